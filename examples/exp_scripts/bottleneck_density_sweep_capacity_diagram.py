@@ -1,92 +1,80 @@
 """Bottleneck runner script for generating flow-density plots.
 
 Run density experiment to generate capacity diagram for the
-bottleneck experiment
+bottleneck experiment. The results of every inflow rate are cached in
+data/bottleneck_sweep, so that interrupted runs can be resumed, and the
+inflow rates can be extended without rerunning previous points.
+
+Usage
+    python bottleneck_density_sweep_capacity_diagram.py --num_workers 4
 """
 
+import argparse
 import multiprocessing
 import numpy as np
 import os
-import ray
 
-from examples.sumo.bottlenecks import bottleneck_example
+from examples.exp_configs.non_rl.bottleneck import flow_params
+from flow.core.sweep import ParameterSweep
 
 
-@ray.remote
-def run_bottleneck(flow_rate, num_trials, num_steps, render=None):
-    """Run a rollout of the bottleneck environment.
+def density_sweep(num_runs, horizon, num_workers, results_dir):
+    """Run the bottleneck environment for a range of inflow rates.
 
     Parameters
     ----------
-    flow_rate : float
-        bottleneck inflow rate
-    num_trials : int
-        number of rollouts to perform
-    num_steps : int
+    num_runs : int
+        number of rollouts to perform per inflow rate
+    horizon : int
         number of simulation steps per rollout
-    render : bool
-        whether to render the environment
+    num_workers : int
+        number of parallel worker processes
+    results_dir : str
+        directory the results of every inflow rate are cached in
 
     Returns
     -------
-    float
-        average outflow rate across rollouts
-    float
-        average speed across rollouts
-    float
-        average rollout density outflow
-    list of float
-        per rollout outflows
-    float
-        inflow rate
+    dict < str, np.ndarray >
+        the per-rollout results of the sweep, see ParameterSweep.load
     """
-    print('Running experiment for inflow rate: ', flow_rate, render)
-    exp = bottleneck_example(flow_rate, num_steps, restart_instance=True)
-    info_dict = exp.run(num_trials, num_steps)
-
-    return info_dict['average_outflow'], \
-        np.mean(info_dict['velocities']), \
-        np.mean(info_dict['average_rollout_density_outflow']), \
-        info_dict['per_rollout_outflows'], \
-        flow_rate
+    sweep = ParameterSweep(
+        flow_params,
+        grid={
+            "inflow_rate": list(range(400, 3000, 100)),
+            "env.horizon": [horizon],
+            "sim.restart_instance": [True],
+        },
+        results_dir=results_dir)
+    print('{} experiments remaining.'.format(len(sweep.pending(num_runs))))
+    return sweep.run(num_runs=num_runs, num_workers=num_workers)
 
 
 if __name__ == '__main__':
-    # import the experiment variable`
-    densities = list(range(400, 3000, 100))
-    outflows = []
-    velocities = []
-    bottleneckdensities = []
-
-    per_step_densities = []
-    per_step_avg_velocities = []
-    per_step_outflows = []
+    parser = argparse.ArgumentParser(
+        description='Run a density sweep of the bottleneck environment.')
+    parser.add_argument('--num_runs', type=int, default=10,
+                        help='Number of rollouts per inflow rate.')
+    parser.add_argument('--horizon', type=int, default=2000,
+                        help='Number of simulation steps per rollout.')
+    parser.add_argument('--num_workers', type=int,
+                        default=max(multiprocessing.cpu_count() - 2, 1),
+                        help='Number of parallel worker processes.')
+    args = parser.parse_args()
 
-    rollout_inflows = []
-    rollout_outflows = []
+    path = os.path.dirname(os.path.abspath(__file__))
+    data_dir = os.path.join(path, '../../data')
+    results = density_sweep(args.num_runs, args.horizon, args.num_workers,
+                            os.path.join(data_dir, 'bottleneck_sweep'))
 
-    num_cpus = multiprocessing.cpu_count()
-    ray.init(num_cpus=max(num_cpus - 2, 1))
-    bottleneck_outputs = [run_bottleneck.remote(d, 10, 2000)
-                          for d in densities]
-    for output in ray.get(bottleneck_outputs):
-        outflow, velocity, bottleneckdensity, \
-            per_rollout_outflows, flow_rate = output
-        for i, _ in enumerate(per_rollout_outflows):
-            rollout_outflows.append(per_rollout_outflows[i])
-            rollout_inflows.append(flow_rate)
-        outflows.append(outflow)
-        velocities.append(velocity)
-        bottleneckdensities.append(bottleneckdensity)
+    # average the results of every inflow rate
+    densities, groups = np.unique(results['inflow_rate'], return_inverse=True)
+    counts = np.bincount(groups)
+    outflows = np.bincount(groups, weights=results['outflows']) / counts
+    velocities = np.bincount(groups, weights=results['velocities']) / counts
 
-    path = os.path.dirname(os.path.abspath(__file__))
-    np.savetxt(path + '/../../data/rets.csv',
-               np.matrix([densities,
-                          outflows,
-                          velocities,
-                          bottleneckdensities]).T,
+    np.savetxt(os.path.join(data_dir, 'rets.csv'),
+               np.array([densities, outflows, velocities]).T,
                delimiter=',')
-    np.savetxt(path + '/../../data/inflows_outflows.csv',
-               np.matrix([rollout_inflows,
-                          rollout_outflows]).T,
+    np.savetxt(os.path.join(data_dir, 'inflows_outflows.csv'),
+               np.array([results['inflow_rate'], results['outflows']]).T,
                delimiter=',')
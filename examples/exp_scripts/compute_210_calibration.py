@@ -1,33 +1,113 @@
-"""We load the calibrated data from calibrated_values and compute how accurate it is."""
+"""Calibrate the car-following parameters of the I-210 subnetwork.
+
+The average speeds on the merge edge of the I-210 subnetwork are compared to
+the speeds observed in calibrated_values/i210_sub_merge_area_reduced.csv.
+The IDM parameters and sumo car-following parameters of the human drivers are
+searched on a local process pool (see flow.core.calibration).
+
+Usage
+    python compute_210_calibration.py --strategy cma --num_evals 256
+
+The errors of previously collected experiments (stored in
+calibrated_values/info_dict.pkl by Experiment.run) can also be computed with:
+
+    python compute_210_calibration.py --score
+"""
+import argparse
+import multiprocessing
 import numpy as np
 import pandas as pd
 import pickle as pkl
 import os
 
-if __name__ == '__main__':
-    with open(os.path.abspath('../calibrated_values/info_dict.pkl'), 'rb') as file:
-        data = pkl.load(file)
+from examples.exp_configs.non_rl.i210_subnetwork import flow_params, edge_id
+from flow.core.calibration import Calibration, SEARCH_STRATEGIES
+
+# length of the intervals of the observed data, in seconds
+INTERVAL = 120
+# bounds of the calibrated parameters
+SPACE = {
+    "acc.a": (0.5, 2.5),
+    "acc.b": (1.0, 3.0),
+    "acc.T": (0.5, 2.0),
+    "acc.s0": (1.0, 4.0),
+    "cf.tau": (0.5, 2.0),
+    "cf.speedFactor": (0.9, 1.2),
+}
+
 
-    calibrated_data = pd.read_csv('../calibrated_values/i210_sub_merge_area_reduced.csv')
+def load_observed_speeds(path):
+    """Return the observed speeds on the merge edge, in m/s."""
+    calibrated_data = pd.read_csv(
+        os.path.join(path, 'i210_sub_merge_area_reduced.csv'))
     valid_section = calibrated_data[calibrated_data['oid'] == 8009307]
-    speeds = valid_section['speed'].to_numpy() / 3.6  # (km/h to m/s)
-    density = valid_section['density']
-    outflow = valid_section['flow']
+    return valid_section['speed'].to_numpy() / 3.6  # (km/h to m/s)
 
-    dict_to_idx = {'oid': 0, 'ent': 1, 'flow': 2, 'ttime': 3,
-                   'speed': 4, 'density': 5, 'lane_changes': 6, 'total_lane_changes': 7}
+
+def score(path, speeds):
+    """Return the errors of the experiments stored in info_dict.pkl."""
+    with open(os.path.join(path, 'info_dict.pkl'), 'rb') as file:
+        data = pkl.load(file)
 
     errors = []
     # compute the speed errors for a given set of params
     for experiment in data:
         merge_speed = experiment['avg_merge_speed']
         # now sum it up in segments noting that the sim step is 0.8
-        num_steps = int(120 / 0.8)
+        num_steps = int(INTERVAL / 0.8)
 
         step_sizes = np.arange(0, len(merge_speed), num_steps)
         # sum up all the slices
         summed_slices = np.add.reduceat(merge_speed, step_sizes) / num_steps
-        # throw away the last point and the first point before the network is formed
-        error = np.abs(np.mean(summed_slices[:-1] - speeds[:summed_slices.shape[0] - 1]))
+        # throw away the last point and the first point before the network is
+        # formed
+        error = np.abs(np.mean(
+            summed_slices[:-1] - speeds[:summed_slices.shape[0] - 1]))
         errors.append(error)
-    print(errors)
+    return errors
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Calibrate the I-210 subnetwork on observed speeds.')
+    parser.add_argument('--strategy', type=str, default='cma',
+                        choices=list(SEARCH_STRATEGIES),
+                        help='Search strategy.')
+    parser.add_argument('--num_evals', type=int, default=256,
+                        help='Maximum number of simulated candidates.')
+    parser.add_argument('--num_workers', type=int,
+                        default=max(multiprocessing.cpu_count() - 2, 1),
+                        help='Number of parallel worker processes.')
+    parser.add_argument('--patience', type=int, default=64,
+                        help='Number of evaluations without improvement '
+                             'after which the search stops.')
+    parser.add_argument('--score', action='store_true',
+                        help='Only compute the errors of the experiments '
+                             'stored in info_dict.pkl.')
+    args = parser.parse_args()
+
+    path = os.path.dirname(os.path.abspath(__file__))
+    data_dir = os.path.join(path, '../calibrated_values')
+    speeds = load_observed_speeds(data_dir)
+
+    if args.score:
+        print(score(data_dir, speeds))
+    else:
+        flow_params['sim'].render = False
+        calibration = Calibration(
+            flow_params,
+            space=SPACE,
+            edge_id=edge_id,
+            observed=speeds,
+            interval=INTERVAL,
+            veh_type='human')
+        result = calibration.run(
+            strategy=args.strategy,
+            num_evals=args.num_evals,
+            num_workers=args.num_workers,
+            patience=args.patience)
+
+        print('Best parameters: {}'.format(result['params']))
+        print('Mean absolute speed error: {:.3f} m/s'.format(result['error']))
+        with open(os.path.join(data_dir, 'calibration.pkl'), 'wb') as file:
+            pkl.dump(result, file)
@@ -82,16 +82,19 @@ def run_model_stablebaseline(flow_params,
     stable_baselines.*
         the trained model
     """
-    from stable_baselines.common.vec_env import DummyVecEnv, SubprocVecEnv
+    from stable_baselines.common.vec_env import DummyVecEnv
     from stable_baselines import PPO2
+    from flow.utils.vec_env import FlowVecEnv
 
     if num_cpus == 1:
         constructor = env_constructor(params=flow_params, version=0)()
         # The algorithms require a vectorized environment to run
         env = DummyVecEnv([lambda: constructor])
     else:
-        env = SubprocVecEnv([env_constructor(params=flow_params, version=i)
-                             for i in range(num_cpus)])
+        # step the simulators of all environments concurrently from within
+        # this process
+        env = FlowVecEnv([env_constructor(params=flow_params, version=i)
+                          for i in range(num_cpus)])
 
     train_model = PPO2('MlpPolicy', env, verbose=1, n_steps=rollout_size)
     train_model.learn(total_timesteps=num_steps)
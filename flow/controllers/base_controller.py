@@ -1,9 +1,35 @@
 """Contains the base acceleration controller class for vehicle control."""
 
 from abc import ABCMeta, abstractmethod
+from contextlib import contextmanager
 import numpy as np
 
 
+@contextmanager
+def bound_to(controller, veh_id):
+    """Bind a controller to a vehicle for the duration of a block.
+
+    The per-vehicle methods of the controllers act for the vehicle of their
+    veh_id attribute. Controllers shared by several vehicles (see the
+    shareable attribute of BaseController) are bound to every vehicle they
+    act for in this way, and the previous vehicle of the controller is
+    restored when the block exits.
+
+    Parameters
+    ----------
+    controller : object
+        an acceleration, lane-changing or routing controller
+    veh_id : str
+        the vehicle the controller acts for in the block
+    """
+    prev_veh_id = controller.veh_id
+    controller.veh_id = veh_id
+    try:
+        yield controller
+    finally:
+        controller.veh_id = prev_veh_id
+
+
 class BaseController(metaclass=ABCMeta):
     """Base class for flow-controlled acceleration behavior.
 
@@ -42,8 +68,30 @@ class BaseController(metaclass=ABCMeta):
         Flag for toggling on/off printing failsafe warnings to screen.
     noise : double
         variance of the gaussian from which to sample a noisy acceleration
+
+    Attributes
+    ----------
+    shareable : bool
+        whether a single instance of the controller may be shared by all the
+        vehicles of a type. Shared instances must keep any per-vehicle state
+        in the kernel (see get_controller_state in the vehicle kernel), and
+        act for several vehicles through get_actions, or through the handles
+        returned by the controller getters of the vehicle kernel (see
+        flow.core.kernel.vehicle.BoundController).
+        Subclasses must set this attribute themselves to be shared: it is
+        reset to False by __init_subclass__ for every subclass that does not
+        set it in its own body, so that subclasses storing per-vehicle state
+        in the controller keep one instance per vehicle.
     """
 
+    shareable = False
+
+    def __init_subclass__(cls, **kwargs):
+        """Reset the shareable attribute of subclasses not setting it."""
+        super().__init_subclass__(**kwargs)
+        if "shareable" not in vars(cls):
+            cls.shareable = False
+
     def __init__(self,
                  veh_id,
                  car_following_params,
@@ -162,6 +210,33 @@ class BaseController(metaclass=ABCMeta):
         env.k.vehicle.update_accel(self.veh_id, accel, noise=True, failsafe=True)
         return accel
 
+    def get_actions(self, env, veh_ids):
+        """Return the actions of several vehicles.
+
+        This is used for controllers shared by several vehicles (see the
+        shareable attribute). By default, get_action is called with the
+        controller bound to every vehicle in turn, and the vehicle of the
+        controller is then restored. Subclasses may override this method to
+        compute the actions of all vehicles at once.
+
+        Parameters
+        ----------
+        env : flow.envs.Env
+            state of the environment at the current time step
+        veh_ids : list of str
+            the vehicles performing an acceleration action
+
+        Returns
+        -------
+        list of (float or None)
+            the action of every vehicle, see get_action
+        """
+        actions = []
+        for veh_id in veh_ids:
+            with bound_to(self, veh_id):
+                actions.append(self.get_action(env))
+        return actions
+
     def get_safe_action_instantaneous(self, env, action):
         """Perform the "instantaneous" failsafe action.
 
@@ -2,6 +2,8 @@
 
 from abc import ABCMeta, abstractmethod
 
+from flow.controllers.base_controller import bound_to
+
 
 class BaseLaneChangeController(metaclass=ABCMeta):
     """Base class for lane-changing controllers.
@@ -28,8 +30,23 @@ class BaseLaneChangeController(metaclass=ABCMeta):
         Dictionary of lane changes params that may optional contain
         "min_gap", which denotes the minimize safe gap (in meters) a car
         is willing to lane-change into.
+
+    Attributes
+    ----------
+    shareable : bool
+        whether a single instance of the controller may be shared by all the
+        vehicles of a type, see flow.controllers.BaseController. It is reset
+        to False for every subclass that does not set it in its own body.
     """
 
+    shareable = False
+
+    def __init_subclass__(cls, **kwargs):
+        """Reset the shareable attribute of subclasses not setting it."""
+        super().__init_subclass__(**kwargs)
+        if "shareable" not in vars(cls):
+            cls.shareable = False
+
     def __init__(self, veh_id, lane_change_params=None):
         """Instantiate the base class for lane-changing controllers."""
         if lane_change_params is None:
@@ -79,3 +96,30 @@ class BaseLaneChangeController(metaclass=ABCMeta):
         # TODO(ak): add failsafe
 
         return lc_action
+
+    def get_actions(self, env, veh_ids):
+        """Return the lane change actions of several vehicles.
+
+        This is used for controllers shared by several vehicles (see the
+        shareable attribute). By default, get_action is called with the
+        controller bound to every vehicle in turn, and the vehicle of the
+        controller is then restored. Subclasses may override this method to
+        compute the actions of all vehicles at once.
+
+        Parameters
+        ----------
+        env : flow.envs.Env
+            state of the environment at the current time step
+        veh_ids : list of str
+            the vehicles performing a lane change action
+
+        Returns
+        -------
+        array_like
+            the lane change action of every vehicle, see get_action
+        """
+        directions = []
+        for veh_id in veh_ids:
+            with bound_to(self, veh_id):
+                directions.append(self.get_action(env))
+        return directions
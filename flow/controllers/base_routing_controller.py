@@ -2,6 +2,8 @@
 
 from abc import ABCMeta, abstractmethod
 
+from flow.controllers.base_controller import bound_to
+
 
 class BaseRouter(metaclass=ABCMeta):
     """Base class for routing controllers.
@@ -25,8 +27,33 @@ class BaseRouter(metaclass=ABCMeta):
         ID of the vehicle this controller is used for
     router_params : dict
         Dictionary of router params
+
+    Attributes
+    ----------
+    route_end_only : bool
+        whether the controller only performs routing actions when its vehicle
+        is on the last edge of its route. If set to True, the controller is
+        only queried at that point, instead of at every step.
+    shareable : bool
+        whether a single instance of the controller may be shared by all the
+        vehicles of a type, see flow.controllers.BaseController
+
+    Both attributes are reset to False by __init_subclass__ for every
+    subclass that does not set them in its own body, so that subclasses
+    implementing another routing logic keep being queried at every step, by
+    their own vehicle, unless they opt in explicitly.
     """
 
+    route_end_only = False
+    shareable = False
+
+    def __init_subclass__(cls, **kwargs):
+        """Reset the attributes of subclasses that do not set them."""
+        super().__init_subclass__(**kwargs)
+        for name in ("route_end_only", "shareable"):
+            if name not in vars(cls):
+                setattr(cls, name, False)
+
     def __init__(self, veh_id, router_params):
         """Instantiate the base class for routing controllers."""
         self.veh_id = veh_id
@@ -49,3 +76,30 @@ class BaseRouter(metaclass=ABCMeta):
             time step.
         """
         pass
+
+    def choose_routes(self, env, veh_ids):
+        """Return the routes chosen by the controller for several vehicles.
+
+        This is used for controllers shared by several vehicles (see the
+        shareable attribute). By default, choose_route is called with the
+        controller bound to every vehicle in turn, and the vehicle of the
+        controller is then restored. Subclasses may override this method to
+        choose the routes of all vehicles at once.
+
+        Parameters
+        ----------
+        env : flow.envs.Env
+            see flow/envs/base.py
+        veh_ids : list of str
+            the vehicles choosing a route
+
+        Returns
+        -------
+        list of (list or None)
+            the route chosen for every vehicle, see choose_route
+        """
+        routes = []
+        for veh_id in veh_ids:
+            with bound_to(self, veh_id):
+                routes.append(self.choose_route(env))
+        return routes
@@ -46,6 +46,8 @@ class CFMController(BaseController):
         to no failsafe (None)
     """
 
+    shareable = True
+
     def __init__(self,
                  veh_id,
                  car_following_params,
@@ -125,6 +127,8 @@ class BCMController(BaseController):
         to no failsafe (None)
     """
 
+    shareable = True
+
     def __init__(self,
                  veh_id,
                  car_following_params,
@@ -208,6 +212,8 @@ class LACController(BaseController):
         to no failsafe (None)
     """
 
+    shareable = True
+
     def __init__(self,
                  veh_id,
                  car_following_params,
@@ -236,10 +242,15 @@ class LACController(BaseController):
         self.k_2 = k_2
         self.h = h
         self.tau = tau
+        # initial acceleration of the vehicles
         self.a = a
 
     def get_accel(self, env):
         """See parent class."""
+        # the current acceleration is stored per vehicle in the kernel
+        state = env.k.vehicle.get_controller_state(self.veh_id)
+        a = state.get("a", self.a)
+
         lead_id = env.k.vehicle.get_leader(self.veh_id)
         lead_vel = env.k.vehicle.get_speed(lead_id)
         this_vel = env.k.vehicle.get_speed(self.veh_id)
@@ -248,10 +259,10 @@ class LACController(BaseController):
         ex = headway - L - self.h * this_vel
         ev = lead_vel - this_vel
         u = self.k_1*ex + self.k_2*ev
-        a_dot = -(self.a/self.tau) + (u/self.tau)
-        self.a = a_dot*env.sim_step + self.a
+        a_dot = -(a/self.tau) + (u/self.tau)
+        state["a"] = a_dot*env.sim_step + a
 
-        return self.a
+        return state["a"]
 
 
 class OVMController(BaseController):
@@ -288,6 +299,8 @@ class OVMController(BaseController):
         to no failsafe (None)
     """
 
+    shareable = True
+
     def __init__(self,
                  veh_id,
                  car_following_params,
@@ -368,6 +381,8 @@ class LinearOVM(BaseController):
         to no failsafe (None)
     """
 
+    shareable = True
+
     def __init__(self,
                  veh_id,
                  car_following_params,
@@ -449,6 +464,8 @@ class IDMController(BaseController):
         to no failsafe (None)
     """
 
+    shareable = True
+
     def __init__(self,
                  veh_id,
                  v0=30,
@@ -510,6 +527,8 @@ class SimCarFollowingController(BaseController):
     Usage: See BaseController for usage example.
     """
 
+    shareable = True
+
     def get_accel(self, env):
         """See parent class."""
         return None
@@ -553,6 +572,8 @@ class GippsController(BaseController):
         to no failsafe (None)
     """
 
+    shareable = True
+
     def __init__(self,
                  veh_id,
                  car_following_params=None,
@@ -636,6 +657,8 @@ class BandoFTLController(BaseController):
         to no failsafe (None)
     """
 
+    shareable = True
+
     def __init__(self,
                  veh_id,
                  car_following_params,
@@ -1,5 +1,7 @@
 """Contains a list of custom lane change controllers."""
 
+import numpy as np
+
 from flow.controllers.base_lane_changing_controller import \
     BaseLaneChangeController
 
@@ -10,6 +12,8 @@ class SimLaneChangeController(BaseLaneChangeController):
     Usage: See base class for usage example.
     """
 
+    shareable = True
+
     def get_lane_change_action(self, env):
         """See parent class."""
         return None
@@ -21,6 +25,12 @@ class StaticLaneChanger(BaseLaneChangeController):
     Usage: See base class for usage example.
     """
 
+    shareable = True
+
     def get_lane_change_action(self, env):
         """See parent class."""
         return 0
+
+    def get_actions(self, env, veh_ids):
+        """See parent class."""
+        return np.zeros(len(veh_ids), dtype=int)
@@ -1,6 +1,5 @@
 """Contains a list of custom routing controllers."""
 import random
-import numpy as np
 
 from flow.controllers.base_routing_controller import BaseRouter
 
@@ -16,6 +15,9 @@ class ContinuousRouter(BaseRouter):
     See base class for usage example.
     """
 
+    route_end_only = True
+    shareable = True
+
     def choose_route(self, env):
         """See parent class.
 
@@ -31,16 +33,39 @@ class ContinuousRouter(BaseRouter):
         elif edge == current_route[-1]:
             # choose one of the available routes based on the fraction of times
             # the given route can be chosen
-            num_routes = len(env.available_routes[edge])
-            frac = [val[1] for val in env.available_routes[edge]]
-            route_id = np.random.choice(
-                [i for i in range(num_routes)], size=1, p=frac)[0]
+            route_id = env.k.network.sample_routes(edge)
 
             # pass the chosen route
             return env.available_routes[edge][route_id][0]
         else:
             return None
 
+    def choose_routes(self, env, veh_ids):
+        """See parent class.
+
+        The routes of all vehicles leaving the same edge are sampled at once.
+        """
+        if type(self).choose_route is not ContinuousRouter.choose_route:
+            # subclasses with custom routing logic choose routes one at a time
+            return super().choose_routes(env, veh_ids)
+
+        edges = env.k.vehicle.get_edge(veh_ids)
+        routes = env.k.vehicle.get_route(veh_ids)
+
+        # group the vehicles about to leave the network by edge
+        leaving = {}
+        for i, (edge, route) in enumerate(zip(edges, routes)):
+            if len(route) > 0 and edge == route[-1]:
+                leaving.setdefault(edge, []).append(i)
+
+        choices = [None] * len(veh_ids)
+        for edge, indices in leaving.items():
+            route_ids = env.k.network.sample_routes(edge, size=len(indices))
+            for i, route_id in zip(indices, route_ids):
+                choices[i] = env.available_routes[edge][route_id][0]
+
+        return choices
+
 
 class MinicityRouter(BaseRouter):
     """A router used to continuously re-route vehicles in minicity network.
@@ -52,6 +77,8 @@ class MinicityRouter(BaseRouter):
     See base class for usage example.
     """
 
+    shareable = True
+
     def choose_route(self, env):
         """See parent class."""
         vehicles = env.k.vehicle
@@ -89,6 +116,9 @@ class GridRouter(BaseRouter):
     See base class for usage example.
     """
 
+    route_end_only = True
+    shareable = True
+
     def choose_route(self, env):
         """See parent class."""
         if len(env.k.vehicle.get_route(self.veh_id)) == 0:
@@ -112,6 +142,9 @@ class BayBridgeRouter(ContinuousRouter):
     See base class for usage example.
     """
 
+    route_end_only = False
+    shareable = True
+
     def choose_route(self, env):
         """See parent class."""
         edge = env.k.vehicle.get_edge(self.veh_id)
@@ -136,6 +169,9 @@ class I210Router(ContinuousRouter):
     See base class for usage example.
     """
 
+    route_end_only = False
+    shareable = True
+
     def choose_route(self, env):
         """See parent class."""
         edge = env.k.vehicle.get_edge(self.veh_id)
@@ -22,6 +22,8 @@ class FollowerStopper(BaseController):
         desired speed of the vehicles (m/s)
     """
 
+    shareable = True
+
     def __init__(self,
                  veh_id,
                  car_following_params,
@@ -119,6 +121,8 @@ class FollowerStopper(BaseController):
 class NonLocalFollowerStopper(FollowerStopper):
     """Follower stopper that uses the average system speed to compute its acceleration."""
 
+    shareable = True
+
     def get_accel(self, env):
         """See parent class."""
         lead_id = env.k.vehicle.get_leader(self.veh_id)
@@ -182,6 +186,8 @@ class PISaturation(BaseController):
         object defining sumo-specific car-following parameters
     """
 
+    shareable = True
+
     def __init__(self, veh_id, car_following_params):
         """Instantiate PISaturation."""
         BaseController.__init__(self, veh_id, car_following_params, delay=1.0)
@@ -189,9 +195,6 @@ class PISaturation(BaseController):
         # maximum achievable acceleration by the vehicle
         self.max_accel = car_following_params.controller_params['accel']
 
-        # history used to determine AV desired velocity
-        self.v_history = []
-
         # other parameters
         self.gamma = 2
         self.g_l = 7
@@ -203,10 +206,14 @@ class PISaturation(BaseController):
         self.beta = 1 - 0.5 * self.alpha
         self.U = 0
         self.v_target = 0
-        self.v_cmd = 0
 
     def get_accel(self, env):
         """See parent class."""
+        # the velocity history used to determine the AV desired velocity and
+        # the commanded velocity are stored per vehicle in the kernel
+        state = env.k.vehicle.get_controller_state(self.veh_id)
+        v_history = state.setdefault("v_history", [])
+
         lead_id = env.k.vehicle.get_leader(self.veh_id)
         lead_vel = env.k.vehicle.get_speed(lead_id)
         this_vel = env.k.vehicle.get_speed(self.veh_id)
@@ -216,13 +223,13 @@ class PISaturation(BaseController):
         dx_s = max(2 * dv, 4)
 
         # update the AV's velocity history
-        self.v_history.append(this_vel)
+        v_history.append(this_vel)
 
-        if len(self.v_history) == int(38 / env.sim_step):
-            del self.v_history[0]
+        if len(v_history) == int(38 / env.sim_step):
+            del v_history[0]
 
         # update desired velocity values
-        v_des = np.mean(self.v_history)
+        v_des = np.mean(v_history)
         v_target = v_des + self.v_catch \
             * min(max((dx - self.g_l) / (self.g_u - self.g_l), 0), 1)
 
@@ -231,10 +238,11 @@ class PISaturation(BaseController):
         beta = 1 - 0.5 * alpha
 
         # compute desired velocity
-        self.v_cmd = beta * (alpha * v_target + (1 - alpha) * lead_vel) \
-            + (1 - beta) * self.v_cmd
+        v_cmd = beta * (alpha * v_target + (1 - alpha) * lead_vel) \
+            + (1 - beta) * state.get("v_cmd", 0)
+        state["v_cmd"] = v_cmd
 
         # compute the acceleration
-        accel = (self.v_cmd - this_vel) / env.sim_step
+        accel = (v_cmd - this_vel) / env.sim_step
 
         return min(accel, self.max_accel)
@@ -0,0 +1,504 @@
+"""Contains a parallel calibration engine for car-following models.
+
+A calibration searches for the car-following parameters (e.g. the parameters
+of an IDMController, or the SumoCarFollowingParams of a vehicle type) for
+which the average speeds on an edge of the network best match observed
+speeds:
+
+    >>> calibration = Calibration(
+    >>>     flow_params,
+    >>>     space={"acc.a": (0.5, 2.0), "acc.b": (1.0, 3.0),
+    >>>            "cf.tau": (0.5, 2.0)},
+    >>>     edge_id="119257908#1-AddedOnRampEdge",
+    >>>     observed=speeds,
+    >>>     interval=120)
+    >>> result = calibration.run(strategy="cma", num_evals=256)
+
+The candidate parameters are simulated in parallel on a local process pool.
+Every worker averages the speeds on the edge over the intervals of the
+observed data, and only sends back this (short) time series. Workers stop
+their simulation as soon as its error is certain to exceed the best error
+found so far, and the search stops once it has not improved for a number of
+evaluations.
+"""
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from copy import deepcopy
+import itertools
+import os
+import random
+
+import numpy as np
+
+from flow.core.sweep import NAMED_OVERRIDES, set_param
+from flow.utils.registry import make_create_env
+
+
+def set_acc_param(flow_params, name, value, veh_type=None):
+    """Set a parameter of the acceleration controller of vehicle types.
+
+    Parameters
+    ----------
+    flow_params : dict
+        flow-specific parameters, modified in place
+    name : str
+        name of the parameter, e.g. "a" or "b" for the IDMController
+    value : Any
+        new value of the parameter
+    veh_type : str, optional
+        the vehicle type whose controller is modified. If not specified, the
+        controllers of all types are modified.
+    """
+    vehicles = flow_params['veh']
+    for type_id, params in vehicles.type_parameters.items():
+        if veh_type in (None, type_id):
+            controller, kwargs = params['acceleration_controller']
+            params['acceleration_controller'] = \
+                (controller, dict(kwargs, **{name: value}))
+    for params in vehicles.initial:
+        if veh_type in (None, params['veh_id']):
+            params['acceleration_controller'] = vehicles.type_parameters[
+                params['veh_id']]['acceleration_controller']
+
+
+def set_car_following_param(flow_params, name, value, veh_type=None):
+    """Set a sumo car-following parameter of vehicle types.
+
+    Parameters
+    ----------
+    flow_params : dict
+        flow-specific parameters, modified in place
+    name : str
+        name of the sumo parameter, e.g. "tau", "minGap" or "speedFactor"
+        (see flow.core.params.SumoCarFollowingParams)
+    value : Any
+        new value of the parameter
+    veh_type : str, optional
+        the vehicle type that is modified. If not specified, all types are
+        modified.
+    """
+    vehicles = flow_params['veh']
+    for typ in vehicles.types:
+        if veh_type in (None, typ['veh_id']):
+            typ['type_params'][name] = value
+            vehicles.type_parameters[typ['veh_id']][
+                'car_following_params'].controller_params[name] = value
+            if name == 'minGap':
+                vehicles.minGap[typ['veh_id']] = value
+
+
+# prefixes of the parameters of the car-following models
+PARAM_PREFIXES = {
+    "acc": set_acc_param,
+    "cf": set_car_following_param,
+}
+
+
+def apply_params(flow_params, params, veh_type=None):
+    """Return a copy of flow_params with calibrated parameters applied.
+
+    Parameters are designated by "acc.<name>" for the parameters of the
+    acceleration controllers (see ``set_acc_param``), by "cf.<name>" for the
+    sumo car-following parameters (see ``set_car_following_param``), and
+    otherwise by one of the named overrides or dotted paths of
+    flow.core.sweep.
+
+    Parameters
+    ----------
+    flow_params : dict
+        base flow-specific parameters
+    params : dict
+        value of every calibrated parameter
+    veh_type : str, optional
+        the vehicle type whose car-following parameters are modified. If not
+        specified, all types are modified.
+
+    Returns
+    -------
+    dict
+        the modified flow-specific parameters
+    """
+    flow_params = deepcopy(flow_params)
+    for name, value in params.items():
+        prefix, _, param = name.partition(".")
+        if prefix in PARAM_PREFIXES:
+            PARAM_PREFIXES[prefix](flow_params, param, value, veh_type)
+        elif name in NAMED_OVERRIDES:
+            NAMED_OVERRIDES[name](flow_params, value)
+        else:
+            set_param(flow_params, name, value)
+    return flow_params
+
+
+def _evaluate(flow_params, seed, edge_id, interval_steps, observed,
+              threshold):
+    """Simulate a candidate and compare its speeds to the observed speeds.
+
+    The error is the mean absolute difference between the average speeds of
+    the simulation and the observed speeds over all intervals. Since the sum
+    of the differences can only grow, the simulation is stopped as soon as
+    this error is certain to exceed the threshold.
+
+    Returns
+    -------
+    float
+        the error of the candidate, or a lower bound of the error if the
+        simulation was stopped early
+    np.ndarray
+        the average speed on the edge during every simulated interval
+    bool
+        whether the simulation was stopped early
+    """
+    flow_params['sim'].seed = seed
+    random.seed(seed)
+    np.random.seed(seed)
+
+    create_env, _ = make_create_env(flow_params)
+    env = create_env()
+    try:
+        num_intervals = min(len(observed),
+                            env.env_params.horizon // interval_steps)
+        speeds = np.zeros(num_intervals)
+        total_error = 0.
+
+        env.reset()
+        for k in range(num_intervals):
+            for _ in range(interval_steps):
+                env.step(None)
+                veh_ids = env.k.vehicle.get_ids_by_edge(edge_id)
+                if len(veh_ids) > 0:
+                    speeds[k] += np.mean(env.k.vehicle.get_speed(veh_ids))
+            speeds[k] /= interval_steps
+
+            total_error += abs(speeds[k] - observed[k])
+            if total_error / num_intervals > threshold:
+                return total_error / num_intervals, speeds[:k + 1], True
+
+        return total_error / num_intervals, speeds, False
+    finally:
+        env.terminate()
+
+
+class GridSearch(object):
+    """Evaluate the points of a regular grid of the search space.
+
+    All searches operate on the unit hypercube, which is mapped linearly to
+    the bounds of the parameters by the Calibration class.
+    """
+
+    def __init__(self, dim, seed=0, grid_size=5):
+        """Instantiate the search.
+
+        Parameters
+        ----------
+        dim : int
+            number of calibrated parameters
+        seed : int, optional
+            unused, the grid is evaluated in order
+        grid_size : int, optional
+            number of values of every parameter
+        """
+        values = np.linspace(0, 1, grid_size)
+        self._points = itertools.product(values, repeat=dim)
+
+    def ask(self, num):
+        """Return up to num candidates, or none once the grid is exhausted.
+
+        Returns
+        -------
+        np.ndarray
+            the candidates, of shape (num_candidates, dim)
+        """
+        return np.array(list(itertools.islice(self._points, num)))
+
+    def tell(self, x, error):
+        """Update the search with the error of an evaluated candidate."""
+        pass
+
+
+class RandomSearch(GridSearch):
+    """Evaluate points sampled uniformly from the search space."""
+
+    def __init__(self, dim, seed=0):
+        """Instantiate the search.
+
+        Parameters
+        ----------
+        dim : int
+            number of calibrated parameters
+        seed : int, optional
+            seed of the sampled points
+        """
+        self._dim = dim
+        self._rng = np.random.RandomState(seed)
+
+    def ask(self, num):
+        """See parent class."""
+        return self._rng.uniform(size=(num, self._dim))
+
+
+class CMASearch(RandomSearch):
+    """Sample points from a gaussian adapted to the best candidates.
+
+    This is a simplified, separable variant of CMA-ES: the covariance of the
+    search distribution is diagonal, and is only adapted with the rank-mu
+    update (there are no evolution paths). Once a full population of
+    candidates is evaluated, the mean moves to the weighted mean of its best
+    half, and the variance of every parameter to the weighted variance of
+    these candidates around the previous mean.
+
+    Candidates may be told in any order, and candidates sampled before an
+    update may be told after it, so that workers never wait for a full
+    population to be evaluated.
+    """
+
+    def __init__(self, dim, seed=0, population=None, sigma=0.3):
+        """Instantiate the search.
+
+        Parameters
+        ----------
+        dim : int
+            number of calibrated parameters
+        seed : int, optional
+            seed of the sampled points
+        population : int, optional
+            number of candidates evaluated between two updates. Defaults to
+            the population size of CMA-ES, 4 + 3 log(dim)
+        sigma : float, optional
+            initial standard deviation of every parameter
+        """
+        super(CMASearch, self).__init__(dim, seed)
+        self.population = population or 4 + int(3 * np.log(dim))
+        self.mean = np.full(dim, 0.5)
+        self.sigma = np.full(dim, sigma)
+
+        mu = max(self.population // 2, 1)
+        weights = np.log(mu + 0.5) - np.log(np.arange(1, mu + 1))
+        self._weights = weights / np.sum(weights)
+        mu_eff = 1 / np.sum(self._weights ** 2)
+        self._c_mu = min(1, mu_eff / (dim + 2) ** 2 * 2)
+
+        self._evaluated = []
+
+    def ask(self, num):
+        """See parent class."""
+        x = self.mean + self.sigma * self._rng.normal(size=(num, self._dim))
+        return np.clip(x, 0, 1)
+
+    def tell(self, x, error):
+        """See parent class."""
+        self._evaluated.append((error, x))
+        if len(self._evaluated) < self.population:
+            return
+
+        self._evaluated.sort(key=lambda e: e[0])
+        best = np.array([x for _, x in self._evaluated[:len(self._weights)]])
+        self._evaluated = []
+
+        step = best - self.mean
+        var = (1 - self._c_mu) * self.sigma ** 2 + \
+            self._c_mu * np.dot(self._weights, step ** 2)
+        self.mean = np.dot(self._weights, best)
+        self.sigma = np.sqrt(var)
+
+
+SEARCH_STRATEGIES = {
+    "grid": GridSearch,
+    "random": RandomSearch,
+    "cma": CMASearch,
+}
+
+
+class Calibration(object):
+    """Calibrate car-following parameters against observed edge speeds.
+
+    Attributes
+    ----------
+    flow_params : dict
+        base flow-specific parameters of the simulations
+    space : dict < str, (float, float) >
+        lower and upper bound of every calibrated parameter, see
+        ``apply_params`` for the names of the parameters
+    edge_id : str
+        the edge whose average speed is compared to the observed speeds
+    observed : np.ndarray
+        the observed average speed on the edge during every interval, in m/s.
+        The first interval starts at the end of the warmup steps
+    interval_steps : int
+        number of environment steps per interval
+    veh_type : str or None
+        the vehicle type whose car-following parameters are calibrated, or
+        None for all types
+    seed : int
+        random seed of the simulations. All candidates are simulated with the
+        same seed, so that their errors only differ through their parameters
+    """
+
+    def __init__(self,
+                 flow_params,
+                 space,
+                 edge_id,
+                 observed,
+                 interval,
+                 veh_type=None,
+                 seed=0):
+        """Instantiate the calibration.
+
+        Parameters
+        ----------
+        flow_params : dict
+            base flow-specific parameters of the simulations
+        space : dict < str, (float, float) >
+            lower and upper bound of every calibrated parameter
+        edge_id : str
+            the edge whose average speed is compared to the observed speeds
+        observed : array_like
+            the observed average speed on the edge during every interval
+        interval : float
+            length of the intervals, in seconds
+        veh_type : str, optional
+            the vehicle type whose car-following parameters are calibrated
+        seed : int, optional
+            random seed of the simulations
+        """
+        self.flow_params = flow_params
+        self.space = space
+        self.edge_id = edge_id
+        self.observed = np.asarray(observed, dtype=float)
+        self.veh_type = veh_type
+        self.seed = seed
+
+        step_length = flow_params['sim'].sim_step * \
+            flow_params['env'].sims_per_step
+        self.interval_steps = max(int(round(interval / step_length)), 1)
+        if flow_params['env'].horizon < self.interval_steps:
+            raise ValueError(
+                "The horizon ({} steps) is shorter than an interval ({} "
+                "steps).".format(flow_params['env'].horizon,
+                                 self.interval_steps))
+
+        bounds = np.array(list(space.values()), dtype=float).reshape(-1, 2)
+        self._low = bounds[:, 0]
+        self._high = bounds[:, 1]
+
+    def params(self, x):
+        """Return the parameters of a point of the unit hypercube.
+
+        Parameters
+        ----------
+        x : array_like
+            the point, with one coordinate per calibrated parameter
+
+        Returns
+        -------
+        dict < str, float >
+            value of every calibrated parameter
+        """
+        values = self._low + np.asarray(x) * (self._high - self._low)
+        return dict(zip(self.space, values.tolist()))
+
+    def _job(self, x, threshold):
+        """Return the arguments of the evaluation of a candidate."""
+        flow_params = apply_params(
+            self.flow_params, self.params(x), self.veh_type)
+        return (flow_params, self.seed, self.edge_id, self.interval_steps,
+                self.observed, threshold)
+
+    def run(self,
+            strategy="cma",
+            num_evals=100,
+            num_workers=None,
+            patience=None,
+            tol=1e-3,
+            search_seed=0,
+            **search_kwargs):
+        """Search for the parameters that best match the observed speeds.
+
+        Parameters
+        ----------
+        strategy : str, optional
+            the search strategy, one of "grid", "random" or "cma"
+        num_evals : int, optional
+            maximum number of candidates to evaluate
+        num_workers : int, optional
+            number of worker processes. If set to 1, the candidates are
+            simulated in the current process. Defaults to the number of CPUs.
+        patience : int, optional
+            the search stops once this number of consecutive evaluations did
+            not improve the best error by more than tol. Defaults to never
+            stopping early
+        tol : float, optional
+            minimum improvement of the best error, in m/s
+        search_seed : int, optional
+            seed of the search strategy
+        search_kwargs : dict
+            additional parameters of the search strategy, e.g. grid_size or
+            population
+
+        Returns
+        -------
+        dict
+            the results of the calibration, with the following keys:
+
+            * "params": the best parameters found
+            * "error": the error of the best parameters, in m/s
+            * "speeds": the average speeds of the best parameters
+            * "history": the parameters, errors, and whether the simulation
+              was stopped early, for every evaluated candidate
+        """
+        search = SEARCH_STRATEGIES[strategy](
+            len(self.space), search_seed, **search_kwargs)
+        history = {"params": [], "error": [], "pruned": []}
+        best = {"params": None, "error": np.inf, "speeds": None}
+        state = {"stale": 0, "done": False}
+
+        def record(x, result):
+            error, speeds, pruned = result
+            search.tell(x, error)
+            history["params"].append(self.params(x))
+            history["error"].append(error)
+            history["pruned"].append(pruned)
+            if error < best["error"] - tol:
+                state["stale"] = 0
+            else:
+                state["stale"] += 1
+            if error < best["error"]:
+                best.update(params=self.params(x), error=error, speeds=speeds)
+            if patience is not None and state["stale"] >= patience:
+                state["done"] = True
+            print("Calibration: {}/{} candidates evaluated, best error: "
+                  "{:.3f}".format(len(history["error"]), num_evals,
+                                  best["error"]))
+
+        num_submitted = 0
+        if num_workers == 1:
+            while num_submitted < num_evals and not state["done"]:
+                candidates = search.ask(1)
+                if len(candidates) == 0:
+                    break
+                num_submitted += 1
+                record(candidates[0],
+                       _evaluate(*self._job(candidates[0], best["error"])))
+        else:
+            num_workers = num_workers or os.cpu_count()
+            with ProcessPoolExecutor(max_workers=num_workers) as pool:
+                # keep all workers busy, and submit a new candidate (with the
+                # best error so far as threshold) every time one completes
+                futures = {}
+                while True:
+                    num_new = min(num_workers - len(futures),
+                                  num_evals - num_submitted)
+                    if num_new > 0 and not state["done"]:
+                        for x in search.ask(num_new):
+                            future = pool.submit(
+                                _evaluate, *self._job(x, best["error"]))
+                            futures[future] = x
+                            num_submitted += 1
+                    if len(futures) == 0:
+                        break
+                    completed, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in completed:
+                        record(futures.pop(future), future.result())
+
+        history = {key: np.array(val) if key != "params" else val
+                   for key, val in history.items()}
+        return dict(best, history=history)
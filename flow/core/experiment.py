@@ -1,7 +1,9 @@
 """Contains an experiment class for running traffic simulations."""
 from flow.utils.registry import make_create_env
+from flow.core.kernel import TrajectoryRecorder
 from datetime import datetime
 import logging
+import os
 import time
 import numpy as np
 
@@ -83,7 +85,8 @@ class Experiment:
 
         logging.info("Initializing environment.")
 
-    def run(self, num_runs, rl_actions=None, convert_to_csv=False):
+    def run(self, num_runs, rl_actions=None, convert_to_csv=False,
+            record_path=None):
         """Run the given network for a set number of runs.
 
         Parameters
@@ -96,6 +99,11 @@ class Experiment:
         convert_to_csv : bool
             Specifies whether to convert the emission file created by sumo
             into a csv file
+        record_path : str, optional
+            if specified, the states of the vehicles and traffic lights of
+            every run are recorded in the "run_<i>" subdirectory of this path,
+            and may be replayed without the simulator using
+            flow.core.kernel.ReplayKernel
 
         Returns
         -------
@@ -140,12 +148,20 @@ class Experiment:
             vel = []
             custom_vals = {key: [] for key in self.custom_callables.keys()}
             state = self.env.reset()
+            recorder = None
+            if record_path is not None:
+                recorder = TrajectoryRecorder(
+                    os.path.join(record_path, "run_{}".format(i)))
+                recorder.record(self.env.k)
             for j in range(num_steps):
                 t0 = time.time()
                 state, reward, done, _ = self.env.step(rl_actions(state))
                 t1 = time.time()
                 times.append(1 / (t1 - t0))
 
+                if recorder is not None:
+                    recorder.record(self.env.k)
+
                 # Compute the velocity speeds and cumulative returns.
                 veh_ids = self.env.k.vehicle.get_ids()
                 vel.append(np.mean(self.env.k.vehicle.get_speed(veh_ids)))
@@ -158,6 +174,9 @@ class Experiment:
                 if done:
                     break
 
+            if recorder is not None:
+                recorder.close()
+
             # Store the information from the run in info_dict.
             outflow = self.env.k.vehicle.get_outflow_rate(int(500))
             info_dict["returns"].append(ret)
@@ -1,5 +1,6 @@
 """Empty init file to ensure documentation for the kernel module is created."""
 
 from flow.core.kernel.kernel import Kernel
+from flow.core.kernel.replay import ReplayKernel, TrajectoryRecorder
 
-__all__ = ["Kernel"]
+__all__ = ["Kernel", "ReplayKernel", "TrajectoryRecorder"]
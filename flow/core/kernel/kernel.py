@@ -1,11 +1,6 @@
 """Script containing the Flow kernel object for interacting with traffic simulators."""
 
 import warnings
-from flow.core.kernel.simulation import TraCISimulation, AimsunKernelSimulation
-from flow.core.kernel.network import TraCIKernelNetwork, AimsunKernelNetwork
-from flow.core.kernel.vehicle import TraCIVehicle, AimsunKernelVehicle
-from flow.core.kernel.traffic_light import TraCITrafficLight, \
-    AimsunKernelTrafficLight
 from flow.utils.exceptions import FatalFlowError
 
 
@@ -62,12 +57,24 @@ class Kernel(object):
         """
         self.kernel_api = None
 
+        # the kernel subclasses of a simulator are only imported when the
+        # simulator is used
         if simulator == "traci":
+            from flow.core.kernel.simulation.traci import TraCISimulation
+            from flow.core.kernel.network.traci import TraCIKernelNetwork
+            from flow.core.kernel.vehicle.traci import TraCIVehicle
+            from flow.core.kernel.traffic_light.traci import TraCITrafficLight
             self.simulation = TraCISimulation(self)
             self.network = TraCIKernelNetwork(self, sim_params)
             self.vehicle = TraCIVehicle(self, sim_params)
             self.traffic_light = TraCITrafficLight(self)
         elif simulator == 'aimsun':
+            from flow.core.kernel.simulation.aimsun import \
+                AimsunKernelSimulation
+            from flow.core.kernel.network.aimsun import AimsunKernelNetwork
+            from flow.core.kernel.vehicle.aimsun import AimsunKernelVehicle
+            from flow.core.kernel.traffic_light.aimsun import \
+                AimsunKernelTrafficLight
             self.simulation = AimsunKernelSimulation(self)
             self.network = AimsunKernelNetwork(self, sim_params)
             self.vehicle = AimsunKernelVehicle(self, sim_params)
@@ -1,7 +1,14 @@
 """Empty init file to ensure documentation for the network module is created."""
 
+from flow.utils.lazy_import import lazy_import
 from flow.core.kernel.network.base import BaseKernelNetwork
-from flow.core.kernel.network.traci import TraCIKernelNetwork
-from flow.core.kernel.network.aimsun import AimsunKernelNetwork
 
-__all__ = ["BaseKernelNetwork", "TraCIKernelNetwork", "AimsunKernelNetwork"]
+# the simulator backends are imported on first access
+__getattr__, __dir__ = lazy_import(__name__, {
+    'TraCIKernelNetwork': 'flow.core.kernel.network.traci',
+    'AimsunKernelNetwork': 'flow.core.kernel.network.aimsun',
+    'ReplayKernelNetwork': 'flow.core.kernel.network.replay',
+})
+
+__all__ = ["BaseKernelNetwork", "TraCIKernelNetwork", "AimsunKernelNetwork",
+           "ReplayKernelNetwork"]
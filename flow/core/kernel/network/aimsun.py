@@ -237,6 +237,7 @@ class AimsunKernelNetwork(BaseKernelNetwork):
 
         # specify routes vehicles can take  # TODO: move into a method
         self.rts = self.network.routes
+        self._build_route_tables()
 
     def pass_api(self, kernel_api):
         """See parent class."""
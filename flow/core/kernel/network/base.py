@@ -10,6 +10,43 @@ from flow.utils.exceptions import FatalFlowError
 VEHICLE_LENGTH = 5
 
 
+def alias_table(probabilities):
+    """Compute the alias table of a discrete probability distribution.
+
+    The table allows to sample from the distribution in constant time, by
+    drawing a uniformly random index i, and returning i with probability
+    prob[i], and alias[i] otherwise (Vose's alias method).
+
+    Parameters
+    ----------
+    probabilities : array_like
+        the (unnormalized) probability of every outcome
+
+    Returns
+    -------
+    np.ndarray
+        probability of keeping every index
+    np.ndarray
+        alias of every index
+    """
+    n = len(probabilities)
+    scaled = np.asarray(probabilities, dtype=float)
+    scaled = scaled * n / scaled.sum()
+    prob = np.ones(n)
+    alias = np.arange(n)
+
+    small = [i for i in range(n) if scaled[i] < 1]
+    large = [i for i in range(n) if scaled[i] >= 1]
+    while small and large:
+        i, j = small.pop(), large.pop()
+        prob[i] = scaled[i]
+        alias[i] = j
+        scaled[j] -= 1 - scaled[i]
+        (small if scaled[j] < 1 else large).append(j)
+
+    return prob, alias
+
+
 class BaseKernelNetwork(object):
     """Base network kernel.
 
@@ -72,6 +109,11 @@ class BaseKernelNetwork(object):
         self.internal_edgestarts_dict = None
         self.total_edgestarts = None
         self.total_edgestarts_dict = None
+        self.rts = None
+
+        # alias tables of the routes starting from every edge, see
+        # sample_routes
+        self._route_tables = {}
 
     def generate_network(self, network):
         """Generate the necessary prerequisites for the simulating a network.
@@ -154,6 +196,54 @@ class BaseKernelNetwork(object):
         """Return the names of all junctions in the network."""
         raise NotImplementedError
 
+    def sample_routes(self, edge, size=None):
+        """Sample routes starting from an edge.
+
+        The routes are sampled among the routes in ``rts[edge]``, based on the
+        fraction of times every route is chosen.
+
+        Parameters
+        ----------
+        edge : str
+            name of the edge the routes start from
+        size : int, optional
+            number of routes to sample. If not specified, a single route is
+            sampled.
+
+        Returns
+        -------
+        int or np.ndarray
+            the index of the sampled route(s) in ``rts[edge]``
+        """
+        if edge not in self._route_tables:
+            self._route_tables[edge] = self._route_table(edge)
+        prob, alias = self._route_tables[edge]
+
+        n = 1 if size is None else size
+        index = np.random.randint(len(prob), size=n)
+        index = np.where(
+            np.random.random_sample(n) < prob[index], index, alias[index])
+
+        return int(index[0]) if size is None else index
+
+    def _route_table(self, edge):
+        """Compute the alias table of the routes starting from an edge."""
+        routes = self.rts[edge]
+        if isinstance(routes[0], str):
+            # single route without a fraction
+            return alias_table([1])
+        return alias_table([frac for _, frac in routes])
+
+    def _build_route_tables(self):
+        """Compute the alias tables of the routes starting from every edge.
+
+        This is called by the simulator kernels once the routes in ``rts``
+        have been specified.
+        """
+        self._route_tables = {
+            edge: self._route_table(edge)
+            for edge in self.rts if len(self.rts[edge]) > 0}
+
     def get_edge(self, x):  # TODO: maybe remove
         """Compute an edge and relative position from an absolute position.
 
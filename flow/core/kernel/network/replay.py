@@ -0,0 +1,90 @@
+"""Script containing the replay network kernel class."""
+
+from flow.core.kernel.network import BaseKernelNetwork
+
+
+class ReplayKernelNetwork(BaseKernelNetwork):
+    """Network kernel holding the static properties of a recorded network.
+
+    The properties of the edges and junctions are stored alongside the
+    recorded rollouts (see flow.core.kernel.TrajectoryRecorder). Edges are
+    referred to by integer codes in the recorded columns.
+    """
+
+    def __init__(self, master_kernel, sim_params, properties):
+        """Instantiate the replay network kernel.
+
+        Parameters
+        ----------
+        master_kernel : flow.core.kernel.ReplayKernel
+            the replay kernel
+        sim_params : flow.core.params.SimParams
+            simulation-specific parameters
+        properties : dict
+            the recorded network properties, consisting of the names, lengths,
+            speed limits and number of lanes of the edges and junctions,
+            whether each of them is a junction, and the total length and
+            maximum speed of the network
+        """
+        BaseKernelNetwork.__init__(self, master_kernel, sim_params)
+
+        self._names = properties["edges"]
+        self._codes = {edge: i for i, edge in enumerate(self._names)}
+        self._lengths = properties["lengths"]
+        self._speed_limits = properties["speed_limits"]
+        self._num_lanes = properties["num_lanes"]
+        self._junction = properties["junction"]
+        self._length = properties["length"]
+        self._max_speed = properties["max_speed"]
+
+    def update(self, reset):
+        """See parent class.
+
+        The recorded network is static, so nothing needs to be updated.
+        """
+        pass
+
+    def close(self):
+        """See parent class."""
+        pass
+
+    def edge_code(self, edge_id):
+        """Return the integer code of an edge, or -1 if it is not known."""
+        return self._codes.get(edge_id, -1)
+
+    def edge_name(self, code):
+        """Return the name of the edge of an integer code ("" for -1)."""
+        return self._names[code] if code >= 0 else ""
+
+    def edge_length(self, edge_id):
+        """See parent class."""
+        code = self.edge_code(edge_id)
+        return self._lengths[code] if code >= 0 else -1001
+
+    def length(self):
+        """See parent class."""
+        return self._length
+
+    def speed_limit(self, edge_id):
+        """See parent class."""
+        code = self.edge_code(edge_id)
+        return self._speed_limits[code] if code >= 0 else -1001
+
+    def max_speed(self):
+        """See parent class."""
+        return self._max_speed
+
+    def num_lanes(self, edge_id):
+        """See parent class."""
+        code = self.edge_code(edge_id)
+        return self._num_lanes[code] if code >= 0 else -1001
+
+    def get_edge_list(self):
+        """See parent class."""
+        return [edge for edge, junction in zip(self._names, self._junction)
+                if not junction]
+
+    def get_junction_list(self):
+        """See parent class."""
+        return [edge for edge, junction in zip(self._names, self._junction)
+                if junction]
@@ -1,14 +1,18 @@
 """Script containing the TraCI network kernel class."""
 import tempfile
+import hashlib
+from bisect import bisect_right
 
 from flow.core.kernel.network import BaseKernelNetwork
 from flow.core.util import makexml, printxml, ensure_dir
 import time
 import os
 import subprocess
+import io
 import xml.etree.ElementTree as ElementTree
 from lxml import etree
 from copy import deepcopy
+import numpy as np
 
 E = etree.Element
 
@@ -22,6 +26,40 @@ def _flow(name, vtype, route, **kwargs):
     return E('flow', id=name, route=route, type=vtype, **kwargs)
 
 
+def _xml_bytes(t):
+    """Return the content of the xml file of an element tree."""
+    return etree.tostring(
+        t, pretty_print=True, encoding='UTF-8', xml_declaration=True)
+
+
+def _schema(nsl):
+    """Return the attributes of a root element referencing an xml schema."""
+    xsi = "http://www.w3.org/2001/XMLSchema-instance"
+    return {"attrib": {"{%s}noNamespaceSchemaLocation" % xsi: nsl},
+            "nsmap": {"xsi": xsi}}
+
+
+# xml tags of the detectors, by detector type
+DETECTOR_TAGS = {"e1": "inductionLoop", "e2": "laneAreaDetector"}
+
+
+def _detector(type, **kwargs):
+    """Return the element of a detector, see Network.specify_detectors.
+
+    The measurements of the detectors are collected through TraCI, so their
+    output is discarded unless a file is specified.
+    """
+    kwargs.setdefault("file", "NUL")
+    kwargs.setdefault("friendlyPos", True)
+    return E(DETECTOR_TAGS[type], **{
+        key: str(val).lower() if isinstance(val, bool) else str(val)
+        for key, val in kwargs.items()})
+
+
+# xml tags of the edge/lane aggregate outputs, by aggregation level
+MEAN_DATA_TAGS = {"edge": "edgeData", "lane": "laneData"}
+
+
 def _inputs(net=None, rou=None, add=None, gui=None):
     inp = E("input")
     inp.append(E("net-file", value=net))
@@ -70,6 +108,7 @@ class TraCIKernelNetwork(BaseKernelNetwork):
         self.netfn = None
         self.confn = None
         self.roufn = None
+        self.vehfn = None
         self.addfn = None
         self.sumfn = None
         self.guifn = None
@@ -83,6 +122,27 @@ class TraCIKernelNetwork(BaseKernelNetwork):
         self.rts = None
         self.cfg = None
 
+        # paths to the edge/lane aggregate outputs generated by sumo, by name
+        # (e.g. "edge_traffic", "lane_emissions"), see `generate_cfg`
+        self.mean_data_files = {}
+
+        # whether the files of the current network are generated, and the
+        # digests of the configuration files written for it (used to avoid
+        # rewriting unchanged files, see `_write_file`)
+        self._generated = False
+        self._digests = {}
+
+        # array-backed geometry index, built once the network is generated
+        # (see `_build_geometry_index`)
+        self._edge_codes = None
+        self._edge_lengths = None
+        self._edge_speeds = None
+        self._edge_lanes = None
+        self._x_offsets = None
+        self._x_scales = None
+        self._start_positions = None
+        self._start_edges = None
+
     def generate_network(self, network):
         """See parent class.
 
@@ -90,12 +150,23 @@ class TraCIKernelNetwork(BaseKernelNetwork):
         files needed to initialize a sumo instance. This includes a .net.xml
         file for network geometry
 
+        If the network was already generated by this kernel (e.g. when the
+        simulation is restarted), the geometry of the network is reused, and
+        only the configuration files are updated. The files of a different
+        network previously generated by this kernel are deleted.
+
         Parameters
         ----------
         network : flow.networks.Network
             an object containing relevant network-specific features such as the
             locations and properties of nodes and edges in the network
         """
+        if self._generated:
+            if network is self.network:
+                self._generate_routes_and_cfg()
+                return
+            self.close()
+
         # store the network object in the network variable
         self.network = network
         self.orig_name = network.orig_name
@@ -109,6 +180,7 @@ class TraCIKernelNetwork(BaseKernelNetwork):
         self.netfn = '%s.net.xml' % self.network.name
         self.confn = '%s.con.xml' % self.network.name
         self.roufn = '%s.rou.xml' % self.network.name
+        self.vehfn = '%s.veh.rou.xml' % self.network.name
         self.addfn = '%s.add.xml' % self.network.name
         self.sumfn = '%s.sumo.cfg' % self.network.name
         self.guifn = '%s.gui.cfg' % self.network.name
@@ -194,6 +266,14 @@ class TraCIKernelNetwork(BaseKernelNetwork):
             self._edges[edge_id]['length'] for edge_id in self._edges
         )
 
+        # compile the geometry of the network into arrays
+        self._build_geometry_index()
+
+        self._generate_routes_and_cfg()
+        self._generated = True
+
+    def _generate_routes_and_cfg(self):
+        """Generate the routes and configuration files of the network."""
         if self.network.routes is None:
             print("No routes specified, defaulting to single edge routes.")
             self.network.routes = {edge: [edge] for edge in self._edge_list}
@@ -209,6 +289,9 @@ class TraCIKernelNetwork(BaseKernelNetwork):
         # specify the location of the sumo configuration file
         self.cfg = self.cfg_path + cfg_name
 
+        # compile the fractions of the routes into sampling tables
+        self._build_route_tables()
+
     def update(self, reset):
         """Perform no action of value (networks are static)."""
         pass
@@ -221,9 +304,13 @@ class TraCIKernelNetwork(BaseKernelNetwork):
         the case of imported .net.xml files we do not want to delete them.
         """
         # Those files are being created even if self.network.net_params.template is a path to .net.xml file
+        self._generated = False
+        self._digests.clear()
+
         files = [self.cfg_path + self.guifn,
                  self.cfg_path + self.addfn,
                  self.cfg_path + self.roufn,
+                 self.cfg_path + self.vehfn,
                  self.cfg_path + self.sumfn]
 
         if self.network.net_params.template is None:
@@ -243,14 +330,85 @@ class TraCIKernelNetwork(BaseKernelNetwork):
                 # neither is the type file
                 continue
 
+    def _build_geometry_index(self):
+        """Compile the geometry of the network into contiguous arrays.
+
+        Every edge (including internal links) is assigned an integer code,
+        which indexes the arrays of edge lengths, speed limits, number of
+        lanes, and of the offset and scale used to convert a relative
+        position on the edge into an absolute position (see ``get_x``). The
+        last element of the offset and scale arrays is reserved for unknown
+        edges, which are mapped to an absolute position of -1001.
+
+        The start positions of the edges in ``total_edgestarts`` are also
+        stored in sorted order, so that ``get_edge`` can be computed with a
+        binary search.
+        """
+        edge_ids = list(self._edges.keys())
+        edge_ids += [edge for edge, _ in self.total_edgestarts
+                     if edge not in self._edges]
+        self._edge_codes = {edge: i for i, edge in enumerate(edge_ids)}
+
+        self._edge_lengths = np.array(
+            [self._edges.get(edge, {}).get('length', -1001)
+             for edge in edge_ids], dtype=float)
+        self._edge_speeds = np.array(
+            [self._edges.get(edge, {}).get('speed', -1001)
+             for edge in edge_ids], dtype=float)
+        self._edge_lanes = np.array(
+            [self._edges.get(edge, {}).get('lanes', -1001)
+             for edge in edge_ids], dtype=int)
+
+        # absolute position = offset + scale * relative position
+        self._x_offsets = np.full(len(edge_ids) + 1, -1001.)
+        self._x_scales = np.zeros(len(edge_ids) + 1)
+        for i, edge in enumerate(edge_ids):
+            if edge in self.total_edgestarts_dict:
+                self._x_offsets[i] = self.total_edgestarts_dict[edge]
+                self._x_scales[i] = 1
+            elif edge[0] == ':':
+                # internal links generalized by a single element (see get_x)
+                self._x_offsets[i] = self.total_edgestarts_dict.get(
+                    edge.rsplit('_', 1)[0], -1001)
+
+        self._start_positions = [pos for _, pos in self.total_edgestarts]
+        self._start_edges = [edge for edge, _ in self.total_edgestarts]
+
     def get_edge(self, x):
-        """See parent class."""
-        for (edge, start_pos) in reversed(self.total_edgestarts):
-            if x >= start_pos:
-                return edge, x - start_pos
+        """See parent class.
+
+        If x is a list or array of positions, a list of edge names and an
+        array of relative positions are returned instead. Positions before
+        the start of the first edge are assigned to the first edge.
+        """
+        if isinstance(x, (list, np.ndarray)):
+            x = np.asarray(x, dtype=float)
+            index = np.searchsorted(self._start_positions, x, side='right')
+            index = np.maximum(index - 1, 0)
+            starts = np.asarray(self._start_positions)[index]
+            return [self._start_edges[i] for i in index], x - starts
+
+        index = bisect_right(self._start_positions, x) - 1
+        if index >= 0:
+            return self._start_edges[index], x - self._start_positions[index]
 
     def get_x(self, edge, position):
-        """See parent class."""
+        """See parent class.
+
+        If edge and position are lists or arrays, the absolute positions of
+        all (edge, position) pairs are returned as an array.
+        """
+        if isinstance(edge, (list, np.ndarray)):
+            codes = np.fromiter(
+                (self._edge_codes.get(e, -1) for e in edge),
+                dtype=int, count=len(edge))
+            x = self._x_offsets[codes] + \
+                self._x_scales[codes] * np.asarray(position, dtype=float)
+            # edges that are not part of the index
+            for i in np.flatnonzero(codes == -1):
+                x[i] = self.get_x(edge[i], position[i])
+            return x
+
         # if there was a collision which caused the vehicle to disappear,
         # return an x value of -1001
         if len(edge) == 0:
@@ -269,12 +427,24 @@ class TraCIKernelNetwork(BaseKernelNetwork):
 
     def edge_length(self, edge_id):
         """See parent class."""
+        if isinstance(edge_id, (list, np.ndarray)):
+            return self._lookup(self._edge_lengths, edge_id)
         try:
             return self._edges[edge_id]['length']
         except KeyError:
             print('Error in edge length with key', edge_id)
             return -1001
 
+    def _lookup(self, values, edge_ids):
+        """Return the values of a geometry array for several edges.
+
+        Unknown edges are assigned a value of -1001.
+        """
+        codes = np.fromiter(
+            (self._edge_codes.get(edge, -1) for edge in edge_ids),
+            dtype=int, count=len(edge_ids))
+        return np.where(codes >= 0, values[codes], -1001)
+
     def length(self):
         """See parent class."""
         return self.__length
@@ -285,6 +455,8 @@ class TraCIKernelNetwork(BaseKernelNetwork):
 
     def speed_limit(self, edge_id):
         """See parent class."""
+        if isinstance(edge_id, (list, np.ndarray)):
+            return self._lookup(self._edge_speeds, edge_id)
         try:
             return self._edges[edge_id]['speed']
         except KeyError:
@@ -293,6 +465,8 @@ class TraCIKernelNetwork(BaseKernelNetwork):
 
     def num_lanes(self, edge_id):
         """See parent class."""
+        if isinstance(edge_id, (list, np.ndarray)):
+            return self._lookup(self._edge_lanes, edge_id)
         try:
             return self._edges[edge_id]['lanes']
         except KeyError:
@@ -616,7 +790,9 @@ class TraCIKernelNetwork(BaseKernelNetwork):
         This method is responsible for creating the following config files:
 
         - *.add.xml: This file contains the sumo-specific properties of
-          vehicles with similar types, and properties of the traffic lights.
+          vehicles with similar types, properties of the traffic lights, the
+          detectors placed in the network, and the (optional) edge/lane
+          aggregate outputs.
         - *.rou.xml: This file contains the routes vehicles can traverse,
           either from a specific starting edge, or by vehicle name, and well as
           the inflows of vehicles.
@@ -720,7 +896,45 @@ class TraCIKernelNetwork(BaseKernelNetwork):
 
                     add.append(e)
 
-        printxml(add, self.cfg_path + self.addfn)
+        # add (optionally) the detectors to the .add.xml file
+        for detector in self.network.detectors or []:
+            add.append(_detector(**detector))
+
+        # add (optionally) the edge/lane aggregate outputs to the .add.xml file
+        self.mean_data_files = {}
+        mean_data_path = getattr(self.sim_params, 'mean_data_path', None)
+        if mean_data_path is not None:
+            ensure_dir(mean_data_path)
+            levels = self.sim_params.mean_data_level
+            if isinstance(levels, str):
+                levels = [levels]
+            data_types = ['traffic']
+            if self.sim_params.mean_data_emissions:
+                data_types.append('emissions')
+
+            for level in levels:
+                if level not in MEAN_DATA_TAGS:
+                    raise ValueError(
+                        'Invalid mean data level: {}. Expected one of {}.'
+                        .format(level, list(MEAN_DATA_TAGS)))
+                for data_type in data_types:
+                    name = '{}_{}'.format(level, data_type)
+                    path = os.path.abspath(os.path.join(
+                        mean_data_path,
+                        '{}-{}.xml'.format(self.network.name, name)))
+                    self.mean_data_files[name] = path
+                    elem = E(
+                        MEAN_DATA_TAGS[level],
+                        id=name,
+                        file=path,
+                        period=repr(float(self.sim_params.mean_data_period)),
+                        excludeEmpty='false')
+                    # the traffic measures are the default type of output
+                    if data_type != 'traffic':
+                        elem.set('type', data_type)
+                    add.append(elem)
+
+        self._write_file(self.cfg_path + self.addfn, _xml_bytes(add))
 
         # this is the data that we will pass to the *.gui.cfg file
         gui = E('viewsettings')
@@ -731,13 +945,58 @@ class TraCIKernelNetwork(BaseKernelNetwork):
               showGrid='0',
               gridXSize='100.00',
               gridYSize='100.00'))
-        printxml(gui, self.cfg_path + self.guifn)
+        self._write_file(self.cfg_path + self.guifn, _xml_bytes(gui))
+
+        # the *.rou.xml file is streamed, since it may contain a large number
+        # of routes and inflows
+        buffer = io.BytesIO()
+        with etree.xmlfile(buffer, encoding='UTF-8') as xf:
+            xf.write_declaration()
+            with xf.element('routes', **_schema(
+                    'http://sumo.dlr.de/xsd/routes_file.xsd')):
+                for elem in self._route_elements(routes):
+                    xf.write(elem, pretty_print=True)
+        self._write_file(self.cfg_path + self.roufn, buffer.getvalue())
+
+        # this is the data that we will pass to the *.sumo.cfg file
+        cfg = makexml('configuration',
+                      'http://sumo.dlr.de/xsd/sumoConfiguration.xsd')
+
+        # the vehicles present at the start of the rollouts are (optionally)
+        # loaded from a separate route file, see generate_initial_vehicles
+        rou = self.roufn
+        if getattr(self.sim_params, 'initial_vehicles_in_routes', False):
+            rou += ',' + self.vehfn
+            if not os.path.exists(self.cfg_path + self.vehfn):
+                self.generate_initial_vehicles({})
+
+        cfg.append(
+            _inputs(
+                net=self.netfn,
+                add=self.addfn,
+                rou=rou,
+                gui=self.guifn))
+        t = E('time')
+        t.append(E('begin', value=repr(0)))
+        cfg.append(t)
+
+        self._write_file(self.cfg_path + self.sumfn, _xml_bytes(cfg))
+        return self.sumfn
 
-        # this is the data that we will pass to the *.rou.xml file
-        routes_data = makexml('routes',
-                              'http://sumo.dlr.de/xsd/routes_file.xsd')
+    def _route_elements(self, routes):
+        """Yield the route and flow elements of the *.rou.xml file.
+
+        Parameters
+        ----------
+        routes : dict
+            see generate_cfg
 
-        # add the routes to the .add.xml file
+        Yields
+        ------
+        lxml.etree.Element
+            the next route or flow element
+        """
+        # add the routes to the .rou.xml file
         for route_id in routes.keys():
             # in this case, we only have one route, convert into into a
             # list of routes with one element
@@ -748,11 +1007,11 @@ class TraCIKernelNetwork(BaseKernelNetwork):
             # the route number of the given route at the given edge
             for i in range(len(routes[route_id])):
                 r, _ = routes[route_id][i]
-                routes_data.append(E(
+                yield E(
                     'route',
                     id='route{}_{}'.format(route_id, i),
                     edges=' '.join(r)
-                ))
+                )
 
         # add the inflows from various edges to the xml file
         if self.network.net_params.inflows is not None:
@@ -784,28 +1043,76 @@ class TraCIKernelNetwork(BaseKernelNetwork):
                             sumo_inflow['number'] = str(
                                 int(float(inflow['number']) * ft))
 
-                        routes_data.append(_flow(**sumo_inflow))
+                        yield _flow(**sumo_inflow)
                 else:
-                    routes_data.append(_flow(**sumo_inflow))
+                    yield _flow(**sumo_inflow)
 
-        printxml(routes_data, self.cfg_path + self.roufn)
+    def _write_file(self, path, data):
+        """Write the content of a configuration file.
 
-        # this is the data that we will pass to the *.sumo.cfg file
-        cfg = makexml('configuration',
-                      'http://sumo.dlr.de/xsd/sumoConfiguration.xsd')
+        The file is not rewritten if it already holds this content, e.g. when
+        the simulation is restarted with an unchanged network.
 
-        cfg.append(
-            _inputs(
-                net=self.netfn,
-                add=self.addfn,
-                rou=self.roufn,
-                gui=self.guifn))
-        t = E('time')
-        t.append(E('begin', value=repr(0)))
-        cfg.append(t)
+        Parameters
+        ----------
+        path : str
+            path to the file
+        data : bytes
+            content of the file
 
-        printxml(cfg, self.cfg_path + self.sumfn)
-        return self.sumfn
+        Returns
+        -------
+        bool
+            whether the file was written
+        """
+        digest = hashlib.sha1(data).hexdigest()
+        if self._digests.get(path) == digest and os.path.exists(path):
+            return False
+        with open(path, 'wb') as f:
+            f.write(data)
+        self._digests[path] = digest
+        return True
+
+    def generate_initial_vehicles(self, initial_state):
+        """Write the vehicles present at the start of a rollout to a file.
+
+        The vehicles are streamed to the *.veh.rou.xml route file, which is
+        loaded by sumo when the simulation is started if the
+        `initial_vehicles_in_routes` attribute of the simulation parameters
+        is set to True. The vehicles depart in the first simulation step
+        following the step performed when the simulation is started, i.e.
+        in the first step of the rollout.
+
+        Parameters
+        ----------
+        initial_state : dict
+            Key = vehicle ID,
+            Element = (vehicle type, starting edge, starting lane index,
+            starting position on edge, starting speed), see
+            flow.envs.Env.setup_initial_state
+        """
+        depart = repr(self.sim_params.sim_step)
+        with etree.xmlfile(self.cfg_path + self.vehfn,
+                           encoding='UTF-8') as xf:
+            xf.write_declaration()
+            with xf.element('routes', **_schema(
+                    'http://sumo.dlr.de/xsd/routes_file.xsd')):
+                for veh_id, (type_id, edge, lane, pos, speed) in \
+                        initial_state.items():
+                    if veh_id in self.rts:
+                        # vehicles of network templates have their own route
+                        route_id = 'route{}_0'.format(veh_id)
+                    else:
+                        route_id = 'route{}_{}'.format(
+                            edge, self.sample_routes(edge))
+                    xf.write(E('vehicle',
+                               id=veh_id,
+                               type=str(type_id),
+                               route=route_id,
+                               depart=depart,
+                               departLane=str(lane),
+                               departPos=str(pos),
+                               departSpeed=str(speed)), pretty_print=True)
 
     def _import_edges_from_net(self, net_params):
         """Import edges from a configuration file.
@@ -0,0 +1,354 @@
+"""Script containing a trajectory recorder and an offline replay kernel.
+
+The recorder stores the vehicle and traffic light states of a rollout at
+every simulation step, and the replay kernel reads them back without running
+a simulator:
+
+    >>> recorder = TrajectoryRecorder("./data/replay/run_0")
+    >>> env.reset()
+    >>> recorder.record(env.k)
+    >>> for _ in range(env.env_params.horizon):
+    >>>     env.step(rl_actions)
+    >>>     recorder.record(env.k)
+    >>> recorder.close()
+
+The replay kernel implements the state acquisition methods of the vehicle,
+traffic light and network kernels, so that reward functions and observation
+methods may be evaluated on recorded rollouts, e.g.:
+
+    >>> from flow.core import rewards
+    >>> env.k = ReplayKernel("./data/replay/run_0")
+    >>> returns = [rewards.desired_velocity(env) for _ in env.k.steps()]
+
+Rollouts are stored as a directory containing a json file with the
+vocabularies of the vehicle names, edges and traffic light states (which are
+replaced by integer codes in the recorded columns), and a sequence of npz
+chunks, each containing the columns of a number of consecutive steps. The
+vehicle columns of all steps in a chunk are concatenated, and indexed by the
+"offsets" column.
+"""
+import json
+import os
+
+import numpy as np
+
+from flow.core.params import SimParams
+from flow.core.util import ensure_dir
+
+# name of the file containing the vocabularies and list of chunks
+META_FILE = "meta.json"
+
+# columns of the vehicles present at every step, and their types
+VEHICLE_COLUMNS = {
+    "id": np.int32,
+    "edge": np.int32,
+    "lane": np.int16,
+    "position": np.float32,
+    "x": np.float32,
+    "speed": np.float32,
+    "headway": np.float32,
+    "leader": np.int32,
+    "follower": np.int32,
+    "accel": np.float32,
+    "realized_accel": np.float32,
+}
+
+
+class TrajectoryRecorder(object):
+    """Record the vehicle and traffic light states of a rollout.
+
+    Attributes
+    ----------
+    path : str
+        directory the rollout is stored in
+    chunk_size : int
+        number of steps stored in every chunk
+    """
+
+    def __init__(self, path, chunk_size=1000):
+        """Instantiate the recorder.
+
+        Parameters
+        ----------
+        path : str
+            directory the rollout is stored in
+        chunk_size : int, optional
+            number of steps stored in every chunk
+        """
+        self.path = path
+        self.chunk_size = chunk_size
+        ensure_dir(path)
+
+        self._meta = {
+            "sim_step": None,
+            "chunks": [],
+            "ids": [], "types": [], "rl": [],
+            "tl_ids": [], "tl_states": [],
+            "network": {"edges": [], "lengths": [], "speed_limits": [],
+                        "num_lanes": [], "junction": [],
+                        "length": None, "max_speed": None},
+        }
+        # integer codes of the vehicles, edges and traffic light states
+        self._ids = {}
+        self._edges = {}
+        self._tl_states = {}
+        self._junctions = set()
+
+        # speed of the vehicles in the previous step
+        self._prev_speed = {}
+
+        # columns of the steps that have not been stored yet
+        self._steps = []
+
+    def _edge_code(self, network, edge):
+        """Return the code of an edge, adding it to the vocabulary if needed."""
+        code = self._edges.get(edge)
+        if code is None:
+            code = self._edges[edge] = len(self._edges)
+            props = self._meta["network"]
+            props["edges"].append(edge)
+            props["lengths"].append(network.edge_length(edge))
+            props["speed_limits"].append(network.speed_limit(edge))
+            props["num_lanes"].append(network.num_lanes(edge))
+            props["junction"].append(edge in self._junctions)
+        return code
+
+    def _vehicle_code(self, vehicle, rl_ids, veh_id):
+        """Return the code of a vehicle, adding it to the vocabulary."""
+        code = self._ids.get(veh_id)
+        if code is None:
+            code = self._ids[veh_id] = len(self._ids)
+            self._meta["ids"].append(veh_id)
+            self._meta["types"].append(vehicle.get_type(veh_id))
+            self._meta["rl"].append(veh_id in rl_ids)
+        return code
+
+    def _start(self, kernel):
+        """Record the static properties of the simulation."""
+        network = kernel.network
+        self._meta["sim_step"] = kernel.simulation.sim_step
+        self._meta["network"]["length"] = network.length()
+        self._meta["network"]["max_speed"] = network.max_speed()
+        self._junctions = set(network.get_junction_list())
+        for edge in network.get_edge_list() + network.get_junction_list():
+            self._edge_code(network, edge)
+        self._meta["tl_ids"] = list(kernel.traffic_light.get_ids())
+
+    def record(self, kernel):
+        """Record the current state of the simulation.
+
+        Parameters
+        ----------
+        kernel : flow.core.kernel.Kernel
+            the kernel of the simulation
+        """
+        if self._meta["sim_step"] is None:
+            self._start(kernel)
+
+        vehicle = kernel.vehicle
+        ids = vehicle.get_ids()
+        rl_ids = set(vehicle.get_rl_ids())
+
+        speed = np.array(vehicle.get_speed(ids), dtype=float)
+        prev_speed = np.array(
+            [self._prev_speed.get(veh_id, s) for veh_id, s in zip(ids, speed)])
+        self._prev_speed = dict(zip(ids, speed))
+
+        codes = [self._vehicle_code(vehicle, rl_ids, veh_id)
+                 for veh_id in ids]
+
+        def code(veh_id):
+            return self._ids.get(veh_id, -1) if veh_id else -1
+
+        step = {
+            "id": codes,
+            "edge": [self._edge_code(kernel.network, edge) if edge else -1
+                     for edge in vehicle.get_edge(ids)],
+            "lane": vehicle.get_lane(ids),
+            "position": vehicle.get_position(ids),
+            "x": vehicle.get_x_by_id(ids),
+            "speed": speed,
+            "headway": vehicle.get_headway(ids),
+            "leader": [code(veh_id) for veh_id in vehicle.get_leader(ids)],
+            "follower": [code(veh_id) for veh_id in vehicle.get_follower(ids)],
+            "accel": [np.nan if accel is None else accel for accel in
+                      (vehicle.get_accel(veh_id) for veh_id in ids)],
+            "realized_accel": (speed - prev_speed) / self._meta["sim_step"],
+        }
+        step = {key: np.asarray(val, dtype=VEHICLE_COLUMNS[key]).reshape(-1)
+                for key, val in step.items()}
+
+        step["time"] = kernel.simulation.time
+        step["num_arrived"] = vehicle.get_num_arrived()
+        step["num_departed"] = len(vehicle.get_departed_ids() or [])
+        step["tl_state"] = [
+            self._tl_states.setdefault(state, len(self._tl_states))
+            for state in (kernel.traffic_light.get_state(node_id)
+                          for node_id in self._meta["tl_ids"])]
+
+        self._steps.append(step)
+        if len(self._steps) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Store the steps that have not been stored yet in a new chunk."""
+        if len(self._steps) == 0:
+            return
+
+        columns = {
+            key: np.concatenate([step[key] for step in self._steps])
+            for key in VEHICLE_COLUMNS}
+        columns["offsets"] = np.cumsum(
+            [0] + [len(step["id"]) for step in self._steps])
+        columns["time"] = np.array([step["time"] for step in self._steps])
+        columns["num_arrived"] = np.array(
+            [step["num_arrived"] for step in self._steps], dtype=np.int32)
+        columns["num_departed"] = np.array(
+            [step["num_departed"] for step in self._steps], dtype=np.int32)
+        columns["tl_state"] = np.array(
+            [step["tl_state"] for step in self._steps],
+            dtype=np.int32).reshape(len(self._steps), -1)
+
+        name = "chunk_{:05d}.npz".format(len(self._meta["chunks"]))
+        np.savez(os.path.join(self.path, name), **columns)
+        self._meta["chunks"].append(
+            {"file": name, "num_steps": len(self._steps)})
+        self._steps = []
+
+        # the vocabularies are stored after every chunk, so that interrupted
+        # rollouts remain readable
+        self._meta["tl_states"] = list(self._tl_states)
+        tmp_path = os.path.join(self.path, META_FILE + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self._meta, f)
+        os.replace(tmp_path, os.path.join(self.path, META_FILE))
+
+    def close(self):
+        """Store the remaining steps."""
+        self.flush()
+
+
+class ReplayKernel(object):
+    """Kernel reading the states of a rollout stored by TrajectoryRecorder.
+
+    The replay kernel contains the same vehicle, traffic_light and network
+    sub-kernels as flow.core.kernel.Kernel, restricted to the methods that
+    acquire state information. The state of these sub-kernels is the state of
+    the current step, which is selected with the ``seek`` or ``steps``
+    methods.
+
+    Attributes
+    ----------
+    path : str
+        directory the rollout is stored in
+    sim_step : float
+        simulation step size of the rollout
+    num_steps : int
+        number of recorded steps
+    step_index : int
+        index of the current step
+    time : float
+        simulation time of the current step
+    columns : dict < str, np.ndarray >
+        columns of the current step
+    num_arrived : np.ndarray
+        number of vehicles that arrived during every step
+    num_departed : np.ndarray
+        number of vehicles that departed during every step
+    """
+
+    def __init__(self, path):
+        """Load a recorded rollout.
+
+        Parameters
+        ----------
+        path : str
+            directory the rollout is stored in
+        """
+        from flow.core.kernel.network.replay import ReplayKernelNetwork
+        from flow.core.kernel.vehicle.replay import ReplayVehicle
+        from flow.core.kernel.traffic_light.replay import ReplayTrafficLight
+
+        self.path = path
+        with open(os.path.join(path, META_FILE)) as f:
+            meta = json.load(f)
+
+        self.sim_step = meta["sim_step"]
+        sim_params = SimParams(sim_step=self.sim_step)
+        self.network = ReplayKernelNetwork(self, sim_params, meta["network"])
+        self.vehicle = ReplayVehicle(
+            self, sim_params, meta["ids"], meta["types"], meta["rl"])
+        self.traffic_light = ReplayTrafficLight(
+            self, meta["tl_ids"], meta["tl_states"])
+
+        self._files = [chunk["file"] for chunk in meta["chunks"]]
+        self._starts = np.cumsum(
+            [0] + [chunk["num_steps"] for chunk in meta["chunks"]])
+        self.num_steps = int(self._starts[-1])
+
+        # the arrivals and departures of all steps are needed to compute the
+        # inflow and outflow rates
+        num_arrived, num_departed = [], []
+        for name in self._files:
+            with np.load(os.path.join(path, name)) as data:
+                num_arrived.append(data["num_arrived"])
+                num_departed.append(data["num_departed"])
+        self.num_arrived = np.concatenate(num_arrived or [np.zeros(0)])
+        self.num_departed = np.concatenate(num_departed or [np.zeros(0)])
+
+        self._chunk_index = None
+        self._chunk = None
+        self.step_index = None
+        self.time = None
+        self.columns = {}
+
+        if self.num_steps > 0:
+            self.seek(0)
+
+    def __len__(self):
+        """Return the number of recorded steps."""
+        return self.num_steps
+
+    def seek(self, step):
+        """Set the current step, and update the sub-kernels.
+
+        Parameters
+        ----------
+        step : int
+            index of the step
+        """
+        if not 0 <= step < self.num_steps:
+            raise IndexError("Step {} is out of range.".format(step))
+
+        # chunks are loaded in full, as all their columns are read when
+        # iterating through the steps
+        chunk_index = int(np.searchsorted(self._starts, step, side="right")) - 1
+        if chunk_index != self._chunk_index:
+            with np.load(os.path.join(self.path,
+                                      self._files[chunk_index])) as data:
+                self._chunk = {key: data[key] for key in data.files}
+            self._chunk_index = chunk_index
+
+        row = step - self._starts[chunk_index]
+        start, end = self._chunk["offsets"][row:row + 2]
+        self.columns = {key: self._chunk[key][start:end]
+                        for key in VEHICLE_COLUMNS}
+        self.columns["tl_state"] = self._chunk["tl_state"][row]
+        self.time = float(self._chunk["time"][row])
+
+        reset = self.step_index is None or step != self.step_index + 1
+        self.step_index = step
+        self.vehicle.update(reset)
+        self.traffic_light.update(reset)
+
+    def steps(self):
+        """Iterate through the recorded steps.
+
+        Yields
+        ------
+        int
+            index of the current step
+        """
+        for step in range(self.num_steps):
+            self.seek(step)
+            yield step
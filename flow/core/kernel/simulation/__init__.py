@@ -1,8 +1,13 @@
 """Empty init file to ensure documentation for the simulation module is created."""
 
+from flow.utils.lazy_import import lazy_import
 from flow.core.kernel.simulation.base import KernelSimulation
-from flow.core.kernel.simulation.traci import TraCISimulation
-from flow.core.kernel.simulation.aimsun import AimsunKernelSimulation
+
+# the simulator backends are imported on first access
+__getattr__, __dir__ = lazy_import(__name__, {
+    'TraCISimulation': 'flow.core.kernel.simulation.traci',
+    'AimsunKernelSimulation': 'flow.core.kernel.simulation.aimsun',
+})
 
 
 __all__ = ['KernelSimulation', 'TraCISimulation', 'AimsunKernelSimulation']
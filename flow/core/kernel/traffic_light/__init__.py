@@ -1,9 +1,15 @@
 """Empty init file to ensure documentation for the traffic lights module is created."""
 
+from flow.utils.lazy_import import lazy_import
 from flow.core.kernel.traffic_light.base import KernelTrafficLight
-from flow.core.kernel.traffic_light.traci import TraCITrafficLight
-from flow.core.kernel.traffic_light.aimsun import AimsunKernelTrafficLight
+
+# the simulator backends are imported on first access
+__getattr__, __dir__ = lazy_import(__name__, {
+    'TraCITrafficLight': 'flow.core.kernel.traffic_light.traci',
+    'AimsunKernelTrafficLight': 'flow.core.kernel.traffic_light.aimsun',
+    'ReplayTrafficLight': 'flow.core.kernel.traffic_light.replay',
+})
 
 
 __all__ = ["KernelTrafficLight", "TraCITrafficLight",
-           "AimsunKernelTrafficLight"]
+           "AimsunKernelTrafficLight", "ReplayTrafficLight"]
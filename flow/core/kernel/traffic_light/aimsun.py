@@ -35,6 +35,13 @@ class AimsunKernelTrafficLight(KernelTrafficLight):
         """See parent class."""
         return self.kernel_api.get_traffic_light_ids()
 
+    def get_detector_ids(self):
+        """See parent class.
+
+        Detectors are not supported in Aimsun yet, so none are returned.
+        """
+        return []
+
     def set_state(self, meter_aimsun_id, state):
         """Set the state of the traffic lights on a specific meter.
 
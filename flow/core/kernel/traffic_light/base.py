@@ -24,6 +24,15 @@ class KernelTrafficLight(object):
 
         >>> tl_state = env.k.traffic_light.get_state(node_id)
 
+    * Detector measurements: This kernel also collects the measurements of the
+      detectors placed in the network (see Network.specify_detectors), which
+      are typically used to control traffic lights and ramp meters. For
+      example, the number of vehicles in the area covered by a detector can be
+      acquired by calling:
+
+        >>> det_id = 'toll_0'  # name of the detector
+        >>> num_vehicles = env.k.traffic_light.get_detector_count(det_id)
+
     All methods in this class are abstract, and must be filled in by the child
     vehicle kernel of separate simulators.
     """
@@ -98,3 +107,94 @@ class KernelTrafficLight(object):
             Element = state of the traffic light at that node/lane
         """
         raise NotImplementedError
+
+    def get_detector_ids(self):
+        """Return the names of all detectors in the network."""
+        raise NotImplementedError
+
+    def get_detector_count(self, det_id):
+        """Return the number of vehicles seen by a detector.
+
+        For lane area detectors, these are the vehicles in the area covered by
+        the detector. For induction loops, these are the vehicles that passed
+        over the loop during the last simulation step.
+
+        Parameters
+        ----------
+        det_id : str
+            name of the detector
+
+        Returns
+        -------
+        int
+        """
+        raise NotImplementedError
+
+    def get_detector_vehicles(self, det_id):
+        """Return the names of the vehicles seen by a detector.
+
+        Parameters
+        ----------
+        det_id : str
+            name of the detector
+
+        Returns
+        -------
+        list of str
+        """
+        raise NotImplementedError
+
+    def get_detector_occupancy(self, det_id):
+        """Return the occupancy of a detector during the last simulation step.
+
+        Parameters
+        ----------
+        det_id : str
+            name of the detector
+
+        Returns
+        -------
+        float
+            percentage of the detector (or the time of the step, for induction
+            loops) occupied by vehicles
+        """
+        raise NotImplementedError
+
+    def get_detector_speed(self, det_id):
+        """Return the mean speed of the vehicles seen by a detector.
+
+        Parameters
+        ----------
+        det_id : str
+            name of the detector
+
+        Returns
+        -------
+        float
+            mean speed, in m/s, or -1 if no vehicles were seen during the
+            last simulation step
+        """
+        raise NotImplementedError
+
+    def get_detector_aggregates(self, det_ids):
+        """Return the aggregated measurements of a group of detectors.
+
+        This is typically used to combine the detectors placed on the
+        different lanes of an edge.
+
+        Parameters
+        ----------
+        det_ids : list of str
+            names of the detectors
+
+        Returns
+        -------
+        int
+            total number of vehicles seen by the detectors
+        float
+            mean occupancy of the detectors
+        float
+            mean speed of the vehicles seen by the detectors, or 0 if no
+            vehicles were seen during the last simulation step
+        """
+        raise NotImplementedError
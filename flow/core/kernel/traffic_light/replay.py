@@ -0,0 +1,45 @@
+"""Script containing the replay traffic light kernel class."""
+
+from flow.core.kernel.traffic_light import KernelTrafficLight
+
+
+class ReplayTrafficLight(KernelTrafficLight):
+    """Traffic light kernel reading the states of a recorded rollout.
+
+    Implements the state acquisition methods of the base traffic light kernel
+    from the current step of a flow.core.kernel.ReplayKernel.
+    """
+
+    def __init__(self, master_kernel, ids, states):
+        """Instantiate the replay traffic light kernel.
+
+        Parameters
+        ----------
+        master_kernel : flow.core.kernel.ReplayKernel
+            the replay kernel, holding the columns of the current step
+        ids : list of str
+            names of the nodes with traffic lights
+        states : list of str
+            traffic light states, indexed by their integer code
+        """
+        KernelTrafficLight.__init__(self, master_kernel)
+
+        self.__ids = ids
+        self.__index = {node_id: i for i, node_id in enumerate(ids)}
+        self.__states = states
+        self.__codes = []
+
+        # number of traffic light nodes
+        self.num_traffic_lights = len(ids)
+
+    def update(self, reset):
+        """See parent class."""
+        self.__codes = self.master_kernel.columns["tl_state"]
+
+    def get_ids(self):
+        """See parent class."""
+        return self.__ids
+
+    def get_state(self, node_id):
+        """See parent class."""
+        return self.__states[self.__codes[self.__index[node_id]]]
@@ -3,6 +3,14 @@
 from flow.core.kernel.traffic_light import KernelTrafficLight
 import traci.constants as tc
 
+# variables subscribed to for every type of detector
+DETECTOR_VARIABLES = [
+    tc.LAST_STEP_VEHICLE_NUMBER,
+    tc.LAST_STEP_VEHICLE_ID_LIST,
+    tc.LAST_STEP_OCCUPANCY,
+    tc.LAST_STEP_MEAN_SPEED,
+]
+
 
 class TraCITrafficLight(KernelTrafficLight):
     """Sumo traffic light kernel.
@@ -30,6 +38,13 @@ class TraCITrafficLight(KernelTrafficLight):
         # number of traffic light nodes
         self.num_traffic_lights = 0
 
+        # names of the induction loops and lane area detectors
+        self.__e1_ids = []
+        self.__e2_ids = []
+
+        # contains current time step detector data
+        self.__detectors = dict()
+
     def pass_api(self, kernel_api):
         """See parent class.
 
@@ -48,6 +63,14 @@ class TraCITrafficLight(KernelTrafficLight):
             self.kernel_api.trafficlight.subscribe(
                 node_id, [tc.TL_RED_YELLOW_GREEN_STATE])
 
+        # subscribe the detector measurements
+        self.__e1_ids = kernel_api.inductionloop.getIDList()
+        self.__e2_ids = kernel_api.lanearea.getIDList()
+        for det_id in self.__e1_ids:
+            kernel_api.inductionloop.subscribe(det_id, DETECTOR_VARIABLES)
+        for det_id in self.__e2_ids:
+            kernel_api.lanearea.subscribe(det_id, DETECTOR_VARIABLES)
+
     def update(self, reset):
         """See parent class."""
         tls_obs = {}
@@ -56,6 +79,15 @@ class TraCITrafficLight(KernelTrafficLight):
                 self.kernel_api.trafficlight.getSubscriptionResults(tl_id)
         self.__tls = tls_obs.copy()
 
+        # the measurements of all detectors are collected in bulk
+        self.__detectors = {}
+        if len(self.__e1_ids) > 0:
+            self.__detectors.update(
+                self.kernel_api.inductionloop.getAllSubscriptionResults())
+        if len(self.__e2_ids) > 0:
+            self.__detectors.update(
+                self.kernel_api.lanearea.getAllSubscriptionResults())
+
     def get_ids(self):
         """See parent class."""
         return self.__ids
@@ -74,3 +106,46 @@ class TraCITrafficLight(KernelTrafficLight):
     def get_state(self, node_id):
         """See parent class."""
         return self.__tls[node_id][tc.TL_RED_YELLOW_GREEN_STATE]
+
+    def get_detector_ids(self):
+        """See parent class."""
+        return list(self.__e1_ids) + list(self.__e2_ids)
+
+    def get_detector_count(self, det_id):
+        """See parent class."""
+        return self.__detectors.get(det_id, {}).get(
+            tc.LAST_STEP_VEHICLE_NUMBER, 0)
+
+    def get_detector_vehicles(self, det_id):
+        """See parent class."""
+        return self.__detectors.get(det_id, {}).get(
+            tc.LAST_STEP_VEHICLE_ID_LIST, ())
+
+    def get_detector_occupancy(self, det_id):
+        """See parent class."""
+        return self.__detectors.get(det_id, {}).get(
+            tc.LAST_STEP_OCCUPANCY, 0)
+
+    def get_detector_speed(self, det_id):
+        """See parent class."""
+        return self.__detectors.get(det_id, {}).get(
+            tc.LAST_STEP_MEAN_SPEED, -1)
+
+    def get_detector_aggregates(self, det_ids):
+        """See parent class."""
+        count = 0
+        occupancy = 0
+        speed = 0
+        for det_id in det_ids:
+            data = self.__detectors.get(det_id, {})
+            num_vehicles = data.get(tc.LAST_STEP_VEHICLE_NUMBER, 0)
+            count += num_vehicles
+            occupancy += data.get(tc.LAST_STEP_OCCUPANCY, 0)
+            if num_vehicles > 0:
+                speed += num_vehicles * data[tc.LAST_STEP_MEAN_SPEED]
+
+        if len(det_ids) > 0:
+            occupancy /= len(det_ids)
+        if count > 0:
+            speed /= count
+        return count, occupancy, speed
@@ -1,8 +1,17 @@
 """Empty init file to ensure documentation for the vehicle module is created."""
 
-from flow.core.kernel.vehicle.base import KernelVehicle
-from flow.core.kernel.vehicle.traci import TraCIVehicle
-from flow.core.kernel.vehicle.aimsun import AimsunKernelVehicle
+from flow.utils.lazy_import import lazy_import
+from flow.core.kernel.vehicle.base import KernelVehicle, VehicleSnapshot, \
+    StepCounter, IdRegistry, BoundController
 
+# the simulator backends are imported on first access
+__getattr__, __dir__ = lazy_import(__name__, {
+    'TraCIVehicle': 'flow.core.kernel.vehicle.traci',
+    'AimsunKernelVehicle': 'flow.core.kernel.vehicle.aimsun',
+    'ReplayVehicle': 'flow.core.kernel.vehicle.replay',
+})
 
-__all__ = ['KernelVehicle', 'TraCIVehicle', 'AimsunKernelVehicle']
+
+__all__ = ['KernelVehicle', 'VehicleSnapshot', 'StepCounter', 'IdRegistry',
+           'BoundController', 'TraCIVehicle', 'AimsunKernelVehicle',
+           'ReplayVehicle']
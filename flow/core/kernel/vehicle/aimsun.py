@@ -823,6 +823,10 @@ class AimsunKernelVehicle(KernelVehicle):
         except KeyError:
             return None
 
+    def get_controller_state(self, veh_id):
+        """See parent class."""
+        return self.__vehicles[veh_id].setdefault("controller_state", {})
+
     def get_x_by_id(self, veh_id):
         """See parent class."""
         return self.master_kernel.network.get_x(self.get_edge(veh_id),
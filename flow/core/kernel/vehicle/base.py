@@ -1,6 +1,315 @@
 """Script containing the base vehicle kernel class."""
 
 from abc import ABCMeta, abstractmethod
+from copy import deepcopy
+import heapq
+import numpy as np
+
+
+class VehicleSnapshot(object):
+    """Snapshot of the mutable state of a vehicle kernel.
+
+    Snapshots are created by KernelVehicle.snapshot, and restored with
+    KernelVehicle.restore. The number of vehicles and the ids of the vehicles
+    at the time of the snapshot are exposed, so that snapshots can be used in
+    place of the vehicle kernel they were taken from when only these values
+    are needed (e.g. to compute the shape of the observation space).
+
+    Attributes
+    ----------
+    num_vehicles : int
+        total number of vehicles at the time of the snapshot
+    num_rl_vehicles : int
+        number of rl vehicles at the time of the snapshot
+    state : dict
+        the copied state, which is specific to the kernel of every simulator
+    """
+
+    def __init__(self, num_vehicles, num_rl_vehicles, ids, rl_ids, state):
+        """Instantiate the snapshot.
+
+        Parameters
+        ----------
+        num_vehicles : int
+            total number of vehicles at the time of the snapshot
+        num_rl_vehicles : int
+            number of rl vehicles at the time of the snapshot
+        ids : list of str
+            ids of the vehicles at the time of the snapshot
+        rl_ids : list of str
+            ids of the rl vehicles at the time of the snapshot
+        state : dict
+            the copied state of the kernel
+        """
+        self.num_vehicles = num_vehicles
+        self.num_rl_vehicles = num_rl_vehicles
+        self.__ids = list(ids)
+        self.__rl_ids = list(rl_ids)
+        self.state = state
+
+    def get_ids(self):
+        """Return the ids of the vehicles at the time of the snapshot."""
+        return list(self.__ids)
+
+    def get_rl_ids(self):
+        """Return the ids of the rl vehicles at the time of the snapshot."""
+        return list(self.__rl_ids)
+
+
+class BoundController(object):
+    """Controller shared by several vehicles, bound to one of them.
+
+    Handles are returned by the controller getters of the vehicle kernels for
+    controllers shared by several vehicles (see the shareable attribute of
+    flow.controllers.BaseController). The attributes of the shared controller
+    are available through the handle, and its methods are called with the
+    controller bound to the vehicle of the handle for the duration of the
+    call only, so that the handles of several vehicles may be kept and used in
+    any order. Attributes other than controller and veh_id are written to the
+    shared controller, and thus modify it for all of its vehicles. Handles
+    pass the isinstance checks of the class of their controller.
+
+    Attributes
+    ----------
+    controller : object
+        the shared controller
+    veh_id : str
+        the vehicle the controller acts for
+    """
+
+    def __init__(self, controller, veh_id):
+        """Instantiate the handle.
+
+        Parameters
+        ----------
+        controller : object
+            the shared controller
+        veh_id : str
+            the vehicle the controller acts for
+        """
+        object.__setattr__(self, "controller", controller)
+        object.__setattr__(self, "veh_id", veh_id)
+
+    @property
+    def __class__(self):
+        """Return the class of the controller, used by isinstance."""
+        return type(self.controller)
+
+    def __reduce__(self):
+        """Return the arguments needed to copy or pickle the handle."""
+        return BoundController, (self.controller, self.veh_id)
+
+    def __setattr__(self, name, value):
+        """Set an attribute of the controller, or of the handle."""
+        if name in ("controller", "veh_id"):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self.controller, name, value)
+
+    def __getattr__(self, name):
+        """Return an attribute of the controller, bound to the vehicle."""
+        from flow.controllers.base_controller import bound_to
+
+        # special attributes (e.g. those looked up by copy and pickle) are not
+        # forwarded to the controller
+        if name.startswith("__"):
+            raise AttributeError(name)
+
+        attr = getattr(self.controller, name)
+        if not callable(attr):
+            return attr
+
+        def method(*args, **kwargs):
+            with bound_to(self.controller, self.veh_id):
+                return attr(*args, **kwargs)
+        return method
+
+
+class StepCounter(object):
+    """Fixed-size history of per-step counts with constant-time window sums.
+
+    The cumulative totals of the last ``capacity`` steps are stored in a ring
+    buffer, so that the sum of the counts of any number of most recent steps
+    is the difference of two totals.
+
+    Attributes
+    ----------
+    capacity : int
+        maximum number of steps whose counts are available
+    """
+
+    def __init__(self, capacity):
+        """Instantiate the counter.
+
+        Parameters
+        ----------
+        capacity : int
+            maximum number of steps whose counts are available
+        """
+        self.capacity = capacity
+        self._totals = [0] * (capacity + 1)
+        self._num_steps = 0
+
+    def __len__(self):
+        """Return the number of steps whose counts are available."""
+        return min(self._num_steps, self.capacity)
+
+    def append(self, count):
+        """Add the count of a new step."""
+        size = self.capacity + 1
+        self._totals[(self._num_steps + 1) % size] = \
+            self._totals[self._num_steps % size] + count
+        self._num_steps += 1
+
+    def clear(self):
+        """Remove the counts of all steps."""
+        self._totals = [0] * (self.capacity + 1)
+        self._num_steps = 0
+
+    def last(self):
+        """Return the count of the most recent step (0 if there is none)."""
+        return self.window(1)[0]
+
+    def window(self, num_steps):
+        """Return the sum of the counts of the most recent steps.
+
+        Parameters
+        ----------
+        num_steps : int
+            number of steps. If there are fewer available steps, or if this
+            value is not positive, all available steps are used
+
+        Returns
+        -------
+        int
+            the sum of the counts
+        int
+            the number of steps the counts were summed over
+        """
+        if num_steps <= 0 or num_steps > len(self):
+            num_steps = len(self)
+        size = self.capacity + 1
+        total = self._totals[self._num_steps % size] - \
+            self._totals[(self._num_steps - num_steps) % size]
+        return total, num_steps
+
+    def copy(self):
+        """Return a copy of the counter."""
+        counter = StepCounter.__new__(StepCounter)
+        counter.capacity = self.capacity
+        counter._totals = list(self._totals)
+        counter._num_steps = self._num_steps
+        return counter
+
+
+class IdRegistry(object):
+    """Ordered set of vehicle ids with stable integer indices.
+
+    Membership tests, insertions and removals are performed in constant
+    time. Every id is assigned the smallest integer index that is not used by
+    another id of the registry, and keeps it until it is removed, so that the
+    state of the vehicles may be stored in arrays of ``num_indices`` rows.
+
+    The ids are iterated in insertion order, or in sorted order if the
+    registry is sorted. The list of the ids is only rebuilt after the
+    registry was modified.
+
+    Attributes
+    ----------
+    sort_ids : bool
+        whether the ids are iterated in sorted order
+    """
+
+    def __init__(self, ids=(), sort_ids=False):
+        """Instantiate the registry.
+
+        Parameters
+        ----------
+        ids : iterable of str, optional
+            initial ids of the registry
+        sort_ids : bool, optional
+            whether the ids are iterated in sorted order
+        """
+        self.sort_ids = sort_ids
+        self._indices = {}
+        self._names = []
+        self._free = []
+        self._list = []
+        for veh_id in ids:
+            self.add(veh_id)
+
+    def __contains__(self, veh_id):
+        """Return whether an id is in the registry."""
+        return veh_id in self._indices
+
+    def __len__(self):
+        """Return the number of ids in the registry."""
+        return len(self._indices)
+
+    def __iter__(self):
+        """Iterate through the ids of the registry."""
+        return iter(self.as_list())
+
+    @property
+    def num_indices(self):
+        """Return the number of indices that were assigned (used or not)."""
+        return len(self._names)
+
+    def add(self, veh_id):
+        """Add an id to the registry, and return its index.
+
+        The index of ids that are already in the registry is unchanged.
+        """
+        index = self._indices.get(veh_id)
+        if index is None:
+            if self._free:
+                index = heapq.heappop(self._free)
+                self._names[index] = veh_id
+            else:
+                index = len(self._names)
+                self._names.append(veh_id)
+            self._indices[veh_id] = index
+            self._list = None
+        return index
+
+    def discard(self, veh_id):
+        """Remove an id from the registry, if it is in the registry."""
+        index = self._indices.pop(veh_id, None)
+        if index is not None:
+            self._names[index] = None
+            heapq.heappush(self._free, index)
+            self._list = None
+
+    def index(self, veh_id, error=-1):
+        """Return the index of an id, or error if it is not in the registry."""
+        return self._indices.get(veh_id, error)
+
+    def indices(self, veh_ids, error=-1):
+        """Return the indices of multiple ids, as an array of integers."""
+        get = self._indices.get
+        return np.fromiter((get(veh_id, error) for veh_id in veh_ids),
+                           dtype=int, count=len(veh_ids))
+
+    def as_list(self):
+        """Return the list of the ids.
+
+        The list is shared between calls until the registry is modified, and
+        should not be modified.
+        """
+        if self._list is None:
+            self._list = sorted(self._indices) if self.sort_ids \
+                else list(self._indices)
+        return self._list
+
+    def copy(self):
+        """Return a copy of the registry, with the same indices."""
+        registry = IdRegistry.__new__(IdRegistry)
+        registry.sort_ids = self.sort_ids
+        registry._indices = dict(self._indices)
+        registry._names = list(self._names)
+        registry._free = list(self._free)
+        registry._list = self._list
+        return registry
 
 
 class KernelVehicle(object, metaclass=ABCMeta):
@@ -83,6 +392,44 @@ class KernelVehicle(object, metaclass=ABCMeta):
         """
         pass
 
+    def snapshot(self):
+        """Return a snapshot of the mutable state of the kernel.
+
+        The snapshot can be restored with the ``restore`` method, e.g. to
+        bring the kernel back to its initial state when the simulation is
+        restarted. By default, all attributes of the kernel but the references
+        to the master kernel and to the simulator API are deep-copied.
+        Simulator-specific kernels may copy less, by sharing the state that
+        does not change during a simulation (e.g. the vehicle types and
+        controllers).
+
+        Returns
+        -------
+        VehicleSnapshot
+            the snapshot
+        """
+        state = {key: val for key, val in vars(self).items()
+                 if key not in ("master_kernel", "kernel_api")}
+        return VehicleSnapshot(
+            num_vehicles=self.num_vehicles,
+            num_rl_vehicles=self.num_rl_vehicles,
+            ids=self.get_ids(),
+            rl_ids=self.get_rl_ids(),
+            state=deepcopy(state))
+
+    def restore(self, snapshot):
+        """Restore the state of the kernel from a snapshot.
+
+        The snapshot is not modified, and may be restored several times. The
+        references to the master kernel and to the simulator API are kept.
+
+        Parameters
+        ----------
+        snapshot : VehicleSnapshot
+            a snapshot returned by the ``snapshot`` method of this kernel
+        """
+        vars(self).update(deepcopy(snapshot.state))
+
     @abstractmethod
     def add(self, veh_id, type_id, edge, pos, lane, speed):
         """Add a vehicle to the network.
@@ -157,7 +504,7 @@ class KernelVehicle(object, metaclass=ABCMeta):
         ----------
         veh_id : str or list of str
             list of vehicle identifiers
-        direction : {-1, 0, 1} or list of {-1, 0, 1}
+        direction : {-1, 0, 1} or array_like of {-1, 0, 1}
             -1: lane change to the right
              0: no lane change
              1: lane change to the left
@@ -255,6 +602,62 @@ class KernelVehicle(object, metaclass=ABCMeta):
         """Return the type of the vehicle of veh_id."""
         pass
 
+    def get_render_data(self, max_speed):
+        """Return the state of all vehicles needed by the renderer.
+
+        Vehicles are split into two classes: human-driven vehicles and
+        "machine" vehicles. The latter consists of human-driven vehicles whose
+        name contains "track" (which are tracked by the renderer as if they
+        were RL vehicles), followed by the RL vehicles.
+
+        This default implementation collects the data one vehicle at a time,
+        and may be overridden by simulator kernels that store it in bulk.
+
+        Parameters
+        ----------
+        max_speed : float
+            speed used to normalize the speeds of the vehicles
+
+        Returns
+        -------
+        dict
+            with the following keys:
+
+            * human_ids, machine_ids: list of str, the names of the vehicles
+              of each class
+            * human_orientations, machine_orientations: np.ndarray of shape
+              (num_vehicles, 3), the [x, y, angle] of the vehicles
+            * human_dynamics, machine_dynamics: np.ndarray, the speeds of the
+              vehicles normalized by max_speed
+            * timestep, timedelta: float, the current simulation time and
+              time step of the simulator (ms)
+        """
+        human_ids = []
+        machine_ids = []
+        for veh_id in self.get_human_ids():
+            if 'track' in veh_id:
+                machine_ids.append(veh_id)
+            else:
+                human_ids.append(veh_id)
+        machine_ids.extend(self.get_rl_ids())
+
+        data = {"human_ids": human_ids, "machine_ids": machine_ids}
+        for name, ids in [("human", human_ids), ("machine", machine_ids)]:
+            data[name + "_orientations"] = np.array(
+                [self.get_orientation(veh_id) for veh_id in ids],
+                dtype=np.float64).reshape(-1, 3)
+            data[name + "_dynamics"] = np.array(
+                [self.get_speed(veh_id) for veh_id in ids],
+                dtype=np.float64) / max_speed
+
+        all_ids = human_ids + machine_ids
+        data["timestep"] = \
+            self.get_timestep(all_ids[0]) if len(all_ids) > 0 else None
+        data["timedelta"] = \
+            self.get_timedelta(all_ids[0]) if len(all_ids) > 0 else None
+
+        return data
+
     @abstractmethod
     def get_ids(self):
         """Return the names of all vehicles currently in the network."""
@@ -545,6 +948,9 @@ class KernelVehicle(object, metaclass=ABCMeta):
     def get_acc_controller(self, veh_id, error=None):
         """Return the acceleration controller of the specified vehicle.
 
+        Controllers shared by several vehicles are returned as a
+        BoundController handle bound to the vehicle.
+
         Parameters
         ----------
         veh_id : str or list of str
@@ -554,7 +960,7 @@ class KernelVehicle(object, metaclass=ABCMeta):
 
         Returns
         -------
-        object
+        object or BoundController
         """
         pass
 
@@ -562,6 +968,9 @@ class KernelVehicle(object, metaclass=ABCMeta):
     def get_lane_changing_controller(self, veh_id, error=None):
         """Return the lane changing controller of the specified vehicle.
 
+        Controllers shared by several vehicles are returned as a
+        BoundController handle bound to the vehicle.
+
         Parameters
         ----------
         veh_id : str or list of str
@@ -571,7 +980,7 @@ class KernelVehicle(object, metaclass=ABCMeta):
 
         Returns
         -------
-        object
+        object or BoundController
         """
         pass
 
@@ -579,6 +988,9 @@ class KernelVehicle(object, metaclass=ABCMeta):
     def get_routing_controller(self, veh_id, error=None):
         """Return the routing controller of the specified vehicle.
 
+        Controllers shared by several vehicles are returned as a
+        BoundController handle bound to the vehicle.
+
         Parameters
         ----------
         veh_id : str or list of str
@@ -588,10 +1000,83 @@ class KernelVehicle(object, metaclass=ABCMeta):
 
         Returns
         -------
-        object
+        object or BoundController
         """
         pass
 
+    def group_by_controller(self, veh_ids, kind):
+        """Group vehicles by their controller of a given kind.
+
+        Vehicles sharing a controller are placed in a single group, so that
+        the controller may act for all of them in a single call to its
+        batched method (get_actions or choose_routes), to which the vehicles
+        are passed explicitly.
+
+        Parameters
+        ----------
+        veh_ids : list of str
+            vehicle ids
+        kind : str
+            kind of controller, one of "acc_controller", "lane_changer" or
+            "router"
+
+        Returns
+        -------
+        list of (object, list of str)
+            the controllers, and the vehicles every controller acts for
+        """
+        getter = {
+            "acc_controller": self.get_acc_controller,
+            "lane_changer": self.get_lane_changing_controller,
+            "router": self.get_routing_controller,
+        }[kind]
+
+        groups = {}
+        for veh_id in veh_ids:
+            controller = getter(veh_id)
+            if isinstance(controller, BoundController):
+                controller = controller.controller
+            groups.setdefault(
+                id(controller), (controller, []))[1].append(veh_id)
+        return list(groups.values())
+
+    def get_controller_state(self, veh_id):
+        """Return the mutable state of the controllers of a vehicle.
+
+        Controllers that are shared by several vehicles (see the shareable
+        attribute of flow.controllers.BaseController) store their per-vehicle
+        state in this dictionary, which is deleted with the vehicle.
+
+        Parameters
+        ----------
+        veh_id : str
+            vehicle id
+
+        Returns
+        -------
+        dict
+        """
+        raise NotImplementedError
+
+    def get_routing_ids(self):
+        """Return the names of vehicles whose routing controllers should act.
+
+        This consists of the vehicles whose routing controller acts at every
+        step, and the vehicles on the last edge of their route whose routing
+        controller only acts at this point (see the route_end_only attribute
+        of flow.controllers.BaseRouter).
+
+        This default implementation returns all vehicles with a routing
+        controller, and may be overridden by simulator kernels that keep track
+        of the routes of vehicles.
+
+        Returns
+        -------
+        list of str
+        """
+        return [veh_id for veh_id in self.get_ids()
+                if self.get_routing_controller(veh_id) is not None]
+
     @abstractmethod
     def get_lane_headways(self, veh_id, error=list()):
         """Return the lane headways of the specified vehicles.
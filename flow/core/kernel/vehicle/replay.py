@@ -0,0 +1,358 @@
+"""Script containing the replay vehicle kernel class."""
+import numpy as np
+
+from flow.core.kernel.vehicle import KernelVehicle
+
+COMMAND_ERROR = "Recorded rollouts cannot be modified."
+STATE_ERROR = '"{}" is not recorded by the TrajectoryRecorder.'
+
+
+class ReplayVehicle(KernelVehicle):
+    """Vehicle kernel reading the vehicle states of a recorded rollout.
+
+    Implements the state acquisition methods of the base vehicle kernel from
+    the columns of the current step of a flow.core.kernel.ReplayKernel. The
+    recorded rollouts cannot be interacted with, so the methods that send
+    commands to the simulator are not available.
+    """
+
+    def __init__(self, master_kernel, sim_params, ids, types, rl):
+        """Instantiate the replay vehicle kernel.
+
+        Parameters
+        ----------
+        master_kernel : flow.core.kernel.ReplayKernel
+            the replay kernel, holding the columns of the current step
+        sim_params : flow.core.params.SimParams
+            simulation-specific parameters
+        ids : list of str
+            names of the vehicles, indexed by their integer code
+        types : list of str
+            types of the vehicles, indexed by their integer code
+        rl : list of bool
+            whether every vehicle is an rl vehicle, indexed by its integer
+            code
+        """
+        KernelVehicle.__init__(self, master_kernel, sim_params)
+
+        self._names = np.array(ids + [""], dtype=object)
+        self._types = types
+        self._codes = {veh_id: code for code, veh_id in enumerate(ids)}
+        self._rl = np.array(rl, dtype=bool)
+
+        # columns of the current step, and row of every vehicle
+        self._columns = {}
+        self._rows = {}
+
+        self.__ids = []
+        self.__rl_ids = []
+        self.__human_ids = []
+
+        self.num_vehicles = 0
+        self.num_rl_vehicles = 0
+
+        # number of arrived and departed vehicles of all steps up to the
+        # current step
+        self._num_arrived = []
+        self._num_departed = []
+
+    def update(self, reset):
+        """See parent class.
+
+        The columns of the current step are read from the master kernel.
+        """
+        self._columns = self.master_kernel.columns
+        codes = self._columns["id"]
+        self.__ids = self._names[codes].tolist()
+        self._rows = dict(zip(self.__ids, range(len(codes))))
+
+        is_rl = self._rl[codes]
+        self.__rl_ids = self._names[codes[is_rl]].tolist()
+        self.__human_ids = self._names[codes[~is_rl]].tolist()
+        self.num_vehicles = len(self.__ids)
+        self.num_rl_vehicles = len(self.__rl_ids)
+
+        step = self.master_kernel.step_index
+        self._num_arrived = self.master_kernel.num_arrived[:step + 1]
+        self._num_departed = self.master_kernel.num_departed[:step + 1]
+
+    def _get(self, column, veh_id, error):
+        """Return the value of a column for one or multiple vehicles."""
+        if isinstance(veh_id, (list, np.ndarray)):
+            return [self._get(column, vehID, error) for vehID in veh_id]
+        row = self._rows.get(veh_id)
+        if row is None:
+            return error
+        return self._columns[column][row].item()
+
+    def _get_name(self, column, veh_id, error):
+        """Return the vehicle names referenced by a column."""
+        if isinstance(veh_id, (list, np.ndarray)):
+            return [self._get_name(column, vehID, error) for vehID in veh_id]
+        row = self._rows.get(veh_id)
+        if row is None:
+            return error
+        return self._names[self._columns[column][row]]
+
+    def get_ids(self):
+        """See parent class."""
+        return self.__ids
+
+    def get_human_ids(self):
+        """See parent class."""
+        return self.__human_ids
+
+    def get_rl_ids(self):
+        """See parent class."""
+        return self.__rl_ids
+
+    def get_type(self, veh_id):
+        """Return the type of the vehicle of veh_id."""
+        return self._types[self._codes[veh_id]]
+
+    def get_ids_by_edge(self, edges):
+        """See parent class."""
+        if isinstance(edges, str):
+            edges = [edges]
+        codes = [self.master_kernel.network.edge_code(edge) for edge in edges]
+        mask = np.isin(self._columns["edge"], codes)
+        return self._names[self._columns["id"][mask]].tolist()
+
+    def get_inflow_rate(self, time_span):
+        """See parent class."""
+        if len(self._num_departed) == 0:
+            return 0
+        num_inflow = self._num_departed[-int(time_span / self.sim_step):]
+        return 3600 * sum(num_inflow) / (len(num_inflow) * self.sim_step)
+
+    def get_outflow_rate(self, time_span):
+        """See parent class."""
+        if len(self._num_arrived) == 0:
+            return 0
+        num_outflow = self._num_arrived[-int(time_span / self.sim_step):]
+        return 3600 * sum(num_outflow) / (len(num_outflow) * self.sim_step)
+
+    def get_num_arrived(self):
+        """See parent class."""
+        if len(self._num_arrived) > 0:
+            return int(self._num_arrived[-1])
+        return 0
+
+    def get_speed(self, veh_id, error=-1001):
+        """See parent class."""
+        return self._get("speed", veh_id, error)
+
+    def get_position(self, veh_id, error=-1001):
+        """See parent class."""
+        return self._get("position", veh_id, error)
+
+    def get_edge(self, veh_id, error=""):
+        """See parent class."""
+        if isinstance(veh_id, (list, np.ndarray)):
+            return [self.get_edge(vehID, error) for vehID in veh_id]
+        row = self._rows.get(veh_id)
+        if row is None:
+            return error
+        return self.master_kernel.network.edge_name(
+            self._columns["edge"][row])
+
+    def get_lane(self, veh_id, error=-1001):
+        """See parent class."""
+        return self._get("lane", veh_id, error)
+
+    def get_leader(self, veh_id, error=""):
+        """See parent class."""
+        return self._get_name("leader", veh_id, error)
+
+    def get_follower(self, veh_id, error=""):
+        """See parent class."""
+        return self._get_name("follower", veh_id, error)
+
+    def get_headway(self, veh_id, error=-1001):
+        """See parent class."""
+        return self._get("headway", veh_id, error)
+
+    def get_x_by_id(self, veh_id):
+        """See parent class."""
+        return self._get("x", veh_id, 0.)
+
+    def get_accel(self, veh_id, noise=True, failsafe=True):
+        """See parent class.
+
+        Only the accelerations with noise and failsafes are recorded. None is
+        returned if no acceleration was commanded to the vehicle.
+        """
+        accel = self._get("accel", veh_id, None)
+        if isinstance(accel, list):
+            return [None if a is None or np.isnan(a) else a for a in accel]
+        return None if accel is None or np.isnan(accel) else accel
+
+    def get_realized_accel(self, veh_id):
+        """See parent class."""
+        return self._get("realized_accel", veh_id, 0)
+
+    ###########################################################################
+    #               Methods for interacting with the simulator                #
+    ###########################################################################
+
+    def add(self, veh_id, type_id, edge, pos, lane, speed):
+        """See parent class."""
+        raise NotImplementedError(COMMAND_ERROR)
+
+    def apply_acceleration(self, veh_id, acc, smooth=True):
+        """See parent class."""
+        raise NotImplementedError(COMMAND_ERROR)
+
+    def apply_lane_change(self, veh_id, direction):
+        """See parent class."""
+        raise NotImplementedError(COMMAND_ERROR)
+
+    def choose_routes(self, veh_id, route_choices):
+        """See parent class."""
+        raise NotImplementedError(COMMAND_ERROR)
+
+    def remove(self, veh_id):
+        """See parent class."""
+        raise NotImplementedError(COMMAND_ERROR)
+
+    def remove_observed(self, veh_id):
+        """See parent class."""
+        raise NotImplementedError(COMMAND_ERROR)
+
+    def reset(self):
+        """See parent class."""
+        raise NotImplementedError(COMMAND_ERROR)
+
+    def set_color(self, veh_id, color):
+        """See parent class."""
+        raise NotImplementedError(COMMAND_ERROR)
+
+    def set_max_speed(self, veh_id, max_speed):
+        """See parent class."""
+        raise NotImplementedError(COMMAND_ERROR)
+
+    def set_observed(self, veh_id):
+        """See parent class."""
+        raise NotImplementedError(COMMAND_ERROR)
+
+    def update_accel(self, veh_id, accel, noise=True, failsafe=True):
+        """See parent class."""
+        raise NotImplementedError(COMMAND_ERROR)
+
+    def update_vehicle_colors(self):
+        """See parent class."""
+        raise NotImplementedError(COMMAND_ERROR)
+
+    ###########################################################################
+    #                   State acquisition (not recorded)                      #
+    ###########################################################################
+
+    def get_2d_position(self, veh_id, error=-1001):
+        """See parent class."""
+        raise NotImplementedError(STATE_ERROR.format("get_2d_position"))
+
+    def get_acc_controller(self, veh_id, error=None):
+        """See parent class."""
+        raise NotImplementedError(STATE_ERROR.format("get_acc_controller"))
+
+    def get_arrived_ids(self):
+        """See parent class."""
+        raise NotImplementedError(STATE_ERROR.format("get_arrived_ids"))
+
+    def get_color(self, veh_id):
+        """See parent class."""
+        raise NotImplementedError(STATE_ERROR.format("get_color"))
+
+    def get_controlled_ids(self):
+        """See parent class."""
+        raise NotImplementedError(STATE_ERROR.format("get_controlled_ids"))
+
+    def get_controlled_lc_ids(self):
+        """See parent class."""
+        raise NotImplementedError(STATE_ERROR.format("get_controlled_lc_ids"))
+
+    def get_default_speed(self, veh_id, error=-1001):
+        """See parent class."""
+        raise NotImplementedError(STATE_ERROR.format("get_default_speed"))
+
+    def get_departed_ids(self):
+        """See parent class."""
+        raise NotImplementedError(STATE_ERROR.format("get_departed_ids"))
+
+    def get_fuel_consumption(self, veh_id, error=-1001):
+        """See parent class."""
+        raise NotImplementedError(STATE_ERROR.format("get_fuel_consumption"))
+
+    def get_lane_changing_controller(self, veh_id, error=None):
+        """See parent class."""
+        raise NotImplementedError(
+            STATE_ERROR.format("get_lane_changing_controller"))
+
+    def get_lane_followers(self, veh_id, error=list()):
+        """See parent class."""
+        raise NotImplementedError(STATE_ERROR.format("get_lane_followers"))
+
+    def get_lane_followers_speed(self, veh_id, error=list()):
+        """See parent class."""
+        raise NotImplementedError(
+            STATE_ERROR.format("get_lane_followers_speed"))
+
+    def get_lane_headways(self, veh_id, error=list()):
+        """See parent class."""
+        raise NotImplementedError(STATE_ERROR.format("get_lane_headways"))
+
+    def get_lane_leaders(self, veh_id, error=list()):
+        """See parent class."""
+        raise NotImplementedError(STATE_ERROR.format("get_lane_leaders"))
+
+    def get_lane_leaders_speed(self, veh_id, error=list()):
+        """See parent class."""
+        raise NotImplementedError(STATE_ERROR.format("get_lane_leaders_speed"))
+
+    def get_lane_tailways(self, veh_id, error=list()):
+        """See parent class."""
+        raise NotImplementedError(STATE_ERROR.format("get_lane_tailways"))
+
+    def get_last_lc(self, veh_id, error=-1001):
+        """See parent class."""
+        raise NotImplementedError(STATE_ERROR.format("get_last_lc"))
+
+    def get_length(self, veh_id, error=-1001):
+        """See parent class."""
+        raise NotImplementedError(STATE_ERROR.format("get_length"))
+
+    def get_max_speed(self, veh_id, error):
+        """See parent class."""
+        raise NotImplementedError(STATE_ERROR.format("get_max_speed"))
+
+    def get_num_not_departed(self):
+        """See parent class."""
+        raise NotImplementedError(STATE_ERROR.format("get_num_not_departed"))
+
+    def get_observed_ids(self):
+        """See parent class."""
+        raise NotImplementedError(STATE_ERROR.format("get_observed_ids"))
+
+    def get_orientation(self, veh_id):
+        """See parent class."""
+        raise NotImplementedError(STATE_ERROR.format("get_orientation"))
+
+    def get_road_grade(self, veh_id):
+        """See parent class."""
+        raise NotImplementedError(STATE_ERROR.format("get_road_grade"))
+
+    def get_route(self, veh_id, error=list()):
+        """See parent class."""
+        raise NotImplementedError(STATE_ERROR.format("get_route"))
+
+    def get_routing_controller(self, veh_id, error=None):
+        """See parent class."""
+        raise NotImplementedError(STATE_ERROR.format("get_routing_controller"))
+
+    def get_timedelta(self, veh_id):
+        """See parent class."""
+        raise NotImplementedError(STATE_ERROR.format("get_timedelta"))
+
+    def get_timestep(self, veh_id):
+        """See parent class."""
+        raise NotImplementedError(STATE_ERROR.format("get_timestep"))
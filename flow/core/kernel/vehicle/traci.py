@@ -1,7 +1,8 @@
 """Script containing the TraCI vehicle kernel class."""
 import traceback
 
-from flow.core.kernel.vehicle import KernelVehicle
+from flow.core.kernel.vehicle import KernelVehicle, VehicleSnapshot, \
+    StepCounter, IdRegistry, BoundController
 import traci.constants as tc
 from traci.exceptions import FatalTraCIError, TraCIException
 import numpy as np
@@ -26,6 +27,16 @@ color_bins = [[int(255 - rdelta * i), int(rdelta * i), 0] for i in
               range(STEPS + 1)]
 
 
+def _copy_vehicle(vals):
+    """Copy the state of a vehicle.
+
+    The lists and dictionaries of the state (e.g. the controller state) are
+    copied as well, while other values, including controllers, are shared.
+    """
+    return {key: val.copy() if isinstance(val, (dict, list)) else val
+            for key, val in vals.items()}
+
+
 class TraCIVehicle(KernelVehicle):
     """Flow kernel for the TraCI API.
 
@@ -38,12 +49,31 @@ class TraCIVehicle(KernelVehicle):
         """See parent class."""
         KernelVehicle.__init__(self, master_kernel, sim_params)
 
-        self.__ids = []  # ids of all vehicles
-        self.__human_ids = []  # ids of human-driven vehicles
-        self.__controlled_ids = []  # ids of flow-controlled vehicles
-        self.__controlled_lc_ids = []  # ids of flow lc-controlled vehicles
-        self.__rl_ids = []  # ids of rl-controlled vehicles
-        self.__observed_ids = []  # ids of the observed vehicles
+        # the ids of the vehicles are stored in registries, which provide
+        # constant-time membership tests and removals, and a stable index for
+        # every vehicle (see get_index and get_rl_index)
+        self.__ids = IdRegistry()  # ids of all vehicles
+        self.__human_ids = IdRegistry()  # ids of human-driven vehicles
+        self.__controlled_ids = IdRegistry()  # ids of flow-controlled vehicles
+        # ids of flow lc-controlled vehicles
+        self.__controlled_lc_ids = IdRegistry()
+        # ids of vehicles whose routing controller acts at every step, and
+        # only at the end of their route, respectively
+        self.__routed_ids = IdRegistry()
+        self.__route_end_ids = IdRegistry()
+        # ids of vehicles whose routing controller acts in the current step
+        self.__routing_ids = []
+
+        # controllers shared by all vehicles of a type, keyed by the type and
+        # the kind of controller
+        self.__shared_controllers = {}
+        # ids of rl-controlled vehicles, which are kept sorted
+        self.__rl_ids = IdRegistry(sort_ids=True)
+        self.__observed_ids = IdRegistry()  # ids of the observed vehicles
+        # ids of human-driven vehicles that are rendered as RL vehicles (see
+        # get_render_data), and of the remaining human-driven vehicles
+        self.__tracked_ids = IdRegistry()
+        self.__untracked_ids = IdRegistry()
 
         # vehicles: Key = Vehicle ID, Value = Dictionary describing the vehicle
         # Ordered dictionary used to keep neural net inputs in order
@@ -69,14 +99,22 @@ class TraCIVehicle(KernelVehicle):
         # list of vehicle ids located in each edge in the network
         self._ids_by_edge = dict()
 
+        # number of steps over which the inflow and outflow rates may be
+        # computed, and the arrived rl vehicles are stored
+        history = max(int(getattr(sim_params, 'rate_window', 3600)
+                          / sim_params.sim_step), 1)
+
         # number of vehicles that entered the network for every time-step
-        self._num_departed = []
+        self._num_departed = StepCounter(history)
         self._departed_ids = 0
 
         # number of vehicles to exit the network for every time-step
-        self._num_arrived = []
+        self._num_arrived = StepCounter(history)
         self._arrived_ids = 0
-        self._arrived_rl_ids = []
+        self._arrived_rl_ids = collections.deque(maxlen=history)
+
+        # whether the state of vehicles is purged once they leave the network
+        self._bounded_memory = getattr(sim_params, 'bounded_memory', False)
 
         # whether or not to automatically color vehicles
         try:
@@ -88,6 +126,17 @@ class TraCIVehicle(KernelVehicle):
         # old speeds used to compute accelerations
         self.previous_speeds = {}
 
+        # "last_lc" values of rl vehicles before their last lane change
+        self.prev_last_lc = dict()
+
+        # time step and time delta of the last simulation step, and whether
+        # the derived state of the vehicles must be recomputed before being
+        # accessed (see _update_headways and _update_multi_lane_headways)
+        self._time_step = None
+        self._time_delta = None
+        self._headways_stale = False
+        self._multi_lane_stale = False
+
     def initialize(self, vehicles):
         """Initialize vehicle state information.
 
@@ -102,6 +151,7 @@ class TraCIVehicle(KernelVehicle):
         """
         self.type_parameters = vehicles.type_parameters
         self.minGap = vehicles.minGap
+        self.__shared_controllers.clear()
         self.num_vehicles = 0
         self.num_rl_vehicles = 0
         self.num_not_departed = 0
@@ -117,6 +167,68 @@ class TraCIVehicle(KernelVehicle):
                 if typ['acceleration_controller'][0] == RLController:
                     self.num_rl_vehicles += 1
 
+    def snapshot(self):
+        """See parent class.
+
+        Only the id lists and the per-vehicle state are copied. The type
+        parameters, as well as the controllers of the vehicles, are shared
+        with the kernel.
+        """
+        return VehicleSnapshot(
+            num_vehicles=self.num_vehicles,
+            num_rl_vehicles=self.num_rl_vehicles,
+            ids=self.__ids.as_list(),
+            rl_ids=self.__rl_ids.as_list(),
+            state=self._copy_state())
+
+    def restore(self, snapshot):
+        """See parent class."""
+        state = snapshot.state
+        (self.__ids, self.__human_ids, self.__controlled_ids,
+         self.__controlled_lc_ids, self.__routed_ids, self.__route_end_ids,
+         self.__rl_ids, self.__observed_ids, self.__tracked_ids,
+         self.__untracked_ids) = [ids.copy() for ids in state["ids"]]
+        self.__routing_ids = list(state["routing_ids"])
+        self.__vehicles = collections.OrderedDict(
+            (veh_id, _copy_vehicle(vals))
+            for veh_id, vals in state["vehicles"].items())
+        self.__sumo_obs = dict(state["sumo_obs"])
+        self._ids_by_edge = dict(state["ids_by_edge"])
+        self._num_departed = state["num_departed"].copy()
+        self._num_arrived = state["num_arrived"].copy()
+        self._arrived_rl_ids = collections.deque(
+            state["arrived_rl_ids"], maxlen=self._arrived_rl_ids.maxlen)
+        self.previous_speeds = dict(state["previous_speeds"])
+        (self.num_vehicles, self.num_rl_vehicles, self.num_not_departed,
+         self._departed_ids, self._arrived_ids, self._time_step,
+         self._time_delta, self._headways_stale,
+         self._multi_lane_stale) = state["counters"]
+
+    def _copy_state(self):
+        """Return a copy of the mutable state of the kernel."""
+        return {
+            "ids": [ids.copy() for ids in (
+                self.__ids, self.__human_ids, self.__controlled_ids,
+                self.__controlled_lc_ids, self.__routed_ids,
+                self.__route_end_ids, self.__rl_ids, self.__observed_ids,
+                self.__tracked_ids, self.__untracked_ids)],
+            "routing_ids": list(self.__routing_ids),
+            "vehicles": collections.OrderedDict(
+                (veh_id, _copy_vehicle(vals))
+                for veh_id, vals in self.__vehicles.items()),
+            "sumo_obs": dict(self.__sumo_obs),
+            "ids_by_edge": dict(self._ids_by_edge),
+            "num_departed": self._num_departed.copy(),
+            "num_arrived": self._num_arrived.copy(),
+            "arrived_rl_ids": list(self._arrived_rl_ids),
+            "previous_speeds": dict(self.previous_speeds),
+            "counters": (self.num_vehicles, self.num_rl_vehicles,
+                         self.num_not_departed, self._departed_ids,
+                         self._arrived_ids, self._time_step,
+                         self._time_delta, self._headways_stale,
+                         self._multi_lane_stale),
+        }
+
     def update(self, reset):
         """See parent class.
 
@@ -146,7 +258,7 @@ class TraCIVehicle(KernelVehicle):
         arrived_rl_ids = []
         # remove exiting vehicles from the vehicles class
         for veh_id in sim_obs[tc.VAR_ARRIVED_VEHICLES_IDS]:
-            if veh_id in self.get_rl_ids():
+            if veh_id in self.__rl_ids:
                 arrived_rl_ids.append(veh_id)
             if veh_id in sim_obs[tc.VAR_TELEPORT_STARTING_VEHICLES_IDS]:
                 # this is meant to resolve the KeyError bug when there are
@@ -161,7 +273,7 @@ class TraCIVehicle(KernelVehicle):
 
         # add entering vehicles into the vehicles class
         for veh_id in sim_obs[tc.VAR_DEPARTED_VEHICLES_IDS]:
-            if veh_id in self.get_ids() and vehicle_obs[veh_id] is not None:
+            if veh_id in self.__ids and vehicle_obs[veh_id] is not None:
                 # this occurs when a vehicle is actively being removed and
                 # placed again in the network to ensure a constant number of
                 # total vehicles (e.g. TrafficLightGridEnv). In this case, the vehicle
@@ -220,27 +332,57 @@ class TraCIVehicle(KernelVehicle):
             self.num_not_departed += sim_obs[tc.VAR_LOADED_VEHICLES_NUMBER] - \
                 sim_obs[tc.VAR_DEPARTED_VEHICLES_NUMBER]
 
-        # update the "headway", "leader", and "follower" variables
+        # the "orientation", "headway", "leader", and "follower" variables,
+        # as well as the multi-lane data, are computed on first access after
+        # every simulation step (see _update_headways and
+        # _update_multi_lane_headways)
+        self._time_step = sim_obs[tc.VAR_TIME_STEP]
+        self._time_delta = sim_obs[tc.VAR_DELTA_T]
+        self._headways_stale = True
+        self._multi_lane_stale = True
+
+        # update the sumo observations variable
+        self.__sumo_obs = vehicle_obs.copy()
+
+        # update the vehicles whose routing controllers act in the next step
+        self.__routing_ids = self.__routed_ids.as_list() + [
+            veh_id for veh_id in self.__route_end_ids
+            if self._is_on_route_end(vehicle_obs.get(veh_id))]
+
+    def _update_headways(self):
+        """Compute the orientation, headway, leader, and follower of vehicles.
+
+        These variables are computed from the subscription results of the
+        last simulation step the first time one of them is accessed, and are
+        cached until the next simulation step.
+        """
+        if not self._headways_stale:
+            return
+        self._headways_stale = False
+
+        vehicle_obs = self.__sumo_obs
+
+        # the followers are recomputed from the leaders of the last step only
+        for veh_id in self.__ids:
+            self.__vehicles[veh_id]["follower"] = None
+            self.__vehicles[veh_id]["follower_headway"] = float("inf")
+
         for veh_id in self.__ids:
             try:
                 _position = vehicle_obs.get(veh_id, {}).get(
                     tc.VAR_POSITION, -1001)
                 _angle = vehicle_obs.get(veh_id, {}).get(tc.VAR_ANGLE, -1001)
-                _time_step = sim_obs[tc.VAR_TIME_STEP]
-                _time_delta = sim_obs[tc.VAR_DELTA_T]
                 self.__vehicles[veh_id]["orientation"] = \
                     list(_position) + [_angle]
-                self.__vehicles[veh_id]["timestep"] = _time_step
-                self.__vehicles[veh_id]["timedelta"] = _time_delta
+                self.__vehicles[veh_id]["timestep"] = self._time_step
+                self.__vehicles[veh_id]["timedelta"] = self._time_delta
             except TypeError:
                 print(traceback.format_exc())
             headway = vehicle_obs.get(veh_id, {}).get(tc.VAR_LEADER, None)
             # check for a collided vehicle or a vehicle with no leader
             if headway is None:
                 self.__vehicles[veh_id]["leader"] = None
-                self.__vehicles[veh_id]["follower"] = None
                 self.__vehicles[veh_id]["headway"] = 1e+3
-                self.__vehicles[veh_id]["follower_headway"] = 1e+3
             else:
                 min_gap = self.minGap[self.get_type(veh_id)]
                 self.__vehicles[veh_id]["headway"] = headway[1] + min_gap
@@ -249,19 +391,89 @@ class TraCIVehicle(KernelVehicle):
                     leader = self.__vehicles[headway[0]]
                     # if veh_id is closer from leader than another follower
                     # (in case followers are in different converging edges)
-                    if ("follower_headway" not in leader or
-                            headway[1] + min_gap < leader["follower_headway"]):
+                    if headway[1] + min_gap < leader["follower_headway"]:
                         leader["follower"] = veh_id
                         leader["follower_headway"] = headway[1] + min_gap
 
-        # update the sumo observations variable
-        self.__sumo_obs = vehicle_obs.copy()
+    def _update_multi_lane_headways(self):
+        """Compute the multi-lane data of vehicles, if not done yet.
+
+        The multi-lane data (see _multi_lane_headways) is computed the first
+        time it is accessed after a simulation step, and is cached until the
+        next simulation step.
+        """
+        if self._multi_lane_stale:
+            self._multi_lane_stale = False
+            self._multi_lane_headways()
+
+    def _make_controller(self, veh_type, kind, controller_cls, make):
+        """Return a controller for a departing vehicle.
+
+        Controllers whose class is shareable (see the shareable attribute of
+        flow.controllers.BaseController) are created once per vehicle type,
+        and shared by all vehicles of this type. Other controllers are created
+        for every vehicle.
 
-        # update the lane leaders data for each vehicle
-        self._multi_lane_headways()
+        Parameters
+        ----------
+        veh_type : str
+            type of the vehicle
+        kind : str
+            kind of controller, one of "acc_controller", "lane_changer" or
+            "router"
+        controller_cls : type
+            class of the controller
+        make : function
+            creates a new instance of the controller for the vehicle
 
-        # make sure the rl vehicle list is still sorted
-        self.__rl_ids.sort()
+        Returns
+        -------
+        object
+            the controller of the vehicle
+        """
+        if not getattr(controller_cls, "shareable", False):
+            return make()
+        key = (veh_type, kind)
+        if key not in self.__shared_controllers:
+            self.__shared_controllers[key] = make()
+        return self.__shared_controllers[key]
+
+    def _get_controller(self, veh_id, kind, error):
+        """Return a controller of a vehicle.
+
+        Shared controllers are returned as a BoundController handle, which
+        binds the controller to the vehicle only while its methods are
+        called.
+        """
+        controller = self.__vehicles.get(veh_id, {}).get(kind, error)
+        if controller is not None and controller is not error and \
+                getattr(controller, "shareable", False):
+            return BoundController(controller, veh_id)
+        return controller
+
+    def get_controller_state(self, veh_id):
+        """See parent class."""
+        return self.__vehicles[veh_id].setdefault("controller_state", {})
+
+    @staticmethod
+    def _is_on_route_end(obs):
+        """Check whether a vehicle is on the last edge of its route.
+
+        Parameters
+        ----------
+        obs : dict or None
+            subscription results of the vehicle
+
+        Returns
+        -------
+        bool
+        """
+        if not obs:
+            return False
+        route = obs.get(tc.VAR_EDGES)
+        # the route of inflowing vehicles is not available in the first step
+        # that they departed
+        return bool(route) and obs.get(tc.VAR_ROAD_ID) == route[-1]
 
     def _add_departed(self, veh_id, veh_type):
         """Add a vehicle that entered the network from an inflow or reset.
@@ -281,8 +493,7 @@ class TraCIVehicle(KernelVehicle):
         if veh_type not in self.type_parameters:
             raise KeyError("Entering vehicle is not a valid type.")
 
-        if veh_id not in self.__ids:
-            self.__ids.append(veh_id)
+        self.__ids.add(veh_id)
         if veh_id not in self.__vehicles:
             self.num_vehicles += 1
             self.__vehicles[veh_id] = dict()
@@ -296,36 +507,50 @@ class TraCIVehicle(KernelVehicle):
         # specify the acceleration controller class
         accel_controller = \
             self.type_parameters[veh_type]["acceleration_controller"]
-        self.__vehicles[veh_id]["acc_controller"] = \
-            accel_controller[0](veh_id,
-                                car_following_params=car_following_params,
-                                **accel_controller[1])
+        self.__vehicles[veh_id]["acc_controller"] = self._make_controller(
+            veh_type, "acc_controller", accel_controller[0],
+            lambda: accel_controller[0](
+                veh_id,
+                car_following_params=car_following_params,
+                **accel_controller[1]))
 
         # specify the lane-changing controller class
         lc_controller = \
             self.type_parameters[veh_type]["lane_change_controller"]
-        self.__vehicles[veh_id]["lane_changer"] = \
-            lc_controller[0](veh_id=veh_id, **lc_controller[1])
+        self.__vehicles[veh_id]["lane_changer"] = self._make_controller(
+            veh_type, "lane_changer", lc_controller[0],
+            lambda: lc_controller[0](veh_id=veh_id, **lc_controller[1]))
 
         # specify the routing controller class
         rt_controller = self.type_parameters[veh_type]["routing_controller"]
         if rt_controller is not None:
-            self.__vehicles[veh_id]["router"] = \
-                rt_controller[0](veh_id=veh_id, router_params=rt_controller[1])
+            self.__vehicles[veh_id]["router"] = self._make_controller(
+                veh_type, "router", rt_controller[0],
+                lambda: rt_controller[0](
+                    veh_id=veh_id, router_params=rt_controller[1]))
+            if getattr(rt_controller[0], "route_end_only", False):
+                self.__route_end_ids.add(veh_id)
+            else:
+                self.__routed_ids.add(veh_id)
         else:
             self.__vehicles[veh_id]["router"] = None
 
         # add the vehicle's id to the list of vehicle ids
         if accel_controller[0] == RLController:
-            if veh_id not in self.__rl_ids:
-                self.__rl_ids.append(veh_id)
+            self.__rl_ids.add(veh_id)
         else:
             if veh_id not in self.__human_ids:
-                self.__human_ids.append(veh_id)
+                self.__human_ids.add(veh_id)
+                # Force tracking human vehicles by adding "track" in vehicle
+                # id. These vehicles are rendered as machine vehicles.
+                if 'track' in veh_id:
+                    self.__tracked_ids.add(veh_id)
+                else:
+                    self.__untracked_ids.add(veh_id)
                 if accel_controller[0] != SimCarFollowingController:
-                    self.__controlled_ids.append(veh_id)
+                    self.__controlled_ids.add(veh_id)
                 if lc_controller[0] != SimLaneChangeController:
-                    self.__controlled_lc_ids.append(veh_id)
+                    self.__controlled_lc_ids.add(veh_id)
 
         # subscribe the new vehicle
         self.kernel_api.vehicle.subscribe(veh_id, [
@@ -375,8 +600,6 @@ class TraCIVehicle(KernelVehicle):
         self.__sumo_obs[veh_id][tc.VAR_FUELCONSUMPTION] = \
             self.kernel_api.vehicle.getFuelConsumption(veh_id)
 
-        # make sure that the order of rl_ids is kept sorted
-        self.__rl_ids.sort()
         self.num_rl_vehicles = len(self.__rl_ids)
 
         # get the subscription results from the new vehicle
@@ -395,8 +618,7 @@ class TraCIVehicle(KernelVehicle):
             self.kernel_api.vehicle.unsubscribe(veh_id)
             self.kernel_api.vehicle.remove(veh_id)
 
-        if veh_id in self.__ids:
-            self.__ids.remove(veh_id)
+        self.__ids.discard(veh_id)
 
         # remove from the vehicles kernel
         if veh_id in self.__vehicles:
@@ -405,21 +627,22 @@ class TraCIVehicle(KernelVehicle):
         if veh_id in self.__sumo_obs:
             del self.__sumo_obs[veh_id]
 
+        # purge the remaining state of the vehicle (see the bounded_memory
+        # attribute of flow.core.params.SumoParams)
+        if self._bounded_memory:
+            self.previous_speeds.pop(veh_id, None)
+            self.prev_last_lc.pop(veh_id, None)
+
         # remove it from all other id lists (if it is there)
-        if veh_id in self.__human_ids:
-            self.__human_ids.remove(veh_id)
-            if veh_id in self.__controlled_ids:
-                self.__controlled_ids.remove(veh_id)
-            if veh_id in self.__controlled_lc_ids:
-                self.__controlled_lc_ids.remove(veh_id)
-        elif veh_id in self.__rl_ids:
-            self.__rl_ids.remove(veh_id)
-            # make sure that the rl ids remain sorted
-            self.__rl_ids.sort()
+        for ids in (self.__human_ids, self.__tracked_ids,
+                    self.__untracked_ids, self.__controlled_ids,
+                    self.__controlled_lc_ids, self.__rl_ids,
+                    self.__routed_ids, self.__route_end_ids):
+            ids.discard(veh_id)
 
         # modify the number of vehicles and RL vehicles
-        self.num_vehicles = len(self.get_ids())
-        self.num_rl_vehicles = len(self.get_rl_ids())
+        self.num_vehicles = len(self.__ids)
+        self.num_rl_vehicles = len(self.__rl_ids)
 
     def test_set_speed(self, veh_id, speed):
         """Set the speed of the specified vehicle."""
@@ -431,92 +654,179 @@ class TraCIVehicle(KernelVehicle):
 
     def set_follower(self, veh_id, follower):
         """Set the follower of the specified vehicle."""
+        self._update_headways()
         self.__vehicles[veh_id]["follower"] = follower
 
     def set_headway(self, veh_id, headway):
         """Set the headway of the specified vehicle."""
+        self._update_headways()
         self.__vehicles[veh_id]["headway"] = headway
 
     def get_orientation(self, veh_id):
         """See parent class."""
+        self._update_headways()
         return self.__vehicles[veh_id]["orientation"]
 
     def get_timestep(self, veh_id):
         """See parent class."""
+        self._update_headways()
         return self.__vehicles[veh_id]["timestep"]
 
     def get_timedelta(self, veh_id):
         """See parent class."""
+        self._update_headways()
         return self.__vehicles[veh_id]["timedelta"]
 
     def get_type(self, veh_id):
         """Return the type of the vehicle of veh_id."""
         return self.__vehicles[veh_id]["type"]
 
+    def get_render_data(self, max_speed):
+        """See parent class.
+
+        The split between human and machine vehicles is resolved when
+        vehicles enter the network, and the orientations and speeds are read
+        directly from the stored subscription results.
+        """
+        self._update_headways()
+        human_ids = list(self.__untracked_ids)
+        machine_ids = self.__tracked_ids.as_list() + self.__rl_ids.as_list()
+
+        data = {"human_ids": human_ids, "machine_ids": machine_ids}
+        for name, ids in [("human", human_ids), ("machine", machine_ids)]:
+            data[name + "_orientations"] = np.array(
+                [self.__vehicles[veh_id]["orientation"] for veh_id in ids],
+                dtype=np.float64).reshape(-1, 3)
+            data[name + "_dynamics"] = np.fromiter(
+                (self.__sumo_obs[veh_id][tc.VAR_SPEED] for veh_id in ids),
+                dtype=np.float64, count=len(ids)) / max_speed
+
+        # the time step and time delta are shared by all vehicles
+        ids = self.__ids.as_list()
+        vehicle = self.__vehicles[ids[0]] if ids else {}
+        data["timestep"] = vehicle.get("timestep")
+        data["timedelta"] = vehicle.get("timedelta")
+
+        return data
+
     def get_initial_speed(self, veh_id):
         """Return the initial speed of the vehicle of veh_id."""
         return self.__vehicles[veh_id]["initial_speed"]
 
     def get_ids(self):
         """See parent class."""
-        return self.__ids
+        return self.__ids.as_list()
 
     def get_human_ids(self):
         """See parent class."""
-        return self.__human_ids
+        return self.__human_ids.as_list()
 
     def get_controlled_ids(self):
         """See parent class."""
-        return self.__controlled_ids
+        return self.__controlled_ids.as_list()
 
     def get_controlled_lc_ids(self):
         """See parent class."""
-        return self.__controlled_lc_ids
+        return self.__controlled_lc_ids.as_list()
 
     def get_rl_ids(self):
         """See parent class."""
-        return self.__rl_ids
+        return self.__rl_ids.as_list()
+
+    def get_index(self, veh_id, error=-1):
+        """Return the index of a vehicle among all vehicles.
+
+        The index of a vehicle is unchanged while it is in the network, and
+        is reused by the vehicles that enter the network after it left. The
+        indices are smaller than the largest number of vehicles that were in
+        the network at the same time.
+
+        Parameters
+        ----------
+        veh_id : str or list of str
+            vehicle id, or list of vehicle ids
+        error : int, optional
+            value that is returned for vehicles that are not in the network
+
+        Returns
+        -------
+        int or np.ndarray
+            index of the vehicle, or array of indices of the vehicles
+        """
+        if isinstance(veh_id, (list, np.ndarray)):
+            return self.__ids.indices(veh_id, error)
+        return self.__ids.index(veh_id, error)
+
+    def get_rl_index(self, veh_id, error=-1):
+        """Return the index of an rl vehicle among the rl vehicles.
+
+        See get_index. The indices of the rl vehicles are assigned separately
+        from the indices of all vehicles.
+
+        Parameters
+        ----------
+        veh_id : str or list of str
+            vehicle id, or list of vehicle ids
+        error : int, optional
+            value that is returned for vehicles that are not rl vehicles in
+            the network
+
+        Returns
+        -------
+        int or np.ndarray
+            index of the vehicle, or array of indices of the vehicles
+        """
+        if isinstance(veh_id, (list, np.ndarray)):
+            return self.__rl_ids.indices(veh_id, error)
+        return self.__rl_ids.index(veh_id, error)
 
     def set_observed(self, veh_id):
         """See parent class."""
-        if veh_id not in self.__observed_ids:
-            self.__observed_ids.append(veh_id)
+        self.__observed_ids.add(veh_id)
 
     def remove_observed(self, veh_id):
         """See parent class."""
-        if veh_id in self.__observed_ids:
-            self.__observed_ids.remove(veh_id)
+        self.__observed_ids.discard(veh_id)
 
     def get_observed_ids(self):
         """See parent class."""
-        return self.__observed_ids
+        return self.__observed_ids.as_list()
 
     def get_ids_by_edge(self, edges):
         """See parent class."""
         if isinstance(edges, (list, np.ndarray)):
-            return sum([self.get_ids_by_edge(edge) for edge in edges], [])
+            return list(itertools.chain.from_iterable(
+                self.get_ids_by_edge(edge) for edge in edges))
+        self._update_multi_lane_headways()
         return self._ids_by_edge.get(edges, []) or []
 
     def get_inflow_rate(self, time_span):
-        """See parent class."""
-        if len(self._num_departed) == 0:
+        """See parent class.
+
+        The rate is computed over at most the rate_window of the simulation
+        parameters (see flow.core.params.SumoParams).
+        """
+        num_inflow, num_steps = self._num_departed.window(
+            int(time_span / self.sim_step))
+        if num_steps == 0:
             return 0
-        num_inflow = self._num_departed[-int(time_span / self.sim_step):]
-        return 3600 * sum(num_inflow) / (len(num_inflow) * self.sim_step)
+        return 3600 * num_inflow / (num_steps * self.sim_step)
 
     def get_outflow_rate(self, time_span):
-        """See parent class."""
-        if len(self._num_arrived) == 0:
+        """See parent class.
+
+        The rate is computed over at most the rate_window of the simulation
+        parameters (see flow.core.params.SumoParams).
+        """
+        num_outflow, num_steps = self._num_arrived.window(
+            int(time_span / self.sim_step))
+        if num_steps == 0:
             return 0
-        num_outflow = self._num_arrived[-int(time_span / self.sim_step):]
-        return 3600 * sum(num_outflow) / (len(num_outflow) * self.sim_step)
+        return 3600 * num_outflow / (num_steps * self.sim_step)
 
     def get_num_arrived(self):
         """See parent class."""
-        if len(self._num_arrived) > 0:
-            return self._num_arrived[-1]
-        else:
-            return 0
+        return self._num_arrived.last()
 
     def get_arrived_ids(self):
         """See parent class."""
@@ -526,7 +836,8 @@ class TraCIVehicle(KernelVehicle):
         """See parent class."""
         if len(self._arrived_rl_ids) > 0:
             arrived = []
-            for arr in self._arrived_rl_ids[-k:]:
+            for arr in reversed(list(itertools.islice(
+                    reversed(self._arrived_rl_ids), k))):
                 arrived.extend(arr)
             return arrived
         else:
@@ -602,18 +913,21 @@ class TraCIVehicle(KernelVehicle):
         """See parent class."""
         if isinstance(veh_id, (list, np.ndarray)):
             return [self.get_leader(vehID, error) for vehID in veh_id]
+        self._update_headways()
         return self.__vehicles.get(veh_id, {}).get("leader", error)
 
     def get_follower(self, veh_id, error=""):
         """See parent class."""
         if isinstance(veh_id, (list, np.ndarray)):
             return [self.get_follower(vehID, error) for vehID in veh_id]
+        self._update_headways()
         return self.__vehicles.get(veh_id, {}).get("follower", error)
 
     def get_headway(self, veh_id, error=-1001):
         """See parent class."""
         if isinstance(veh_id, (list, np.ndarray)):
             return [self.get_headway(vehID, error) for vehID in veh_id]
+        self._update_headways()
         return self.__vehicles.get(veh_id, {}).get("headway", error)
 
     def get_last_lc(self, veh_id, error=-1001):
@@ -626,13 +940,14 @@ class TraCIVehicle(KernelVehicle):
                           ' {}.'.format(veh_id, error))
             return error
         else:
+            self._update_headways()
             return self.__vehicles.get(veh_id, {}).get("headway", error)
 
     def get_acc_controller(self, veh_id, error=None):
         """See parent class."""
         if isinstance(veh_id, (list, np.ndarray)):
             return [self.get_acc_controller(vehID, error) for vehID in veh_id]
-        return self.__vehicles.get(veh_id, {}).get("acc_controller", error)
+        return self._get_controller(veh_id, "acc_controller", error)
 
     def get_lane_changing_controller(self, veh_id, error=None):
         """See parent class."""
@@ -641,7 +956,7 @@ class TraCIVehicle(KernelVehicle):
                 self.get_lane_changing_controller(vehID, error)
                 for vehID in veh_id
             ]
-        return self.__vehicles.get(veh_id, {}).get("lane_changer", error)
+        return self._get_controller(veh_id, "lane_changer", error)
 
     def get_routing_controller(self, veh_id, error=None):
         """See parent class."""
@@ -649,10 +964,11 @@ class TraCIVehicle(KernelVehicle):
             return [
                 self.get_routing_controller(vehID, error) for vehID in veh_id
             ]
-        return self.__vehicles.get(veh_id, {}).get("router", error)
+        return self._get_controller(veh_id, "router", error)
 
     def set_lane_headways(self, veh_id, lane_headways):
         """Set the lane headways of the specified vehicle."""
+        self._update_multi_lane_headways()
         self.__vehicles[veh_id]["lane_headways"] = lane_headways
 
     def get_lane_headways(self, veh_id, error=None):
@@ -661,6 +977,7 @@ class TraCIVehicle(KernelVehicle):
             error = list()
         if isinstance(veh_id, (list, np.ndarray)):
             return [self.get_lane_headways(vehID, error) for vehID in veh_id]
+        self._update_multi_lane_headways()
         return self.__vehicles.get(veh_id, {}).get("lane_headways", error)
 
     def get_lane_leaders_speed(self, veh_id, error=None):
@@ -677,6 +994,7 @@ class TraCIVehicle(KernelVehicle):
 
     def set_lane_leaders(self, veh_id, lane_leaders):
         """Set the lane leaders of the specified vehicle."""
+        self._update_multi_lane_headways()
         self.__vehicles[veh_id]["lane_leaders"] = lane_leaders
 
     def get_lane_leaders(self, veh_id, error=None):
@@ -685,10 +1003,12 @@ class TraCIVehicle(KernelVehicle):
             error = list()
         if isinstance(veh_id, (list, np.ndarray)):
             return [self.get_lane_leaders(vehID, error) for vehID in veh_id]
+        self._update_multi_lane_headways()
         return self.__vehicles[veh_id]["lane_leaders"]
 
     def set_lane_tailways(self, veh_id, lane_tailways):
         """Set the lane tailways of the specified vehicle."""
+        self._update_multi_lane_headways()
         self.__vehicles[veh_id]["lane_tailways"] = lane_tailways
 
     def get_lane_tailways(self, veh_id, error=None):
@@ -697,10 +1017,12 @@ class TraCIVehicle(KernelVehicle):
             error = list()
         if isinstance(veh_id, (list, np.ndarray)):
             return [self.get_lane_tailways(vehID, error) for vehID in veh_id]
+        self._update_multi_lane_headways()
         return self.__vehicles.get(veh_id, {}).get("lane_tailways", error)
 
     def set_lane_followers(self, veh_id, lane_followers):
         """Set the lane followers of the specified vehicle."""
+        self._update_multi_lane_headways()
         self.__vehicles[veh_id]["lane_followers"] = lane_followers
 
     def get_lane_followers(self, veh_id, error=None):
@@ -709,6 +1031,7 @@ class TraCIVehicle(KernelVehicle):
             error = list()
         if isinstance(veh_id, (list, np.ndarray)):
             return [self.get_lane_followers(vehID, error) for vehID in veh_id]
+        self._update_multi_lane_headways()
         return self.__vehicles.get(veh_id, {}).get("lane_followers", error)
 
     def _multi_lane_headways(self):
@@ -961,7 +1284,7 @@ class TraCIVehicle(KernelVehicle):
             acc = [acc]
 
         for i, vid in enumerate(veh_ids):
-            if acc[i] is not None and vid in self.get_ids():
+            if acc[i] is not None and vid in self.__ids:
                 self.__vehicles[vid]["accel"] = acc[i]
                 this_vel = self.get_speed(vid)
                 next_vel = max([this_vel + acc[i] * self.sim_step, 0])
@@ -971,38 +1294,52 @@ class TraCIVehicle(KernelVehicle):
                     self.kernel_api.vehicle.setSpeed(vid, next_vel)
 
     def apply_lane_change(self, veh_ids, direction):
-        """See parent class."""
+        """See parent class.
+
+        The target lanes of all vehicles are computed at once, from the number
+        of lanes of their edges in the geometry index of the network kernel,
+        and commands are only sent to the vehicles whose target lane differs
+        from their current lane.
+        """
         # to hand the case of a single vehicle
         if type(veh_ids) == str:
             veh_ids = [veh_ids]
             direction = [direction]
 
         # if any of the directions are not -1, 0, or 1, raise a ValueError
-        if any(d not in [-1, 0, 1] for d in direction):
+        direction = np.asarray(direction)
+        if not np.all(np.isin(direction, [-1, 0, 1])):
             raise ValueError(
                 "Direction values for lane changes may only be: -1, 0, or 1.")
 
-        for i, veh_id in enumerate(veh_ids):
-            # check for no lane change
-            if direction[i] == 0:
-                continue
-
-            # compute the target lane, and clip it so vehicle don't try to lane
-            # change out of range
-            this_lane = self.get_lane(veh_id)
-            this_edge = self.get_edge(veh_id)
-            target_lane = min(
-                max(this_lane + direction[i], 0),
-                self.master_kernel.network.num_lanes(this_edge) - 1)
-
-            # perform the requested lane action action in TraCI
-            if target_lane != this_lane:
-                self.kernel_api.vehicle.changeLane(
-                    veh_id, int(target_lane), self.sim_step)
-
-                if veh_id in self.get_rl_ids():
-                    self.prev_last_lc[veh_id] = \
-                        self.__vehicles[veh_id]["last_lc"]
+        # check for no lane change
+        changing = np.flatnonzero(direction)
+        if len(changing) == 0:
+            return
+        veh_ids = [veh_ids[i] for i in changing]
+        direction = direction[changing].astype(int)
+
+        # compute the target lanes, and clip them so vehicle don't try to lane
+        # change out of range. Vehicles on unknown edges (e.g. teleported
+        # vehicles) are assigned a negative number of lanes, and are skipped
+        this_lane = np.array(self.get_lane(veh_ids), dtype=int)
+        num_lanes = self.master_kernel.network.num_lanes(
+            self.get_edge(veh_ids))
+        target_lane = np.clip(this_lane + direction, 0, num_lanes - 1)
+        valid = (num_lanes > 0) & (target_lane != this_lane)
+
+        # perform the requested lane action action in TraCI
+        for i in np.flatnonzero(valid):
+            veh_id = veh_ids[i]
+            self.kernel_api.vehicle.changeLane(
+                veh_id, int(target_lane[i]), self.sim_step)
+
+            if veh_id in self.__rl_ids:
+                self.prev_last_lc[veh_id] = self.__vehicles[veh_id]["last_lc"]
+
+    def get_routing_ids(self):
+        """See parent class."""
+        return self.__routing_ids
 
     def choose_routes(self, veh_ids, route_choices):
         """See parent class."""
@@ -1019,7 +1356,13 @@ class TraCIVehicle(KernelVehicle):
     def get_x_by_id(self, veh_id):
         """See parent class."""
         if isinstance(veh_id, (list, np.ndarray)):
-            return [self.get_x_by_id(vehID) for vehID in veh_id]
+            # convert the positions of all vehicles in a single call to the
+            # geometry index of the network
+            edges = self.get_edge(veh_id)
+            x = self.master_kernel.network.get_x(
+                edges, self.get_position(veh_id))
+            x[[edge == '' for edge in edges]] = 0.
+            return x.tolist()
         if self.get_edge(veh_id) == '':
             # occurs when a vehicle crashes is teleported for some other reason
             return 0.
@@ -1106,10 +1449,8 @@ class TraCIVehicle(KernelVehicle):
             # the case of network templates.
             route_id = 'route{}_0'.format(veh_id)
         else:
-            num_routes = len(self.master_kernel.network.rts[edge])
-            frac = [val[1] for val in self.master_kernel.network.rts[edge]]
-            route_id = 'route{}_{}'.format(edge, np.random.choice(
-                [i for i in range(num_routes)], size=1, p=frac)[0])
+            route_id = 'route{}_{}'.format(
+                edge, self.master_kernel.network.sample_routes(edge))
 
         self.kernel_api.vehicle.addFull(
             veh_id,
@@ -2,6 +2,7 @@
 
 import logging
 import collections
+import copy
 
 from flow.utils.flow_warnings import deprecated_attribute
 from flow.controllers.car_following_models import SimCarFollowingController
@@ -363,6 +364,31 @@ class VehicleParams:
         self.num_types += 1
         self.types.append({"veh_id": veh_id, "type_params": type_params})
 
+    def copy(self):
+        """Return a copy of the object.
+
+        The lists and dictionaries of the copy can be extended independently
+        of the original object (e.g. by adding vehicle types to it), while the
+        controller specifications and car-following and lane-change params
+        objects of the vehicle types are shared.
+
+        Returns
+        -------
+        flow.core.params.VehicleParams
+            the copied object
+        """
+        vehicles = copy.copy(self)
+        vehicles.ids = list(self.ids)
+        vehicles.__vehicles = collections.OrderedDict(
+            (veh_id, dict(vals)) for veh_id, vals in self.__vehicles.items())
+        vehicles.types = [dict(typ) for typ in self.types]
+        vehicles.type_parameters = {
+            veh_type: dict(params)
+            for veh_type, params in self.type_parameters.items()}
+        vehicles.minGap = dict(self.minGap)
+        vehicles.initial = [dict(typ) for typ in self.initial]
+        return vehicles
+
     def get_type(self, veh_id):
         """Return the type of a specified vehicle.
 
@@ -411,6 +437,13 @@ class SimParams(object):
         specifies rendering resolution (pixel / meter)
     force_color_update : bool, optional
         whether or not to automatically color vehicles according to their types
+    render_backend : str, optional
+        backend used to render frames in the "gray", "dgray", "rgb", and
+        "drgb" modes, one of:
+
+        * "pyglet": render with OpenGL via pyglet, which requires a display
+        * "numpy": rasterize frames in software, which does not require a
+          display (see flow/renderer/numpy_renderer.py)
     """
 
     def __init__(self,
@@ -422,7 +455,8 @@ class SimParams(object):
                  sight_radius=25,
                  show_radius=False,
                  pxpm=2,
-                 force_color_update=False):
+                 force_color_update=False,
+                 render_backend="pyglet"):
         """Instantiate SimParams."""
         self.sim_step = sim_step
         self.render = render
@@ -433,6 +467,7 @@ class SimParams(object):
         self.pxpm = pxpm
         self.show_radius = show_radius
         self.force_color_update = force_color_update
+        self.render_backend = render_backend
 
 
 class AimsunParams(SimParams):
@@ -588,6 +623,42 @@ class SumoParams(SimParams):
         current time step
     use_ballistic: bool, optional
         If true, use a ballistic integration step instead of an euler step
+    render_backend : str, optional
+        backend used to render frames in the "gray", "dgray", "rgb", and
+        "drgb" modes, one of "pyglet" (requires a display) or "numpy"
+        (software rendering, does not require a display)
+    initial_vehicles_in_routes : bool, optional
+        whether the vehicles present at the start of a rollout are written to
+        a route file, and loaded by sumo in a single pass when it is started,
+        instead of being added one at a time through TraCI when the
+        environment is reset. This only applies to rollouts that start a new
+        sumo instance (e.g. if restart_instance is set to True); vehicles are
+        otherwise added through TraCI.
+    mean_data_path : str, optional
+        Path to the folder in which to create the edge/lane aggregate outputs
+        of sumo (see flow.core.util.load_mean_data). These outputs contain the
+        flow, density, speed and (optionally) fuel consumption of every edge
+        or lane, averaged over intervals of mean_data_period seconds, and
+        their size does not depend on the number of vehicles. Aggregate
+        outputs are not generated if this value is not specified
+    mean_data_level : str or list of str, optional
+        the level at which the aggregate outputs are computed, "edge" and/or
+        "lane"
+    mean_data_period : float, optional
+        length of the aggregation intervals, in seconds
+    mean_data_emissions : bool, optional
+        whether to also generate the aggregate emissions and fuel consumption
+        of every edge or lane
+    rate_window : float, optional
+        longest time span, in seconds, over which the inflow and outflow
+        rates of the vehicle kernel are computed. The number of departed and
+        arrived vehicles, and the ids of the arrived rl vehicles, are only
+        stored for this time span
+    bounded_memory : bool, optional
+        whether all the state of a vehicle (including its previous speed) is
+        purged from the vehicle kernel once it leaves the network, so that
+        the memory of long simulations does not grow with the number of
+        vehicles that went through the network
     """
 
     def __init__(self,
@@ -609,11 +680,20 @@ class SumoParams(SimParams):
                  teleport_time=-1,
                  num_clients=1,
                  color_by_speed=False,
-                 use_ballistic=False):
+                 use_ballistic=False,
+                 render_backend="pyglet",
+                 initial_vehicles_in_routes=False,
+                 mean_data_path=None,
+                 mean_data_level="edge",
+                 mean_data_period=60,
+                 mean_data_emissions=True,
+                 rate_window=3600,
+                 bounded_memory=False):
         """Instantiate SumoParams."""
         super(SumoParams, self).__init__(
             sim_step, render, restart_instance, emission_path, save_render,
-            sight_radius, show_radius, pxpm, force_color_update)
+            sight_radius, show_radius, pxpm, force_color_update,
+            render_backend)
         self.port = port
         self.lateral_resolution = lateral_resolution
         self.no_step_log = no_step_log
@@ -624,6 +704,13 @@ class SumoParams(SimParams):
         self.num_clients = num_clients
         self.color_by_speed = color_by_speed
         self.use_ballistic = use_ballistic
+        self.initial_vehicles_in_routes = initial_vehicles_in_routes
+        self.mean_data_path = mean_data_path
+        self.mean_data_level = mean_data_level
+        self.mean_data_period = mean_data_period
+        self.mean_data_emissions = mean_data_emissions
+        self.rate_window = rate_window
+        self.bounded_memory = bounded_memory
 
 
 class EnvParams:
@@ -0,0 +1,396 @@
+"""Contains a parameter sweep engine built on top of the Experiment class.
+
+A sweep runs an experiment for every point of a grid of overrides of some
+base ``flow_params`` (and for every requested seed), on a local process pool:
+
+    >>> sweep = ParameterSweep(
+    >>>     flow_params,
+    >>>     grid={"inflow_rate": [1000, 1500, 2000],
+    >>>           "env.additional_params.max_accel": [1, 3]},
+    >>>     results_dir="./data/sweep",
+    >>>     seeds=[0, 1])
+    >>> results = sweep.run(num_runs=5)
+
+The results of every (point, seed) pair are stored in a separate file of
+``results_dir``, named after a hash of the resulting configuration and seed.
+Points whose results are already stored are skipped, so that rerunning a
+sweep only runs the points that were added to the grid, and an interrupted
+sweep resumes where it stopped.
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from copy import deepcopy
+import hashlib
+import inspect
+import itertools
+import json
+import os
+import random
+
+import numpy as np
+
+from flow.core.experiment import Experiment
+from flow.core.util import ensure_dir
+
+
+def set_param(flow_params, path, value):
+    """Set a parameter of flow_params from its dotted path.
+
+    Every element of the path is either a dictionary key, an attribute, or a
+    list index, e.g. "env.additional_params.max_accel" or "sim.sim_step".
+
+    Parameters
+    ----------
+    flow_params : dict
+        flow-specific parameters, modified in place
+    path : str
+        dotted path to the parameter
+    value : Any
+        new value of the parameter
+    """
+    *parents, name = path.split(".")
+    obj = flow_params
+    for key in parents:
+        obj = _get_item(obj, key)
+
+    if isinstance(obj, dict):
+        obj[name] = value
+    elif isinstance(obj, list):
+        obj[int(name)] = value
+    else:
+        setattr(obj, name, value)
+
+
+def _get_item(obj, key):
+    """Return the element of a dict, list or object designated by key."""
+    if isinstance(obj, dict):
+        return obj[key]
+    elif isinstance(obj, list):
+        return obj[int(key)]
+    return getattr(obj, key)
+
+
+def _edge_inflows(flow_params, edge=None):
+    """Return the inflows with a vehsPerHour rate, grouped by edge."""
+    inflows = {}
+    for inflow in flow_params['net'].inflows.get():
+        if "vehsPerHour" in inflow and edge in (None, inflow["edge"]):
+            inflows.setdefault(inflow["edge"], []).append(inflow)
+    return inflows
+
+
+def set_inflow_rate(flow_params, rate, edge=None):
+    """Set the total inflow rate entering the network through an edge.
+
+    The rate is distributed among the inflows of the edge in proportion to
+    their current rates. Only inflows specified with vehsPerHour are
+    modified.
+
+    Parameters
+    ----------
+    flow_params : dict
+        flow-specific parameters, modified in place
+    rate : float
+        total inflow rate of the edge, in veh/hr
+    edge : str, optional
+        the edge whose inflows are modified. If not specified, the rate is
+        applied to every edge with an inflow.
+    """
+    for inflows in _edge_inflows(flow_params, edge).values():
+        total = sum(inflow["vehsPerHour"] for inflow in inflows)
+        for inflow in inflows:
+            share = inflow["vehsPerHour"] / total if total > 0 \
+                else 1 / len(inflows)
+            inflow["vehsPerHour"] = rate * share
+
+
+def set_penetration(flow_params, penetration, rl_type="rl", edge=None):
+    """Set the penetration rate of a vehicle type in the inflows of an edge.
+
+    The total inflow rate of the edge is preserved, and split between the
+    inflows of type rl_type and the other inflows.
+
+    Parameters
+    ----------
+    flow_params : dict
+        flow-specific parameters, modified in place
+    penetration : float
+        fraction of the inflow made up of vehicles of type rl_type
+    rl_type : str, optional
+        type of the penetrating vehicles. Defaults to "rl"
+    edge : str, optional
+        the edge whose inflows are modified. If not specified, the
+        penetration is applied to every edge with an inflow.
+
+    Raises
+    ------
+    ValueError
+        if an edge has no inflow of type rl_type
+    """
+    for edge_id, inflows in _edge_inflows(flow_params, edge).items():
+        total = sum(inflow["vehsPerHour"] for inflow in inflows)
+        groups = [
+            ([inflow for inflow in inflows if inflow["vtype"] == rl_type],
+             penetration),
+            ([inflow for inflow in inflows if inflow["vtype"] != rl_type],
+             1 - penetration),
+        ]
+        if len(groups[0][0]) == 0:
+            raise ValueError(
+                'No inflow of type "{}" on edge "{}".'.format(
+                    rl_type, edge_id))
+        for group, fraction in groups:
+            for inflow in group:
+                inflow["vehsPerHour"] = total * fraction / len(group)
+
+
+# overrides that are specified by name instead of by a dotted path
+NAMED_OVERRIDES = {
+    "inflow_rate": set_inflow_rate,
+    "penetration": set_penetration,
+}
+
+
+def _encode(obj):
+    """Return a deterministic JSON-compatible representation of an object."""
+    if inspect.isclass(obj) or inspect.isroutine(obj):
+        return "{}.{}".format(obj.__module__, obj.__qualname__)
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, (set, frozenset)):
+        return sorted(obj, key=repr)
+    if hasattr(obj, "__dict__"):
+        return {"__class__": _encode(obj.__class__), **vars(obj)}
+    return repr(obj)
+
+
+def config_hash(flow_params, seed, num_runs):
+    """Return a hash identifying the results of an experiment.
+
+    Parameters
+    ----------
+    flow_params : dict
+        flow-specific parameters of the experiment
+    seed : int
+        random seed of the experiment
+    num_runs : int
+        number of rollouts of the experiment
+
+    Returns
+    -------
+    str
+        hexadecimal digest of the configuration
+    """
+    config = json.dumps([flow_params, seed, num_runs], default=_encode,
+                        sort_keys=True)
+    return hashlib.sha1(config.encode()).hexdigest()
+
+
+def _run_point(flow_params, seed, num_runs, custom_callables, path):
+    """Run the experiment of a sweep point and store its results.
+
+    The results are first written to a temporary file and then renamed, so
+    that interrupted runs do not leave partial results behind.
+    """
+    flow_params['sim'].seed = seed
+    random.seed(seed)
+    np.random.seed(seed)
+
+    exp = Experiment(flow_params, custom_callables=custom_callables)
+    info_dict = exp.run(num_runs=num_runs)
+
+    tmp_path = path[:-len(".npz")] + ".tmp.npz"
+    np.savez(tmp_path, **{key: np.asarray(val, dtype=float)
+                          for key, val in info_dict.items()})
+    os.replace(tmp_path, path)
+    return path
+
+
+class ParameterSweep(object):
+    """Run an experiment over a grid of parameters, with result caching.
+
+    Attributes
+    ----------
+    flow_params : dict
+        base flow-specific parameters of the experiments
+    grid : dict < str, list >
+        values of every swept parameter. Parameters are designated by a dotted
+        path in flow_params (see ``set_param``), or by the name of one of the
+        overrides (see ``NAMED_OVERRIDES``)
+    results_dir : str
+        directory the results of every experiment are stored in
+    seeds : list of int
+        random seeds every point of the grid is run with
+    overrides : dict < str, function >
+        functions used to apply the named parameters. Every function is
+        called with the flow_params to modify and the value of the parameter
+    custom_callables : dict < str, function >
+        see flow.core.experiment.Experiment. Must be picklable if the sweep
+        is run with more than one worker
+    """
+
+    def __init__(self,
+                 flow_params,
+                 grid,
+                 results_dir,
+                 seeds=(0,),
+                 overrides=None,
+                 custom_callables=None):
+        """Instantiate the sweep.
+
+        Parameters
+        ----------
+        flow_params : dict
+            base flow-specific parameters of the experiments
+        grid : dict < str, list >
+            values of every swept parameter
+        results_dir : str
+            directory the results of every experiment are stored in
+        seeds : list of int, optional
+            random seeds every point of the grid is run with
+        overrides : dict < str, function >, optional
+            additional named overrides, see class definition
+        custom_callables : dict < str, function >, optional
+            see flow.core.experiment.Experiment
+        """
+        self.flow_params = flow_params
+        self.grid = grid
+        self.results_dir = results_dir
+        self.seeds = list(seeds)
+        self.overrides = dict(NAMED_OVERRIDES, **(overrides or {}))
+        self.custom_callables = custom_callables
+
+        ensure_dir(results_dir)
+
+    def points(self):
+        """Return every point of the grid.
+
+        Returns
+        -------
+        list of dict
+            value of every swept parameter, in the order of the grid
+        """
+        names = list(self.grid.keys())
+        return [dict(zip(names, values))
+                for values in itertools.product(*self.grid.values())]
+
+    def make_flow_params(self, point):
+        """Return a copy of the base flow_params with the point applied.
+
+        Parameters
+        ----------
+        point : dict
+            value of every swept parameter
+
+        Returns
+        -------
+        dict
+            flow-specific parameters of the point
+        """
+        flow_params = deepcopy(self.flow_params)
+        for name, value in point.items():
+            if name in self.overrides:
+                self.overrides[name](flow_params, value)
+            else:
+                set_param(flow_params, name, value)
+        return flow_params
+
+    def _experiments(self, num_runs):
+        """Return the point, seed, flow_params and result path of all runs."""
+        experiments = []
+        for point in self.points():
+            flow_params = self.make_flow_params(point)
+            for seed in self.seeds:
+                key = config_hash(flow_params, seed, num_runs)
+                path = os.path.join(self.results_dir, key + ".npz")
+                experiments.append((point, seed, flow_params, path))
+        return experiments
+
+    def pending(self, num_runs=1):
+        """Return the points and seeds whose results are not stored yet.
+
+        Parameters
+        ----------
+        num_runs : int, optional
+            number of rollouts per experiment
+
+        Returns
+        -------
+        list of (dict, int)
+            the pending points and their seed
+        """
+        return [(point, seed) for point, seed, _, path in
+                self._experiments(num_runs) if not os.path.exists(path)]
+
+    def run(self, num_runs=1, num_workers=None):
+        """Run all pending experiments of the sweep.
+
+        Parameters
+        ----------
+        num_runs : int, optional
+            number of rollouts per experiment
+        num_workers : int, optional
+            number of worker processes. If set to 1, the experiments are run
+            in the current process. Defaults to the number of CPUs.
+
+        Returns
+        -------
+        dict < str, np.ndarray >
+            the results of the sweep, see ``load``
+        """
+        experiments = [(flow_params, seed, path) for _, seed, flow_params, path
+                       in self._experiments(num_runs)
+                       if not os.path.exists(path)]
+
+        if num_workers == 1:
+            for flow_params, seed, path in experiments:
+                _run_point(flow_params, seed, num_runs,
+                           self.custom_callables, path)
+        elif len(experiments) > 0:
+            with ProcessPoolExecutor(max_workers=num_workers) as pool:
+                futures = [
+                    pool.submit(_run_point, flow_params, seed, num_runs,
+                                self.custom_callables, path)
+                    for flow_params, seed, path in experiments]
+                for i, future in enumerate(as_completed(futures)):
+                    future.result()
+                    print("Sweep: {}/{} experiments completed.".format(
+                        i + 1, len(experiments)))
+
+        return self.load(num_runs)
+
+    def load(self, num_runs=1):
+        """Return the stored results of the sweep as columns.
+
+        Every row corresponds to one rollout. The columns consist of the value
+        of every swept parameter, the seed, the rollout index, and every
+        quantity returned by Experiment.run. Points whose results are not
+        stored yet are skipped.
+
+        Parameters
+        ----------
+        num_runs : int, optional
+            number of rollouts per experiment
+
+        Returns
+        -------
+        dict < str, np.ndarray >
+            the results of the sweep
+        """
+        columns = {name: [] for name in self.grid}
+        columns.update({"seed": [], "rollout": []})
+        metrics = {}
+
+        for point, seed, _, path in self._experiments(num_runs):
+            if not os.path.exists(path):
+                continue
+            with np.load(path) as data:
+                for key in data.files:
+                    metrics.setdefault(key, []).append(data[key])
+            for name, value in point.items():
+                columns[name].append(np.repeat(value, num_runs))
+            columns["seed"].append(np.repeat(seed, num_runs))
+            columns["rollout"].append(np.arange(num_runs))
+
+        columns.update(metrics)
+        return {key: np.concatenate(val) if len(val) > 0 else np.zeros(0)
+                for key, val in columns.items()}
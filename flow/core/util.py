@@ -3,6 +3,7 @@
 import csv
 import errno
 import os
+import numpy as np
 from lxml import etree
 from xml.etree import ElementTree
 
@@ -97,3 +98,70 @@ def emission_to_csv(emission_path, output_path=None):
         dict_writer = csv.DictWriter(output_file, keys)
         dict_writer.writeheader()
         dict_writer.writerows(out_data)
+
+
+def load_mean_data(path, attributes=None):
+    """Load an edge/lane aggregate output generated by sumo.
+
+    These outputs are generated by setting the mean_data_path attribute of
+    flow.core.params.SumoParams, and their paths are available in the
+    mean_data_files attribute of the network kernel.
+
+    Parameters
+    ----------
+    path : str
+        path to the aggregate output
+    attributes : list of str, optional
+        the attributes to load (e.g. "density", "speed", "entered", "left" or
+        "fuel_abs"), defaults to all attributes
+
+    Returns
+    -------
+    dict < str, np.ndarray or list of str >
+        the aggregated data, with the following keys:
+
+        * "begin": start times of the intervals, of shape (num_intervals,)
+        * "end": end times of the intervals, of shape (num_intervals,)
+        * "ids": names of the edges or lanes, of length num_ids
+        * one key per attribute, with the values of the attribute at every
+          interval and edge or lane, of shape (num_intervals, num_ids). Values
+          that are not available (e.g. the speed on empty edges) are NaN
+    """
+    begin, end = [], []
+    ids = {}
+    values = []
+
+    # intervals are parsed one at a time, since the output of long rollouts
+    # may be large
+    for _, interval in etree.iterparse(
+            path, events=("end",), tag="interval", recover=True):
+        begin.append(float(interval.attrib["begin"]))
+        end.append(float(interval.attrib["end"]))
+        row = {}
+        for elem in interval.iter("edge", "lane"):
+            # the edges of lane-level outputs only contain their lanes
+            if len(elem) > 0:
+                continue
+            col = ids.setdefault(elem.attrib["id"], len(ids))
+            for key, val in elem.attrib.items():
+                if key != "id" and (attributes is None or key in attributes):
+                    row[key, col] = float(val)
+        values.append(row)
+        interval.clear()
+
+    keys = attributes
+    if keys is None:
+        keys = sorted({key for row in values for key, _ in row})
+
+    data = {
+        "begin": np.array(begin),
+        "end": np.array(end),
+        "ids": list(ids),
+    }
+    for key in keys:
+        data[key] = np.full((len(values), len(ids)), np.nan)
+    for i, row in enumerate(values):
+        for (key, col), val in row.items():
+            data[key][i, col] = val
+
+    return data
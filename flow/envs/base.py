@@ -1,7 +1,7 @@
 """Base environment class. This is the parent of all other environment classes."""
 
 from abc import ABCMeta, abstractmethod
-from copy import deepcopy
+from copy import copy
 import os
 import atexit
 import time
@@ -10,7 +10,6 @@ import numpy as np
 import random
 import shutil
 import subprocess
-from flow.renderer.pyglet_renderer import PygletRenderer as Renderer
 from flow.utils.flow_warnings import deprecated_attribute
 
 import gym
@@ -24,6 +23,9 @@ import sumolib
 
 from flow.core.util import ensure_dir
 from flow.core.kernel import Kernel
+from flow.controllers.car_following_models import SimCarFollowingController
+from flow.controllers.lane_change_controllers import SimLaneChangeController
+from flow.controllers.rlcontroller import RLController
 from flow.utils.exceptions import FatalFlowError
 
 
@@ -90,11 +92,14 @@ class Env(gym.Env, metaclass=ABCMeta):
         name of the vehicles that will originally available in the network at
         the start of a rollout (i.e. after `env.reset()` is called). This also
         corresponds to `self.initial_state.keys()`.
+    initial_vehicles : flow.core.kernel.vehicle.VehicleSnapshot
+        snapshot of the initial state of the vehicle kernel, restored when the
+        simulation is restarted
     available_routes : dict
         the available_routes variable contains a dictionary of routes vehicles
         can traverse; to be used when routes need to be chosen dynamically.
         Equivalent to `network.rts`.
-    renderer : flow.renderer.pyglet_renderer.PygletRenderer or None
+    renderer : flow.renderer.PygletRenderer or flow.renderer.NumpyRenderer
         renderer class, used to collect image-based representations of the
         traffic network. This attribute is set to None if `sim_params.render`
         is set to True or False.
@@ -130,10 +135,12 @@ class Env(gym.Env, metaclass=ABCMeta):
         self.network = scenario if scenario is not None else network
         self.net_params = self.network.net_params
         self.initial_config = self.network.initial_config
-        self.sim_params = deepcopy(sim_params)
-        # check whether we should be rendering
-        self.should_render = self.sim_params.render
-        self.sim_params.render = False
+        self.sim_params = copy(sim_params)
+        # check whether we should be rendering with sumo-gui. Pixel-based
+        # rendering modes do not need the gui, and are started right away
+        self.should_render = self.sim_params.render is True
+        if self.should_render:
+            self.sim_params.render = False
         time_stamp = ''.join(str(time.time()).split('.'))
         if os.environ.get("TEST_FLAG", 0):
             # 1.0 works with stress_test_start 10k times
@@ -164,35 +171,33 @@ class Env(gym.Env, metaclass=ABCMeta):
         self.k.network.generate_network(self.network)
 
         # initial the vehicles kernel using the VehicleParams object
-        self.k.vehicle.initialize(deepcopy(self.network.vehicles))
+        self.k.vehicle.initialize(self.network.vehicles)
+
+        # store the initial vehicle ids
+        self.initial_ids = list(self.network.vehicles.ids)
+
+        # phases of the simulation steps that are performed by the step
+        # method (see make_step_plan)
+        self.step_plan = self.make_step_plan()
+
+        # store a snapshot of the initial state of the vehicles kernel (needed
+        # for restarting the simulation)
+        self.initial_vehicles = self.k.vehicle.snapshot()
+
+        # whether the initial vehicles are loaded by the simulation from its
+        # route files, instead of being added when the environment is reset
+        self._initial_vehicles_loaded = False
 
         # initialize the simulation using the simulation kernel. This will use
         # the network kernel as an input in order to determine what network
         # needs to be simulated.
-        kernel_api = self.k.simulation.start_simulation(
-            network=self.k.network, sim_params=self.sim_params)
-
-        # pass the kernel api to the kernel and it's subclasses
-        self.k.pass_api(kernel_api)
+        self._start_simulation()
 
         # the available_routes variable contains a dictionary of routes
         # vehicles can traverse; to be used when routes need to be chosen
         # dynamically
         self.available_routes = self.k.network.rts
 
-        # store the initial vehicle ids
-        self.initial_ids = deepcopy(self.network.vehicles.ids)
-
-        # store the initial state of the vehicles kernel (needed for restarting
-        # the simulation)
-        self.k.vehicle.kernel_api = None
-        self.k.vehicle.master_kernel = None
-        self.initial_vehicles = deepcopy(self.k.vehicle)
-        self.k.vehicle.kernel_api = self.k.kernel_api
-        self.k.vehicle.master_kernel = self.k
-
-        self.setup_initial_state()
-
         # use pyglet to render the simulation
         if self.sim_params.render in ['gray', 'dgray', 'rgb', 'drgb']:
             save_render = self.sim_params.save_render
@@ -208,8 +213,20 @@ class Env(gym.Env, metaclass=ABCMeta):
                 lane_poly = [i for pt in _lane_poly for i in pt]
                 network.append(lane_poly)
 
-            # instantiate a pyglet renderer
-            self.renderer = Renderer(
+            # instantiate a renderer with the requested backend. The
+            # renderers are only imported when rendering is requested.
+            render_backend = getattr(
+                self.sim_params, "render_backend", "pyglet")
+            if render_backend == "numpy":
+                from flow.renderer.numpy_renderer import NumpyRenderer
+                renderer_cls = NumpyRenderer
+            elif render_backend == "pyglet":
+                from flow.renderer.pyglet_renderer import PygletRenderer
+                renderer_cls = PygletRenderer
+            else:
+                raise FatalFlowError(
+                    'Render backend %s is not supported!' % render_backend)
+            self.renderer = renderer_cls(
                 network,
                 self.sim_params.render,
                 save_render,
@@ -245,11 +262,14 @@ class Env(gym.Env, metaclass=ABCMeta):
         render : bool, optional
             specifies whether to use the gui
         """
-        self.k.close()
-
-        # killed the sumo process if using sumo/TraCI
         if self.simulator == 'traci':
+            # the network files are kept, and reused by the network kernel if
+            # the network did not change
+            self.k.simulation.close()
+            # killed the sumo process if using sumo/TraCI
             self.k.simulation.sumo_proc.kill()
+        else:
+            self.k.close()
 
         if render is not None:
             self.sim_params.render = render
@@ -258,13 +278,39 @@ class Env(gym.Env, metaclass=ABCMeta):
             ensure_dir(sim_params.emission_path)
             self.sim_params.emission_path = sim_params.emission_path
 
+        self._update_network_kernel()
+        self.k.vehicle.initialize(self.network.vehicles)
+        self._start_simulation()
+
+    def _update_network_kernel(self):
+        """Generate the current network in the network kernel.
+
+        This is called by restart_simulation once the previous simulation is
+        closed, and may be overridden by environments that do not regenerate
+        the network on every restart.
+        """
         self.k.network.generate_network(self.network)
-        self.k.vehicle.initialize(deepcopy(self.network.vehicles))
+
+    def _start_simulation(self):
+        """Start a simulation of the network generated by the network kernel.
+
+        The initial state of the vehicles is generated before the simulation
+        is started, so that the initial vehicles can be written to the route
+        files of the simulation (see the initial_vehicles_in_routes attribute
+        of SumoParams).
+        """
+        self.setup_initial_state()
+
+        self._initial_vehicles_loaded = self.simulator == 'traci' and \
+            getattr(self.sim_params, 'initial_vehicles_in_routes', False)
+        if self._initial_vehicles_loaded:
+            self.k.network.generate_initial_vehicles(self.initial_state)
+
         kernel_api = self.k.simulation.start_simulation(
             network=self.k.network, sim_params=self.sim_params)
-        self.k.pass_api(kernel_api)
 
-        self.setup_initial_state()
+        # pass the kernel api to the kernel and it's subclasses
+        self.k.pass_api(kernel_api)
 
     def setup_initial_state(self):
         """Store information on the initial state of vehicles in the network.
@@ -322,48 +368,28 @@ class Env(gym.Env, metaclass=ABCMeta):
         info : dict
             contains other diagnostic information from the previous action
         """
+        plan = self.step_plan
         for _ in range(self.env_params.sims_per_step):
             self.time_counter += 1
             self.step_counter += 1
 
             # perform acceleration actions for controlled human-driven vehicles
-            if len(self.k.vehicle.get_controlled_ids()) > 0:
-                accel = []
-                for veh_id in self.k.vehicle.get_controlled_ids():
-                    action = self.k.vehicle.get_acc_controller(
-                        veh_id).get_action(self)
-                    accel.append(action)
-                self.k.vehicle.apply_acceleration(
-                    self.k.vehicle.get_controlled_ids(), accel)
+            if plan["acceleration"]:
+                self.apply_acceleration_actions()
 
             # perform lane change actions for controlled human-driven vehicles
-            if len(self.k.vehicle.get_controlled_lc_ids()) > 0:
-                direction = []
-                for veh_id in self.k.vehicle.get_controlled_lc_ids():
-                    target_lane = self.k.vehicle.get_lane_changing_controller(
-                        veh_id).get_action(self)
-                    direction.append(target_lane)
-                self.k.vehicle.apply_lane_change(
-                    self.k.vehicle.get_controlled_lc_ids(),
-                    direction=direction)
+            if plan["lane_change"]:
+                self.apply_lane_change_actions()
 
             # perform (optionally) routing actions for all vehicles in the
             # network, including RL and SUMO-controlled vehicles
-            routing_ids = []
-            routing_actions = []
-            for veh_id in self.k.vehicle.get_ids():
-                if self.k.vehicle.get_routing_controller(veh_id) \
-                        is not None:
-                    routing_ids.append(veh_id)
-                    route_contr = self.k.vehicle.get_routing_controller(
-                        veh_id)
-                    routing_actions.append(route_contr.choose_route(self))
-
-            self.k.vehicle.choose_routes(routing_ids, routing_actions)
+            if plan["routing"]:
+                self.apply_routing_actions()
 
             self.apply_rl_actions(rl_actions)
 
-            self.additional_command()
+            if plan["additional_command"]:
+                self.additional_command()
 
             # advance the simulation in the simulator by one step
             self.k.simulation.simulation_step()
@@ -385,14 +411,14 @@ class Env(gym.Env, metaclass=ABCMeta):
             # render a frame
             self.render()
 
-        states = self.get_state()
+        # collect observation new state associated with action. The states
+        # returned by get_state are not modified afterwards, and are not
+        # copied
+        next_observation = np.asarray(self.get_state())
 
         # collect information of the state of the network based on the
         # environment class used
-        self.state = np.asarray(states).T
-
-        # collect observation new state associated with action
-        next_observation = np.copy(states)
+        self.state = next_observation.T
 
         # test if the environment should terminate due to a collision or the
         # time horizon being met
@@ -459,13 +485,14 @@ class Env(gym.Env, metaclass=ABCMeta):
             # issue a random seed to induce randomness into the next rollout
             self.sim_params.seed = random.randint(0, 1e5)
 
-            self.k.vehicle = deepcopy(self.initial_vehicles)
-            self.k.vehicle.master_kernel = self.k
+            self.k.vehicle.restore(self.initial_vehicles)
             # restart the sumo instance
             self.restart_simulation(self.sim_params)
 
-        # perform shuffling (if requested)
-        elif self.initial_config.shuffle:
+        # perform shuffling (if requested). The initial vehicles loaded by a
+        # new simulation were already shuffled when it was started
+        elif self.initial_config.shuffle and \
+                not self._initial_vehicles_loaded:
             self.setup_initial_state()
 
         # clear all vehicles from the network and the vehicles class
@@ -492,31 +519,7 @@ class Env(gym.Env, metaclass=ABCMeta):
         self.k.vehicle.reset()
 
         # reintroduce the initial vehicles to the network
-        for veh_id in self.initial_ids:
-            type_id, edge, lane_index, pos, speed = \
-                self.initial_state[veh_id]
-
-            try:
-                self.k.vehicle.add(
-                    veh_id=veh_id,
-                    type_id=type_id,
-                    edge=edge,
-                    lane=lane_index,
-                    pos=pos,
-                    speed=speed)
-            except (FatalTraCIError, TraCIException):
-                # if a vehicle was not removed in the first attempt, remove it
-                # now and then reintroduce it
-                self.k.vehicle.remove(veh_id)
-                if self.simulator == 'traci':
-                    self.k.kernel_api.vehicle.remove(veh_id)  # FIXME: hack
-                self.k.vehicle.add(
-                    veh_id=veh_id,
-                    type_id=type_id,
-                    edge=edge,
-                    lane=lane_index,
-                    pos=pos,
-                    speed=speed)
+        self.add_initial_vehicles()
 
         # advance the simulation in the simulator by one step
         self.k.simulation.simulation_step()
@@ -524,6 +527,10 @@ class Env(gym.Env, metaclass=ABCMeta):
         # update the information in each kernel to match the current state
         self.k.update(reset=True)
 
+        # the controllers of the vehicle types may have been modified since
+        # the last rollout
+        self.step_plan = self.make_step_plan()
+
         # update the colors of vehicles
         if self.sim_params.render:
             self.k.vehicle.update_vehicle_colors()
@@ -542,14 +549,12 @@ class Env(gym.Env, metaclass=ABCMeta):
                 msg += '- {}: {}\n'.format(veh_id, self.initial_state[veh_id])
             raise FatalFlowError(msg=msg)
 
-        states = self.get_state()
+        # observation associated with the reset (no warm-up steps)
+        observation = np.asarray(self.get_state())
 
         # collect information of the state of the network based on the
         # environment class used
-        self.state = np.asarray(states).T
-
-        # observation associated with the reset (no warm-up steps)
-        observation = np.copy(states)
+        self.state = observation.T
 
         # perform (optional) warm-up steps before training
         for _ in range(self.env_params.warmup_steps):
@@ -560,10 +565,149 @@ class Env(gym.Env, metaclass=ABCMeta):
 
         return observation
 
+    def add_initial_vehicles(self):
+        """Reintroduce the initial vehicles to the network.
+
+        The vehicles are added at their position in the initial state (see
+        setup_initial_state). If the simulation was just started with the
+        initial vehicles in its route files, they depart in the next
+        simulation step and are not added again.
+        """
+        if self._initial_vehicles_loaded:
+            self._initial_vehicles_loaded = False
+            return
+
+        for veh_id in self.initial_ids:
+            type_id, edge, lane_index, pos, speed = \
+                self.initial_state[veh_id]
+
+            try:
+                self.k.vehicle.add(
+                    veh_id=veh_id,
+                    type_id=type_id,
+                    edge=edge,
+                    lane=lane_index,
+                    pos=pos,
+                    speed=speed)
+            except (FatalTraCIError, TraCIException):
+                # if a vehicle was not removed in the first attempt, remove it
+                # now and then reintroduce it
+                self.k.vehicle.remove(veh_id)
+                if self.simulator == 'traci':
+                    self.k.kernel_api.vehicle.remove(veh_id)  # FIXME: hack
+                self.k.vehicle.add(
+                    veh_id=veh_id,
+                    type_id=type_id,
+                    edge=edge,
+                    lane=lane_index,
+                    pos=pos,
+                    speed=speed)
+
     def additional_command(self):
         """Additional commands that may be performed by the step method."""
         pass
 
+    def make_step_plan(self):
+        """Return the phases of the simulation steps needed by this env.
+
+        The phases are determined from the controllers of the vehicle types,
+        which include the types of the vehicles entering the network through
+        inflows, so that the phases of the step method that cannot act on any
+        vehicle are skipped. The plan is computed when the environment is
+        created and reset.
+
+        Returns
+        -------
+        dict < str, bool >
+            whether the "acceleration" and "lane_change" actions of the
+            controlled human-driven vehicles, the "routing" actions of all
+            vehicles, and the "additional_command" method are performed
+        """
+        plan = {
+            "acceleration": False,
+            "lane_change": False,
+            "routing": False,
+            # the additional_command method of the base class does nothing
+            "additional_command":
+                type(self).additional_command is not Env.additional_command,
+        }
+        for params in self.k.vehicle.type_parameters.values():
+            acc_controller = params["acceleration_controller"][0]
+            if acc_controller != RLController:
+                plan["acceleration"] |= \
+                    acc_controller != SimCarFollowingController
+                plan["lane_change"] |= \
+                    params["lane_change_controller"][0] != \
+                    SimLaneChangeController
+            plan["routing"] |= params["routing_controller"] is not None
+
+        return plan
+
+    def apply_acceleration_actions(self):
+        """Perform the acceleration actions of the controlled human vehicles.
+
+        Only the controllers of the vehicles returned by the vehicle kernel's
+        get_controlled_ids method are queried, and controllers shared by
+        several vehicles compute their actions in a single call to their
+        get_actions method. The accelerations of all vehicles are then
+        applied at once.
+        """
+        controlled_ids = self.k.vehicle.get_controlled_ids()
+        if len(controlled_ids) == 0:
+            return
+
+        veh_ids = []
+        accel = []
+        for controller, group in self.k.vehicle.group_by_controller(
+                controlled_ids, "acc_controller"):
+            veh_ids.extend(group)
+            accel.extend(controller.get_actions(self, group))
+
+        self.k.vehicle.apply_acceleration(veh_ids, accel)
+
+    def apply_lane_change_actions(self):
+        """Perform the lane change actions of the lane-changing controllers.
+
+        Only the controllers of the vehicles returned by the vehicle kernel's
+        get_controlled_lc_ids method are queried, and controllers shared by
+        several vehicles compute their actions in a single call to their
+        get_actions method. The actions of all vehicles are then applied at
+        once.
+        """
+        lc_ids = self.k.vehicle.get_controlled_lc_ids()
+        if len(lc_ids) == 0:
+            return
+
+        veh_ids = []
+        direction = []
+        for controller, group in self.k.vehicle.group_by_controller(
+                lc_ids, "lane_changer"):
+            veh_ids.extend(group)
+            direction.extend(controller.get_actions(self, group))
+
+        self.k.vehicle.apply_lane_change(veh_ids, direction=direction)
+
+    def apply_routing_actions(self):
+        """Perform the routing actions of the routing controllers.
+
+        Only the controllers of the vehicles returned by the vehicle kernel's
+        get_routing_ids method are queried, and controllers shared by several
+        vehicles choose their routes in a single call to their choose_routes
+        method.
+        """
+        routing_ids = self.k.vehicle.get_routing_ids()
+        if len(routing_ids) == 0:
+            return
+
+        veh_ids = []
+        routing_actions = []
+        for router, group in self.k.vehicle.group_by_controller(
+                routing_ids, "router"):
+            veh_ids.extend(group)
+            routing_actions.extend(router.choose_routes(self, group))
+
+        self.k.vehicle.choose_routes(veh_ids, routing_actions)
+
     def clip_actions(self, rl_actions=None):
         """Clip the actions passed from the RL agent.
 
@@ -710,6 +854,12 @@ class Env(gym.Env, metaclass=ABCMeta):
     def render(self, reset=False, buffer_length=5):
         """Render a frame.
 
+        The last `buffer_length` frames and sights, sampled once every second
+        of simulation time, are stored in the `frame_buffer` and
+        `sights_buffer` attributes (see flow.renderer.FrameBuffer). Their
+        `stacked` method returns the history as a single array, and can be
+        used to build stacked observations.
+
         Parameters
         ----------
         reset : bool
@@ -723,82 +873,37 @@ class Env(gym.Env, metaclass=ABCMeta):
 
             # cache rendering
             if reset:
-                self.frame_buffer = [self.frame.copy() for _ in range(5)]
-                self.sights_buffer = [self.sights.copy() for _ in range(5)]
-            else:
-                if self.step_counter % int(1/self.sim_step) == 0:
-                    self.frame_buffer.append(self.frame.copy())
-                    self.sights_buffer.append(self.sights.copy())
-                if len(self.frame_buffer) > buffer_length:
-                    self.frame_buffer.pop(0)
-                    self.sights_buffer.pop(0)
+                from flow.renderer.frame_buffer import FrameBuffer
+                self.frame_buffer = FrameBuffer(buffer_length)
+                self.sights_buffer = FrameBuffer(buffer_length, ragged=True)
+                self.frame_buffer.reset(self.frame)
+                self.sights_buffer.reset(self.sights)
+            elif self.step_counter % int(1/self.sim_step) == 0:
+                self.frame_buffer.append(self.frame)
+                self.sights_buffer.append(self.sights)
         elif (self.sim_params.render is True) and self.sim_params.save_render:
             # sumo-gui render
             self.k.kernel_api.gui.screenshot("View #0", self.path+"/frame_%06d.png" % self.time_counter)
 
     def pyglet_render(self):
         """Render a frame using pyglet."""
-        # get human and RL simulation status
-        human_idlist = self.k.vehicle.get_human_ids()
-        machine_idlist = self.k.vehicle.get_rl_ids()
-        human_logs = []
-        human_orientations = []
-        human_dynamics = []
-        machine_logs = []
-        machine_orientations = []
-        machine_dynamics = []
-        max_speed = self.k.network.max_speed()
-        for id in human_idlist:
-            # Force tracking human vehicles by adding "track" in vehicle id.
-            # The tracked human vehicles will be treated as machine vehicles.
-            if 'track' in id:
-                machine_logs.append(
-                    [self.k.vehicle.get_timestep(id),
-                     self.k.vehicle.get_timedelta(id),
-                     id])
-                machine_orientations.append(
-                    self.k.vehicle.get_orientation(id))
-                machine_dynamics.append(
-                    self.k.vehicle.get_speed(id)/max_speed)
-            else:
-                human_logs.append(
-                    [self.k.vehicle.get_timestep(id),
-                     self.k.vehicle.get_timedelta(id),
-                     id])
-                human_orientations.append(
-                    self.k.vehicle.get_orientation(id))
-                human_dynamics.append(
-                    self.k.vehicle.get_speed(id)/max_speed)
-        for id in machine_idlist:
-            machine_logs.append(
-                [self.k.vehicle.get_timestep(id),
-                 self.k.vehicle.get_timedelta(id),
-                 id])
-            machine_orientations.append(
-                self.k.vehicle.get_orientation(id))
-            machine_dynamics.append(
-                self.k.vehicle.get_speed(id)/max_speed)
+        # get human and RL simulation status. Human vehicles with "track" in
+        # their id are treated as machine vehicles.
+        data = self.k.vehicle.get_render_data(self.k.network.max_speed())
+        timestep, timedelta = data["timestep"], data["timedelta"]
+        human_logs = [[timestep, timedelta, veh_id]
+                      for veh_id in data["human_ids"]]
+        machine_logs = [[timestep, timedelta, veh_id]
+                        for veh_id in data["machine_ids"]]
 
         # step the renderer
-        self.frame = self.renderer.render(human_orientations,
-                                          machine_orientations,
-                                          human_dynamics,
-                                          machine_dynamics,
+        self.frame = self.renderer.render(data["human_orientations"],
+                                          data["machine_orientations"],
+                                          data["human_dynamics"],
+                                          data["machine_dynamics"],
                                           human_logs,
                                           machine_logs)
 
         # get local observation of RL vehicles
-        self.sights = []
-        for id in human_idlist:
-            # Force tracking human vehicles by adding "track" in vehicle id.
-            # The tracked human vehicles will be treated as machine vehicles.
-            if "track" in id:
-                orientation = self.k.vehicle.get_orientation(id)
-                sight = self.renderer.get_sight(
-                    orientation, id)
-                self.sights.append(sight)
-        for id in machine_idlist:
-            orientation = self.k.vehicle.get_orientation(id)
-            sight = self.renderer.get_sight(
-                orientation, id)
-            self.sights.append(sight)
+        self.sights = self.renderer.get_sights(
+            data["machine_orientations"], data["machine_ids"])
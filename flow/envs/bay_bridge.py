@@ -93,6 +93,7 @@ class BayBridgeEnv(Env):
         # forward for edges
         self.edge_dict.update(
             (k, [[] for _ in range(MAX_LANES)]) for k in EDGE_LIST)
+        lc_ids = []
         for veh_id in self.k.vehicle.get_ids():
             edge = self.k.vehicle.get_edge(veh_id)
             if edge not in self.edge_dict:
@@ -104,7 +105,8 @@ class BayBridgeEnv(Env):
             # right route
             self.edge_dict[edge][lane].append((veh_id, pos))
             if edge == "124952171" and lane == 1:
-                self.k.vehicle.apply_lane_change([veh_id], direction=[1])
+                lc_ids.append(veh_id)
+        self.k.vehicle.apply_lane_change(lc_ids, direction=[1] * len(lc_ids))
 
         if not self.disable_tb:
             self.apply_toll_bridge_control()
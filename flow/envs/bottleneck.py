@@ -15,8 +15,6 @@ from flow.core.params import InFlows, NetParams
 from flow.core.params import SumoCarFollowingParams, SumoLaneChangeParams
 from flow.core.params import VehicleParams
 
-from copy import deepcopy
-
 import numpy as np
 from gym.spaces.box import Box
 
@@ -107,10 +105,6 @@ class BottleneckEnv(Env):
         A factor describing how many lanes are in the system. Scaling=1 implies
         4 lanes going to 2 going to 1, scaling=2 implies 8 lanes going to 4
         going to 2, etc.
-    edge_dict : dict of dicts
-        A dict mapping edges to a dict of lanes where each entry in the lane
-        dict tracks the vehicles that are in that lane. Used to save on
-        unnecessary lookups.
     cars_waiting_for_toll : {veh_id: {lane_change_mode: int, color: (int)}}
         A dict mapping vehicle ids to a dict tracking the color and lane change
         mode of vehicles before they entered the toll area. When vehicles exit
@@ -202,7 +196,6 @@ class BottleneckEnv(Env):
         env_add_params = self.env_params.additional_params
         # tells how scaled the number of lanes are
         self.scaling = network.net_params.additional_params.get("scaling", 1)
-        self.edge_dict = dict()
         self.cars_waiting_for_toll = dict()
         self.cars_before_ramp = dict()
         self.toll_wait_time = np.abs(
@@ -231,30 +224,20 @@ class BottleneckEnv(Env):
         self.smoothed_num = np.zeros(10)  # averaged number of vehs in '4'
         self.outflow_index = 0
 
+        # whether the zone detectors of the network are available. If not,
+        # the vehicles in the zones are collected from their edges.
+        self._has_detectors = \
+            'toll_0' in self.k.traffic_light.get_detector_ids()
+
     def additional_command(self):
-        """Build a dict with vehicle information.
+        """Apply the toll booth and ramp meter controls, if enabled.
 
-        The dict contains the list of vehicles and their position for each edge
-        and for each edge within the edge.
+        The vehicles in the toll booth and ramp meter zones, as well as the
+        number of vehicles in the bottleneck, are collected from the detectors
+        of the network (see BottleneckNetwork).
         """
         super().additional_command()
 
-        # build a dict containing the list of vehicles and their position for
-        # each edge and for each lane within the edge
-        empty_edge = [[] for _ in range(MAX_LANES * self.scaling)]
-
-        self.edge_dict = {k: deepcopy(empty_edge) for k in EDGE_LIST}
-        for veh_id in self.k.vehicle.get_ids():
-            try:
-                edge = self.k.vehicle.get_edge(veh_id)
-                if edge not in self.edge_dict:
-                    self.edge_dict[edge] = deepcopy(empty_edge)
-                lane = self.k.vehicle.get_lane(veh_id)  # integer
-                pos = self.k.vehicle.get_position(veh_id)
-                self.edge_dict[edge][lane].append((veh_id, pos))
-            except Exception:
-                pass
-
         if not self.env_params.additional_params['disable_tb']:
             self.apply_toll_bridge_control()
         if not self.env_params.additional_params['disable_ramp_metering']:
@@ -262,11 +245,94 @@ class BottleneckEnv(Env):
             self.alinea()
 
         # compute the outflow
-        veh_ids = self.k.vehicle.get_ids_by_edge('4')
-        self.smoothed_num[self.outflow_index] = len(veh_ids)
+        if self._has_detectors:
+            num_vehicles = sum(
+                self.k.traffic_light.get_detector_count(
+                    'bottleneck_{}'.format(lane))
+                for lane in range(2 * self.scaling))
+        else:
+            num_vehicles = len(self.k.vehicle.get_ids_by_edge('4'))
+        self.smoothed_num[self.outflow_index] = num_vehicles
         self.outflow_index = \
             (self.outflow_index + 1) % self.smoothed_num.shape[0]
 
+    def _zone_vehicles(self, zone, edge, num_lanes):
+        """Return the vehicles and positions in the lanes of a zone.
+
+        If the zone detectors are available, the vehicles of every lane are
+        read from its detector, and lanes whose detector is empty are skipped.
+        Otherwise, the vehicles are collected from the edge of the zone. The
+        edges, lanes and positions of the vehicles are then fetched once per
+        detector (or once for the edge).
+
+        Parameters
+        ----------
+        zone : str
+            name of the zone, i.e. "toll" or "ramp_meter"
+        edge : str
+            name of the edge the zone is located on
+        num_lanes : int
+            number of lanes of the zone
+
+        Returns
+        -------
+        list of list of (str, float)
+            for every lane, the names and positions of the vehicles whose
+            front is on the lane
+        """
+        if self._has_detectors:
+            groups = []
+            for lane in range(num_lanes):
+                det_id = '{}_{}'.format(zone, lane)
+                if self.k.traffic_light.get_detector_count(det_id) > 0:
+                    groups.append((lane, list(
+                        self.k.traffic_light.get_detector_vehicles(det_id))))
+        else:
+            groups = [(None, self.k.vehicle.get_ids_by_edge(edge))]
+
+        cars_in_zone = [[] for _ in range(num_lanes)]
+        for lane, veh_ids in groups:
+            edges = self.k.vehicle.get_edge(veh_ids)
+            lanes = self.k.vehicle.get_lane(veh_ids)
+            positions = self.k.vehicle.get_position(veh_ids)
+            for veh_id, veh_edge, veh_lane, pos in zip(
+                    veh_ids, edges, lanes, positions):
+                # the detectors also contain vehicles whose front has already
+                # left the lane
+                if veh_edge != edge or not 0 <= veh_lane < num_lanes or \
+                        (lane is not None and veh_lane != lane):
+                    continue
+                cars_in_zone[veh_lane].append((veh_id, pos))
+
+        return cars_in_zone
+
+    def _zone_exits(self, zone, edge, cars_in_zone):
+        """Return the vehicles of a zone that have reached the next edge.
+
+        Parameters
+        ----------
+        zone : str
+            name of the zone, i.e. "toll" or "ramp_meter"
+        edge : str
+            name of the edge after the zone
+        cars_in_zone : dict
+            vehicles that have entered the zone
+
+        Returns
+        -------
+        list of str
+            the names of the vehicles that have left the zone
+        """
+        if self._has_detectors:
+            num_lanes = self.k.network.num_lanes(edge)
+            veh_ids = set().union(*(
+                self.k.traffic_light.get_detector_vehicles(
+                    '{}_exit_{}'.format(zone, lane))
+                for lane in range(num_lanes)))
+            return [veh_id for veh_id in cars_in_zone if veh_id in veh_ids]
+        return [veh_id for veh_id in cars_in_zone
+                if self.k.vehicle.get_edge(veh_id) == edge]
+
     def ramp_meter_lane_change_control(self):
         """Control lane change behavior of vehicles near the ramp meters.
 
@@ -280,24 +346,22 @@ class BottleneckEnv(Env):
         behavior of the vehicles has been adjusted, we temporary set the color
         of the affected vehicles to light blue.
         """
-        cars_that_have_left = []
-        for veh_id in self.cars_before_ramp:
-            if self.k.vehicle.get_edge(veh_id) == EDGE_AFTER_RAMP_METER:
-                color = self.cars_before_ramp[veh_id]['color']
-                self.k.vehicle.set_color(veh_id, color)
-                if self.simulator == 'traci':
-                    lane_change_mode = self.cars_before_ramp[veh_id][
-                        'lane_change_mode']
-                    self.k.kernel_api.vehicle.setLaneChangeMode(
-                        veh_id, lane_change_mode)
-                cars_that_have_left.append(veh_id)
-
+        cars_that_have_left = self._zone_exits(
+            'ramp_meter', EDGE_AFTER_RAMP_METER, self.cars_before_ramp)
         for veh_id in cars_that_have_left:
+            color = self.cars_before_ramp[veh_id]['color']
+            self.k.vehicle.set_color(veh_id, color)
+            if self.simulator == 'traci':
+                lane_change_mode = self.cars_before_ramp[veh_id][
+                    'lane_change_mode']
+                self.k.kernel_api.vehicle.setLaneChangeMode(
+                    veh_id, lane_change_mode)
             del self.cars_before_ramp[veh_id]
 
-        for lane in range(NUM_RAMP_METERS * self.scaling):
-            cars_in_lane = self.edge_dict[EDGE_BEFORE_RAMP_METER][lane]
-
+        cars_in_zone = self._zone_vehicles(
+            'ramp_meter', EDGE_BEFORE_RAMP_METER,
+            NUM_RAMP_METERS * self.scaling)
+        for cars_in_lane in cars_in_zone:
             for veh_id, pos in cars_in_lane:
                 if pos > RAMP_METER_AREA:
                     if veh_id not in self.cars_waiting_for_toll:
@@ -371,40 +435,36 @@ class BottleneckEnv(Env):
         long a vehicle should wait. We then turn on a red light for that many
         seconds.
         """
-        cars_that_have_left = []
-        for veh_id in self.cars_waiting_for_toll:
-            if self.k.vehicle.get_edge(veh_id) == EDGE_AFTER_TOLL:
-                lane = self.k.vehicle.get_lane(veh_id)
-                color = self.cars_waiting_for_toll[veh_id]["color"]
-                self.k.vehicle.set_color(veh_id, color)
-                if self.simulator == 'traci':
-                    lane_change_mode = \
-                        self.cars_waiting_for_toll[veh_id]["lane_change_mode"]
-                    self.k.kernel_api.vehicle.setLaneChangeMode(
-                        veh_id, lane_change_mode)
-                if lane not in self.fast_track_lanes:
-                    self.toll_wait_time[lane] = max(
-                        0,
-                        np.random.normal(
-                            MEAN_NUM_SECONDS_WAIT_AT_TOLL / self.sim_step,
-                            1 / self.sim_step))
-                else:
-                    self.toll_wait_time[lane] = max(
-                        0,
-                        np.random.normal(
-                            MEAN_NUM_SECONDS_WAIT_AT_FAST_TRACK /
-                            self.sim_step, 1 / self.sim_step))
-
-                cars_that_have_left.append(veh_id)
-
+        cars_that_have_left = self._zone_exits(
+            'toll', EDGE_AFTER_TOLL, self.cars_waiting_for_toll)
         for veh_id in cars_that_have_left:
+            lane = self.k.vehicle.get_lane(veh_id)
+            color = self.cars_waiting_for_toll[veh_id]["color"]
+            self.k.vehicle.set_color(veh_id, color)
+            if self.simulator == 'traci':
+                lane_change_mode = \
+                    self.cars_waiting_for_toll[veh_id]["lane_change_mode"]
+                self.k.kernel_api.vehicle.setLaneChangeMode(
+                    veh_id, lane_change_mode)
+            if lane not in self.fast_track_lanes:
+                self.toll_wait_time[lane] = max(
+                    0,
+                    np.random.normal(
+                        MEAN_NUM_SECONDS_WAIT_AT_TOLL / self.sim_step,
+                        1 / self.sim_step))
+            else:
+                self.toll_wait_time[lane] = max(
+                    0,
+                    np.random.normal(
+                        MEAN_NUM_SECONDS_WAIT_AT_FAST_TRACK /
+                        self.sim_step, 1 / self.sim_step))
             del self.cars_waiting_for_toll[veh_id]
 
         traffic_light_states = ["G"] * NUM_TOLL_LANES * self.scaling
 
-        for lane in range(NUM_TOLL_LANES * self.scaling):
-            cars_in_lane = self.edge_dict[EDGE_BEFORE_TOLL][lane]
-
+        cars_in_zone = self._zone_vehicles(
+            'toll', EDGE_BEFORE_TOLL, NUM_TOLL_LANES * self.scaling)
+        for lane, cars_in_lane in enumerate(cars_in_zone):
             for veh_id, pos in cars_in_lane:
                 if pos > TOLL_BOOTH_AREA:
                     if veh_id not in self.cars_waiting_for_toll:
@@ -529,8 +589,8 @@ class BottleneckAccelEnv(BottleneckEnv):
 
         super().__init__(env_params, sim_params, network, simulator)
         self.add_rl_if_exit = env_params.get_additional_param("add_rl_if_exit")
-        self.num_rl = deepcopy(self.initial_vehicles.num_rl_vehicles)
-        self.rl_id_list = deepcopy(self.initial_vehicles.get_rl_ids())
+        self.num_rl = self.initial_vehicles.num_rl_vehicles
+        self.rl_id_list = self.initial_vehicles.get_rl_ids()
         self.max_speed = self.k.network.max_speed()
 
     @property
@@ -683,8 +743,7 @@ class BottleneckAccelEnv(BottleneckEnv):
             for veh_id in sorted_rl_ids]
 
         # vehicle that are not allowed to change have their directions set to 0
-        direction[non_lane_changing_veh] = \
-            np.array([0] * sum(non_lane_changing_veh))
+        direction[non_lane_changing_veh] = 0
 
         self.k.vehicle.apply_acceleration(sorted_rl_ids, acc=acceleration)
         self.k.vehicle.apply_lane_change(sorted_rl_ids, direction=direction)
@@ -1,16 +1,19 @@
 """Empty init file to ensure documentation for multi-agent environment classes is created."""
 
-from flow.envs.multiagent.base import MultiEnv
-from flow.envs.multiagent.ring.wave_attenuation import \
-    MultiWaveAttenuationPOEnv
-from flow.envs.multiagent.ring.wave_attenuation import \
-    MultiAgentWaveAttenuationPOEnv
-from flow.envs.multiagent.ring.accel import AdversarialAccelEnv
-from flow.envs.multiagent.ring.accel import MultiAgentAccelPOEnv
-from flow.envs.multiagent.traffic_light_grid import MultiTrafficLightGridPOEnv
-from flow.envs.multiagent.highway import MultiAgentHighwayPOEnv
-from flow.envs.multiagent.merge import MultiAgentMergePOEnv
-from flow.envs.multiagent.i210 import I210MultiEnv
+from flow.utils.lazy_import import lazy_import
+
+__getattr__, __dir__ = lazy_import(__name__, {
+    'MultiEnv': 'flow.envs.multiagent.base',
+    'MultiWaveAttenuationPOEnv': 'flow.envs.multiagent.ring.wave_attenuation',
+    'MultiAgentWaveAttenuationPOEnv':
+        'flow.envs.multiagent.ring.wave_attenuation',
+    'AdversarialAccelEnv': 'flow.envs.multiagent.ring.accel',
+    'MultiAgentAccelPOEnv': 'flow.envs.multiagent.ring.accel',
+    'MultiTrafficLightGridPOEnv': 'flow.envs.multiagent.traffic_light_grid',
+    'MultiAgentHighwayPOEnv': 'flow.envs.multiagent.highway',
+    'MultiAgentMergePOEnv': 'flow.envs.multiagent.merge',
+    'I210MultiEnv': 'flow.envs.multiagent.i210',
+})
 
 __all__ = [
     'MultiEnv',
@@ -1,6 +1,5 @@
 """Environment for training multi-agent experiments."""
 
-from copy import deepcopy
 import numpy as np
 import random
 import traceback
@@ -16,7 +15,90 @@ from flow.utils.exceptions import FatalFlowError
 
 
 class MultiEnv(MultiAgentEnv, Env):
-    """Multi-agent version of base env. See parent class for info."""
+    """Multi-agent version of base env. See parent class for info.
+
+    Batched mode
+        If "batched" is set to True in the additional environment parameters,
+        the observations and rewards of all agents are computed as stacked
+        arrays via the ``get_state_batch`` and ``compute_reward_batch``
+        methods. The stacked arrays are stored under the ``agent_ids``,
+        ``obs_batch`` and ``reward_batch`` attributes, with the rows ordered
+        as in ``agent_ids``, and the dictionaries returned by ``step`` and
+        ``reset`` are views of their rows. Actions may then also be passed as
+        a single array, ordered as in ``agent_ids``.
+    """
+
+    @property
+    def batched(self):
+        """Return whether observations and rewards are computed in batch."""
+        return self.env_params.additional_params.get("batched", False)
+
+    def get_state_batch(self):
+        """Return the observations of all agents as a single array.
+
+        Subclasses may override this method to compute the observations of
+        all agents with vectorized operations. By default, the observations
+        returned by ``get_state`` are stacked.
+
+        Returns
+        -------
+        list of str
+            ids of the agents, in the order of the rows of the observations
+        np.ndarray
+            observations of all agents, of shape (n_agents, obs_dim)
+        """
+        states = self.get_state()
+        agent_ids = list(states.keys())
+        if len(agent_ids) == 0:
+            return agent_ids, np.zeros((0,) + self.observation_space.shape)
+        return agent_ids, np.stack([states[key] for key in agent_ids])
+
+    def compute_reward_batch(self, rl_actions, **kwargs):
+        """Return the rewards of all agents as a single array.
+
+        Subclasses may override this method to compute terms shared by all
+        agents once, and the per-agent terms with vectorized operations. By
+        default, the rewards returned by ``compute_reward`` are stacked.
+
+        Parameters
+        ----------
+        rl_actions : dict of array_like
+            actions performed by the rl agents
+        kwargs : dict
+            other parameters of interest (see ``compute_reward``)
+
+        Returns
+        -------
+        list of str
+            ids of the agents, in the order of the rewards
+        np.ndarray
+            rewards of all agents, of shape (n_agents,)
+        """
+        reward = self.compute_reward(rl_actions, **kwargs)
+        agent_ids = list(reward.keys())
+        return agent_ids, np.array([reward[key] for key in agent_ids],
+                                   dtype=float)
+
+    def _get_observations(self):
+        """Return the observations of all agents as a dictionary.
+
+        In batched mode, the stacked observations are stored as well.
+        """
+        if not self.batched:
+            return self.get_state()
+        self.agent_ids, self.obs_batch = self.get_state_batch()
+        return dict(zip(self.agent_ids, self.obs_batch))
+
+    def _get_rewards(self, rl_actions, **kwargs):
+        """Return the rewards of all agents as a dictionary.
+
+        In batched mode, the stacked rewards are stored as well.
+        """
+        if not self.batched:
+            return self.compute_reward(rl_actions, **kwargs)
+        reward_ids, self.reward_batch = self.compute_reward_batch(
+            rl_actions, **kwargs)
+        return dict(zip(reward_ids, self.reward_batch))
 
     def step(self, rl_actions):
         """Advance the environment by one step.
@@ -34,8 +116,10 @@ class MultiEnv(MultiAgentEnv, Env):
 
         Parameters
         ----------
-        rl_actions : array_like
-            an list of actions provided by the rl algorithm
+        rl_actions : dict of array_like or array_like
+            the actions provided by the rl algorithm, keyed by agent id. In
+            batched mode, this may also be an array of actions ordered as in
+            ``agent_ids``
 
         Returns
         -------
@@ -48,45 +132,31 @@ class MultiEnv(MultiAgentEnv, Env):
         info : dict
             contains other diagnostic information from the previous action
         """
+        if self.batched and isinstance(rl_actions, np.ndarray):
+            rl_actions = dict(zip(self.agent_ids, rl_actions))
+
+        plan = self.step_plan
         for _ in range(self.env_params.sims_per_step):
             self.time_counter += 1
             self.step_counter += 1
 
             # perform acceleration actions for controlled human-driven vehicles
-            if len(self.k.vehicle.get_controlled_ids()) > 0:
-                accel = []
-                for veh_id in self.k.vehicle.get_controlled_ids():
-                    accel_contr = self.k.vehicle.get_acc_controller(veh_id)
-                    action = accel_contr.get_action(self)
-                    accel.append(action)
-                self.k.vehicle.apply_acceleration(
-                    self.k.vehicle.get_controlled_ids(), accel)
+            if plan["acceleration"]:
+                self.apply_acceleration_actions()
 
             # perform lane change actions for controlled human-driven vehicles
-            if len(self.k.vehicle.get_controlled_lc_ids()) > 0:
-                direction = []
-                for veh_id in self.k.vehicle.get_controlled_lc_ids():
-                    target_lane = self.k.vehicle.get_lane_changing_controller(
-                        veh_id).get_action(self)
-                    direction.append(target_lane)
-                self.k.vehicle.apply_lane_change(
-                    self.k.vehicle.get_controlled_lc_ids(),
-                    direction=direction)
+            if plan["lane_change"]:
+                self.apply_lane_change_actions()
 
             # perform (optionally) routing actions for all vehicle in the
             # network, including rl and sumo-controlled vehicles
-            routing_ids = []
-            routing_actions = []
-            for veh_id in self.k.vehicle.get_ids():
-                if self.k.vehicle.get_routing_controller(veh_id) is not None:
-                    routing_ids.append(veh_id)
-                    route_contr = self.k.vehicle.get_routing_controller(veh_id)
-                    routing_actions.append(route_contr.choose_route(self))
-            self.k.vehicle.choose_routes(routing_ids, routing_actions)
+            if plan["routing"]:
+                self.apply_routing_actions()
 
             self.apply_rl_actions(rl_actions)
 
-            self.additional_command()
+            if plan["additional_command"]:
+                self.additional_command()
 
             # advance the simulation in the simulator by one step
             self.k.simulation.simulation_step()
@@ -105,7 +175,7 @@ class MultiEnv(MultiAgentEnv, Env):
             if crash:
                 break
 
-        states = self.get_state()
+        states = self._get_observations()
         done = {key: key in self.k.vehicle.get_arrived_ids()
                 for key in states.keys()}
         if crash or (self.time_counter >= self.env_params.sims_per_step *
@@ -118,9 +188,9 @@ class MultiEnv(MultiAgentEnv, Env):
         # compute the reward
         if self.env_params.clip_actions:
             clipped_actions = self.clip_actions(rl_actions)
-            reward = self.compute_reward(clipped_actions, fail=crash)
+            reward = self._get_rewards(clipped_actions, fail=crash)
         else:
-            reward = self.compute_reward(rl_actions, fail=crash)
+            reward = self._get_rewards(rl_actions, fail=crash)
 
         for rl_id in self.k.vehicle.get_arrived_rl_ids(self.env_params.sims_per_step):
             done[rl_id] = True
@@ -176,13 +246,14 @@ class MultiEnv(MultiAgentEnv, Env):
             # issue a random seed to induce randomness into the next rollout
             self.sim_params.seed = random.randint(0, 1e5)
 
-            self.k.vehicle = deepcopy(self.initial_vehicles)
-            self.k.vehicle.master_kernel = self.k
+            self.k.vehicle.restore(self.initial_vehicles)
             # restart the sumo instance
             self.restart_simulation(self.sim_params)
 
-        # perform shuffling (if requested)
-        elif self.initial_config.shuffle:
+        # perform shuffling (if requested). The initial vehicles loaded by a
+        # new simulation were already shuffled when it was started
+        elif self.initial_config.shuffle and \
+                not self._initial_vehicles_loaded:
             self.setup_initial_state()
 
         # clear all vehicles from the network and the vehicles class
@@ -209,31 +280,7 @@ class MultiEnv(MultiAgentEnv, Env):
         self.k.vehicle.reset()
 
         # reintroduce the initial vehicles to the network
-        for veh_id in self.initial_ids:
-            type_id, edge, lane_index, pos, speed = \
-                self.initial_state[veh_id]
-
-            try:
-                self.k.vehicle.add(
-                    veh_id=veh_id,
-                    type_id=type_id,
-                    edge=edge,
-                    lane=lane_index,
-                    pos=pos,
-                    speed=speed)
-            except (FatalTraCIError, TraCIException):
-                # if a vehicle was not removed in the first attempt, remove it
-                # now and then reintroduce it
-                self.k.vehicle.remove(veh_id)
-                if self.simulator == 'traci':
-                    self.k.kernel_api.vehicle.remove(veh_id)  # FIXME: hack
-                self.k.vehicle.add(
-                    veh_id=veh_id,
-                    type_id=type_id,
-                    edge=edge,
-                    lane=lane_index,
-                    pos=pos,
-                    speed=speed)
+        self.add_initial_vehicles()
 
         # advance the simulation in the simulator by one step
         self.k.simulation.simulation_step()
@@ -241,6 +288,10 @@ class MultiEnv(MultiAgentEnv, Env):
         # update the information in each kernel to match the current state
         self.k.update(reset=True)
 
+        # the controllers of the vehicle types may have been modified since
+        # the last rollout
+        self.step_plan = self.make_step_plan()
+
         # update the colors of vehicles
         if self.sim_params.render:
             self.k.vehicle.update_vehicle_colors()
@@ -262,7 +313,7 @@ class MultiEnv(MultiAgentEnv, Env):
         # render a frame
         self.render(reset=True)
 
-        return self.get_state()
+        return self._get_observations()
 
     def clip_actions(self, rl_actions=None):
         """Clip the actions passed from the RL agent.
@@ -16,6 +16,9 @@ ADDITIONAL_ENV_PARAMS = {
     "max_decel": 1,
     # whether we use an obs space that contains adjacent lane info or just the lead obs
     "lead_obs": True,
+    # whether to compute the observations and rewards of all agents as
+    # stacked arrays (see flow.envs.multiagent.MultiEnv)
+    "batched": False,
 }
 
 
@@ -113,60 +116,77 @@ class I210MultiEnv(MultiEnv):
 
     def get_state(self):
         """See class definition."""
+        return dict(zip(*self.get_state_batch()))
+
+    def get_state_batch(self):
+        """See parent class.
+
+        The observations of all autonomous vehicles are collected with one
+        call per kernel quantity and normalized in a single operation.
+        """
+        rl_ids = self.k.vehicle.get_rl_ids()
         if self.lead_obs:
-            veh_info = {}
-            for rl_id in self.k.vehicle.get_rl_ids():
-                speed = self.k.vehicle.get_speed(rl_id)
-                headway = self.k.vehicle.get_headway(rl_id)
-                lead_speed = self.k.vehicle.get_speed(self.k.vehicle.get_leader(rl_id))
-                if lead_speed == -1001:
-                    lead_speed = 0
-                veh_info.update({rl_id: np.array([speed / 50.0, headway / 1000.0, lead_speed / 50.0])})
+            speed = np.array(self.k.vehicle.get_speed(rl_ids), dtype=float)
+            headway = np.array(
+                self.k.vehicle.get_headway(rl_ids), dtype=float)
+            lead_speed = np.array(self.k.vehicle.get_speed(
+                self.k.vehicle.get_leader(rl_ids)), dtype=float)
+            lead_speed[lead_speed == -1001] = 0
+            obs = np.stack((speed / 50.0, headway / 1000.0,
+                            lead_speed / 50.0), axis=1).reshape(-1, 3)
         else:
-            veh_info = {rl_id: np.concatenate((self.state_util(rl_id),
-                                               self.veh_statistics(rl_id)))
-                        for rl_id in self.k.vehicle.get_rl_ids()}
-        return veh_info
+            obs = np.concatenate((self.state_util_batch(rl_ids),
+                                  self.veh_statistics_batch(rl_ids)), axis=1)
+        return list(rl_ids), obs
 
     def compute_reward(self, rl_actions, **kwargs):
-        # TODO(@evinitsky) we need something way better than this. Something that adds
-        # in notions of local reward
         """See class definition."""
         # in the warmup steps
         if rl_actions is None:
             return {}
+        return dict(zip(*self.compute_reward_batch(rl_actions, **kwargs)))
 
-        rewards = {}
-        for rl_id in self.k.vehicle.get_rl_ids():
-            if self.env_params.evaluate:
-                # reward is speed of vehicle if we are in evaluation mode
-                reward = self.k.vehicle.get_speed(rl_id)
-            elif kwargs['fail']:
-                # reward is 0 if a collision occurred
-                reward = 0
-            else:
-                # reward high system-level velocities
-                cost1 = average_velocity(self, fail=kwargs['fail'])
-
-                # penalize small time headways
-                cost2 = 0
-                t_min = 1  # smallest acceptable time headway
-
-                lead_id = self.k.vehicle.get_leader(rl_id)
-                if lead_id not in ["", None] \
-                        and self.k.vehicle.get_speed(rl_id) > 0:
-                    t_headway = max(
-                        self.k.vehicle.get_headway(rl_id) /
-                        self.k.vehicle.get_speed(rl_id), 0)
-                    cost2 += min((t_headway - t_min) / t_min, 0)
-
-                # weights for cost1, cost2, and cost3, respectively
-                eta1, eta2 = 1.00, 0.10
-
-                reward = max(eta1 * cost1 + eta2 * cost2, 0)
-
-            rewards[rl_id] = reward
-        return rewards
+    def compute_reward_batch(self, rl_actions, **kwargs):
+        # TODO(@evinitsky) we need something way better than this. Something that adds
+        # in notions of local reward
+        """See parent class.
+
+        The system-level velocity is computed once for all agents, and the
+        headway penalties of all agents are vectorized.
+        """
+        # in the warmup steps
+        if rl_actions is None:
+            return [], np.zeros(0)
+
+        rl_ids = list(self.k.vehicle.get_rl_ids())
+        speed = np.array(self.k.vehicle.get_speed(rl_ids), dtype=float)
+
+        if self.env_params.evaluate:
+            # reward is speed of vehicle if we are in evaluation mode
+            return rl_ids, speed
+        elif kwargs['fail']:
+            # reward is 0 if a collision occurred
+            return rl_ids, np.zeros(len(rl_ids))
+
+        # reward high system-level velocities
+        cost1 = average_velocity(self, fail=kwargs['fail'])
+
+        # penalize small time headways
+        t_min = 1  # smallest acceptable time headway
+        has_leader = np.array(
+            [lead_id not in ["", None]
+             for lead_id in self.k.vehicle.get_leader(rl_ids)], dtype=bool)
+        valid = has_leader & (speed > 0)
+        headway = np.array(self.k.vehicle.get_headway(rl_ids), dtype=float)
+        t_headway = np.maximum(
+            headway / np.where(valid, speed, 1), 0)
+        cost2 = np.where(
+            valid, np.minimum((t_headway - t_min) / t_min, 0), 0)
+
+        # weights for cost1, cost2, and cost3, respectively
+        eta1, eta2 = 1.00, 0.10
+
+        return rl_ids, np.maximum(eta1 * cost1 + eta2 * cost2, 0)
 
     def additional_command(self):
         """See parent class.
@@ -191,35 +211,46 @@ class I210MultiEnv(MultiEnv):
         If there are fewer than MAX_LANES the extra
         entries are filled with -1 to disambiguate from zeros.
         """
+        return self.state_util_batch([rl_id])[0]
+
+    def state_util_batch(self, rl_ids):
+        """Return the output of ``state_util`` for several vehicles.
+
+        Returns
+        -------
+        np.ndarray
+            array of shape (len(rl_ids), 6 * MAX_LANES)
+        """
         veh = self.k.vehicle
-        lane_headways = veh.get_lane_headways(rl_id).copy()
-        lane_tailways = veh.get_lane_tailways(rl_id).copy()
-        lane_leader_speed = veh.get_lane_leaders_speed(rl_id).copy()
-        lane_follower_speed = veh.get_lane_followers_speed(rl_id).copy()
-        leader_ids = veh.get_lane_leaders(rl_id).copy()
-        follower_ids = veh.get_lane_followers(rl_id).copy()
-        rl_ids = self.k.vehicle.get_rl_ids()
-        is_leader_rl = [1 if l_id in rl_ids else 0 for l_id in leader_ids]
-        is_follow_rl = [1 if f_id in rl_ids else 0 for f_id in follower_ids]
-        diff = MAX_LANES - len(is_leader_rl)
-        if diff > 0:
-            # the minus 1 disambiguates missing cars from missing lanes
-            lane_headways += diff * [-1]
-            lane_tailways += diff * [-1]
-            lane_leader_speed += diff * [-1]
-            lane_follower_speed += diff * [-1]
-            is_leader_rl += diff * [-1]
-            is_follow_rl += diff * [-1]
-        lane_headways = np.asarray(lane_headways) / 1000
-        lane_tailways = np.asarray(lane_tailways) / 1000
-        lane_leader_speed = np.asarray(lane_leader_speed) / 100
-        lane_follower_speed = np.asarray(lane_follower_speed) / 100
-        return np.concatenate((lane_headways, lane_tailways, lane_leader_speed,
-                               lane_follower_speed, is_leader_rl,
-                               is_follow_rl))
+        all_rl_ids = set(veh.get_rl_ids())
+
+        # the minus 1 disambiguates missing cars from missing lanes
+        lane_info = np.full((len(rl_ids), 6, MAX_LANES), -1, dtype=float)
+        for i, rl_id in enumerate(rl_ids):
+            num_lanes = min(len(veh.get_lane_leaders(rl_id)), MAX_LANES)
+            lane_info[i, :, :num_lanes] = [
+                veh.get_lane_headways(rl_id)[:num_lanes],
+                veh.get_lane_tailways(rl_id)[:num_lanes],
+                veh.get_lane_leaders_speed(rl_id)[:num_lanes],
+                veh.get_lane_followers_speed(rl_id)[:num_lanes],
+                [l_id in all_rl_ids
+                 for l_id in veh.get_lane_leaders(rl_id)[:num_lanes]],
+                [f_id in all_rl_ids
+                 for f_id in veh.get_lane_followers(rl_id)[:num_lanes]],
+            ]
+
+        # normalize the headways, tailways and speeds
+        lane_info /= np.array([1000, 1000, 100, 100, 1, 1])[:, np.newaxis]
+
+        return lane_info.reshape(len(rl_ids), 6 * MAX_LANES)
 
     def veh_statistics(self, rl_id):
         """Return speed, edge information, and x, y about the vehicle itself."""
-        speed = self.k.vehicle.get_speed(rl_id) / 100.0
-        lane = (self.k.vehicle.get_lane(rl_id) + 1) / 10.0
-        return np.array([speed, lane])
+        return self.veh_statistics_batch([rl_id])[0]
+
+    def veh_statistics_batch(self, rl_ids):
+        """Return the output of ``veh_statistics`` for several vehicles."""
+        speed = np.array(self.k.vehicle.get_speed(rl_ids), dtype=float)
+        lane = np.array(self.k.vehicle.get_lane(rl_ids), dtype=float)
+        return np.stack((speed / 100.0, (lane + 1) / 10.0),
+                        axis=1).reshape(-1, 2)
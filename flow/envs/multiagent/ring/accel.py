@@ -77,10 +77,11 @@ class AdversarialAccelEnv(AccelEnv, MultiEnv):
 
         The adversary state and the agent state are identical.
         """
+        sorted_ids = self.sorted_ids
         state = np.array([[
-            self.k.vehicle.get_speed(veh_id) / self.k.network.max_speed(),
-            self.k.vehicle.get_x_by_id(veh_id) / self.k.network.length()
-        ] for veh_id in self.sorted_ids])
+            speed / self.k.network.max_speed(), x / self.k.network.length()
+        ] for speed, x in zip(self.k.vehicle.get_speed(sorted_ids),
+                              self.k.vehicle.get_x_by_id(sorted_ids))])
         state = np.ndarray.flatten(state)
         return {'av': state, 'adversary': state}
 
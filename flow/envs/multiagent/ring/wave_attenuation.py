@@ -11,8 +11,6 @@ abs/1710.05465, 2017. [Online]. Available: https://arxiv.org/abs/1710.05465
 import numpy as np
 from gym.spaces.box import Box
 import random
-from scipy.optimize import fsolve
-from copy import deepcopy
 
 from flow.core.params import InitialConfig
 from flow.core.params import NetParams
@@ -289,11 +287,10 @@ class MultiAgentWaveAttenuationPOEnv(MultiEnv):
         self.network = self.network.__class__(
             self.network.orig_name, self.network.vehicles,
             net_params, initial_config)
-        self.k.vehicle = deepcopy(self.initial_vehicles)
-        self.k.vehicle.kernel_api = self.k.kernel_api
-        self.k.vehicle.master_kernel = self.k
+        self.k.vehicle.restore(self.initial_vehicles)
 
         # solve for the velocity upper bound of the ring
+        from scipy.optimize import fsolve
         v_guess = 4
         v_eq_max = fsolve(v_eq_max_function, np.array(v_guess),
                           args=(len(self.initial_ids), length))[0]
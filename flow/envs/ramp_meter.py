@@ -25,6 +25,10 @@ ADDITIONAL_ENV_PARAMS = {
     "num_rl": 5,
 }
 
+# groups of detectors observed by the ramp meter, if the network contains them
+# (see RampMeterNetwork.specify_detectors)
+METER_DETECTORS = ["ramp_queue", "mainline_upstream", "mainline_downstream"]
+
 class RampMeterPOEnv(Env):
     """Partially observable merge environment.
 
@@ -49,6 +53,11 @@ class RampMeterPOEnv(Env):
         than "num_rl", the observations from the additional vehicles are not
         included in the state space.
 
+        If the network contains detectors (see the "detectors" parameter of
+        RampMeterNetwork), the observation also contains the number of
+        vehicles, occupancy, and mean speed measured by the detectors of the
+        ramp queue, and of the highway upstream and downstream of the merge.
+
     Actions
         The action space consists of a vector of bounded accelerations for each
         autonomous vehicle $i$. In order to ensure safety, these actions are
@@ -90,6 +99,14 @@ class RampMeterPOEnv(Env):
         self.leader = []
         self.follower = []
 
+        # names of the detectors in every group of METER_DETECTORS. This is
+        # empty if the network does not contain detectors.
+        det_ids = [det["id"] for det in network.detectors or []]
+        self.meter_detectors = [
+            [det_id for det_id in det_ids
+             if det_id.rsplit("_", 1)[0] == group]
+            for group in METER_DETECTORS] if det_ids else []
+
         super().__init__(env_params, sim_params, network, simulator)
 
     """ Treat the ramp meter as a vehicles, turn continuous action into discret signal"""
@@ -106,7 +123,9 @@ class RampMeterPOEnv(Env):
     @property
     def observation_space(self):
         """See class definition."""
-        return Box(low=-2000, high=2000, shape=(6 * self.num_rl, ), dtype=np.float32)
+        return Box(low=-2000, high=2000,
+                   shape=(6 * self.num_rl + 3 * len(self.meter_detectors), ),
+                   dtype=np.float32)
 
     """ Treat the ramp meter as a vehicles, turn continuous action into discret signal"""
     def _apply_rl_actions(self, rl_actions):
@@ -183,6 +202,11 @@ class RampMeterPOEnv(Env):
             for j in range(3):
                 observation[6 * i + j + 3] = positions[j]
 
+        # aggregated measurements of the ramp meter detectors
+        for det_ids in self.meter_detectors:
+            observation.extend(
+                self.k.traffic_light.get_detector_aggregates(det_ids))
+
         return observation
 
     def compute_reward(self, rl_actions, **kwargs):
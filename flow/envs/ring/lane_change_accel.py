@@ -122,8 +122,8 @@ class LaneChangeAccelEnv(AccelEnv):
 
         speed = [self.k.vehicle.get_speed(veh_id) / max_speed
                  for veh_id in self.sorted_ids]
-        pos = [self.k.vehicle.get_x_by_id(veh_id) / length
-               for veh_id in self.sorted_ids]
+        pos = [x / length
+               for x in self.k.vehicle.get_x_by_id(self.sorted_ids)]
         lane = [self.k.vehicle.get_lane(veh_id) / max_lanes
                 for veh_id in self.sorted_ids]
 
@@ -135,10 +135,9 @@ class LaneChangeAccelEnv(AccelEnv):
         direction = actions[1::2]
 
         # re-arrange actions according to mapping in observation space
+        rl_ids = set(self.k.vehicle.get_rl_ids())
         sorted_rl_ids = [
-            veh_id for veh_id in self.sorted_ids
-            if veh_id in self.k.vehicle.get_rl_ids()
-        ]
+            veh_id for veh_id in self.sorted_ids if veh_id in rl_ids]
 
         # represents vehicles that are allowed to change lanes
         non_lane_changing_veh = \
@@ -147,8 +146,7 @@ class LaneChangeAccelEnv(AccelEnv):
              + self.k.vehicle.get_last_lc(veh_id)
              for veh_id in sorted_rl_ids]
         # vehicle that are not allowed to change have their directions set to 0
-        direction[non_lane_changing_veh] = \
-            np.array([0] * sum(non_lane_changing_veh))
+        direction[non_lane_changing_veh] = 0
 
         self.k.vehicle.apply_acceleration(sorted_rl_ids, acc=acceleration)
         self.k.vehicle.apply_lane_change(sorted_rl_ids, direction=direction)
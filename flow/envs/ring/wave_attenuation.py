@@ -14,10 +14,9 @@ from flow.envs.base import Env
 
 from gym.spaces.box import Box
 
-from copy import deepcopy
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import random
-from scipy.optimize import fsolve
 
 ADDITIONAL_ENV_PARAMS = {
     # maximum acceleration of autonomous vehicles
@@ -61,6 +60,14 @@ class WaveAttenuationEnv(Env):
       vehicle is trained on. If set to None, the environment sticks to the ring
       road specified in the original network definition.
 
+    Optional from env_params:
+
+    * prebuild_rings: whether to generate the networks of every integer ring
+      length in the ring_length range when the environment is created (in
+      parallel), so that resets only need to select one of them instead of
+      regenerating the network. Only supported with the "traci" simulator.
+      Defaults to False.
+
     States
         The state consists of the velocities and absolute position of all
         vehicles in the network. This assumes a constant number of vehicles.
@@ -84,8 +91,92 @@ class WaveAttenuationEnv(Env):
                 raise KeyError(
                     'Environment parameter \'{}\' not supplied'.format(p))
 
+        # table of v_eq_max values, keyed by ring length
+        self._v_eq_max = {}
+        # networks and network kernels of the prebuilt ring lengths, keyed by
+        # ring length and network name respectively
+        self._ring_networks = None
+        self._ring_kernels = None
+
         super().__init__(env_params, sim_params, network, simulator)
 
+        if env_params.additional_params.get('prebuild_rings', False) \
+                and env_params.additional_params['ring_length'] is not None \
+                and simulator == 'traci':
+            self._build_ring_library()
+
+    def _make_ring_network(self, length):
+        """Return a copy of the ring network with a different length."""
+        initial_config = InitialConfig(bunching=50, min_gap=0)
+        additional_net_params = {
+            'length':
+                length,
+            'lanes':
+                self.net_params.additional_params['lanes'],
+            'speed_limit':
+                self.net_params.additional_params['speed_limit'],
+            'resolution':
+                self.net_params.additional_params['resolution']
+        }
+        net_params = NetParams(additional_params=additional_net_params)
+
+        return self.network.__class__(
+            self.network.orig_name, self.network.vehicles,
+            net_params, initial_config)
+
+    def _build_ring_library(self):
+        """Generate the networks of every ring length in the training range.
+
+        The network files of every ring length are generated in parallel by
+        separate network kernels, and the v_eq_max of every ring length is
+        tabulated.
+        """
+        min_length, max_length = self.env_params.additional_params[
+            'ring_length']
+        lengths = range(min_length, max_length + 1)
+        self._ring_networks = {
+            length: self._make_ring_network(length) for length in lengths}
+
+        def generate(network):
+            network_kernel = self.k.network.__class__(self.k, self.sim_params)
+            network_kernel.generate_network(network)
+            return network_kernel
+
+        # the network generation is dominated by netconvert subprocesses
+        with ThreadPoolExecutor() as pool:
+            network_kernels = list(pool.map(
+                generate, self._ring_networks.values()))
+
+        self._ring_kernels = {
+            network.name: network_kernel for network, network_kernel in
+            zip(self._ring_networks.values(), network_kernels)}
+
+        for length in lengths:
+            self.get_v_eq_max(length)
+
+    def get_v_eq_max(self, length):
+        """Return the velocity upper bound of a ring of a given length.
+
+        The values are computed once per ring length and then tabulated.
+
+        Parameters
+        ----------
+        length : int
+            length of the ring road
+
+        Returns
+        -------
+        float
+            the velocity upper bound
+        """
+        if length not in self._v_eq_max:
+            from scipy.optimize import fsolve
+            v_guess = 4
+            self._v_eq_max[length] = fsolve(
+                v_eq_max_function, np.array(v_guess),
+                args=(len(self.initial_ids), length))[0]
+        return self._v_eq_max[length]
+
     @property
     def action_space(self):
         """See class definition."""
@@ -142,8 +233,8 @@ class WaveAttenuationEnv(Env):
         """See class definition."""
         speed = [self.k.vehicle.get_speed(veh_id) / self.k.network.max_speed()
                  for veh_id in self.k.vehicle.get_ids()]
-        pos = [self.k.vehicle.get_x_by_id(veh_id) / self.k.network.length()
-               for veh_id in self.k.vehicle.get_ids()]
+        pos = [x / self.k.network.length()
+               for x in self.k.vehicle.get_x_by_id(self.k.vehicle.get_ids())]
 
         return np.array(speed + pos)
 
@@ -168,36 +259,20 @@ class WaveAttenuationEnv(Env):
         self.step_counter = 0
 
         # update the network
-        initial_config = InitialConfig(bunching=50, min_gap=0)
         length = random.randint(
             self.env_params.additional_params['ring_length'][0],
             self.env_params.additional_params['ring_length'][1])
-        additional_net_params = {
-            'length':
-                length,
-            'lanes':
-                self.net_params.additional_params['lanes'],
-            'speed_limit':
-                self.net_params.additional_params['speed_limit'],
-            'resolution':
-                self.net_params.additional_params['resolution']
-        }
-        net_params = NetParams(additional_params=additional_net_params)
-
-        self.network = self.network.__class__(
-            self.network.orig_name, self.network.vehicles,
-            net_params, initial_config)
-        self.k.vehicle = deepcopy(self.initial_vehicles)
-        self.k.vehicle.kernel_api = self.k.kernel_api
-        self.k.vehicle.master_kernel = self.k
+        if self._ring_networks is not None:
+            self.network = self._ring_networks[length]
+        else:
+            self.network = self._make_ring_network(length)
+        self.k.vehicle.restore(self.initial_vehicles)
 
         # solve for the velocity upper bound of the ring
-        v_guess = 4
-        v_eq_max = fsolve(v_eq_max_function, np.array(v_guess),
-                          args=(len(self.initial_ids), length))[0]
+        v_eq_max = self.get_v_eq_max(length)
 
         print('\n-----------------------')
-        print('ring length:', net_params.additional_params['length'])
+        print('ring length:', length)
         print('v_max:', v_eq_max)
         print('-----------------------')
 
@@ -209,6 +284,31 @@ class WaveAttenuationEnv(Env):
         # perform the generic reset function
         return super().reset()
 
+    def _update_network_kernel(self):
+        """See parent class.
+
+        If the current network was prebuilt, the network kernel and files
+        generated for it when the environment was created are used instead,
+        and the network kernel of a network that was not prebuilt is closed.
+        """
+        if self._ring_kernels is None or \
+                self.network.name not in self._ring_kernels:
+            return super()._update_network_kernel()
+
+        if self.k.network.network.name not in self._ring_kernels:
+            self.k.network.close()
+        self.k.network = self._ring_kernels[self.network.name]
+
+    def terminate(self):
+        """See parent class.
+
+        This also deletes the files of the prebuilt networks.
+        """
+        super().terminate()
+        if self._ring_kernels is not None:
+            for network_kernel in self._ring_kernels.values():
+                network_kernel.close()
+
 
 class WaveAttenuationPOEnv(WaveAttenuationEnv):
     """POMDP version of WaveAttenuationEnv.
@@ -156,6 +156,10 @@ class Network(object):
         starting from that edge. These are only applied at the start of a
         simulation; vehicles are allowed to reroute within the environment
         immediately afterwards.
+    detectors : list of dict or None
+        detectors that are assigned to the network via the `specify_detectors`
+        method. If the detectors attribute is set to None, no detectors are
+        placed in the network.
     edge_starts : list of (str, float)
         a list of tuples in which the first element of the tuple is the name of
         the edge/intersection/internal_link, and the second value is the
@@ -338,6 +342,9 @@ class Network(object):
         # specify routes vehicles can take
         self.routes = self.specify_routes(net_params)
 
+        # specify the detectors placed in the network (default is None)
+        self.detectors = self.specify_detectors(net_params)
+
         if net_params.template is None and net_params.osm_path is None:
             # specify the attributes of the nodes
             self.nodes = self.specify_nodes(net_params)
@@ -635,6 +642,41 @@ class Network(object):
         """
         return None
 
+    # TODO: convert to property
+    def specify_detectors(self, net_params):
+        """Specify the detectors placed in the network (if any exist).
+
+        Each detector is a dict consisting of the following properties:
+
+        * **id**: name of the detector
+        * **type**: "e1" for an induction loop, located at a single position
+          of a lane, or "e2" for a lane area detector, spanning a section of
+          a lane
+        * **lane**: name of the lane the detector is placed on, e.g. "1_0"
+        * **pos**: position of the detector (or start of its area) on the lane
+        * **length**: length of the area covered by the detector. Only needed
+          by lane area detectors.
+
+        Any additional property is passed to the simulator as is. The
+        measurements of the detectors can then be collected from the traffic
+        light kernel, e.g. ``env.k.traffic_light.get_detector_count(det_id)``.
+
+        Parameters
+        ----------
+        net_params : flow.core.params.NetParams
+            see flow/core/params.py
+
+        Returns
+        -------
+        list of dict
+            A list of detector attributes. If none are specified, no detectors
+            are added to the network.
+
+        For information on detector attributes, see:
+        https://sumo.dlr.de/docs/Simulation/Output/Lanearea_Detectors_(E2).html
+        """
+        return None
+
     @staticmethod
     def gen_custom_start_pos(cls, net_params, initial_config, num_vehicles):
         """Generate a user defined set of starting positions.
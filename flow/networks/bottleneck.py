@@ -12,6 +12,11 @@ ADDITIONAL_NET_PARAMS = {
     'speed_limit': 23
 }
 
+# start of the toll booth zone, at the end of edge "1"
+TOLL_ZONE_START = 10
+# start of the ramp meter zone, at the end of edge "2"
+RAMP_METER_ZONE_START = 80
+
 
 class BottleneckNetwork(Network):
     """Network class for bottleneck simulations.
@@ -26,6 +31,16 @@ class BottleneckNetwork(Network):
     * **scaling** : the factor multiplying number of lanes
     * **speed_limit** : edge speed limit
 
+    The network also contains the following detectors, on every lane i of the
+    edges they are placed on:
+
+    * **toll_i** : lane area detector covering the toll booth zone of edge "1"
+    * **toll_exit_i** : induction loop at the start of edge "2"
+    * **ramp_meter_i** : lane area detector covering the ramp meter zone of
+      edge "2"
+    * **ramp_meter_exit_i** : induction loop at the start of edge "3"
+    * **bottleneck_i** : lane area detector covering edge "4"
+
     Usage
     -----
     >>> from flow.core.params import NetParams
@@ -219,6 +234,44 @@ class BottleneckNetwork(Network):
         }]
         return centroids
 
+    def specify_detectors(self, net_params):
+        """See parent class."""
+        scaling = net_params.additional_params.get("scaling", 1)
+        detectors = []
+        for lane in range(4 * scaling):
+            detectors += [{
+                "id": "toll_{}".format(lane),
+                "type": "e2",
+                "lane": "1_{}".format(lane),
+                "pos": TOLL_ZONE_START,
+                "length": 100 - TOLL_ZONE_START
+            }, {
+                "id": "toll_exit_{}".format(lane),
+                "type": "e1",
+                "lane": "2_{}".format(lane),
+                "pos": 0
+            }, {
+                "id": "ramp_meter_{}".format(lane),
+                "type": "e2",
+                "lane": "2_{}".format(lane),
+                "pos": RAMP_METER_ZONE_START,
+                "length": 310 - RAMP_METER_ZONE_START
+            }, {
+                "id": "ramp_meter_exit_{}".format(lane),
+                "type": "e1",
+                "lane": "3_{}".format(lane),
+                "pos": 0
+            }]
+        for lane in range(2 * scaling):
+            detectors += [{
+                "id": "bottleneck_{}".format(lane),
+                "type": "e2",
+                "lane": "4_{}".format(lane),
+                "pos": 0,
+                "length": 280
+            }]
+        return detectors
+
     def specify_routes(self, net_params):
         """See parent class."""
         rts = {
@@ -40,6 +40,11 @@ class RampMeterNetwork(Network):
     * **highway_lanes** : number of lanes in the highway
     * **speed_limit** : max speed limit of the network
 
+    Optional from net_params:
+
+    * **detectors** : whether to place detectors in the network, see
+      ``specify_detectors``. Defaults to False.
+
     Usage
     -----
     >>> from flow.core.params import NetParams
@@ -179,6 +184,50 @@ class RampMeterNetwork(Network):
 
         return types
 
+    def specify_detectors(self, net_params):
+        """See parent class.
+
+        If the "detectors" network parameter is set, the following detectors
+        are placed on every lane i of the edges they are located on:
+
+        * **ramp_queue_i** : lane area detector covering the on-ramp edge
+          leading to the ramp meter, i.e. the queue of the ramp meter
+        * **mainline_upstream_i** : induction loop at the start of the highway
+          edge leading to the merge
+        * **mainline_downstream_i** : induction loop in the middle of the
+          highway edge past the merge
+        """
+        if not net_params.additional_params.get("detectors", False):
+            return None
+
+        h_lanes = net_params.additional_params["highway_lanes"]
+        m_lanes = net_params.additional_params["merge_lanes"]
+        postmerge = net_params.additional_params["post_merge_length"]
+
+        detectors = []
+        for lane in range(m_lanes):
+            detectors.append({
+                "id": "ramp_queue_{}".format(lane),
+                "type": "e2",
+                "lane": "inflow_merge_{}".format(lane),
+                "pos": 0,
+                "length": INFLOW_EDGE_LEN
+            })
+        for lane in range(h_lanes):
+            detectors.append({
+                "id": "mainline_upstream_{}".format(lane),
+                "type": "e1",
+                "lane": "left_{}".format(lane),
+                "pos": 0
+            })
+            detectors.append({
+                "id": "mainline_downstream_{}".format(lane),
+                "type": "e1",
+                "lane": "center_{}".format(lane),
+                "pos": postmerge / 2
+            })
+        return detectors
+
     def specify_routes(self, net_params):
         """See parent class."""
         rts = {
@@ -1,5 +1,16 @@
-"""Empty init file to ensure documentation for the renderer module is created."""
+"""Empty init file to ensure documentation for the renderer module is created.
 
-from flow.renderer.pyglet_renderer import PygletRenderer
+The renderers are imported on first access, as they depend on optional
+packages (pyglet, matplotlib, cv2, imutils) that are only needed when
+rendering.
+"""
 
-__all__ = ['PygletRenderer']
+from flow.utils.lazy_import import lazy_import
+
+__getattr__, __dir__ = lazy_import(__name__, {
+    'PygletRenderer': 'flow.renderer.pyglet_renderer',
+    'NumpyRenderer': 'flow.renderer.numpy_renderer',
+    'FrameBuffer': 'flow.renderer.frame_buffer',
+})
+
+__all__ = ['PygletRenderer', 'NumpyRenderer', 'FrameBuffer']
@@ -0,0 +1,127 @@
+"""Contains the frame buffer class used to store rendering histories."""
+
+import numpy as np
+
+
+class FrameBuffer(object):
+    """Preallocated ring buffer of rendered frames or sights.
+
+    The buffer keeps the last ``length`` items appended to it. Items are
+    stored twice in an array of ``2 * length`` slots, so that the full history
+    is always available as a contiguous, chronologically ordered view of the
+    storage (see ``stacked``), and no copies are needed to use it as a stacked
+    observation.
+
+    If ``ragged`` is set to True, the first dimension of the items may vary
+    between items (e.g. the number of vehicles sights are collected for).
+    Items are then zero-padded to the largest size seen so far, and the valid
+    size of each item is tracked separately. If the shape of the remaining
+    dimensions changes, the history is reset with the new item.
+
+    Usage
+    -----
+    >>> buffer = FrameBuffer(length=5)
+    >>> buffer.reset(frame)  # fills the history with the initial frame
+    >>> buffer.append(new_frame)
+    >>> buffer[-1]  # most recent frame
+    >>> buffer.stacked()  # history of shape (5,) + frame.shape
+    """
+
+    def __init__(self, length, ragged=False):
+        """Instantiate the buffer.
+
+        Parameters
+        ----------
+        length : int
+            number of items kept in the history
+        ragged : bool, optional
+            whether the size of the first dimension of the items may vary
+        """
+        self.length = length
+        self.ragged = ragged
+        self._data = None
+        self._sizes = np.zeros(2 * length, dtype=int)
+        self._pos = 0
+
+    def reset(self, item):
+        """Fill the entire history with a single item.
+
+        Parameters
+        ----------
+        item : array_like
+            the item to fill the history with
+        """
+        item = np.asarray(item)
+        self._data = np.empty((2 * self.length,) + item.shape, item.dtype)
+        self._data[:] = item
+        self._sizes[:] = item.shape[0] if item.ndim > 0 else 0
+        self._pos = 0
+
+    def append(self, item):
+        """Add an item to the history, replacing the oldest one.
+
+        Parameters
+        ----------
+        item : array_like
+            the new item
+        """
+        item = np.asarray(item)
+        if self._data is None or item.dtype != self._data.dtype:
+            self.reset(item)
+            return
+
+        if self.ragged and item.ndim > 0:
+            if item.shape[1:] != self._data.shape[2:]:
+                self.reset(item)
+                return
+            if item.shape[0] > self._data.shape[1]:
+                self._grow(item.shape[0])
+        elif item.shape != self._data.shape[1:]:
+            self.reset(item)
+            return
+
+        size = item.shape[0] if item.ndim > 0 else 0
+        for slot in (self._pos, self._pos + self.length):
+            if self.ragged:
+                self._data[slot, :size] = item
+                self._data[slot, size:] = 0
+            else:
+                self._data[slot] = item
+            self._sizes[slot] = size
+        self._pos = (self._pos + 1) % self.length
+
+    def stacked(self):
+        """Return the history as a view of the underlying storage.
+
+        Returns
+        -------
+        np.ndarray
+            array of shape (length,) + item shape, ordered from the oldest to
+            the most recent item. For ragged buffers, the items are padded
+            with zeros (see ``sizes`` for their valid size).
+        """
+        return self._data[self._pos:self._pos + self.length]
+
+    def sizes(self):
+        """Return the valid size of the first dimension of every item."""
+        return self._sizes[self._pos:self._pos + self.length]
+
+    def __len__(self):
+        """Return the number of items in the history."""
+        return 0 if self._data is None else self.length
+
+    def __getitem__(self, index):
+        """Return an item from the history, 0 being the oldest."""
+        if self._data is None:
+            raise IndexError("FrameBuffer is empty.")
+        slot = self._pos + range(self.length)[index]
+        if self.ragged and self._data.ndim > 1:
+            return self._data[slot, :self._sizes[slot]]
+        return self._data[slot]
+
+    def _grow(self, size):
+        """Increase the padded size of the items of a ragged buffer."""
+        data = np.zeros((self._data.shape[0], size) + self._data.shape[2:],
+                        self._data.dtype)
+        data[:, :self._data.shape[1]] = self._data
+        self._data = data
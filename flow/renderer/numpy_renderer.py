@@ -0,0 +1,607 @@
+"""Contains the headless numpy renderer class."""
+
+import matplotlib.cm as cm
+import matplotlib.colors as colors
+import numpy as np
+import cv2
+import imutils
+import os
+from os.path import expanduser
+import time
+HOME = expanduser("~")
+
+# background color of the frame, matching glClearColor(0.125, ...) in the
+# pyglet renderer
+BACKGROUND_COLOR = 32
+# color of the lanes of the road network
+LANE_COLOR = 224
+# size of the triangles representing vehicles (meter)
+VEHICLE_SIZE = 5
+
+
+class NumpyRenderer(object):
+    """Headless software renderer.
+
+    Provide a drop-in replacement for the pyglet renderer that rasterizes the
+    road network and vehicles directly into numpy arrays, and as such does not
+    require a display or an OpenGL context. The produced frames and sights
+    follow the same layout and conventions as the pyglet renderer (frames are
+    stored in BGR order, and "gray" modes return the first channel), so that
+    policies trained with one renderer can be evaluated with the other.
+
+    The lanes of the network are rasterized once into a background layer
+    during initialization. Every call to ``render`` copies this layer and
+    draws the vehicles onto it. Moreover, ``render_batch`` can be used to
+    rasterize the frames of several simulations of the same network (e.g. in
+    vectorized environments) in a single vectorized pass.
+
+    Attributes
+    ----------
+    data : list
+        A list of rendering data to be saved when save_render is set to
+        True.
+    mode : str
+        * "gray": static grayscale rendering, which is good for training
+        * "dgray": dynamic grayscale rendering
+        * "rgb": static RGB rendering
+        * "drgb": dynamic RGB rendering, which is good for visualization
+    save_render : bool
+        Specify whether to save rendering data to disk
+    path : str
+        Specify where to store the rendering data
+    sight_radius : int
+        Set the radius of observation for RL vehicles (meter)
+    show_radius : bool
+        Specify whether to render the radius of RL observation
+    time : int
+        Rendering time that increments by one with every render() call
+    lane_polys : list
+        A list of road network polygons, in pixel coordinates
+    width : int
+        Width of the frame
+    height : int
+        Height of the frame
+    x_shift : float
+        The shift substracted to the input x coordinate
+    x_scale : float
+        The scale multiplied to the input x coordinate
+    y_shift : float
+        The shift substracted to the input y coordinate
+    y_scale : float
+        The scale multiplied to the input y coordinate
+    background : numpy.ndarray
+        The pre-rendered road network, of size height x width x 3, in RGB
+        order and with the origin at the bottom-left corner
+    frame : numpy.ndarray
+        An array of size height x width x 3, in BGR order
+    pxpm : int
+        Specify rendering resolution (pixel / meter)
+    """
+
+    def __init__(self, network, mode,
+                 save_render=False,
+                 path=HOME+"/flow_rendering",
+                 sight_radius=50,
+                 show_radius=False,
+                 pxpm=2,
+                 alpha=1.0):
+        """Initialize the numpy renderer.
+
+        Parameters
+        ----------
+        network : list of list
+            A list of road network polygons. Each polygon is expressed as
+            a list of x and y coordinates, e.g., [x1, y1, x2, y2, ...]
+        mode : str
+            * "gray": static grayscale rendering, which is good for training
+            * "dgray": dynamic grayscale rendering
+            * "rgb": static RGB rendering
+            * "drgb": dynamic RGB rendering, which is good for visualization
+        save_render : bool
+            Specify whether to save rendering data to disk
+        path : str
+            Specify where to store the rendering data
+        sight_radius : int
+            Set the radius of observation for RL vehicles (meter)
+        show_radius : bool
+            Specify whether to render the radius of RL observation
+        pxpm : int
+            Specify rendering resolution (pixel / meter)
+        alpha : int
+            Specify opacity of the alpha channel.
+            1.0 is fully opaque; 0.0 is fully transparent.
+        """
+        self.mode = mode
+        if self.mode not in ["rgb", "drgb", "gray", "dgray"]:
+            raise ValueError("Mode %s is not supported!" % self.mode)
+        self.save_render = save_render
+        self.path = path + '/' + time.strftime("%Y-%m-%d-%H%M%S")
+        if self.save_render:
+            if not os.path.exists(path):
+                os.mkdir(path)
+            os.mkdir(self.path)
+            self.data = [network]
+        self.sight_radius = sight_radius
+        self.pxpm = pxpm  # Pixel per meter
+        self.show_radius = show_radius
+        self.alpha = alpha
+        self.time = 0
+
+        lane_polys_flat = [pt for poly in network for pt in poly]
+
+        polys_x = np.asarray(lane_polys_flat[::2])
+        width = int(polys_x.max() - polys_x.min())
+        shift = polys_x.min() - 2
+        scale = (width - 4) / width
+        self.width = int((width + 2*self.sight_radius) * self.pxpm)
+        self.x_shift = shift - self.sight_radius
+        self.x_scale = scale
+
+        polys_y = np.asarray(lane_polys_flat[1::2])
+        height = int(polys_y.max() - polys_y.min())
+        shift = polys_y.min() - 2
+        scale = (height - 4) / height
+        self.height = int((height + 2*self.sight_radius) * self.pxpm)
+        self.y_shift = shift - self.sight_radius
+        self.y_scale = scale
+
+        # colormaps used by the dynamic rendering modes
+        if "drgb" in self.mode:
+            self._human_cmap = self._truncate_colormap(cm.Greens, 0.2, 0.8)
+            self._machine_cmap = self._truncate_colormap(cm.Blues, 0.2, 0.8)
+        elif "dgray" in self.mode:
+            self._human_cmap = self._truncate_colormap(cm.binary, 0.55, 0.95)
+            self._machine_cmap = self._truncate_colormap(
+                cm.binary, 0.05, 0.45)
+
+        # rasterize the road network into the background layer
+        self.lane_polys = []
+        segments = []
+        for poly in network:
+            poly = np.asarray(poly, dtype=np.float64).reshape(-1, 2)
+            poly = self._to_pixels(poly)
+            self.lane_polys.append(poly)
+            segments.append(np.stack([poly[:-1], poly[1:]], axis=1))
+
+        self.background = np.full(
+            (1, self.height, self.width, 3), BACKGROUND_COLOR, np.uint8)
+        if len(segments) > 0:
+            segments = np.concatenate(segments)
+            self._draw_segments(
+                self.background, segments,
+                np.full((len(segments), 4), [LANE_COLOR] * 3 + [
+                    int(self.alpha*255)], np.uint8),
+                np.zeros(len(segments), dtype=int))
+        self.background = self.background[0]
+
+        self.frame = self.background[::-1, :, ::-1].copy()
+        self.network = self.frame.copy()
+        print('Rendering with frame {} x {}...'.format(self.width, self.height))
+
+    def render(self,
+               human_orientations,
+               machine_orientations,
+               human_dynamics,
+               machine_dynamics,
+               human_logs,
+               machine_logs):
+        """Update the rendering frame.
+
+        Parameters
+        ----------
+        human_orientations : list
+            A list contains orientations of all human vehicles
+            An orientation is a list contains [x, y, angle].
+        machine_orientations : list
+            A list contains orientations of all RL vehicles
+            An orientation is a list contains [x, y, angle].
+        human_dynamics : list
+            A list contains the speed of all human vehicles normalized by
+            max speed, i.e., speed/max_speed
+            This is used to dynamically color human vehicles based on its
+            velocity.
+        machine_dynamics : list
+            A list contains the speed of all RL vehicles normalized by
+            max speed, i.e., speed/max_speed
+            This is used to dynamically color RL vehicles based on its
+            velocity.
+        human_logs : list
+            A list contains the timestep (ms), timedelta (ms), and id of
+            all human vehicles
+        machine_logs : list
+            A list contains the timestep (ms), timedelta (ms), and id of
+            all RL vehicles
+        """
+        self.time += 1
+
+        frames = self._rasterize(
+            [human_orientations], [machine_orientations],
+            [human_dynamics], [machine_dynamics])
+        self.frame = frames[0]
+
+        if self.save_render:
+            cv2.imwrite("%s/frame_%06d.png" %
+                        (self.path, self.time), self.frame)
+            self.data.append([list(human_orientations),
+                              list(machine_orientations),
+                              list(human_dynamics),
+                              list(machine_dynamics),
+                              list(human_logs),
+                              list(machine_logs)])
+        if "gray" in self.mode:
+            return self.frame[:, :, 0]
+        else:
+            return self.frame
+
+    def render_batch(self,
+                     human_orientations,
+                     machine_orientations,
+                     human_dynamics,
+                     machine_dynamics):
+        """Render the frames of several simulations of this network at once.
+
+        Unlike ``render``, this method does not update the ``frame`` attribute
+        of the renderer, and no rendering data is saved.
+
+        Parameters
+        ----------
+        human_orientations : list of list
+            the human vehicle orientations of every simulation, see render
+        machine_orientations : list of list
+            the RL vehicle orientations of every simulation, see render
+        human_dynamics : list of list
+            the human vehicle dynamics of every simulation, see render
+        machine_dynamics : list of list
+            the RL vehicle dynamics of every simulation, see render
+
+        Returns
+        -------
+        numpy.ndarray
+            the frames of every simulation, of size
+            batch_size x height x width (x 3 for rgb modes)
+        """
+        frames = self._rasterize(human_orientations, machine_orientations,
+                                 human_dynamics, machine_dynamics)
+        if "gray" in self.mode:
+            return frames[..., 0]
+        else:
+            return frames
+
+    def close(self):
+        """Terminate the renderer."""
+        print('Closing renderer...')
+        save_path = ''
+        if self.save_render:
+            save_path = '%s/data_%06d.npy' % (self.path, self.time)
+            data = np.empty(len(self.data), dtype=object)
+            for i, datum in enumerate(self.data):
+                data[i] = datum
+            np.save(save_path, data)
+        print('Goodbye!')
+        return save_path
+
+    def get_sight(self, orientation, veh_id):
+        """Return the local observation of a vehicle.
+
+        Parameters
+        ----------
+        orientation : list
+            An orientation is a list contains [x, y, angle]
+        veh_id : str
+            The vehicle to observe for
+        """
+        x, y, ang = orientation
+        x = (x-self.x_shift)*self.x_scale*self.pxpm
+        y = (y-self.y_shift)*self.y_scale*self.pxpm
+        x_med = x
+        y_med = self.height - y
+        sight_radius = self.sight_radius * self.pxpm
+        x_min = int(x_med - sight_radius)
+        y_min = int(y_med - sight_radius)
+        x_max = int(x_med + sight_radius)
+        y_max = int(y_med + sight_radius)
+        fixed_sight = self.frame[y_min:y_max, x_min:x_max]
+        height, width = fixed_sight.shape[0:2]
+        mask = np.zeros((height, width), np.uint8)
+        cv2.circle(mask, (int(sight_radius), int(sight_radius)),
+                   int(sight_radius), (255, 255, 255), thickness=-1)
+        rotated_sight = cv2.bitwise_and(fixed_sight, fixed_sight, mask=mask)
+        rotated_sight = imutils.rotate(rotated_sight, ang)
+
+        if self.save_render:
+            cv2.imwrite("%s/sight_%s_%06d.png" %
+                        (self.path, veh_id, self.time),
+                        rotated_sight)
+        if "gray" in self.mode:
+            return rotated_sight[:, :, 0]
+        else:
+            return rotated_sight
+
+    def get_sights(self, orientations, veh_ids):
+        """Return the local observations of a set of vehicles.
+
+        The sights are cropped from the current frame and masked in a single
+        vectorized operation, and are returned as one batched array.
+
+        Parameters
+        ----------
+        orientations : array_like
+            the [x, y, angle] orientation of every vehicle
+        veh_ids : list of str
+            the vehicles to observe for
+
+        Returns
+        -------
+        numpy.ndarray
+            the sights of all vehicles, of size num_vehicles x 2*r x 2*r
+            (x 3 for rgb modes), where r = sight_radius * pxpm
+        """
+        sight_radius = self.sight_radius * self.pxpm
+        side = int(2 * sight_radius)
+        orientations = np.asarray(orientations, dtype=np.float64)
+        orientations = orientations.reshape(-1, 3)
+
+        # crop the sights from the frame
+        x_med = (orientations[:, 0]-self.x_shift)*self.x_scale*self.pxpm
+        y_med = self.height - \
+            (orientations[:, 1]-self.y_shift)*self.y_scale*self.pxpm
+        x_min = (x_med - sight_radius).astype(int)
+        y_min = (y_med - sight_radius).astype(int)
+        offset = np.arange(side)
+        rows = np.clip(y_min[:, None] + offset, 0, self.height - 1)
+        cols = np.clip(x_min[:, None] + offset, 0, self.width - 1)
+        sights = self.frame[rows[:, :, None], cols[:, None, :]]
+
+        # mask everything outside of the sight radius
+        mask = np.zeros((side, side), np.uint8)
+        cv2.circle(mask, (int(sight_radius), int(sight_radius)),
+                   int(sight_radius), (255, 255, 255), thickness=-1)
+        sights *= (mask > 0)[np.newaxis, :, :, np.newaxis]
+
+        # rotate the sights in the direction of the vehicles
+        for i, (ang, veh_id) in enumerate(zip(orientations[:, 2], veh_ids)):
+            sights[i] = imutils.rotate(sights[i], ang)
+            if self.save_render:
+                cv2.imwrite("%s/sight_%s_%06d.png" %
+                            (self.path, veh_id, self.time),
+                            sights[i])
+
+        if "gray" in self.mode:
+            return sights[..., 0]
+        else:
+            return sights
+
+    def _to_pixels(self, points):
+        """Convert an N x 2 array of network coordinates into pixels."""
+        points = np.array(points, dtype=np.float64).reshape(-1, 2)
+        points[:, 0] = (points[:, 0]-self.x_shift)*self.x_scale*self.pxpm
+        points[:, 1] = (points[:, 1]-self.y_shift)*self.y_scale*self.pxpm
+        return points
+
+    def _vehicle_colors(self, dynamics, machine):
+        """Return the RGBA colors of a set of vehicles.
+
+        Parameters
+        ----------
+        dynamics : array_like
+            the normalized speeds of the vehicles
+        machine : bool
+            whether the vehicles are RL (True) or human (False) vehicles
+
+        Returns
+        -------
+        numpy.ndarray
+            an N x 4 array of colors, as unsigned bytes
+        """
+        dynamics = np.asarray(dynamics, dtype=np.float64).reshape(-1)
+        if self.mode in ["drgb", "dgray"]:
+            cmap = self._machine_cmap if machine else self._human_cmap
+            color = cmap(dynamics).reshape(-1, 4)
+            color[:, 3] = self.alpha
+            return (255*color).astype(np.uint8)
+        elif self.mode == "rgb":
+            color = [0, 150, 200] if machine else [0, 225, 0]
+        else:
+            color = [150, 150, 150] if machine else [100, 100, 100]
+        return np.tile(np.array(color + [int(255*self.alpha)], np.uint8),
+                       (dynamics.shape[0], 1))
+
+    def _rasterize(self,
+                   human_orientations,
+                   machine_orientations,
+                   human_dynamics,
+                   machine_dynamics):
+        """Rasterize the vehicles of a batch of simulations.
+
+        See render_batch for a description of the parameters.
+
+        Returns
+        -------
+        numpy.ndarray
+            the frames of every simulation, of size
+            batch_size x height x width x 3, in BGR order
+        """
+        batch_size = len(human_orientations)
+        canvas = np.repeat(self.background[np.newaxis], batch_size, axis=0)
+
+        centers, angles, rgba, index = [], [], [], []
+        circle_centers, circle_rgba, circle_index = [], [], []
+        for i in range(batch_size):
+            for orientations, dynamics, machine in [
+                    (human_orientations[i], human_dynamics[i], False),
+                    (machine_orientations[i], machine_dynamics[i], True)]:
+                if len(orientations) == 0:
+                    continue
+                orientations = np.asarray(orientations, dtype=np.float64)
+                color = self._vehicle_colors(dynamics, machine)
+                centers.append(self._to_pixels(orientations[:, :2]))
+                angles.append(orientations[:, 2])
+                rgba.append(color)
+                index.append(np.full(len(orientations), i))
+                if machine and self.show_radius:
+                    circle_centers.append(centers[-1])
+                    circle_rgba.append(color)
+                    circle_index.append(index[-1])
+
+        if len(centers) > 0:
+            centers = np.concatenate(centers)
+            rgba = np.concatenate(rgba)
+            index = np.concatenate(index)
+            self._fill_triangles(
+                canvas, self._triangles(centers, np.concatenate(angles)),
+                rgba, index)
+
+            # radius of observation of the RL vehicles
+            if len(circle_centers) > 0 and self.sight_radius > 0:
+                circle_centers = np.concatenate(circle_centers)
+                circle_rgba = np.concatenate(circle_rgba)
+                circle_index = np.concatenate(circle_index)
+                num_pts = int(self.pxpm * 50)
+                theta = np.radians(np.arange(num_pts) / num_pts * 360.0)
+                radius = self.sight_radius * self.pxpm
+                offsets = np.stack([radius*self.x_scale*np.cos(theta),
+                                    radius*self.y_scale*np.sin(theta)], 1)
+                loops = circle_centers[:, np.newaxis] + offsets
+                segments = np.stack(
+                    [loops, np.roll(loops, -1, axis=1)], axis=2)
+                self._draw_segments(
+                    canvas, segments.reshape(-1, 2, 2),
+                    np.repeat(circle_rgba, num_pts, axis=0),
+                    np.repeat(circle_index, num_pts))
+
+        # flip the frames vertically and convert them to BGR
+        return np.ascontiguousarray(canvas[:, ::-1, :, ::-1])
+
+    def _triangles(self, centers, angles):
+        """Return the vertices of the vehicle triangles.
+
+        Parameters
+        ----------
+        centers : numpy.ndarray
+            N x 2 array of vehicle positions, in pixels
+        angles : numpy.ndarray
+            N array of vehicle angles, in degrees
+
+        Returns
+        -------
+        numpy.ndarray
+            N x 3 x 2 array of vertices
+        """
+        ang = np.radians(angles)
+        s = VEHICLE_SIZE * self.pxpm
+        cx, cy = centers[:, 0], centers[:, 1]
+        x_ = cx - s*self.x_scale*np.sin(ang)
+        y_ = cy - s*self.y_scale*np.cos(ang)
+        dx = 0.25*s*self.x_scale*np.sin(np.pi/2-ang)
+        dy = 0.25*s*self.y_scale*np.cos(np.pi/2-ang)
+        return np.stack([np.stack([cx, cy], 1),
+                         np.stack([x_ + dx, y_ - dy], 1),
+                         np.stack([x_ - dx, y_ + dy], 1)], axis=1)
+
+    def _blend(self, canvas, index, py, px, rgba):
+        """Alpha-blend colors into a set of pixels of the canvas."""
+        inside = (px >= 0) & (px < self.width) & (py >= 0) & \
+            (py < self.height)
+        index, py, px, rgba = index[inside], py[inside], px[inside], \
+            rgba[inside]
+        alpha = rgba[:, 3:].astype(np.float64) / 255
+        dst = canvas[index, py, px].astype(np.float64)
+        canvas[index, py, px] = np.round(
+            alpha * rgba[:, :3] + (1 - alpha) * dst).astype(np.uint8)
+
+    def _fill_triangles(self, canvas, triangles, rgba, index):
+        """Fill triangles into the canvas.
+
+        A pixel is covered by a triangle if its center lies within it, as is
+        done when rasterizing polygons with OpenGL.
+
+        Parameters
+        ----------
+        canvas : numpy.ndarray
+            batch_size x height x width x 3 array to draw in
+        triangles : numpy.ndarray
+            N x 3 x 2 array of vertices, in pixels
+        rgba : numpy.ndarray
+            N x 4 array of colors
+        index : numpy.ndarray
+            N array of the index of the frame of every triangle
+        """
+        lo = np.floor(triangles.min(axis=1)).astype(int)
+        hi = np.ceil(triangles.max(axis=1)).astype(int)
+        size = max(int((hi - lo).max()), 1)
+
+        # pixel centers of the bounding box of every triangle
+        grid = np.arange(size)
+        px = lo[:, 0, np.newaxis, np.newaxis] + grid[np.newaxis, np.newaxis]
+        py = lo[:, 1, np.newaxis, np.newaxis] + grid[np.newaxis, :, np.newaxis]
+        px, py = np.broadcast_arrays(px, py)
+        cx, cy = px + 0.5, py + 0.5
+
+        # edge functions, the pixel is inside if they all have the same sign
+        edges = []
+        for a, b in [(0, 1), (1, 2), (2, 0)]:
+            ax = triangles[:, a, 0, np.newaxis, np.newaxis]
+            ay = triangles[:, a, 1, np.newaxis, np.newaxis]
+            bx = triangles[:, b, 0, np.newaxis, np.newaxis]
+            by = triangles[:, b, 1, np.newaxis, np.newaxis]
+            edges.append((bx - ax) * (cy - ay) - (by - ay) * (cx - ax))
+        edges = np.stack(edges)
+        mask = np.all(edges >= 0, axis=0) | np.all(edges <= 0, axis=0)
+
+        n = np.broadcast_to(np.arange(len(triangles))[:, None, None],
+                            mask.shape)[mask]
+        self._blend(canvas, index[n], py[mask], px[mask], rgba[n])
+
+    def _draw_segments(self, canvas, segments, rgba, index):
+        """Draw one-pixel wide line segments into the canvas.
+
+        Parameters
+        ----------
+        canvas : numpy.ndarray
+            batch_size x height x width x 3 array to draw in
+        segments : numpy.ndarray
+            N x 2 x 2 array of end points, in pixels
+        rgba : numpy.ndarray
+            N x 4 array of colors
+        index : numpy.ndarray
+            N array of the index of the frame of every segment
+        """
+        delta = segments[:, 1] - segments[:, 0]
+        num_steps = max(int(np.ceil(np.abs(delta).max())), 1) + 1
+        t = np.linspace(0, 1, num_steps)
+        points = segments[:, 0, np.newaxis] + \
+            t[np.newaxis, :, np.newaxis] * delta[:, np.newaxis]
+        pixels = np.floor(points).astype(int)
+
+        # only keep one sample per pixel of each segment
+        n = np.repeat(np.arange(len(segments)), num_steps)
+        keys = np.stack([n, pixels[..., 0].ravel(), pixels[..., 1].ravel()])
+        keys = np.unique(keys, axis=1)
+        n, px, py = keys
+        self._blend(canvas, index[n], py, px, rgba[n])
+
+    @staticmethod
+    def _truncate_colormap(cmap, minval=0.25, maxval=0.75, n=100):
+        """Truncate a matplotlib colormap.
+
+        Parameters
+        ----------
+        cmap : matplotlib.colors.LinearSegmentedColormap
+            Original colormap
+        minval : float
+            Minimum value of the truncated colormap
+        maxval : float
+            Maximum value of the truncated colormap
+        n : int
+            Number of RGB quantization levels of the truncated colormap
+
+        Returns
+        -------
+        matplotlib.colors.LinearSegmentedColormap
+            truncated colormap
+        """
+        new_cmap = colors.LinearSegmentedColormap.from_list(
+            'trunc({n},{a:.2f},{b:.2f})'
+            .format(n=cmap.name, a=minval, b=maxval),
+            cmap(np.linspace(minval, maxval, n)))
+        return new_cmap
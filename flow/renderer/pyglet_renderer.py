@@ -145,6 +145,15 @@ class PygletRenderer(object):
         self.y_shift = shift - self.sight_radius
         self.y_scale = scale
 
+        # colormaps used by the dynamic rendering modes
+        if self.mode == "drgb":
+            self._human_cmap = self._truncate_colormap(cm.Greens, 0.2, 0.8)
+            self._machine_cmap = self._truncate_colormap(cm.Blues, 0.2, 0.8)
+        elif self.mode == "dgray":
+            self._human_cmap = self._truncate_colormap(cm.binary, 0.55, 0.95)
+            self._machine_cmap = self._truncate_colormap(
+                cm.binary, 0.05, 0.45)
+
         self.lane_colors = []
         for lane_poly in self.lane_polys:
             lane_poly[::2] = [(x-self.x_shift)*self.x_scale*self.pxpm
@@ -212,14 +221,6 @@ class PygletRenderer(object):
             A list contains the timestep (ms), timedelta (ms), and id of
             all RL vehicles
         """
-        if self.save_render:
-            _human_orientations = copy.deepcopy(human_orientations)
-            _machine_orientations = copy.deepcopy(machine_orientations)
-            _human_dynamics = copy.deepcopy(human_dynamics)
-            _machine_dynamics = copy.deepcopy(machine_dynamics)
-            _human_logs = copy.deepcopy(human_logs)
-            _machine_logs = copy.deepcopy(machine_logs)
-
         self.time += 1
 
         pyglet.gl.glClearColor(0.125, 0.125, 0.125, self.alpha)
@@ -227,33 +228,15 @@ class PygletRenderer(object):
         self.window.switch_to()
         self.window.dispatch_events()
 
-        self.lane_batch = pyglet.graphics.Batch()
-        self._add_lane_polys()
+        # the road network does not change, so the lane batch created during
+        # initialization is drawn again
         self.lane_batch.draw()
         self.vehicle_batch = pyglet.graphics.Batch()
-        if "drgb" in self.mode:
-            human_cmap = self._truncate_colormap(cm.Greens, 0.2, 0.8)
-            machine_cmap = self._truncate_colormap(cm.Blues, 0.2, 0.8)
-            human_conditions = [
-                (255*np.array(human_cmap(d)[:3]+(self.alpha,)))
-                .astype(np.uint8).tolist()
-                for d in human_dynamics]
-            machine_conditions = [
-                (255*np.array(machine_cmap(d)[:3]+(self.alpha,)))
-                .astype(np.uint8).tolist()
-                for d in machine_dynamics]
-
-        elif "dgray" in self.mode:
-            human_cmap = self._truncate_colormap(cm.binary, 0.55, 0.95)
-            machine_cmap = self._truncate_colormap(cm.binary, 0.05, 0.45)
-            human_conditions = [
-                (255*np.array(human_cmap(d)[:3]+(self.alpha,)))
-                .astype(np.uint8).tolist()
-                for d in human_dynamics]
-            machine_conditions = [
-                (255*np.array(machine_cmap(d)[:3]+(self.alpha,)))
-                .astype(np.uint8).tolist()
-                for d in machine_dynamics]
+        if self.mode in ["drgb", "dgray"]:
+            human_conditions = self._cmap_colors(
+                self._human_cmap, human_dynamics)
+            machine_conditions = self._cmap_colors(
+                self._machine_cmap, machine_dynamics)
 
         elif "rgb" in self.mode:
             human_conditions = [
@@ -295,9 +278,14 @@ class PygletRenderer(object):
         if self.save_render:
             cv2.imwrite("%s/frame_%06d.png" %
                         (self.path, self.time), self.frame)
-            self.data.append([_human_orientations, _machine_orientations,
-                              _human_dynamics, _machine_dynamics,
-                              _human_logs, _machine_logs])
+            # the environment creates new lists at every frame, so only the
+            # outer lists are copied
+            self.data.append([list(human_orientations),
+                              list(machine_orientations),
+                              list(human_dynamics),
+                              list(machine_dynamics),
+                              list(human_logs),
+                              list(machine_logs)])
         if "gray" in self.mode:
             return self.frame[:, :, 0]
         else:
@@ -351,6 +339,30 @@ class PygletRenderer(object):
         else:
             return rotated_sight
 
+    def get_sights(self, orientations, veh_ids):
+        """Return the local observations of a set of vehicles.
+
+        Parameters
+        ----------
+        orientations : array_like
+            the [x, y, angle] orientation of every vehicle
+        veh_ids : list of str
+            the vehicles to observe for
+
+        Returns
+        -------
+        numpy.ndarray
+            the sights of all vehicles, stacked along the first axis
+        """
+        sights = [self.get_sight(orientation, veh_id)
+                  for orientation, veh_id in zip(orientations, veh_ids)]
+        if len(sights) > 0:
+            return np.stack(sights)
+
+        side = int(2 * self.sight_radius * self.pxpm)
+        shape = (0, side, side) if "gray" in self.mode else (0, side, side, 3)
+        return np.zeros(shape, dtype=np.uint8)
+
     def _add_lane_polys(self):
         """Render road network polygons."""
         for lane_poly, lane_color in zip(self.lane_polys, self.lane_colors):
@@ -459,6 +471,27 @@ class PygletRenderer(object):
             pxpm, pyglet.gl.GL_LINE_LOOP, group, index,
             ("v2f", vertex_list), ("c4B", vertex_color))
 
+    def _cmap_colors(self, cmap, dynamics):
+        """Return the [r, g, b, a] colors of vehicles from a colormap.
+
+        Parameters
+        ----------
+        cmap : matplotlib.colors.LinearSegmentedColormap
+            colormap used to color the vehicles
+        dynamics : list
+            normalized speeds of the vehicles
+
+        Returns
+        -------
+        list of list
+            the color of every vehicle
+        """
+        if len(dynamics) == 0:
+            return []
+        color = cmap(np.asarray(dynamics, dtype=np.float64))
+        color[:, 3] = self.alpha
+        return (255*color).astype(np.uint8).tolist()
+
     @staticmethod
     def _truncate_colormap(cmap, minval=0.25, maxval=0.75, n=100):
         """Truncate a matplotlib colormap.
@@ -0,0 +1,52 @@
+"""Utility methods for deferring the import of the members of a package.
+
+Packages that expose a large number of classes (e.g. ``flow.envs``) can list
+the module every class is defined in, and only import that module the first
+time the class is accessed:
+
+>>> __getattr__, __dir__ = lazy_import(__name__, {
+>>>     'AccelEnv': 'flow.envs.ring.accel',
+>>> })
+
+This keeps the startup time of processes that only use a few of these
+classes (e.g. RLlib workers) low, and avoids loading optional dependencies,
+such as the renderer, unless they are needed.
+"""
+
+import importlib
+import sys
+
+
+def lazy_import(package, members):
+    """Return the module-level ``__getattr__`` and ``__dir__`` of a package.
+
+    Parameters
+    ----------
+    package : str
+        name of the package whose members are lazily imported
+    members : dict of str
+        the module that defines each lazily imported member, keyed by the
+        name of the member
+
+    Returns
+    -------
+    function
+        module-level ``__getattr__`` method, importing a member on first
+        access and caching it in the package's namespace
+    function
+        module-level ``__dir__`` method, listing the lazy members as well
+    """
+    def __getattr__(name):
+        try:
+            module = members[name]
+        except KeyError:
+            raise AttributeError("module {!r} has no attribute {!r}".format(
+                package, name)) from None
+        value = getattr(importlib.import_module(module), name)
+        setattr(sys.modules[package], name, value)
+        return value
+
+    def __dir__():
+        return sorted(set(vars(sys.modules[package])) | set(members))
+
+    return __getattr__, __dir__
@@ -3,7 +3,7 @@
 import gym
 from gym.envs.registration import register
 
-from copy import deepcopy
+from copy import copy
 
 import flow.envs
 from flow.core.params import InitialConfig
@@ -88,8 +88,8 @@ def make_create_env(params, version=0, render=None):
     traffic_lights = params.get("tls", TrafficLightParams())
 
     def create_env(*_):
-        sim_params = deepcopy(params['sim'])
-        vehicles = deepcopy(params['veh'])
+        sim_params = copy(params['sim'])
+        vehicles = params['veh'].copy()
 
         network = network_class(
             name=exp_tag,
@@ -0,0 +1,561 @@
+"""Vectorized environments for stepping many simulators concurrently.
+
+Every Flow environment spends most of a step blocked on the round-trip to
+its simulator (``simulationStep`` over the TraCI socket). This module
+contains two vectorized environments that overlap these round-trips:
+
+* FlowVecEnv owns several environments within a single Python process and
+  issues the step of every environment before collecting any of the results,
+  so that the simulator processes advance in parallel while the Python side
+  waits on their sockets.
+* SharedMemoryVecEnv runs every environment in a worker process, for when the
+  Python side of the environments is the bottleneck. Observations, actions,
+  rewards, and done masks are exchanged through shared memory, and only small
+  control messages travel through the pipes to the workers.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import Pipe, Process, resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+from gym.spaces.box import Box
+
+try:
+    from stable_baselines.common.vec_env import VecEnv
+except ImportError:
+    VecEnv = object
+
+
+class FlowVecEnv(VecEnv):
+    """Vectorized environment that steps N Flow environments in lockstep.
+
+    The environments are created within the calling process. On every call to
+    ``step_async``, the step of each environment is submitted to a thread
+    pool. Since waiting on the simulator socket releases the GIL, the N
+    simulators compute their next state concurrently, and only the (much
+    cheaper) Python-side kernel updates are serialized.
+
+    Environments whose rollout terminated are automatically reset. Following
+    the stable-baselines convention, the last observation of the terminated
+    rollout is stored under the "terminal_observation" key of its info dict.
+
+    If stable-baselines is installed, this class subclasses its ``VecEnv``
+    object and can be passed directly to its algorithms.
+
+    Usage
+    -----
+    >>> from flow.utils.registry import env_constructor
+    >>> from flow.utils.vec_env import FlowVecEnv
+    >>>
+    >>> env = FlowVecEnv([env_constructor(params=flow_params, version=i)
+    >>>                   for i in range(4)])
+    >>> obs = env.reset()  # of shape (4,) + observation_space.shape
+    >>> obs, rewards, dones, infos = env.step(actions)
+
+    Attributes
+    ----------
+    envs : list of flow.envs.Env
+        the environments stepped by this object
+    num_envs : int
+        number of environments
+    observation_space : gym.spaces.*
+        observation space of a single environment
+    action_space : gym.spaces.*
+        action space of a single environment
+    """
+
+    def __init__(self, env_fns, num_threads=None):
+        """Instantiate the vectorized environment.
+
+        Parameters
+        ----------
+        env_fns : list of callable
+            methods that create the environments when called with no
+            arguments, e.g. as returned by flow.utils.registry.env_constructor
+        num_threads : int, optional
+            number of threads used to step the environments. Defaults to one
+            thread per environment.
+        """
+        self.envs = [env_fn() for env_fn in env_fns]
+        env = self.envs[0]
+
+        if VecEnv is object:
+            self.num_envs = len(self.envs)
+            self.observation_space = env.observation_space
+            self.action_space = env.action_space
+        else:
+            VecEnv.__init__(self, len(self.envs), env.observation_space,
+                            env.action_space)
+
+        self._pool = ThreadPoolExecutor(
+            max_workers=num_threads or len(self.envs))
+        self._futures = None
+
+    def reset(self):
+        """Reset all environments concurrently.
+
+        Returns
+        -------
+        np.ndarray
+            the stacked initial observation of every environment
+        """
+        obs = list(self._pool.map(lambda env: env.reset(), self.envs))
+        return np.stack([np.asarray(ob) for ob in obs])
+
+    def step_async(self, actions):
+        """Submit the step of every environment without waiting on them.
+
+        Parameters
+        ----------
+        actions : array_like
+            the actions of every environment, indexed along the first axis
+        """
+        self._futures = [
+            self._pool.submit(self._step_env, env, action)
+            for env, action in zip(self.envs, actions)
+        ]
+
+    def step_wait(self):
+        """Wait for the steps submitted by ``step_async`` to complete.
+
+        Returns
+        -------
+        np.ndarray
+            the stacked observations
+        np.ndarray
+            the rewards of every environment
+        np.ndarray
+            the done masks of every environment
+        list of dict
+            the info dicts of every environment
+        """
+        results = [future.result() for future in self._futures]
+        self._futures = None
+        obs, rews, dones, infos = zip(*results)
+        return (np.stack(obs), np.asarray(rews, dtype=np.float64),
+                np.asarray(dones, dtype=np.bool_), list(infos))
+
+    def step(self, actions):
+        """Advance all environments by one step.
+
+        See ``step_wait`` for a description of the returned values.
+        """
+        self.step_async(actions)
+        return self.step_wait()
+
+    def close(self):
+        """Terminate all environments and the thread pool."""
+        if self._futures is not None:
+            for future in self._futures:
+                future.result()
+            self._futures = None
+        self._pool.shutdown(wait=True)
+        for env in self.envs:
+            env.terminate()
+
+    def get_attr(self, attr_name, indices=None):
+        """Return an attribute from the environments at the given indices."""
+        return [getattr(self.envs[i], attr_name)
+                for i in self._get_indices(indices)]
+
+    def set_attr(self, attr_name, value, indices=None):
+        """Set an attribute of the environments at the given indices."""
+        for i in self._get_indices(indices):
+            setattr(self.envs[i], attr_name, value)
+
+    def env_method(self, method_name, *method_args, indices=None,
+                   **method_kwargs):
+        """Call a method of the environments at the given indices."""
+        return [getattr(self.envs[i], method_name)(
+                    *method_args, **method_kwargs)
+                for i in self._get_indices(indices)]
+
+    def seed(self, seed=None):
+        """Seed the simulators, offsetting the seed by the env index.
+
+        The new seeds take effect the next time the simulation of each
+        environment is restarted.
+        """
+        seeds = [None if seed is None else seed + i
+                 for i in range(self.num_envs)]
+        for env, env_seed in zip(self.envs, seeds):
+            env.sim_params.seed = env_seed
+        return seeds
+
+    def get_images(self):
+        """Return the last rendered frame of every environment."""
+        return [getattr(env, "frame", None) for env in self.envs]
+
+    def _get_indices(self, indices):
+        """Convert the indices argument into a list of integers."""
+        if indices is None:
+            return range(self.num_envs)
+        elif isinstance(indices, int):
+            return [indices]
+        return indices
+
+    @staticmethod
+    def _step_env(env, action):
+        """Step a single environment, resetting it if the rollout is done."""
+        obs, reward, done, info = env.step(action)
+        obs = np.asarray(obs)
+        if done:
+            info = dict(info or {})
+            info["terminal_observation"] = obs
+            obs = np.asarray(env.reset())
+        return obs, reward, done, info
+
+
+class SharedMemoryVecEnv(VecEnv):
+    """Vectorized environment that steps Flow environments in worker processes.
+
+    Each environment is created and stepped in its own process. The
+    observations, actions, rewards, and done masks of all environments are
+    stored in ``multiprocessing.shared_memory`` blocks sized from the
+    observation and action spaces of the environments, so that they do not
+    need to be pickled through the pipes to the workers. This matters most for
+    image observations (e.g. from the "drgb" renderer), which would otherwise
+    be copied several times per step.
+
+    The shared buffers form a ring of ``ring_size`` slots: the arrays returned
+    by ``reset`` and ``step_wait`` are views of the current slot, and remain
+    valid until ``ring_size - 1`` further steps have been performed, after
+    which the slot is overwritten. Copy the arrays if they need to be kept for
+    longer.
+
+    Environments whose rollout terminated are automatically reset. The last
+    observation of the terminated rollout is stored under the
+    "terminal_observation" key of its info dict.
+
+    Only environments with Box observation and action spaces are supported.
+
+    Attributes
+    ----------
+    num_envs : int
+        number of environments
+    observation_space : gym.spaces.Box
+        observation space of a single environment
+    action_space : gym.spaces.Box
+        action space of a single environment
+    ring_size : int
+        number of slots in the shared buffers
+    """
+
+    def __init__(self, env_fns, ring_size=2):
+        """Instantiate the vectorized environment and start the workers.
+
+        Parameters
+        ----------
+        env_fns : list of callable
+            methods that create the environments when called with no
+            arguments, e.g. as returned by flow.utils.registry.env_constructor
+        ring_size : int, optional
+            number of slots in the shared buffers, see class definition
+
+        Raises
+        ------
+        ValueError
+            if the observation or action space of the environments is not a
+            Box space
+        """
+        num_envs = len(env_fns)
+
+        # the resource tracker is started before the workers, so that it is
+        # shared by the workers whatever the start method is, and the shared
+        # memory blocks are only unlinked by this process
+        resource_tracker.ensure_running()
+
+        # start the workers, which report the spaces of their environment
+        self._remotes = []
+        self._processes = []
+        for env_fn in env_fns:
+            remote, work_remote = Pipe()
+            # the methods are wrapped so that lambdas and closures (e.g. the
+            # outputs of env_constructor) can be sent to spawned processes
+            process = Process(
+                target=_shared_memory_worker,
+                args=(work_remote, remote, CloudpickleWrapper(env_fn)),
+                daemon=True)
+            process.start()
+            work_remote.close()
+            self._remotes.append(remote)
+            self._processes.append(process)
+
+        observation_space, action_space = self._remotes[0].recv()
+        for remote in self._remotes[1:]:
+            remote.recv()
+
+        if VecEnv is object:
+            self.num_envs = num_envs
+            self.observation_space = observation_space
+            self.action_space = action_space
+        else:
+            VecEnv.__init__(self, num_envs, observation_space, action_space)
+
+        self.ring_size = ring_size
+        self._slot = 0
+        self._waiting = False
+        self._closed = False
+        self._shm = {}
+        self._buffers = {}
+
+        for space in (observation_space, action_space):
+            if not isinstance(space, Box):
+                self.close()
+                raise ValueError(
+                    "SharedMemoryVecEnv only supports Box spaces, got {}."
+                    .format(type(space).__name__))
+
+        # create the shared buffers and pass them to the workers
+        specs = {
+            "obs": ((ring_size, num_envs) + observation_space.shape,
+                    observation_space.dtype),
+            "actions": ((num_envs,) + action_space.shape,
+                        action_space.dtype),
+            "rewards": ((ring_size, num_envs), np.float64),
+            "dones": ((ring_size, num_envs), np.bool_),
+        }
+        for key, (shape, dtype) in specs.items():
+            size = max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1)
+            self._shm[key] = SharedMemory(create=True, size=size)
+            self._buffers[key] = np.ndarray(
+                shape, dtype=dtype, buffer=self._shm[key].buf)
+
+        shm_names = {key: shm.name for key, shm in self._shm.items()}
+        for i, remote in enumerate(self._remotes):
+            remote.send(("attach", (i, shm_names, specs)))
+        for remote in self._remotes:
+            remote.recv()
+
+    def reset(self):
+        """Reset all environments.
+
+        Returns
+        -------
+        np.ndarray
+            the stacked initial observation of every environment
+        """
+        self._slot = (self._slot + 1) % self.ring_size
+        for remote in self._remotes:
+            remote.send(("reset", self._slot))
+        for remote in self._remotes:
+            remote.recv()
+        return self._buffers["obs"][self._slot]
+
+    def step_async(self, actions):
+        """Write the actions to shared memory and notify the workers.
+
+        Parameters
+        ----------
+        actions : array_like
+            the actions of every environment, indexed along the first axis
+        """
+        self._buffers["actions"][:] = np.reshape(
+            actions, self._buffers["actions"].shape)
+        self._slot = (self._slot + 1) % self.ring_size
+        for remote in self._remotes:
+            remote.send(("step", self._slot))
+        self._waiting = True
+
+    def step_wait(self):
+        """Wait for the workers to complete the step.
+
+        Returns
+        -------
+        np.ndarray
+            the stacked observations
+        np.ndarray
+            the rewards of every environment
+        np.ndarray
+            the done masks of every environment
+        list of dict
+            the info dicts of every environment
+        """
+        infos = [remote.recv() for remote in self._remotes]
+        self._waiting = False
+        return (self._buffers["obs"][self._slot],
+                self._buffers["rewards"][self._slot],
+                self._buffers["dones"][self._slot],
+                infos)
+
+    def step(self, actions):
+        """Advance all environments by one step.
+
+        See ``step_wait`` for a description of the returned values.
+        """
+        self.step_async(actions)
+        return self.step_wait()
+
+    def close(self):
+        """Terminate the workers and release the shared memory."""
+        if self._closed:
+            return
+        if self._waiting:
+            for remote in self._remotes:
+                remote.recv()
+        for remote in self._remotes:
+            remote.send(("close", None))
+        for process in self._processes:
+            process.join()
+
+        # release the views before closing the underlying memory
+        self._buffers.clear()
+        for shm in self._shm.values():
+            shm.close()
+            shm.unlink()
+        self._closed = True
+
+    def get_attr(self, attr_name, indices=None):
+        """Return an attribute from the environments at the given indices."""
+        return self._call("get_attr", (attr_name,), indices)
+
+    def set_attr(self, attr_name, value, indices=None):
+        """Set an attribute of the environments at the given indices."""
+        self._call("set_attr", (attr_name, value), indices)
+
+    def env_method(self, method_name, *method_args, indices=None,
+                   **method_kwargs):
+        """Call a method of the environments at the given indices."""
+        return self._call(
+            "env_method", (method_name, method_args, method_kwargs), indices)
+
+    def seed(self, seed=None):
+        """Seed the simulators, offsetting the seed by the env index.
+
+        The new seeds take effect the next time the simulation of each
+        environment is restarted.
+        """
+        seeds = [None if seed is None else seed + i
+                 for i in range(self.num_envs)]
+        for i, env_seed in enumerate(seeds):
+            self._call("set_seed", (env_seed,), [i])
+        return seeds
+
+    def get_images(self):
+        """Return the last rendered frame of every environment."""
+        return self._call("get_attr", ("frame", None), None)
+
+    def _call(self, cmd, data, indices):
+        """Send a control message to the workers at the given indices."""
+        if indices is None:
+            indices = range(self.num_envs)
+        elif isinstance(indices, int):
+            indices = [indices]
+        remotes = [self._remotes[i] for i in indices]
+        for remote in remotes:
+            remote.send((cmd, data))
+        return [remote.recv() for remote in remotes]
+
+
+class CloudpickleWrapper(object):
+    """Callable wrapper serializing the wrapped method with cloudpickle.
+
+    The standard pickle module cannot serialize lambdas and closures, which
+    are sent to the worker processes when they are started with the "spawn"
+    or "forkserver" start methods (the default start method on macOS and
+    Windows). Nothing is serialized with the "fork" start method.
+
+    Attributes
+    ----------
+    fn : callable
+        the wrapped method
+    """
+
+    def __init__(self, fn):
+        """Instantiate the wrapper.
+
+        Parameters
+        ----------
+        fn : callable
+            the wrapped method
+        """
+        self.fn = fn
+
+    def __call__(self, *args, **kwargs):
+        """Call the wrapped method."""
+        return self.fn(*args, **kwargs)
+
+    def __getstate__(self):
+        """Serialize the wrapped method with cloudpickle."""
+        try:
+            from ray import cloudpickle
+        except ImportError:
+            import cloudpickle
+        return cloudpickle.dumps(self.fn)
+
+    def __setstate__(self, state):
+        """Deserialize the wrapped method."""
+        import pickle
+        self.fn = pickle.loads(state)
+
+
+def _shared_memory_worker(remote, parent_remote, env_fn):
+    """Run a single environment on behalf of a SharedMemoryVecEnv.
+
+    The worker first sends the observation and action spaces of its
+    environment, and then waits for an "attach" message containing its index
+    and the names, shapes, and dtypes of the shared buffers.
+
+    Parameters
+    ----------
+    remote : multiprocessing.connection.Connection
+        end of the pipe used to communicate with the vectorized environment
+    parent_remote : multiprocessing.connection.Connection
+        end of the pipe held by the vectorized environment, closed here
+    env_fn : callable
+        method that creates the environment
+    """
+    parent_remote.close()
+
+    env = env_fn()
+    remote.send((env.observation_space, env.action_space))
+
+    index = None
+    shm = {}
+    buffers = {}
+    try:
+        while True:
+            cmd, data = remote.recv()
+            if cmd == "step":
+                obs, reward, done, info = env.step(
+                    buffers["actions"][index])
+                if done:
+                    info = dict(info or {})
+                    info["terminal_observation"] = np.asarray(obs)
+                    obs = env.reset()
+                buffers["obs"][data, index] = obs
+                buffers["rewards"][data, index] = reward
+                buffers["dones"][data, index] = done
+                remote.send(info)
+            elif cmd == "reset":
+                buffers["obs"][data, index] = env.reset()
+                remote.send(None)
+            elif cmd == "attach":
+                index, shm_names, specs = data
+                for key, name in shm_names.items():
+                    shape, dtype = specs[key]
+                    # the blocks are owned (and unlinked) by the vectorized
+                    # environment, and the resource tracker is shared with it
+                    shm[key] = SharedMemory(name=name)
+                    buffers[key] = np.ndarray(
+                        shape, dtype=dtype, buffer=shm[key].buf)
+                remote.send(None)
+            elif cmd == "get_attr":
+                remote.send(getattr(env, *data))
+            elif cmd == "set_attr":
+                remote.send(setattr(env, *data))
+            elif cmd == "env_method":
+                name, args, kwargs = data
+                remote.send(getattr(env, name)(*args, **kwargs))
+            elif cmd == "set_seed":
+                env.sim_params.seed = data[0]
+                remote.send(None)
+            elif cmd == "close":
+                break
+    finally:
+        env.terminate()
+        remote.close()
+        buffers.clear()
+        for block in shm.values():
+            block.close()
@@ -67,14 +67,16 @@ def get_capacity_data(data):
     as_array
         std deviation of outflow at given inflow
     """
-    unique_vals = sorted(list(set(data['inflows'])))
-    sorted_outflows = {inflow: [] for inflow in unique_vals}
-
-    for inflow, outlfow in zip(data['inflows'], data['outflows']):
-        sorted_outflows[inflow].append(outlfow)
-
-    mean = np.asarray([np.mean(sorted_outflows[val]) for val in unique_vals])
-    std = np.asarray([np.std(sorted_outflows[val]) for val in unique_vals])
+    inflows = np.asarray(data['inflows'], dtype=float)
+    outflows = np.asarray(data['outflows'], dtype=float)
+
+    # group the outflows by inflow, and compute the statistics of every group
+    unique_vals, groups, counts = np.unique(
+        inflows, return_inverse=True, return_counts=True)
+    groups = groups.ravel()
+    mean = np.bincount(groups, weights=outflows) / counts
+    std = np.sqrt(np.bincount(
+        groups, weights=(outflows - mean[groups]) ** 2) / counts)
 
     return unique_vals, mean, std
 
@@ -13,7 +13,10 @@ parser : ArgumentParser
 """
 
 import argparse
+from copy import copy
 import gym
+import multiprocessing
+from multiprocessing.util import Finalize
 import numpy as np
 import os
 import sys
@@ -40,15 +43,34 @@ example usage:
 Here the arguments are:
 1 - the path to the simulation results
 2 - the number of the checkpoint
+
+To evaluate several checkpoints without rendering, over 4 processes:
+    python ./visualizer_rllib.py /ray_results/experiment_dir/result_dir all \
+        --headless --num_workers 4 --num_rollouts 8
 """
 
 
-def visualizer_rllib(args):
-    """Visualizer for RLlib experiments.
-
-    This function takes args (see function create_parser below for
-    more detailed information on what information can be fed to this
-    visualizer), and renders the experiment associated with it.
+def restore_agent(args, headless=False):
+    """Restore the agent and environment of an RLlib experiment.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        command-line arguments, see create_parser
+    headless : bool, optional
+        whether to disable rendering and emission outputs, regardless of the
+        render_mode, save_render and gen_emission arguments
+
+    Returns
+    -------
+    ray.rllib.agents.Trainer
+        the agent, restored from the requested checkpoint
+    gym.Env
+        the environment the agent is evaluated on
+    dict
+        the RLlib configuration of the experiment
+    bool
+        whether the environment is a multi-agent environment
     """
     result_dir = args.result_dir if args.result_dir[-1] != '/' \
         else args.result_dir[:-1]
@@ -106,7 +128,11 @@ def visualizer_rllib(args):
     sim_params.emission_path = emission_path if args.gen_emission else None
 
     # pick your rendering mode
-    if args.render_mode == 'sumo_web3d':
+    if headless:
+        sim_params.render = False
+        sim_params.save_render = False
+        sim_params.emission_path = None
+    elif args.render_mode == 'sumo_web3d':
         sim_params.num_clients = 2
         sim_params.render = False
     elif args.render_mode == 'drgb':
@@ -116,7 +142,7 @@ def visualizer_rllib(args):
         sim_params.render = False  # will be set to True below
     elif args.render_mode == 'no_render':
         sim_params.render = False
-    if args.save_render:
+    if args.save_render and not headless:
         if args.render_mode != 'sumo_gui':
             sim_params.render = 'drgb'
             sim_params.pxpm = 4
@@ -160,39 +186,170 @@ def visualizer_rllib(args):
     else:
         env = gym.make(env_name)
 
-    if args.render_mode == 'sumo_gui':
+    if args.render_mode == 'sumo_gui' and not headless:
         env.sim_params.render = True  # set to True after initializing agent and env
 
+    # if restart_instance, don't restart here because env.reset will restart later
+    if not sim_params.restart_instance:
+        env.restart_simulation(sim_params=sim_params, render=sim_params.render)
+
+    return agent, env, config, multiagent
+
+
+def compute_actions(agent, config, observations):
+    """Compute the actions of all agents in a step of a multi-agent env.
+
+    The observations of all agents sharing a policy are processed in a single
+    batched call to the policy, instead of one call per agent.
+
+    Parameters
+    ----------
+    agent : ray.rllib.agents.Trainer
+        the agent computing the actions
+    config : dict
+        the RLlib configuration of the experiment
+    observations : dict
+        observation of every agent
+
+    Returns
+    -------
+    dict
+        action of every agent
+    """
+    policy_map_fn = config['multiagent']['policy_mapping_fn']
+    if hasattr(agent, 'workers'):
+        worker = agent.workers.local_worker()
+    else:
+        worker = agent.local_evaluator
+
+    # group the agents by policy
+    agent_ids = {}
+    for agent_id in observations.keys():
+        agent_ids.setdefault(policy_map_fn(agent_id), []).append(agent_id)
+
+    actions = {}
+    for policy_id, ids in agent_ids.items():
+        preprocessor = worker.preprocessors[policy_id]
+        obs_filter = worker.filters[policy_id]
+        obs_batch = np.stack([
+            obs_filter(preprocessor.transform(observations[agent_id]),
+                       update=False)
+            for agent_id in ids])
+
+        policy = agent.get_policy(policy_id)
+        batch, _, _ = policy.compute_actions(obs_batch)
+
+        action_space = policy.action_space
+        if config.get('clip_actions', True) and \
+                isinstance(action_space, gym.spaces.Box):
+            batch = np.clip(batch, action_space.low, action_space.high)
+        actions.update(zip(ids, batch))
+
+    return actions
+
+
+def rollout(agent, env, config, multiagent, horizon):
+    """Perform a rollout of an agent, and collect its metrics.
+
+    Parameters
+    ----------
+    agent : ray.rllib.agents.Trainer
+        the agent computing the actions
+    env : gym.Env
+        the environment the agent is evaluated on
+    config : dict
+        the RLlib configuration of the experiment
+    multiagent : bool
+        whether the environment is a multi-agent environment
+    horizon : int
+        maximum number of steps of the rollout
+
+    Returns
+    -------
+    dict
+        * return: the return of the rollout, or a dictionary of returns
+          keyed by policy for multi-agent environments
+        * mean_speed: the mean speed of vehicles during the rollout
+        * std_speed: the std of the speed of vehicles during the rollout
+        * outflow: the outflow rate in the last 500 sec, in veh/hr
+        * inflow: the inflow rate in the last 500 sec, in veh/hr
+    """
+    use_lstm = config['model']['use_lstm']
     if multiagent:
-        rets = {}
         # map the agent id to its policy
         policy_map_fn = config['multiagent']['policy_mapping_fn']
-        for key in config['multiagent']['policies'].keys():
-            rets[key] = []
+        ret = {key: 0 for key in config['multiagent']['policies'].keys()}
+        # recurrent state of every agent
+        state_init = {}
     else:
-        rets = []
-
-    if config['model']['use_lstm']:
-        use_lstm = True
-        if multiagent:
-            state_init = {}
-            # map the agent id to its policy
-            policy_map_fn = config['multiagent']['policy_mapping_fn']
-            size = config['model']['lstm_cell_size']
-            for key in config['multiagent']['policies'].keys():
-                state_init[key] = [np.zeros(size, np.float32),
-                                   np.zeros(size, np.float32)]
-        else:
+        ret = 0
+        if use_lstm:
             state_init = [
                 np.zeros(config['model']['lstm_cell_size'], np.float32),
                 np.zeros(config['model']['lstm_cell_size'], np.float32)
             ]
-    else:
-        use_lstm = False
 
-    # if restart_instance, don't restart here because env.reset will restart later
-    if not sim_params.restart_instance:
-        env.restart_simulation(sim_params=sim_params, render=sim_params.render)
+    vel = []
+    state = env.reset()
+    vehicles = env.unwrapped.k.vehicle
+    for _ in range(horizon):
+        speeds = vehicles.get_speed(vehicles.get_ids())
+
+        # only include non-empty speeds
+        if len(speeds) > 0:
+            vel.append(np.mean(speeds))
+
+        if multiagent and use_lstm:
+            action = {}
+            size = config['model']['lstm_cell_size']
+            for agent_id in state.keys():
+                if agent_id not in state_init:
+                    state_init[agent_id] = [np.zeros(size, np.float32),
+                                            np.zeros(size, np.float32)]
+                action[agent_id], state_init[agent_id], _ = \
+                    agent.compute_action(
+                        state[agent_id], state=state_init[agent_id],
+                        policy_id=policy_map_fn(agent_id))
+        elif multiagent:
+            action = compute_actions(agent, config, state)
+        elif use_lstm:
+            action, state_init, _ = agent.compute_action(
+                state, state=state_init)
+        else:
+            action = agent.compute_action(state)
+        state, reward, done, _ = env.step(action)
+        if multiagent:
+            for actor, rew in reward.items():
+                ret[policy_map_fn(actor)] += rew
+        else:
+            ret += reward
+        if multiagent and done['__all__']:
+            break
+        if not multiagent and done:
+            break
+
+    return {
+        'return': ret,
+        'mean_speed': np.mean(vel),
+        'std_speed': np.std(vel),
+        'outflow': vehicles.get_outflow_rate(500),
+        'inflow': vehicles.get_inflow_rate(500),
+    }
+
+
+def visualizer_rllib(args):
+    """Visualizer for RLlib experiments.
+
+    This function takes args (see function create_parser below for
+    more detailed information on what information can be fed to this
+    visualizer), and renders the experiment associated with it.
+    """
+    agent, env, config, multiagent = restore_agent(args)
+
+    if multiagent:
+        rets = {key: [] for key in config['multiagent']['policies'].keys()}
+    else:
+        rets = []
 
     # Simulate and collect metrics
     final_outflows = []
@@ -201,61 +358,24 @@ def visualizer_rllib(args):
     std_speed = []
 
     for i in range(args.num_rollouts):
-        vel = []
-        acc = []
-        state = env.reset()
-        if multiagent:
-            ret = {key: [0] for key in rets.keys()}
-        else:
-            ret = 0
-        for _ in range(env_params.horizon):
-            vehicles = env.unwrapped.k.vehicle
-            speeds = vehicles.get_speed(vehicles.get_ids())
-
-            # only include non-empty speeds
-            if speeds:
-                vel.append(np.mean(speeds))
-
-            if multiagent:
-                action = {}
-                for agent_id in state.keys():
-                    if use_lstm:
-                        action[agent_id], state_init[agent_id], logits = \
-                            agent.compute_action(
-                            state[agent_id], state=state_init[agent_id],
-                            policy_id=policy_map_fn(agent_id))
-                    else:
-                        action[agent_id] = agent.compute_action(
-                            state[agent_id], policy_id=policy_map_fn(agent_id))
-            else:
-                action = agent.compute_action(state)
-            state, reward, done, _ = env.step(action)
-            if multiagent:
-                for actor, rew in reward.items():
-                    ret[policy_map_fn(actor)][0] += rew
-            else:
-                ret += reward
-            if multiagent and done['__all__']:
-                break
-            if not multiagent and done:
-                break
+        info = rollout(agent, env, config, multiagent,
+                       env.unwrapped.env_params.horizon)
+        ret = info['return']
 
         if multiagent:
             for key in rets.keys():
                 rets[key].append(ret[key])
         else:
             rets.append(ret)
-        outflow = vehicles.get_outflow_rate(500)
-        final_outflows.append(outflow)
-        inflow = vehicles.get_inflow_rate(500)
-        final_inflows.append(inflow)
+        final_outflows.append(info['outflow'])
+        final_inflows.append(info['inflow'])
         if np.all(np.array(final_inflows) > 1e-5):
             throughput_efficiency = [x / y for x, y in
                                      zip(final_outflows, final_inflows)]
         else:
             throughput_efficiency = [0] * len(final_inflows)
-        mean_speed.append(np.mean(vel))
-        std_speed.append(np.std(vel))
+        mean_speed.append(info['mean_speed'])
+        std_speed.append(info['std_speed'])
         if multiagent:
             for agent_id, rew in rets.items():
                 print('Round {}, Return: {} for agent {}'.format(
@@ -326,6 +446,134 @@ def visualizer_rllib(args):
         os.remove(emission_path)
 
 
+# agent and environment of the current evaluation worker
+_worker = {}
+
+
+def _init_worker(args):
+    """Restore the agent and environment of an evaluation worker.
+
+    The environment is terminated by the finalizer stored under "close",
+    which is called when the worker process exits or, in the current
+    process, explicitly once the rollouts are done.
+    """
+    if not ray.is_initialized():
+        ray.init(num_cpus=1)
+    _worker['agent'], _worker['env'], _worker['config'], \
+        _worker['multiagent'] = restore_agent(args, headless=True)
+    _worker['close'] = Finalize(
+        _worker['env'], _worker['env'].unwrapped.terminate, exitpriority=10)
+
+
+def _evaluate_rollout(_):
+    """Perform a rollout in an evaluation worker."""
+    env = _worker['env']
+    return rollout(_worker['agent'], env, _worker['config'],
+                   _worker['multiagent'], env.unwrapped.env_params.horizon)
+
+
+def evaluate_rllib(args, num_workers=1):
+    """Evaluate an RLlib checkpoint without rendering.
+
+    The rollouts are distributed over a pool of processes, each of which
+    restores the agent and environment once. Rendering and emission outputs
+    are disabled.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        command-line arguments, see create_parser
+    num_workers : int, optional
+        number of worker processes. If set to 1, the rollouts are performed
+        in the current process.
+
+    Returns
+    -------
+    dict
+        the per-rollout values ("returns", "mean_speed", "outflow", "inflow"
+        and "throughput_efficiency"), and the mean and std of each of them
+        (e.g. "mean_speed_mean" and "mean_speed_std"). For multi-agent
+        environments, the returns are summed over all policies.
+    """
+    if num_workers == 1:
+        _init_worker(args)
+        results = [_evaluate_rollout(i) for i in range(args.num_rollouts)]
+        _worker['close']()
+    else:
+        # the pool is closed and joined rather than terminated, so that the
+        # workers exit normally and run their finalizers
+        ctx = multiprocessing.get_context('spawn')
+        pool = ctx.Pool(num_workers, initializer=_init_worker,
+                        initargs=(args,))
+        try:
+            results = pool.map(_evaluate_rollout, range(args.num_rollouts))
+            pool.close()
+        except BaseException:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+
+    stats = {
+        'returns': np.array([
+            sum(r['return'].values()) if isinstance(r['return'], dict)
+            else r['return'] for r in results]),
+        'mean_speed': np.array([r['mean_speed'] for r in results]),
+        'outflow': np.array([r['outflow'] for r in results]),
+        'inflow': np.array([r['inflow'] for r in results]),
+    }
+    if np.all(stats['inflow'] > 1e-5):
+        stats['throughput_efficiency'] = stats['outflow'] / stats['inflow']
+    else:
+        stats['throughput_efficiency'] = np.zeros(len(results))
+
+    for key in list(stats.keys()):
+        stats[key + '_mean'] = np.mean(stats[key])
+        stats[key + '_std'] = np.std(stats[key])
+
+    return stats
+
+
+def evaluate_checkpoints(args, num_workers=1):
+    """Evaluate all the checkpoints listed in args without rendering.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        command-line arguments, see create_parser. The checkpoint_num
+        argument may be a comma-separated list of checkpoint numbers, or
+        "all" to evaluate every checkpoint in result_dir.
+    num_workers : int, optional
+        number of worker processes per checkpoint
+
+    Returns
+    -------
+    dict
+        the results of evaluate_rllib for every checkpoint number
+    """
+    if args.checkpoint_num == 'all':
+        checkpoint_nums = sorted(
+            (d.split('_')[-1] for d in os.listdir(args.result_dir)
+             if d.startswith('checkpoint_')), key=int)
+    else:
+        checkpoint_nums = args.checkpoint_num.split(',')
+
+    results = {}
+    for checkpoint_num in checkpoint_nums:
+        checkpoint_args = copy(args)
+        checkpoint_args.checkpoint_num = checkpoint_num
+        results[checkpoint_num] = evaluate_rllib(checkpoint_args, num_workers)
+
+        stats = results[checkpoint_num]
+        print('Checkpoint {}:'.format(checkpoint_num))
+        for key in ['returns', 'mean_speed', 'outflow', 'inflow',
+                    'throughput_efficiency']:
+            print('    {}, average, std: {}, {}'.format(
+                key, stats[key + '_mean'], stats[key + '_std']))
+
+    return results
+
+
 def create_parser():
     """Create the parser to capture CLI arguments."""
     parser = argparse.ArgumentParser(
@@ -378,11 +626,26 @@ def create_parser():
         '--horizon',
         type=int,
         help='Specifies the horizon.')
+    parser.add_argument(
+        '--headless',
+        action='store_true',
+        help='Evaluates the checkpoints without rendering or emission '
+             'outputs, and prints aggregate statistics. The checkpoint '
+             'number may then be a comma-separated list, or "all".')
+    parser.add_argument(
+        '--num_workers',
+        type=int,
+        default=1,
+        help='The number of processes the rollouts are distributed over in '
+             'headless mode.')
     return parser
 
 
 if __name__ == '__main__':
     parser = create_parser()
     args = parser.parse_args()
-    ray.init(num_cpus=1)
-    visualizer_rllib(args)
+    if args.headless:
+        evaluate_checkpoints(args, args.num_workers)
+    else:
+        ray.init(num_cpus=1)
+        visualizer_rllib(args)
@@ -0,0 +1,109 @@
+"""Script for benchmarking the startup time of Flow processes.
+
+Every benchmarked statement is run in a fresh python interpreter, so that
+the measured time includes all the (transitive) imports it triggers, as is the
+case for RLlib workers and short-lived evaluation processes.
+
+Usage
+    python scripts/benchmark_import_time.py --num_runs 10
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+# modules that should only be loaded when rendering or using Aimsun
+OPTIONAL_MODULES = [
+    'pyglet', 'matplotlib', 'imutils', 'scipy',
+    'flow.renderer.pyglet_renderer', 'flow.renderer.numpy_renderer',
+    'flow.core.kernel.simulation.aimsun', 'flow.core.kernel.vehicle.aimsun',
+]
+
+BENCHMARKS = {
+    'import flow.envs': 'import flow.envs',
+    'make_create_env': """
+from flow.core.params import SumoParams, EnvParams, NetParams, VehicleParams
+from flow.envs import AccelEnv
+from flow.networks import RingNetwork
+from flow.networks.ring import ADDITIONAL_NET_PARAMS
+from flow.envs.ring.accel import ADDITIONAL_ENV_PARAMS
+from flow.utils.registry import make_create_env
+vehicles = VehicleParams()
+vehicles.add('human', num_vehicles=1)
+create_env, _ = make_create_env(params=dict(
+    exp_tag='benchmark',
+    env_name=AccelEnv,
+    network=RingNetwork,
+    simulator='traci',
+    sim=SumoParams(),
+    env=EnvParams(additional_params=ADDITIONAL_ENV_PARAMS),
+    net=NetParams(additional_params=ADDITIONAL_NET_PARAMS),
+    veh=vehicles,
+))
+""",
+}
+
+# template of the program run by every interpreter
+TIMER = """
+import json, sys, time
+t0 = time.perf_counter()
+exec(compile({code!r}, '<benchmark>', 'exec'))
+elapsed = time.perf_counter() - t0
+print(json.dumps([elapsed, [m for m in {optional!r} if m in sys.modules]]))
+"""
+
+
+def time_statement(code, num_runs):
+    """Run a statement in fresh interpreters and time it.
+
+    Parameters
+    ----------
+    code : str
+        the statement to time
+    num_runs : int
+        number of interpreters to run the statement in
+
+    Returns
+    -------
+    list of float
+        the time taken by the statement in every run, in seconds
+    list of str
+        optional modules that were loaded by the statement
+
+    Raises
+    ------
+    RuntimeError
+        if the statement fails to run
+    """
+    program = TIMER.format(code=code, optional=OPTIONAL_MODULES)
+    times, loaded = [], []
+    for _ in range(num_runs):
+        out = subprocess.run([sys.executable, '-c', program],
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if out.returncode != 0:
+            raise RuntimeError(out.stderr.decode().strip().splitlines()[-1])
+        elapsed, loaded = json.loads(out.stdout.decode().splitlines()[-1])
+        times.append(elapsed)
+    return times, loaded
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Benchmark the startup time of Flow processes.')
+    parser.add_argument('--num_runs', type=int, default=5,
+                        help='Number of fresh interpreters per statement.')
+    args = parser.parse_args()
+
+    for name, code in BENCHMARKS.items():
+        try:
+            times, loaded = time_statement(code, args.num_runs)
+        except RuntimeError as e:
+            print('{}: failed ({})'.format(name, e))
+            continue
+        print('{}: median {:.1f} ms, min {:.1f} ms ({} runs)'.format(
+            name, 1000 * statistics.median(times), 1000 * min(times),
+            args.num_runs))
+        print('    optional modules loaded: {}'.format(
+            ', '.join(loaded) or 'none'))
@@ -0,0 +1,111 @@
+import unittest
+import os
+
+from flow.controllers import IDMController
+from flow.core.calibration import Calibration, apply_params
+from flow.core.calibration import GridSearch, RandomSearch, CMASearch
+
+from tests.setup_scripts import ring_road_exp_setup
+
+import numpy as np
+
+os.environ["TEST_FLAG"] = "True"
+
+
+class TestApplyParams(unittest.TestCase):
+    """Tests the apply_params method in flow/core/calibration.py."""
+
+    def setUp(self):
+        env, _, self.flow_params = ring_road_exp_setup()
+        env.terminate()
+
+    def test_apply_params(self):
+        flow_params = apply_params(
+            self.flow_params,
+            {"acc.a": 2.0, "cf.minGap": 3.0, "env.horizon": 25})
+
+        vehicles = flow_params["veh"]
+        self.assertEqual(
+            vehicles.type_parameters["idm"]["acceleration_controller"],
+            (IDMController, {"a": 2.0}))
+        self.assertEqual(vehicles.types[0]["type_params"]["minGap"], 3.0)
+        self.assertEqual(vehicles.minGap["idm"], 3.0)
+        self.assertEqual(flow_params["env"].horizon, 25)
+
+        # the base flow_params are unchanged
+        vehicles = self.flow_params["veh"]
+        self.assertEqual(
+            vehicles.type_parameters["idm"]["acceleration_controller"],
+            (IDMController, {}))
+        self.assertEqual(vehicles.minGap["idm"], 2.5)
+
+        # parameters of other vehicle types are unchanged
+        flow_params = apply_params(
+            self.flow_params, {"acc.a": 2.0}, veh_type="rl")
+        self.assertEqual(
+            flow_params["veh"].type_parameters["idm"][
+                "acceleration_controller"],
+            (IDMController, {}))
+
+
+class TestSearchStrategies(unittest.TestCase):
+    """Tests the search strategies in flow/core/calibration.py."""
+
+    def test_grid_search(self):
+        search = GridSearch(2, grid_size=3)
+        points = np.concatenate([search.ask(4), search.ask(10)])
+        self.assertEqual(points.shape, (9, 2))
+        np.testing.assert_array_almost_equal(points[:4], [
+            [0, 0], [0, 0.5], [0, 1], [0.5, 0]])
+        self.assertEqual(len(search.ask(1)), 0)
+
+    def test_random_search(self):
+        points = RandomSearch(3, seed=0).ask(100)
+        self.assertEqual(points.shape, (100, 3))
+        self.assertTrue(np.all((points >= 0) & (points <= 1)))
+
+    def test_cma_search(self):
+        target = np.array([0.2, 0.7, 0.4])
+        search = CMASearch(3, seed=0)
+        for _ in range(20):
+            # candidates are told one at a time, as workers complete
+            for x in search.ask(search.population):
+                search.tell(x, np.sum(np.abs(x - target)))
+
+        # the search distribution concentrates around the target
+        np.testing.assert_array_almost_equal(search.mean, target, decimal=1)
+        self.assertTrue(np.all(search.sigma < 0.3))
+
+
+class TestCalibration(unittest.TestCase):
+    """Tests the Calibration class in flow/core/calibration.py."""
+
+    def setUp(self):
+        env, _, flow_params = ring_road_exp_setup()
+        env.terminate()
+        flow_params['sim'].render = False
+        flow_params['env'].horizon = 20
+        self.calibration = Calibration(
+            flow_params,
+            space={"acc.v0": (2, 10)},
+            edge_id="top",
+            observed=np.full(4, 5.),
+            interval=0.5)
+
+    def test_params(self):
+        self.assertEqual(self.calibration.interval_steps, 5)
+        self.assertDictEqual(self.calibration.params([0.5]), {"acc.v0": 6.})
+
+    def test_run(self):
+        result = self.calibration.run(
+            strategy="grid", num_evals=2, num_workers=1, grid_size=3)
+
+        history = result["history"]
+        self.assertListEqual(history["params"],
+                             [{"acc.v0": 2.}, {"acc.v0": 6.}])
+        self.assertEqual(result["error"], np.min(history["error"]))
+        self.assertLessEqual(len(result["speeds"]), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -7,6 +7,8 @@ from flow.core.params import VehicleParams
 from flow.controllers.routing_controllers import ContinuousRouter
 from flow.controllers.car_following_models import IDMController
 from flow.controllers import RLController
+from flow.controllers.base_lane_changing_controller import \
+    BaseLaneChangeController
 from flow.envs.ring.accel import ADDITIONAL_ENV_PARAMS
 from flow.utils.exceptions import FatalFlowError
 from flow.envs import Env, TestEnv
@@ -112,6 +114,63 @@ class TestShuffle(unittest.TestCase):
         self.assertCountEqual(before_reset, after_reset)
 
 
+class TestInitialVehiclesInRoutes(unittest.TestCase):
+    """
+    Tests that the initial vehicles can be loaded from the route files of a
+    restarted simulation, and that the network files are reused.
+    """
+
+    def setUp(self):
+        vehicles = VehicleParams()
+        vehicles.add(
+            veh_id="test",
+            acceleration_controller=(IDMController, {}),
+            routing_controller=(ContinuousRouter, {}),
+            num_vehicles=5)
+        vehicles.add(
+            veh_id="rl",
+            acceleration_controller=(RLController, {}),
+            num_vehicles=1)
+
+        sim_params = SumoParams(restart_instance=True,
+                                initial_vehicles_in_routes=True)
+
+        self.env, _, _ = ring_road_exp_setup(
+            sim_params=sim_params,
+            initial_config=InitialConfig(shuffle=True),
+            vehicles=vehicles)
+
+    def tearDown(self):
+        self.env.terminate()
+        self.env = None
+
+    def test_reset(self):
+        network = self.env.k.network
+        net_mtime = os.path.getmtime(network.cfg_path + network.netfn)
+        rou_mtime = os.path.getmtime(network.cfg_path + network.roufn)
+
+        for _ in range(2):
+            self.env.reset()
+
+            # the vehicles departed at their initial positions
+            self.assertCountEqual(self.env.k.vehicle.get_ids(),
+                                  self.env.initial_ids)
+            self.assertListEqual(self.env.k.vehicle.get_rl_ids(), ["rl_0"])
+            for veh_id in self.env.initial_ids:
+                _, edge, lane, pos, _ = self.env.initial_state[veh_id]
+                self.assertEqual(self.env.k.vehicle.get_edge(veh_id), edge)
+                self.assertEqual(self.env.k.vehicle.get_lane(veh_id), lane)
+                self.assertAlmostEqual(
+                    self.env.k.vehicle.get_position(veh_id), pos, places=2)
+            self.env.step(rl_actions=None)
+
+        # the network and route files were not regenerated
+        self.assertEqual(
+            os.path.getmtime(network.cfg_path + network.netfn), net_mtime)
+        self.assertEqual(
+            os.path.getmtime(network.cfg_path + network.roufn), rou_mtime)
+
+
 class TestEmissionPath(unittest.TestCase):
     """
     Tests that the default emission path of an environment is set to None.
@@ -289,6 +348,120 @@ class TestApplyingActionsWithSumo(unittest.TestCase):
         np.testing.assert_array_almost_equal(lane2, expected_lane2, 1)
 
 
+class LeftLaneChanger(BaseLaneChangeController):
+    """Lane-changing controller always moving its vehicles to the left."""
+
+    shareable = True
+    calls = []
+
+    def get_lane_change_action(self, env):
+        return 1  # pragma: no cover
+
+    def get_actions(self, env, veh_ids):
+        self.calls.append(list(veh_ids))
+        return np.ones(len(veh_ids))
+
+
+class TestApplyLaneChangeActions(unittest.TestCase):
+    """Tests the apply_lane_change_actions method in base.py.
+
+    Ensures that shared lane-changing controllers compute the actions of all
+    their vehicles at once, and that vehicles do not move past the leftmost
+    lane.
+    """
+
+    def setUp(self):
+        LeftLaneChanger.calls = []
+        net_params = NetParams(additional_params={
+            "length": 230, "lanes": 2, "speed_limit": 30, "resolution": 40})
+        vehicles = VehicleParams()
+        vehicles.add(
+            veh_id="test",
+            acceleration_controller=(IDMController, {}),
+            lane_change_controller=(LeftLaneChanger, {}),
+            routing_controller=(ContinuousRouter, {}),
+            lane_change_params=SumoLaneChangeParams(lane_change_mode=0),
+            num_vehicles=5)
+        self.env, _, _ = ring_road_exp_setup(
+            net_params=net_params, vehicles=vehicles)
+
+    def tearDown(self):
+        self.env.terminate()
+        self.env = None
+
+    def test_apply_lane_change_actions(self):
+        self.env.reset()
+        ids = self.env.k.vehicle.get_ids()
+        LeftLaneChanger.calls = []
+
+        for _ in range(3):
+            self.env.step(rl_actions=None)
+
+        # one call per step, for all vehicles of the type
+        self.assertEqual(len(LeftLaneChanger.calls), 3)
+        for call in LeftLaneChanger.calls:
+            self.assertCountEqual(call, ids)
+
+        # all vehicles are in the leftmost lane
+        self.assertListEqual(self.env.k.vehicle.get_lane(ids), [1] * 5)
+
+        # lane changes are applied to array directions, and requests to move
+        # past the leftmost lane are ignored
+        self.env.k.vehicle.apply_lane_change(
+            ids, direction=np.array([-1., 1., -0., 1., -1.]))
+        self.env.k.simulation.simulation_step()
+        self.env.k.vehicle.update(False)
+        self.assertListEqual(
+            self.env.k.vehicle.get_lane(ids), [0, 1, 1, 1, 0])
+
+
+class TestStepPlan(unittest.TestCase):
+    """Tests the make_step_plan method in base.py.
+
+    Ensures that the phases of the step method are only performed if the
+    vehicle types have controllers that act during these phases.
+    """
+
+    def test_step_plan(self):
+        # human-driven vehicles with routers, in an environment that
+        # implements additional_command
+        env, _, _ = ring_road_exp_setup()
+        self.assertDictEqual(env.step_plan, {
+            "acceleration": True,
+            "lane_change": False,
+            "routing": True,
+            "additional_command": True,
+        })
+        env.terminate()
+
+        # rl vehicles and vehicles controlled by sumo only
+        vehicles = VehicleParams()
+        vehicles.add(veh_id="rl",
+                     acceleration_controller=(RLController, {}),
+                     num_vehicles=1)
+        vehicles.add(veh_id="human", num_vehicles=2)
+        env, _, _ = ring_road_exp_setup(vehicles=vehicles)
+        self.assertFalse(env.step_plan["acceleration"])
+        self.assertFalse(env.step_plan["lane_change"])
+        self.assertFalse(env.step_plan["routing"])
+
+        env.reset()
+        for _ in range(3):
+            obs, _, _, _ = env.step(rl_actions=None)
+        self.assertEqual(env.time_counter, 3)
+        self.assertEqual(len(env.k.vehicle.get_ids()), 3)
+        np.testing.assert_array_equal(obs, env.get_state())
+        env.terminate()
+
+    def test_step_plan_reset(self):
+        """Ensures that the plan is recomputed when the env is reset."""
+        env, _, _ = ring_road_exp_setup()
+        env.step_plan = {key: False for key in env.step_plan}
+        env.reset()
+        self.assertTrue(env.step_plan["acceleration"])
+        env.terminate()
+
+
 class TestWarmUpSteps(unittest.TestCase):
     """Ensures that the appropriate number of warmup steps are run when using
     flow.core.params.EnvParams.warmup_steps"""
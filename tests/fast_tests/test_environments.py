@@ -8,14 +8,15 @@ from flow.core.params import VehicleParams
 from flow.core.params import NetParams, EnvParams, SumoParams, InFlows
 from flow.controllers import IDMController, RLController
 from flow.networks import RingNetwork, MergeNetwork, BottleneckNetwork
-from flow.networks import HighwayRampsNetwork
+from flow.networks import HighwayRampsNetwork, RampMeterNetwork
 from flow.networks.ring import ADDITIONAL_NET_PARAMS as RING_PARAMS
 from flow.networks.merge import ADDITIONAL_NET_PARAMS as MERGE_PARAMS
 from flow.networks.highway_ramps import ADDITIONAL_NET_PARAMS as \
     HIGHWAY_PARAMS
 from flow.envs import LaneChangeAccelEnv, LaneChangeAccelPOEnv, AccelEnv, \
     WaveAttenuationEnv, WaveAttenuationPOEnv, MergePOEnv, \
-    TestEnv, BottleneckDesiredVelocityEnv, BottleneckEnv, BottleneckAccelEnv
+    TestEnv, BottleneckDesiredVelocityEnv, BottleneckEnv, BottleneckAccelEnv, \
+    RampMeterPOEnv
 from flow.envs.ring.wave_attenuation import v_eq_max_function
 from flow.envs.multiagent import MultiAgentHighwayPOEnv
 from flow.envs.multiagent import MultiAgentAccelPOEnv
@@ -432,6 +433,36 @@ class TestWaveAttenuationEnv(unittest.TestCase):
         env.reset()
         self.assertEqual(env.k.network.non_internal_length(), 256)
 
+    def test_reset_prebuilt(self):
+        """
+        Tests that the reset method selects among the prebuilt ring networks
+        when prebuild_rings is set to True.
+        """
+        env_params = deepcopy(self.env_params)
+        env_params.additional_params["ring_length"] = [225, 230]
+        env_params.additional_params["prebuild_rings"] = True
+
+        # create the environment
+        env = WaveAttenuationEnv(
+            sim_params=self.sim_params,
+            network=self.network,
+            env_params=env_params
+        )
+
+        # every ring length was generated, and its v_eq_max tabulated
+        self.assertEqual(len(env._ring_kernels), 6)
+        self.assertCountEqual(env._v_eq_max.keys(), range(225, 231))
+
+        # the networks used upon reset are the prebuilt ones
+        for _ in range(3):
+            env.reset()
+            length = env.k.network.non_internal_length()
+            self.assertTrue(225 <= length <= 230)
+            self.assertIs(env.k.network, env._ring_kernels[env.network.name])
+            self.assertIs(env.network, env._ring_networks[round(length)])
+
+        env.terminate()
+
     def test_v_eq_max_function(self):
         """
         Tests that the v_eq_max_function returns appropriate values.
@@ -692,6 +723,72 @@ class TestMergePOEnv(unittest.TestCase):
         )
 
 
+class TestRampMeterPOEnv(unittest.TestCase):
+
+    """Tests the RampMeterPOEnv environment in flow/envs/ramp_meter.py"""
+
+    def setUp(self):
+        vehicles = VehicleParams()
+        vehicles.add("human", acceleration_controller=(IDMController, {}),
+                     num_vehicles=2)
+
+        inflow = InFlows()
+        inflow.add(veh_type="human", edge="inflow_merge",
+                   vehs_per_hour=1800, depart_speed=5)
+
+        additional_net_params = MERGE_PARAMS.copy()
+        additional_net_params["detectors"] = True
+        self.network = RampMeterNetwork(
+            name="test_ramp_meter",
+            vehicles=vehicles,
+            net_params=NetParams(inflows=inflow,
+                                 additional_params=additional_net_params),
+        )
+        self.env = RampMeterPOEnv(
+            env_params=EnvParams(
+                additional_params={
+                    "max_accel": 3,
+                    "max_decel": 3,
+                    "target_velocity": 25,
+                    "num_rl": 5,
+                }
+            ),
+            sim_params=SumoParams(),
+            network=self.network,
+        )
+
+    def tearDown(self):
+        self.env.terminate()
+        self.env = None
+
+    def test_detector_observations(self):
+        """Tests the observations of the ramp meter detectors."""
+        self.assertListEqual(
+            self.env.meter_detectors,
+            [["ramp_queue_0"], ["mainline_upstream_0"],
+             ["mainline_downstream_0"]])
+        self.assertEqual(self.env.observation_space.shape[0], 6 * 5 + 9)
+
+        self.env.reset()
+        for _ in range(50):
+            obs, _, _, _ = self.env.step(None)
+
+        self.assertEqual(len(obs), 6 * 5 + 9)
+        # the ramp queue detector covers all of edge "inflow_merge"
+        count, occupancy, speed = obs[30:33]
+        self.assertGreater(count, 0)
+        self.assertGreaterEqual(
+            count, len(self.env.k.vehicle.get_ids_by_edge("inflow_merge")))
+        self.assertGreater(occupancy, 0)
+        self.assertGreater(speed, 0)
+
+    def test_no_detectors(self):
+        """Tests that detectors are only observed if they are requested."""
+        self.network.net_params.additional_params["detectors"] = False
+        self.assertIsNone(self.network.specify_detectors(
+            self.network.net_params))
+
+
 class TestTestEnv(unittest.TestCase):
 
     """Tests the TestEnv environment in flow/envs/test.py"""
@@ -809,6 +906,30 @@ class TestBottleneckEnv(unittest.TestCase):
             expected_max=float('inf'))
         )
 
+    def test_zone_detectors(self):
+        """Tests that the zone vehicles and counts match the edge data."""
+        self.assertTrue(self.env._has_detectors)
+        for _ in range(20):
+            self.env.step(None)
+
+            for zone, edge in [("toll", "1"), ("ramp_meter", "2")]:
+                cars_in_zone = self.env._zone_vehicles(zone, edge, 4)
+                for lane in range(4):
+                    expected = sorted(
+                        (veh_id, self.env.k.vehicle.get_position(veh_id))
+                        for veh_id in self.env.k.vehicle.get_ids_by_edge(edge)
+                        if self.env.k.vehicle.get_lane(veh_id) == lane and
+                        self.env.k.vehicle.get_position(veh_id) > 80)
+                    actual = sorted(
+                        (veh_id, pos) for veh_id, pos in cars_in_zone[lane]
+                        if pos > 80)
+                    self.assertListEqual(actual, expected)
+
+            # the bottleneck detectors cover all of edge "4"
+            self.assertGreaterEqual(
+                self.env.smoothed_num[self.env.outflow_index - 1],
+                len(self.env.k.vehicle.get_ids_by_edge("4")))
+
 
 class TestBottleneckAccelEnv(unittest.TestCase):
 
@@ -1326,6 +1447,52 @@ class TestMultiAgentHighwayPOEnv(unittest.TestCase):
         )
 
 
+class TestMultiEnvBatched(unittest.TestCase):
+    """Tests the batched mode of the MultiEnv class in
+       flow/envs/multiagent/base.py"""
+
+    def setUp(self):
+        vehicles = VehicleParams()
+        vehicles.add("rl", acceleration_controller=(RLController, {}),
+                     num_vehicles=2)
+        vehicles.add("human", acceleration_controller=(IDMController, {}),
+                     num_vehicles=2)
+
+        self.env = MultiAgentAccelPOEnv(
+            sim_params=SumoParams(),
+            network=RingNetwork(
+                name="test_ring",
+                vehicles=vehicles,
+                net_params=NetParams(additional_params=RING_PARAMS.copy()),
+            ),
+            env_params=EnvParams(additional_params={
+                'max_accel': 1,
+                'max_decel': 1,
+                'target_velocity': 25,
+                'batched': True,
+            })
+        )
+
+    def tearDown(self):
+        self.env.terminate()
+        self.env = None
+
+    def test_batched(self):
+        obs = self.env.reset()
+
+        # the observations are stacked, and the dict views share their rows
+        self.assertListEqual(self.env.agent_ids, ["rl_0", "rl_1"])
+        self.assertEqual(self.env.obs_batch.shape, (2, 6))
+        for i, rl_id in enumerate(self.env.agent_ids):
+            np.testing.assert_array_equal(obs[rl_id], self.env.obs_batch[i])
+
+        # actions can be passed as a single array
+        obs, reward, _, _ = self.env.step(np.array([[1.], [-1.]]))
+        self.assertEqual(self.env.reward_batch.shape, (2,))
+        for i, rl_id in enumerate(self.env.agent_ids):
+            self.assertAlmostEqual(reward[rl_id], self.env.reward_batch[i])
+
+
 ###############################################################################
 #                              Utility methods                                #
 ###############################################################################
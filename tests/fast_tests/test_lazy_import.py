@@ -0,0 +1,51 @@
+import subprocess
+import sys
+import unittest
+
+import flow.envs
+import flow.networks
+from flow.utils.lazy_import import lazy_import
+
+
+class TestLazyImport(unittest.TestCase):
+    """Tests the lazy_import method in flow/utils/lazy_import.py."""
+
+    def test_lazy_import(self):
+        __getattr__, __dir__ = lazy_import(__name__, {
+            'TestLazyImport': __name__, 'deepcopy': 'copy'})
+
+        # members are imported on first access
+        from copy import deepcopy
+        self.assertIs(__getattr__('deepcopy'), deepcopy)
+        self.assertIn('deepcopy', __dir__())
+
+        # unknown members raise an AttributeError
+        self.assertRaises(AttributeError, __getattr__, 'foo')
+
+    def test_envs_and_networks(self):
+        # all members are still listed and accessible
+        self.assertTrue(set(flow.envs.__all__) <= set(dir(flow.envs)))
+        self.assertTrue(
+            set(flow.networks.__all__) <= set(dir(flow.networks)))
+        from flow.envs import AccelEnv
+        from flow.envs.ring.accel import AccelEnv as AccelEnvClass
+        self.assertIs(AccelEnv, AccelEnvClass)
+        self.assertIs(getattr(flow.networks, 'RingNetwork'),
+                      flow.networks.ring.RingNetwork)
+
+    def test_import_time_dependencies(self):
+        # the renderer and the aimsun kernels are not loaded with flow.envs
+        code = "import sys, flow.envs; from flow.envs import AccelEnv; " \
+               "print(' '.join(sorted(sys.modules)))"
+        modules = subprocess.check_output(
+            [sys.executable, '-c', code], stderr=subprocess.DEVNULL
+        ).decode().split()
+        for module in ['pyglet', 'flow.renderer.pyglet_renderer',
+                       'flow.renderer.numpy_renderer',
+                       'flow.core.kernel.vehicle.aimsun',
+                       'flow.core.kernel.simulation.aimsun']:
+            self.assertNotIn(module, modules)
+
+
+if __name__ == '__main__':
+    unittest.main()
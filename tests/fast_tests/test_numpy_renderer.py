@@ -0,0 +1,178 @@
+from flow.renderer.numpy_renderer import NumpyRenderer as Renderer
+from flow.renderer.frame_buffer import FrameBuffer
+from flow.core.params import SumoParams
+from tests.setup_scripts import ring_road_exp_setup
+import numpy as np
+import os
+import unittest
+
+os.environ["TEST_FLAG"] = "True"
+
+
+class TestNumpyRenderer(unittest.TestCase):
+    """Tests numpy_renderer"""
+
+    def setUp(self):
+        path = os.path.dirname(os.path.abspath(__file__))[:-11]
+        self.data = np.load(
+            '{}/data/renderer_data/replay.npy'.format(path),
+            allow_pickle=True
+        )
+        # Default renderer parameters
+        self.network = self.data[0]
+        self.mode = "drgb"
+        self.save_render = False
+        self.sight_radius = 25
+        self.pxpm = 3
+        self.show_radius = True
+        self.alpha = 0.9
+
+    def tearDown(self):
+        self.renderer.close()
+
+    def _make_renderer(self, **kwargs):
+        return Renderer(
+            self.network,
+            mode=self.mode,
+            save_render=self.save_render,
+            sight_radius=self.sight_radius,
+            pxpm=self.pxpm,
+            show_radius=self.show_radius,
+            alpha=self.alpha,
+            **kwargs
+        )
+
+    def test_init(self):
+        self.renderer = self._make_renderer()
+
+        # Ensure that the attributes match their correct values
+        self.assertEqual(self.renderer.mode, self.mode)
+        self.assertEqual(self.renderer.sight_radius, self.sight_radius)
+        self.assertEqual(self.renderer.pxpm, self.pxpm)
+        self.assertEqual(self.renderer.show_radius, self.show_radius)
+        self.assertEqual(self.renderer.alpha, self.alpha)
+
+        # the lanes are drawn on top of the background
+        self.assertEqual(self.renderer.frame.shape, (378, 378, 3))
+        self.assertEqual(self.renderer.frame.min(), 32)
+        self.assertGreater(self.renderer.frame.max(), 200)
+
+        # unsupported modes
+        self.assertRaises(ValueError, Renderer, self.network, mode=True)
+
+    def test_render(self):
+        for mode, shape in [('drgb', (378, 378, 3)), ('rgb', (378, 378, 3)),
+                            ('dgray', (378, 378)), ('gray', (378, 378))]:
+            self.mode = mode
+            self.renderer = self._make_renderer()
+            frame = self.renderer.render(*self.data[100])
+            self.assertEqual(frame.shape, shape)
+            self.assertEqual(frame.dtype, np.uint8)
+
+        # check that the vehicles are drawn in their respective colors
+        self.mode = 'rgb'
+        self.alpha = 1
+        self.renderer = self._make_renderer()
+        frame = self.renderer.render(*self.data[100])
+        bgr = frame.reshape(-1, 3)
+        self.assertEqual(np.sum(np.all(bgr == [0, 225, 0], axis=1)) > 0, True)
+        self.assertEqual(
+            np.sum(np.all(bgr == [200, 150, 0], axis=1)) > 0, True)
+
+    def test_render_batch(self):
+        self.renderer = self._make_renderer()
+        frame = self.renderer.render(*self.data[100])
+
+        frames = self.renderer.render_batch(
+            *[[self.data[100][i], self.data[101][i]] for i in range(4)])
+        self.assertEqual(frames.shape, (2, 378, 378, 3))
+        np.testing.assert_array_equal(frames[0], frame)
+
+    def test_get_sight(self):
+        self.renderer = self._make_renderer()
+        self.renderer.render(*self.data[101])
+
+        orientation = self.data[101][0][0]
+        id = self.data[101][4][0][-1]
+        sight = self.renderer.get_sight(orientation, id)
+        self.assertEqual(sight.shape, (150, 150, 3))
+
+    def test_get_sights(self):
+        self.renderer = self._make_renderer()
+        self.renderer.render(*self.data[101])
+
+        orientations = self.data[101][0][:2]
+        ids = [log[-1] for log in self.data[101][4][:2]]
+        sights = self.renderer.get_sights(orientations, ids)
+        self.assertEqual(sights.shape, (len(ids), 150, 150, 3))
+
+        # no vehicles to observe for
+        sights = self.renderer.get_sights([], [])
+        self.assertEqual(sights.shape, (0, 150, 150, 3))
+
+    def test_save_renderer(self):
+        self.save_render = True
+        self.renderer = self._make_renderer(path='/tmp')
+        self.renderer.render(*self.data[101])
+
+        save_path = self.renderer.close()
+        saved_data = np.load(save_path, allow_pickle=True)
+
+        self.assertEqual(self.data[0], saved_data[0])
+        self.assertEqual(self.data[101], saved_data[1])
+
+
+class TestNumpyRendererEnv(unittest.TestCase):
+    """Tests the numpy render backend from within an environment."""
+
+    def test_env(self):
+        sim_params = SumoParams(
+            sim_step=0.1, render="drgb", render_backend="numpy")
+        env, _, _ = ring_road_exp_setup(sim_params=sim_params)
+        self.assertIsInstance(env.renderer, Renderer)
+
+        env.reset()
+        env.step(None)
+        self.assertEqual(
+            env.frame.shape, (env.renderer.height, env.renderer.width, 3))
+
+        # check the frame history
+        self.assertEqual(env.frame_buffer.stacked().shape,
+                         (5, env.renderer.height, env.renderer.width, 3))
+        self.assertEqual(env.sights_buffer.stacked().shape[0], 5)
+        env.terminate()
+
+
+class TestFrameBuffer(unittest.TestCase):
+    """Tests the FrameBuffer class in flow/renderer/frame_buffer.py."""
+
+    def test_append(self):
+        buffer = FrameBuffer(3)
+        buffer.reset(np.zeros((2, 2), dtype=np.uint8))
+        self.assertEqual(len(buffer), 3)
+
+        for i in range(1, 5):
+            buffer.append(np.full((2, 2), i, dtype=np.uint8))
+        np.testing.assert_array_equal(
+            buffer.stacked()[:, 0, 0], [2, 3, 4])
+        self.assertEqual(buffer[-1][0, 0], 4)
+        self.assertEqual(buffer[0][0, 0], 2)
+
+        # the stacked history is a view of the storage, not a copy
+        self.assertFalse(buffer.stacked().flags['OWNDATA'])
+
+    def test_ragged(self):
+        buffer = FrameBuffer(3, ragged=True)
+        buffer.reset(np.zeros((0, 4), dtype=np.uint8))
+        buffer.append(np.ones((2, 4), dtype=np.uint8))
+        buffer.append(np.ones((1, 4), dtype=np.uint8))
+        buffer.append(np.ones((3, 4), dtype=np.uint8))
+
+        self.assertEqual(buffer.stacked().shape, (3, 3, 4))
+        np.testing.assert_array_equal(buffer.sizes(), [2, 1, 3])
+        self.assertEqual(buffer[1].shape, (1, 4))
+        np.testing.assert_array_equal(buffer.stacked()[1, 1:], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from flow.core import rewards
+from flow.core.kernel import ReplayKernel, TrajectoryRecorder
+
+from tests.setup_scripts import ring_road_exp_setup, highway_exp_setup
+
+os.environ["TEST_FLAG"] = "True"
+
+
+class TestReplayKernel(unittest.TestCase):
+    """Tests the recorder and replay kernel in flow/core/kernel/replay.py."""
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def record(self, env, num_steps, chunk_size):
+        """Record a rollout, and return the recorded states of the env."""
+        recorder = TrajectoryRecorder(self.path, chunk_size=chunk_size)
+        env.reset()
+        recorder.record(env.k)
+        states = [self.state(env)]
+        for _ in range(num_steps):
+            env.step(None)
+            recorder.record(env.k)
+            states.append(self.state(env))
+        recorder.close()
+        return states
+
+    @staticmethod
+    def state(env):
+        """Return the data of the env compared with the replayed data."""
+        veh = env.k.vehicle
+        ids = veh.get_ids()
+        return {
+            "ids": list(ids),
+            "rl_ids": list(veh.get_rl_ids()),
+            "edges": veh.get_edge(ids),
+            "lanes": veh.get_lane(ids),
+            "positions": veh.get_position(ids),
+            "speeds": veh.get_speed(ids),
+            "leaders": [leader or "" for leader in veh.get_leader(ids)],
+            "headways": veh.get_headway(ids),
+            "reward": rewards.desired_velocity(env),
+            "outflow": veh.get_outflow_rate(10),
+        }
+
+    def test_ring(self):
+        env, _, _ = ring_road_exp_setup()
+        states = self.record(env, num_steps=25, chunk_size=10)
+        edge = env.k.network.get_edge_list()[0]
+        edge_length = env.k.network.edge_length(edge)
+        max_speed = env.k.network.max_speed()
+        env.terminate()
+        kernel = env.k
+
+        # the rollout is stored in 3 chunks
+        self.assertEqual(
+            len([f for f in os.listdir(self.path) if f.endswith(".npz")]), 3)
+
+        env.k = ReplayKernel(self.path)
+        self.assertEqual(len(env.k), 26)
+        self.assertEqual(env.k.network.edge_length(edge), edge_length)
+        self.assertEqual(env.k.network.max_speed(), max_speed)
+
+        for step in env.k.steps():
+            expected = states[step]
+            actual = self.state(env)
+            for key in ["ids", "rl_ids", "edges", "lanes", "leaders"]:
+                self.assertListEqual(actual[key], expected[key])
+            for key in ["positions", "speeds", "headways", "reward",
+                        "outflow"]:
+                np.testing.assert_array_almost_equal(
+                    actual[key], expected[key], decimal=3)
+
+        # the steps can be visited in any order
+        env.k.seek(3)
+        self.assertListEqual(env.k.vehicle.get_ids(), states[3]["ids"])
+        veh_id = states[3]["ids"][0]
+        self.assertEqual(env.k.vehicle.get_type(veh_id),
+                         kernel.vehicle.get_type(veh_id))
+        self.assertEqual(env.k.vehicle.get_speed("unknown"), -1001)
+        self.assertRaises(IndexError, env.k.seek, 26)
+        env.k = kernel
+
+    def test_traffic_lights(self):
+        env, _, _ = highway_exp_setup()
+        self.record(env, num_steps=5, chunk_size=100)
+        env.terminate()
+
+        kernel = ReplayKernel(self.path)
+        self.assertListEqual(kernel.traffic_light.get_ids(), [])
+        self.assertListEqual(
+            kernel.vehicle.get_ids_by_edge("highway_0"),
+            kernel.vehicle.get_ids())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -12,6 +12,7 @@ from flow.core.params import SumoCarFollowingParams
 from flow.networks.ring import RingNetwork, ADDITIONAL_NET_PARAMS
 from flow.envs import TestEnv
 from flow.networks import Network
+from flow.core.kernel.network.base import alias_table
 
 from flow.controllers.routing_controllers import ContinuousRouter
 from flow.controllers.car_following_models import IDMController
@@ -64,6 +65,27 @@ class TestGetX(unittest.TestCase):
         pos = 4.72
         self.assertAlmostEqual(self.env.k.network.get_x(edge, pos), -1001)
 
+    def test_getx_array(self):
+        # test for several (edge, position) pairs at once, including an
+        # internal link generalized by a single element and a missing edge
+        edges = ["bottom", ":bottom", ":bottom_0", ":foo_0", ""]
+        positions = [4.72, 0.1, 2, 2, 4.72]
+        x = self.env.k.network.get_x(edges, positions)
+        np.testing.assert_array_almost_equal(
+            x, [self.env.k.network.get_x(edge, pos)
+                for edge, pos in zip(edges, positions)])
+
+    def test_edge_attributes_array(self):
+        edges = ["bottom", "right", "foo"]
+        np.testing.assert_array_equal(
+            self.env.k.network.num_lanes(edges),
+            [self.env.k.network.num_lanes("bottom"),
+             self.env.k.network.num_lanes("right"), -1001])
+        np.testing.assert_array_almost_equal(
+            self.env.k.network.edge_length(edges[:2]),
+            [self.env.k.network.edge_length("bottom"),
+             self.env.k.network.edge_length("right")])
+
 
 class TestGetEdge(unittest.TestCase):
     """
@@ -92,6 +114,18 @@ class TestGetEdge(unittest.TestCase):
         self.assertTupleEqual(
             self.env.k.network.get_edge(x2), (":bottom", 0.1))
 
+    def test_get_edge_array(self):
+        edges, positions = self.env.k.network.get_edge([5, 0.1])
+        self.assertListEqual(edges, ["bottom", ":bottom"])
+        np.testing.assert_array_almost_equal(positions, [4.72, 0.1])
+
+    def test_get_x_by_id(self):
+        self.env.reset()
+        veh_ids = self.env.k.vehicle.get_ids()
+        np.testing.assert_array_almost_equal(
+            self.env.k.vehicle.get_x_by_id(veh_ids),
+            [self.env.k.vehicle.get_x_by_id(veh_id) for veh_id in veh_ids])
+
 
 class TestEvenStartPos(unittest.TestCase):
     """
@@ -920,6 +954,35 @@ class TestDefaultRoutes(unittest.TestCase):
         )
 
 
+class TestSampleRoutes(unittest.TestCase):
+    """Tests the sample_routes method in the network kernel."""
+
+    def test_alias_table(self):
+        probabilities = np.array([0.1, 0.5, 0.15, 0.25])
+        prob, alias = alias_table(probabilities)
+
+        # the table reproduces the distribution exactly
+        n = len(probabilities)
+        reconstructed = prob / n
+        for i in range(n):
+            reconstructed[alias[i]] += (1 - prob[i]) / n
+        np.testing.assert_array_almost_equal(reconstructed, probabilities)
+
+    def test_sample_routes(self):
+        env, _, _ = ring_road_exp_setup()
+        network = env.k.network
+        network.rts["top"] = [(["top", "left"], 0.2),
+                              (["top", "bottom"], 0.8)]
+        network._build_route_tables()
+
+        self.assertIn(network.sample_routes("top"), [0, 1])
+        np.random.seed(0)
+        samples = network.sample_routes("top", size=10000)
+        self.assertAlmostEqual(np.mean(samples == 0), 0.2, places=2)
+
+        env.terminate()
+
+
 class TestOpenStreetMap(unittest.TestCase):
     """Tests the formation of osm files with Flow. This is done on a section of
     Northside UC Berkeley."""
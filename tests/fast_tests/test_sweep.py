@@ -0,0 +1,122 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from flow.core.params import InFlows, NetParams
+from flow.core.sweep import ParameterSweep, config_hash, set_param
+from flow.core.sweep import set_inflow_rate, set_penetration
+
+from tests.setup_scripts import ring_road_exp_setup
+
+import numpy as np
+
+os.environ["TEST_FLAG"] = "True"
+
+
+def inflow_flow_params():
+    """Return flow_params with a human and an rl inflow on edge "1"."""
+    inflows = InFlows()
+    inflows.add(veh_type="human", edge="1", vehs_per_hour=900)
+    inflows.add(veh_type="rl", edge="1", vehs_per_hour=100)
+    inflows.add(veh_type="human", edge="2", vehs_per_hour=500)
+    return {"net": NetParams(inflows=inflows)}
+
+
+class TestOverrides(unittest.TestCase):
+    """Tests the parameter overrides in flow/core/sweep.py."""
+
+    def test_set_param(self):
+        _, _, flow_params = ring_road_exp_setup()
+        set_param(flow_params, "env.horizon", 25)
+        set_param(flow_params, "net.additional_params.length", 300)
+        self.assertEqual(flow_params["env"].horizon, 25)
+        self.assertEqual(flow_params["net"].additional_params["length"], 300)
+
+    def test_set_inflow_rate(self):
+        flow_params = inflow_flow_params()
+        set_inflow_rate(flow_params, 2000, edge="1")
+        rates = [inflow["vehsPerHour"]
+                 for inflow in flow_params["net"].inflows.get()]
+        # the rate is split proportionally, and other edges are unchanged
+        np.testing.assert_array_almost_equal(rates, [1800, 200, 500])
+
+    def test_set_penetration(self):
+        flow_params = inflow_flow_params()
+        set_penetration(flow_params, 0.25, edge="1")
+        rates = [inflow["vehsPerHour"]
+                 for inflow in flow_params["net"].inflows.get()]
+        np.testing.assert_array_almost_equal(rates, [750, 250, 500])
+
+        # edge "2" has no rl inflow
+        self.assertRaises(ValueError, set_penetration, flow_params, 0.25)
+
+
+class TestConfigHash(unittest.TestCase):
+    """Tests the config_hash method in flow/core/sweep.py."""
+
+    def test_config_hash(self):
+        _, _, flow_params1 = ring_road_exp_setup()
+        _, _, flow_params2 = ring_road_exp_setup()
+
+        # equal configurations have equal hashes
+        self.assertEqual(config_hash(flow_params1, 0, 1),
+                         config_hash(flow_params2, 0, 1))
+
+        # the hash depends on the seed, number of runs, and parameters
+        self.assertNotEqual(config_hash(flow_params1, 0, 1),
+                            config_hash(flow_params1, 1, 1))
+        self.assertNotEqual(config_hash(flow_params1, 0, 1),
+                            config_hash(flow_params1, 0, 2))
+        flow_params2["env"].horizon = 100
+        self.assertNotEqual(config_hash(flow_params1, 0, 1),
+                            config_hash(flow_params2, 0, 1))
+
+
+class TestParameterSweep(unittest.TestCase):
+    """Tests the ParameterSweep class in flow/core/sweep.py."""
+
+    def setUp(self):
+        self.results_dir = tempfile.mkdtemp()
+        _, _, flow_params = ring_road_exp_setup()
+        flow_params['sim'].render = False
+        flow_params['env'].horizon = 5
+        self.sweep = ParameterSweep(
+            flow_params,
+            grid={"env.additional_params.max_accel": [1, 3]},
+            results_dir=self.results_dir,
+            seeds=[0, 1])
+
+    def tearDown(self):
+        shutil.rmtree(self.results_dir)
+
+    def test_points(self):
+        self.assertListEqual(
+            self.sweep.points(),
+            [{"env.additional_params.max_accel": 1},
+             {"env.additional_params.max_accel": 3}])
+        self.assertEqual(len(self.sweep.pending(num_runs=2)), 4)
+
+    def test_run_and_resume(self):
+        results = self.sweep.run(num_runs=2, num_workers=1)
+
+        # one row per rollout
+        np.testing.assert_array_equal(
+            results["env.additional_params.max_accel"],
+            [1, 1, 1, 1, 3, 3, 3, 3])
+        np.testing.assert_array_equal(results["seed"],
+                                      [0, 0, 1, 1, 0, 0, 1, 1])
+        self.assertEqual(len(results["returns"]), 8)
+
+        # completed points are skipped when the sweep is extended
+        self.assertEqual(len(self.sweep.pending(num_runs=2)), 0)
+        self.sweep.grid["env.additional_params.max_accel"].append(5)
+        self.assertListEqual(
+            self.sweep.pending(num_runs=2),
+            [({"env.additional_params.max_accel": 5}, 0),
+             ({"env.additional_params.max_accel": 5}, 1)])
+        self.assertEqual(len(os.listdir(self.results_dir)), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
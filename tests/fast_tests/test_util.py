@@ -3,6 +3,9 @@ import csv
 import os
 import json
 import collections
+import pickle
+import shutil
+import tempfile
 
 from flow.envs import AccelEnv
 from flow.networks import FigureEightNetwork
@@ -11,11 +14,16 @@ from flow.core.params import TrafficLightParams
 from flow.controllers import IDMController, ContinuousRouter, RLController
 from flow.core.params import SumoParams, EnvParams, NetParams, InitialConfig, \
     InFlows, SumoCarFollowingParams
-from flow.core.util import emission_to_csv
+from flow.core.util import emission_to_csv, load_mean_data
 from flow.envs import MergePOEnv
 from flow.networks import MergeNetwork
 from flow.utils.registry import make_create_env
 from flow.utils.rllib import FlowParamsEncoder, get_flow_params
+from flow.utils.vec_env import FlowVecEnv, SharedMemoryVecEnv, \
+    CloudpickleWrapper
+
+from tests.setup_scripts import ring_road_exp_setup
+import numpy as np
 
 os.environ["TEST_FLAG"] = "True"
 
@@ -59,6 +67,67 @@ class TestEmissionToCSV(unittest.TestCase):
         self.assertEqual(len(dict1), 104)
 
 
+class TestLoadMeanData(unittest.TestCase):
+    """Tests the edge/lane aggregate outputs and the load_mean_data function.
+
+    Ensures that the outputs are generated when a mean_data_path is specified
+    and that the aggregated values match the vehicles in the network.
+    """
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_load_mean_data(self):
+        sim_params = SumoParams(
+            sim_step=0.1,
+            mean_data_path=self.path,
+            mean_data_level=["edge", "lane"],
+            mean_data_period=1)
+        env, _, _ = ring_road_exp_setup(sim_params=sim_params)
+        env.reset()
+        for _ in range(20):
+            env.step(None)
+        files = env.k.network.mean_data_files
+        edges = env.k.network.get_edge_list()
+        num_vehicles = env.k.vehicle.num_vehicles
+        env.terminate()
+
+        self.assertCountEqual(
+            files.keys(), ["edge_traffic", "edge_emissions",
+                           "lane_traffic", "lane_emissions"])
+
+        # one row per interval, and one column per edge
+        data = load_mean_data(files["edge_traffic"])
+        num_intervals = len(data["begin"])
+        self.assertGreaterEqual(num_intervals, 2)
+        np.testing.assert_array_almost_equal(
+            data["end"][:-1], data["begin"][1:])
+        np.testing.assert_array_almost_equal(
+            data["end"][:2] - data["begin"][:2], [1, 1])
+        self.assertCountEqual(data["ids"], edges)
+        self.assertEqual(data["density"].shape, (num_intervals, len(edges)))
+
+        # the vehicles spend the whole interval in the network
+        np.testing.assert_almost_equal(
+            np.sum(data["sampledSeconds"][1]), num_vehicles)
+
+        # the lane outputs have one column per lane (the ring has one lane)
+        data = load_mean_data(files["lane_traffic"],
+                              attributes=["speed"])
+        self.assertCountEqual(
+            data["ids"], ["{}_0".format(edge) for edge in edges])
+        self.assertCountEqual(
+            data.keys(), ["begin", "end", "ids", "speed"])
+
+        # the fuel consumption is available in the emissions outputs
+        data = load_mean_data(files["edge_emissions"])
+        self.assertIn("fuel_abs", data)
+        self.assertTrue(np.all(data["fuel_abs"] >= 0))
+
+
 class TestRegistry(unittest.TestCase):
     """Tests the methods located in flow/utils/registry.py"""
 
@@ -323,5 +392,101 @@ class TestRllib(unittest.TestCase):
                                      flow_params["veh"].__dict__))
 
 
+class VecEnvTestMixin(object):
+    """Checks shared by the vectorized environments in flow/utils/vec_env.py.
+
+    Test cases using this mixin implement the make_vec_env method, which
+    creates the tested vectorized environment from a list of methods creating
+    the environments.
+    """
+
+    def setUp(self):
+        env_params = EnvParams(
+            horizon=5,
+            additional_params={
+                "target_velocity": 8,
+                "max_accel": 1,
+                "max_decel": 1,
+                "sort_vehicles": False,
+            })
+
+        def env_fn():
+            return ring_road_exp_setup(env_params=env_params)[0]
+
+        self.env = self.make_vec_env([env_fn, env_fn])
+
+    def tearDown(self):
+        self.env.close()
+
+    def assert_results_kept(self, num_steps):
+        """Assert that the results of a step are kept for some more steps."""
+        self.env.reset()
+        actions = np.zeros((2,) + self.env.action_space.shape)
+        results = self.env.step(actions)
+        expected = [np.array(result) for result in results[:3]]
+
+        # the observations are those of the environments, in order
+        np.testing.assert_array_almost_equal(
+            results[0], np.stack(self.env.get_attr("state")))
+
+        for _ in range(num_steps):
+            self.env.step(actions)
+        for result, value in zip(results[:3], expected):
+            np.testing.assert_array_equal(result, value)
+
+    def test_step(self):
+        obs_shape = self.env.observation_space.shape
+
+        obs = self.env.reset()
+        self.assertEqual(obs.shape, (2,) + obs_shape)
+        # both environments are identical, and so are their observations
+        np.testing.assert_array_almost_equal(obs[0], obs[1])
+
+        # step the environments until the end of their horizon
+        actions = np.zeros((2,) + self.env.action_space.shape)
+        for _ in range(4):
+            obs, rews, dones, infos = self.env.step(actions)
+            self.assertEqual(obs.shape, (2,) + obs_shape)
+            self.assertEqual(rews.shape, (2,))
+            self.assertFalse(any(dones))
+        self.assertListEqual(self.env.get_attr("time_counter"), [4, 4])
+
+        # check that the environments are automatically reset when done, and
+        # that the last observation of their rollout is returned
+        obs, rews, dones, infos = self.env.step(actions)
+        self.assertTrue(all(dones))
+        self.assertListEqual(self.env.get_attr("time_counter"), [0, 0])
+        for info in infos:
+            self.assertEqual(info["terminal_observation"].shape, obs_shape)
+
+
+class TestFlowVecEnv(VecEnvTestMixin, unittest.TestCase):
+    """Tests the lockstep vectorized environment in flow/utils/vec_env.py."""
+
+    def make_vec_env(self, env_fns):
+        return FlowVecEnv(env_fns, num_threads=1)
+
+    def test_results_kept(self):
+        """Ensures that the results of a step are never overwritten."""
+        self.assert_results_kept(num_steps=3)
+
+
+class TestSharedMemoryVecEnv(VecEnvTestMixin, unittest.TestCase):
+    """Tests the shared memory vectorized environment."""
+
+    def make_vec_env(self, env_fns):
+        return SharedMemoryVecEnv(env_fns, ring_size=3)
+
+    def test_results_kept(self):
+        """Ensures that results are kept for ring_size - 1 more steps."""
+        self.assert_results_kept(num_steps=self.env.ring_size - 1)
+
+    def test_cloudpickle_wrapper(self):
+        """Ensures that closures can be sent to spawned workers."""
+        offset = 3
+        fn = CloudpickleWrapper(lambda x: x + offset)
+        self.assertEqual(pickle.loads(pickle.dumps(fn))(1), 4)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -9,6 +9,9 @@ from flow.controllers.car_following_models import IDMController, \
     SimCarFollowingController
 from flow.controllers.lane_change_controllers import StaticLaneChanger
 from flow.controllers.rlcontroller import RLController
+from flow.controllers.routing_controllers import ContinuousRouter, \
+    BayBridgeRouter
+from flow.core.kernel.vehicle import StepCounter, IdRegistry
 
 from tests.setup_scripts import ring_road_exp_setup, highway_exp_setup
 
@@ -195,6 +198,25 @@ class TestVehiclesClass(unittest.TestCase):
         self.assertEqual(env.k.vehicle.num_rl_vehicles,
                          len(env.k.vehicle.get_rl_ids()))
 
+    def test_copy(self):
+        """Check that copies of VehicleParams can be extended separately."""
+        vehicles = VehicleParams()
+        vehicles.add("test", num_vehicles=2)
+        vehicles_copy = vehicles.copy()
+        vehicles_copy.add("test_rl", num_vehicles=1,
+                          acceleration_controller=(RLController, {}))
+
+        self.assertListEqual(vehicles.ids, ["test_0", "test_1"])
+        self.assertEqual(vehicles.num_rl_vehicles, 0)
+        self.assertListEqual(list(vehicles.type_parameters), ["test"])
+        self.assertEqual(vehicles_copy.num_vehicles, 3)
+        self.assertEqual(vehicles_copy.get_type("test_rl_0"), "test_rl")
+
+        # the vehicle type parameters are shared
+        self.assertIs(
+            vehicles_copy.type_parameters["test"]["car_following_params"],
+            vehicles.type_parameters["test"]["car_following_params"])
+
 
 class TestMultiLaneData(unittest.TestCase):
     """
@@ -568,6 +590,373 @@ class TestIdsByEdge(unittest.TestCase):
         self.assertCountEqual(ids, expected_ids)
 
 
+class TestLazyDerivedState(unittest.TestCase):
+    """
+    Tests that the headways and multi-lane data of the vehicles are computed
+    on first access after a simulation step.
+    """
+
+    def setUp(self):
+        vehicles = VehicleParams()
+        vehicles.add(veh_id="test",
+                     acceleration_controller=(IDMController, {}),
+                     num_vehicles=5)
+        vehicles.add(veh_id="rl",
+                     acceleration_controller=(RLController, {}),
+                     num_vehicles=1)
+
+        self.env, _, _ = ring_road_exp_setup(vehicles=vehicles)
+
+    def tearDown(self):
+        self.env.terminate()
+        self.env = None
+
+    def test_lazy_derived_state(self):
+        self.env.reset()
+        k = self.env.k.vehicle
+        for _ in range(5):
+            self.env.k.simulation.simulation_step()
+            self.env.k.update(reset=False)
+
+        # nothing was computed since the last step
+        self.assertTrue(k._headways_stale)
+        self.assertTrue(k._multi_lane_stale)
+
+        # the derived state matches the state of the simulator
+        for veh_id in k.get_ids():
+            leader, gap = self.env.k.kernel_api.vehicle.getLeader(veh_id)
+            self.assertEqual(k.get_leader(veh_id), leader)
+            self.assertAlmostEqual(k.get_headway(veh_id),
+                                   gap + k.minGap["test"])
+            self.assertEqual(k.get_follower(leader), veh_id)
+        self.assertFalse(k._headways_stale)
+        self.assertTrue(k._multi_lane_stale)
+
+        self.assertEqual(k.get_lane_leaders("rl_0"), [k.get_leader("rl_0")])
+        self.assertCountEqual(
+            k.get_ids_by_edge(["bottom", "right", "top", "left"]),
+            k.get_ids())
+        self.assertFalse(k._multi_lane_stale)
+
+    def test_followers_of_last_step(self):
+        """Ensures that the followers only depend on the last step."""
+        self.env.reset()
+        k = self.env.k.vehicle
+        self.env.k.simulation.simulation_step()
+        self.env.k.update(reset=False)
+
+        # the follower of a vehicle is removed after its headways were read
+        follower = k.get_follower("rl_0")
+        next_follower = k.get_follower(follower)
+        k.remove(follower)
+        self.env.k.simulation.simulation_step()
+        self.env.k.update(reset=False)
+
+        # the new follower is further away, but replaces the removed one
+        self.assertEqual(k.get_follower("rl_0"), next_follower)
+        self.assertEqual(k.get_leader(next_follower), "rl_0")
+
+
+class TestRoutingIds(unittest.TestCase):
+    """Tests the get_routing_ids method, which is used for routing."""
+
+    def setUp(self):
+        vehicles = VehicleParams()
+        vehicles.add(veh_id="test",
+                     acceleration_controller=(IDMController, {}),
+                     routing_controller=(ContinuousRouter, {}),
+                     num_vehicles=5)
+
+        self.env, _, _ = ring_road_exp_setup(vehicles=vehicles)
+
+    def tearDown(self):
+        # free data used by the class
+        self.env.terminate()
+        self.env = None
+
+    def test_routing_ids(self):
+        self.env.reset()
+        vehicles = self.env.k.vehicle
+
+        num_routed = 0
+        for _ in range(200):
+            # only the vehicles on the last edge of their route are routed
+            expected_ids = [
+                veh_id for veh_id in vehicles.get_ids()
+                if vehicles.get_edge(veh_id) ==
+                vehicles.get_route(veh_id)[-1]]
+            self.assertCountEqual(vehicles.get_routing_ids(), expected_ids)
+            num_routed += len(expected_ids)
+
+            self.env.step(rl_actions=None)
+
+        # the vehicles reached the end of their routes during the run
+        self.assertGreater(num_routed, 0)
+
+
+class TestSharedControllers(unittest.TestCase):
+    """Tests that shareable controllers are shared by vehicles of a type."""
+
+    def test_shared_controllers(self):
+        class CustomIDMController(IDMController):
+            """Subclass that is not explicitly marked as shareable."""
+            pass
+
+        vehicles = VehicleParams()
+        vehicles.add(veh_id="shared",
+                     acceleration_controller=(IDMController, {}),
+                     routing_controller=(ContinuousRouter, {}),
+                     num_vehicles=3)
+        vehicles.add(veh_id="custom",
+                     acceleration_controller=(CustomIDMController, {}),
+                     num_vehicles=2)
+        env, _, _ = ring_road_exp_setup(vehicles=vehicles)
+        env.reset()
+        k = env.k.vehicle
+
+        # shareable controllers are created once per vehicle type, and
+        # returned as handles bound to the vehicle they are retrieved for
+        controller = k.get_acc_controller("shared_0")
+        self.assertEqual(controller.veh_id, "shared_0")
+        self.assertIs(k.get_acc_controller("shared_1").controller,
+                      controller.controller)
+        self.assertEqual(controller.veh_id, "shared_0")
+        self.assertIs(k.get_routing_controller("shared_2").controller,
+                      k.get_routing_controller("shared_0").controller)
+        self.assertListEqual(
+            [group for _, group in k.group_by_controller(
+                k.get_ids(), "acc_controller")],
+            [["shared_0", "shared_1", "shared_2"], ["custom_0"],
+             ["custom_1"]])
+
+        # the flags are not inherited by subclasses that do not set them
+        self.assertFalse(CustomIDMController.shareable)
+        self.assertTrue(ContinuousRouter.route_end_only)
+        self.assertFalse(BayBridgeRouter.route_end_only)
+
+        # other controllers are created for every vehicle
+        self.assertIsNot(k.get_acc_controller("custom_0"),
+                         k.get_acc_controller("custom_1"))
+        self.assertEqual(k.get_acc_controller("custom_1").veh_id, "custom_1")
+
+        # the controller state is stored per vehicle
+        k.get_controller_state("shared_0")["a"] = 1
+        self.assertDictEqual(k.get_controller_state("shared_0"), {"a": 1})
+        self.assertDictEqual(k.get_controller_state("shared_1"), {})
+
+        env.terminate()
+
+    def test_interleaved_vehicles(self):
+        """Ensures that kept handles act for their own vehicle."""
+        class IndexController(IDMController):
+            """Shared controller whose acceleration is the vehicle index."""
+            shareable = True
+
+            def get_accel(self, env):
+                return float(self.veh_id.split("_")[-1])
+
+        vehicles = VehicleParams()
+        vehicles.add(veh_id="shared",
+                     acceleration_controller=(IndexController, {}),
+                     num_vehicles=3)
+        env, _, _ = ring_road_exp_setup(vehicles=vehicles)
+        env.reset()
+        k = env.k.vehicle
+
+        controller_0 = k.get_acc_controller("shared_0")
+        controller_1 = k.get_acc_controller("shared_1")
+        self.assertEqual(controller_1.get_action(env), 1.)
+        self.assertEqual(controller_0.get_action(env), 0.)
+        self.assertEqual(controller_1.get_accel(env), 1.)
+        self.assertEqual(k.get_accel("shared_0", noise=False,
+                                     failsafe=False), 0.)
+
+        # the shared controller is not bound to any vehicle outside calls
+        shared = controller_0.controller
+        self.assertEqual(shared.get_actions(env, ["shared_2", "shared_0"]),
+                         [2., 0.])
+        self.assertEqual(controller_0.veh_id, "shared_0")
+        self.assertEqual(shared.veh_id, "shared_0")
+
+        # handles behave like the shared controller they are bound to
+        self.assertIsInstance(controller_0, IndexController)
+        controller_0.v0 = 20
+        self.assertEqual(shared.v0, 20)
+        self.assertEqual(controller_1.v0, 20)
+        self.assertEqual(controller_0.veh_id, "shared_0")
+
+        env.terminate()
+
+
+class TestSnapshot(unittest.TestCase):
+    """Tests the snapshot and restore methods of the vehicle kernel."""
+
+    def test_snapshot_restore(self):
+        vehicles = VehicleParams()
+        vehicles.add(veh_id="human",
+                     acceleration_controller=(IDMController, {}),
+                     num_vehicles=3)
+        vehicles.add(veh_id="rl",
+                     acceleration_controller=(RLController, {}),
+                     num_vehicles=1)
+        env, _, _ = ring_road_exp_setup(vehicles=vehicles)
+        env.reset()
+        k = env.k.vehicle
+        type_parameters = k.type_parameters
+
+        snapshot = k.snapshot()
+        self.assertEqual(snapshot.num_vehicles, 4)
+        self.assertEqual(snapshot.num_rl_vehicles, 1)
+        self.assertListEqual(snapshot.get_rl_ids(), ["rl_0"])
+        speed = k.get_speed("human_0")
+        controller = k.get_acc_controller("human_0")
+
+        # modifying the kernel does not modify the snapshot
+        k.get_controller_state("human_0")["a"] = 1
+        k.remove("human_0")
+        self.assertEqual(k.num_vehicles, 3)
+        self.assertCountEqual(snapshot.get_ids(),
+                              ["human_0", "human_1", "human_2", "rl_0"])
+
+        # the state of the vehicles is restored, and the type parameters and
+        # controllers are shared
+        for _ in range(2):
+            k.restore(snapshot)
+            self.assertEqual(k.num_vehicles, 4)
+            self.assertCountEqual(k.get_human_ids(),
+                                  ["human_0", "human_1", "human_2"])
+            self.assertEqual(k.get_speed("human_0"), speed)
+            self.assertDictEqual(k.get_controller_state("human_0"), {})
+            self.assertIs(k.get_acc_controller("human_0").controller,
+                          controller.controller)
+            self.assertIs(k.type_parameters, type_parameters)
+            k.get_controller_state("human_0")["a"] = 1
+
+        env.terminate()
+
+
+class TestStepCounter(unittest.TestCase):
+    """Tests the StepCounter class of the vehicle kernel."""
+
+    def test_step_counter(self):
+        counter = StepCounter(3)
+        self.assertEqual(len(counter), 0)
+        self.assertEqual(counter.last(), 0)
+        self.assertTupleEqual(counter.window(2), (0, 0))
+
+        for count in [1, 2, 3]:
+            counter.append(count)
+        self.assertEqual(len(counter), 3)
+        self.assertEqual(counter.last(), 3)
+        self.assertTupleEqual(counter.window(2), (5, 2))
+        # all available steps are used if more are requested
+        self.assertTupleEqual(counter.window(10), (6, 3))
+        self.assertTupleEqual(counter.window(0), (6, 3))
+
+        # the oldest counts are dropped once the capacity is reached
+        copy = counter.copy()
+        counter.append(4)
+        self.assertEqual(len(counter), 3)
+        self.assertTupleEqual(counter.window(3), (9, 3))
+        self.assertTupleEqual(copy.window(3), (6, 3))
+
+        counter.clear()
+        self.assertEqual(len(counter), 0)
+        self.assertTupleEqual(counter.window(3), (0, 0))
+
+
+class TestIdRegistry(unittest.TestCase):
+    """Tests the IdRegistry class of the vehicle kernel."""
+
+    def test_id_registry(self):
+        registry = IdRegistry(["b", "a", "c"])
+        self.assertListEqual(registry.as_list(), ["b", "a", "c"])
+        self.assertIn("a", registry)
+        self.assertEqual(len(registry), 3)
+        self.assertEqual(registry.add("a"), 1)
+
+        # indices are kept on removal, and freed indices are reused
+        copy = registry.copy()
+        registry.discard("a")
+        registry.discard("d")
+        self.assertNotIn("a", registry)
+        self.assertListEqual(list(registry), ["b", "c"])
+        self.assertEqual(registry.index("c"), 2)
+        self.assertEqual(registry.add("d"), 1)
+        self.assertEqual(registry.add("e"), 3)
+        self.assertEqual(registry.num_indices, 4)
+        np.testing.assert_array_equal(
+            registry.indices(["e", "a", "b"]), [3, -1, 0])
+
+        # the copy is not modified
+        self.assertListEqual(copy.as_list(), ["b", "a", "c"])
+        self.assertEqual(copy.index("a"), 1)
+
+        # sorted registries
+        registry = IdRegistry(["rl_1", "rl_0"], sort_ids=True)
+        self.assertListEqual(registry.as_list(), ["rl_0", "rl_1"])
+        self.assertEqual(registry.index("rl_0"), 1)
+
+    def test_kernel_indices(self):
+        vehicles = VehicleParams()
+        vehicles.add(veh_id="human",
+                     acceleration_controller=(IDMController, {}),
+                     num_vehicles=3)
+        vehicles.add(veh_id="rl",
+                     acceleration_controller=(RLController, {}),
+                     num_vehicles=2)
+        env, _, _ = ring_road_exp_setup(vehicles=vehicles)
+        env.reset()
+        k = env.k.vehicle
+
+        ids = k.get_ids()
+        np.testing.assert_array_equal(
+            np.sort(k.get_index(ids)), np.arange(5))
+        np.testing.assert_array_equal(
+            np.sort(k.get_rl_index(k.get_rl_ids())), [0, 1])
+        self.assertEqual(k.get_rl_index("human_0"), -1)
+
+        index = k.get_index("rl_1")
+        k.remove("human_0")
+        self.assertEqual(k.get_index("rl_1"), index)
+        self.assertEqual(k.get_index("human_0"), -1)
+        self.assertNotIn("human_0", k.get_ids())
+        self.assertNotIn("human_0", k.get_human_ids())
+        self.assertNotIn("human_0", k.get_controlled_ids())
+
+        env.terminate()
+
+
+class TestBoundedMemory(unittest.TestCase):
+    """Tests the rate_window and bounded_memory simulation parameters."""
+
+    def test_bounded_memory(self):
+        vehicles = VehicleParams()
+        vehicles.add(veh_id="human",
+                     acceleration_controller=(IDMController, {}),
+                     num_vehicles=3)
+        sim_params = SumoParams(sim_step=0.1, render=False, rate_window=1,
+                                bounded_memory=True)
+        env, _, _ = ring_road_exp_setup(vehicles=vehicles,
+                                        sim_params=sim_params)
+        env.reset()
+        for _ in range(20):
+            env.step(rl_actions=None)
+        k = env.k.vehicle
+
+        # only the counts of the last rate_window seconds are stored
+        self.assertEqual(len(k._num_arrived), 10)
+        self.assertEqual(k._arrived_rl_ids.maxlen, 10)
+        self.assertEqual(k.get_outflow_rate(100), 0)
+
+        # the state of removed vehicles is purged
+        self.assertIn("human_0", k.previous_speeds)
+        k.remove("human_0")
+        self.assertNotIn("human_0", k.previous_speeds)
+
+        env.terminate()
+
+
 class TestObservedIDs(unittest.TestCase):
     """Tests the observed_ids methods, which are used for visualization."""
 
@@ -600,5 +989,33 @@ class TestObservedIDs(unittest.TestCase):
         self.assertCountEqual(env.k.vehicle.get_observed_ids(), ["test_1"])
 
 
+class TestRenderData(unittest.TestCase):
+    """Tests the get_render_data method, which is used by the renderers."""
+
+    def test_render_data(self):
+        vehicles = VehicleParams()
+        vehicles.add(veh_id="test", num_vehicles=3)
+        vehicles.add(veh_id="test_track", num_vehicles=1)
+        vehicles.add(veh_id="rl", acceleration_controller=(RLController, {}),
+                     num_vehicles=1)
+
+        env, _, _ = ring_road_exp_setup(vehicles=vehicles)
+        env.reset()
+
+        data = env.k.vehicle.get_render_data(max_speed=30)
+
+        # tracked human vehicles are rendered as machine vehicles
+        self.assertCountEqual(data["human_ids"],
+                              ["test_0", "test_1", "test_2"])
+        self.assertListEqual(data["machine_ids"], ["test_track_0", "rl_0"])
+        self.assertEqual(data["human_orientations"].shape, (3, 3))
+        self.assertEqual(data["machine_orientations"].shape, (2, 3))
+        np.testing.assert_array_almost_equal(
+            data["human_dynamics"],
+            np.array(env.k.vehicle.get_speed(data["human_ids"])) / 30)
+
+        env.terminate()
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -52,6 +52,28 @@ class TestVisualizerRLlib(unittest.TestCase):
         pass_args = parser.parse_args(arg_str)
         visualizer_rllib(pass_args)
 
+    def test_evaluate_multi(self):
+        """Test for headless multi-agent evaluation"""
+        try:
+            ray.init(num_cpus=1)
+        except Exception:
+            pass
+        # current path
+        current_path = os.path.realpath(__file__).rsplit('/', 1)[0]
+
+        # evaluate the checkpoint with batched actions, without rendering
+        arg_str = '{}/../data/rllib_data/multi_agent 1 --num_rollouts 2 ' \
+                  '--headless ' \
+                  '--horizon 10'.format(current_path).split()
+        parser = vs_rllib.create_parser()
+        pass_args = parser.parse_args(arg_str)
+        results = vs_rllib.evaluate_checkpoints(pass_args)
+
+        stats = results['1']
+        self.assertEqual(len(stats['returns']), 2)
+        self.assertAlmostEqual(stats['returns_mean'],
+                               np.mean(stats['returns']))
+
 
 class TestPlotters(unittest.TestCase):
 